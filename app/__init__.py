@@ -1,12 +1,15 @@
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from config.config import config
+from app.utils.startup_profile import StartupProfile
 
 db = SQLAlchemy()
-migrate = Migrate()
 
 def create_app(config_name='default'):
+    # Phase timings of this boot (python profile_startup.py, /api/startup-profile)
+    boot = StartupProfile()
+    
     app = Flask(__name__, 
                 template_folder='views/templates',
                 static_folder='views/static')
@@ -15,7 +18,45 @@ def create_app(config_name='default'):
     
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+    
+    # Simulated market pinned to a session moment, so a seeded day reads as "now" at any hour
+    if app.config.get('KITE_SIMULATION') and app.config.get('KITE_SIM_CLOCK'):
+        from app.utils import clock
+        clock.set_clock(clock.ReplayClock.at_ist(app.config['KITE_SIM_CLOCK'], speed=1))
+    
+    # Flask-Migrate pulls in alembic: only for flask CLI commands (flask db ..., and flask init-db
+    # for a new database's schema, which create_app no longer creates), not in web workers
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+        from app import commands
+        commands.init_app(app)
+    boot.mark('extensions')
+    
+    # Track committed writes per table for version-keyed response caches
+    from app.services.data_version_service import DataVersionService
+    DataVersionService.install()
+    
+    # gzip/brotli for JSON responses
+    from app.utils import fast_json
+    fast_json.init_app(app)
+    
+    # Request, SQL, Kite and job metrics exposed at /metrics
+    from app.middlewares import metrics
+    metrics.init_app(app)
+    
+    # Sampled per-request SQL profile, N+1 detection and Server-Timing headers
+    from app.middlewares import query_profiler
+    query_profiler.init_app(app)
+    
+    # Stack sampling profiler, started and stopped per worker from the admin pages
+    from app.middlewares import sampling_profiler
+    sampling_profiler.init_app(app)
+    
+    # pandas, plotly, kiteconnect and the MACD cache load in the background from the first request
+    from app.middlewares import warmup
+    warmup.init_app(app)
+    boot.mark('middlewares')
     
     # Register blueprints
     from app.controllers.auth_controller import auth_bp
@@ -24,7 +65,9 @@ def create_app(config_name='default'):
     from app.controllers.strategy_controller import strategy_bp
     from app.controllers.oi_crossover_controller import oi_crossover_bp
     from app.controllers.futures_oi_controller import futures_oi_bp
+    from app.controllers.metrics_controller import metrics_bp
     from app.api.routes import api_bp
+    boot.mark('blueprint_imports')
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(market_bp)
@@ -32,14 +75,14 @@ def create_app(config_name='default'):
     app.register_blueprint(strategy_bp)
     app.register_blueprint(oi_crossover_bp)
     app.register_blueprint(futures_oi_bp)
+    app.register_blueprint(metrics_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
+    boot.mark('blueprint_registration')
     
     # Import models to ensure they're registered with SQLAlchemy
-    from app.models import nifty_price, banknifty_price, expiry_settings, nifty_stocks, strategy_models, futures_oi_data
-    
-    # Create tables
-    with app.app_context():
-        db.create_all()
+    # (tables come from migrations: flask db upgrade, or flask init-db for a new database)
+    from app.models import nifty_price, banknifty_price, expiry_settings, nifty_stocks, strategy_models, futures_oi_data, market_signal_snapshot, oi_minute_aggregate, job_run
+    boot.mark('models')
     
     # Add datetime utilities to Jinja2 globals
     from app.utils.datetime_utils import format_ist_time, format_ist_time_only, utc_to_ist
@@ -51,5 +94,11 @@ def create_app(config_name='default'):
     
     # Initialize scheduler after app context is available
     init_scheduler(app)
+    boot.mark('scheduler')
+    
+    app.extensions['startup_profile'] = boot.finish()
+    from app.services.metrics_service import metrics
+    metrics.set_gauge('app_boot_seconds', boot.total_ms / 1000)
+    print(f"⏱️ App created in {boot.total_ms:.0f} ms")
     
     return app
\ No newline at end of file
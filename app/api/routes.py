@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request
 from app.services.market_service import MarketService
 from app.services.kite_service import KiteService
+from app.middlewares.auth_middleware import login_required
+from app.utils.pagination import page_args
+from app.utils.downsampling import downsample_args, downsample
 from app.controllers.oi_controller import oi_changes_api, oi_changes_timeline_api
 from app.controllers.nifty_stocks_controller import (
     nifty_stocks_api, 
@@ -13,15 +16,23 @@ api_bp = Blueprint('api', __name__)
 
 @api_bp.route('/prices/latest', methods=['GET'])
 def get_latest_prices():
-    """API endpoint to get latest prices"""
+    """API endpoint to get latest prices (keyset paged: ?limit=&cursor=&since=)"""
+    try:
+        paging = page_args(default_limit=100)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
     try:
-        limit = request.args.get('limit', 100, type=int)
         market_service = MarketService()
-        prices = market_service.get_latest_prices(limit)
+        prices, page = market_service.get_latest_prices(**paging)
         
         return jsonify({
             'success': True,
-            'data': [price.to_dict() for price in prices]
+            'data': [price.to_dict() for price in prices],
+            'page': page
         })
     except Exception as e:
         return jsonify({
@@ -31,15 +42,32 @@ def get_latest_prices():
 
 @api_bp.route('/prices/history', methods=['GET'])
 def get_price_history():
-    """API endpoint to get price history"""
+    """API endpoint to get price history (keyset paged: ?limit=&cursor=&since=, ?downsample=lttb|minmax&points=)"""
+    try:
+        # The whole window unless the client pages with limit/cursor/since
+        paging = page_args(default_limit=None)
+        method, points = downsample_args()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
     try:
         hours = request.args.get('hours', 24, type=int)
         market_service = MarketService()
-        prices = market_service.get_price_history(hours)
+        prices, page = market_service.get_price_history(hours, **paging)
+        
+        if method:
+            prices = downsample(
+                prices, [p['timestamp'] for p in prices], [p['price'] for p in prices], method, points
+            )
+            page['downsampled'] = len(prices)
         
         return jsonify({
             'success': True,
-            'data': prices
+            'data': prices,
+            'page': page
         })
     except Exception as e:
         return jsonify({
@@ -125,4 +153,110 @@ def get_nifty_top_performers():
 @api_bp.route('/nifty-sector-performance', methods=['GET'])
 def get_nifty_sector_performance():
     """API endpoint to get sector performance data"""
-    return nifty_sector_performance_api()
\ No newline at end of file
+    return nifty_sector_performance_api()
+
+@api_bp.route('/max-pain/<underlying>', methods=['GET'])
+def get_max_pain(underlying):
+    """API endpoint to get max pain and OI walls for the latest option chain"""
+    from app.controllers.max_pain_controller import get_max_pain_api
+    return get_max_pain_api(underlying)
+
+@api_bp.route('/max-pain-timeline/<underlying>', methods=['GET'])
+def get_max_pain_timeline(underlying):
+    """API endpoint to get intraday max pain timeline for charting"""
+    from app.controllers.max_pain_controller import get_max_pain_timeline_api
+    return get_max_pain_timeline_api(underlying)
+
+@api_bp.route('/stream', methods=['GET'])
+def stream():
+    """Server-Sent Events stream of live updates (?topics=prices,option_chain:NIFTY,...)"""
+    from app.controllers.stream_controller import stream_events
+    return stream_events()
+
+@api_bp.route('/export/<dataset>', methods=['GET'])
+@login_required
+def export_dataset(dataset):
+    """API endpoint to stream a historical table (?format=csv|ndjson|parquet&start=&end=&underlying=)"""
+    from app.controllers.export_controller import export_dataset_api
+    return export_dataset_api(dataset)
+
+@api_bp.route('/batch', methods=['GET', 'POST'])
+def batch():
+    """API endpoint to evaluate several dashboard widgets in one request (?widgets=a,b or POST {"widgets": [...]})"""
+    from app.controllers.batch_controller import batch_api
+    return batch_api()
+
+@api_bp.route('/sql-profile', methods=['GET', 'DELETE'])
+@login_required
+def sql_profile():
+    """API endpoint for this worker's per-endpoint SQL profile and N+1 suspects (DELETE resets it)"""
+    import os
+    from app.middlewares.query_profiler import query_report
+    if request.method == 'DELETE':
+        query_report.clear()
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'data': query_report.get_report()
+    })
+
+@api_bp.route('/startup-profile', methods=['GET'])
+def startup_profile():
+    """API endpoint for this worker's create_app phase timings and background warm-up"""
+    from flask import current_app
+    profile = current_app.extensions.get('startup_profile')
+    return jsonify({
+        'success': True,
+        'data': profile.report() if profile else None
+    })
+
+@api_bp.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """API endpoint for response cache hit/miss counters and current data versions"""
+    from app.middlewares.response_cache import response_cache
+    from app.services.data_version_service import data_versions
+    return jsonify({
+        'success': True,
+        'data': {
+            'response_cache': response_cache.get_stats(),
+            'data_versions': data_versions.get_all()
+        }
+    })
+
+@api_bp.route('/data-gaps', methods=['GET'])
+def data_gaps():
+    """API endpoint for missing ingestion slots per table and underlying on an IST date (?date=YYYY-MM-DD, default today)"""
+    from datetime import datetime
+    from app.services.data_gap_service import DataGapService
+    try:
+        trade_date = request.args.get('date')
+        trade_date = datetime.strptime(trade_date, '%Y-%m-%d').date() if trade_date else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'date must be YYYY-MM-DD'}), 400
+    try:
+        return jsonify({'success': True, 'data': DataGapService().scan(trade_date)})
+    except Exception as e:
+        print(f"Error scanning data gaps: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@api_bp.route('/data-gaps/backfill', methods=['POST'])
+@login_required
+def backfill_data_gaps():
+    """API endpoint to fill index and futures gaps from Kite historical candles (JSON: {date, days})"""
+    from datetime import datetime, timedelta
+    from app.services.data_gap_service import DataGapService
+    payload = request.get_json(silent=True) or {}
+    gap_service = DataGapService()
+    try:
+        end_date = datetime.strptime(payload['date'], '%Y-%m-%d').date() if payload.get('date') else gap_service.ist_today()
+        days = int(payload.get('days', 1))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'date must be YYYY-MM-DD and days a number'}), 400
+    if not 1 <= days <= 60:
+        return jsonify({'success': False, 'message': 'days must be between 1 and 60'}), 400
+    try:
+        dates = [end_date - timedelta(days=offset) for offset in range(days)]
+        return jsonify({'success': True, 'data': gap_service.backfill(dates)})
+    except Exception as e:
+        print(f"Error backfilling data gaps: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
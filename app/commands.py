@@ -0,0 +1,32 @@
+import click
+from flask.cli import with_appcontext
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+from app import db
+
+
+def prepare_schema():
+    """
+    Upgrade a migrated database, or create a new one's schema and stamp it at the
+    latest migration. Needs an app context with Flask-Migrate registered; returns
+    the message to show.
+    """
+    if inspect(db.engine).has_table('alembic_version'):
+        upgrade()
+        return '✅ Database upgraded to the latest migration'
+    # New database (or one whose tables create_app used to create): the models are the schema at head
+    db.create_all()
+    stamp()
+    return '✅ Database schema created and stamped at the latest migration'
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create a new database's schema and stamp it at the latest migration; upgrade a migrated one."""
+    click.echo(prepare_schema())
+
+
+def init_app(app):
+    """Flask CLI commands: flask --app run init-db"""
+    app.cli.add_command(init_db_command)
@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, send_from_directory, abort
 from app.models.expiry_settings import ExpirySettings
 from app.middlewares.auth_middleware import login_required
+from app.services.job_trace_service import JobTraceService
+from app.services.sampling_profiler import profiler
+from app.utils import clock
 from datetime import datetime, date
 from app import db
+import os
+import pytz
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -174,3 +179,121 @@ def reset_expiry(underlying):
             'success': False,
             'message': f'Error resetting expiry: {str(e)}'
         }), 500
+
+@admin_bp.route('/jobs')
+@login_required
+def job_runs():
+    """Scheduler job runs of a day: per-job summary, slowest cycles with their phase timings and skipped runs"""
+    try:
+        trade_date = datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        trade_date = clock.now(pytz.timezone('Asia/Kolkata')).date()
+    job_id = request.args.get('job') or None
+
+    service = JobTraceService()
+    return render_template(
+        'admin/job_runs.html',
+        trade_date=trade_date,
+        job_id=job_id,
+        summary=service.get_day_summary(trade_date),
+        slowest_runs=service.get_slowest_runs(trade_date, job_id=job_id),
+        skipped_runs=service.get_skipped_runs(trade_date)
+    )
+
+@admin_bp.route('/jobs/runs')
+@login_required
+def job_runs_data():
+    """Slowest job runs of a day as JSON (date=YYYY-MM-DD, job=<job id>, limit=N)"""
+    try:
+        trade_date = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') \
+            else clock.now(pytz.timezone('Asia/Kolkata')).date()
+        limit = min(int(request.args.get('limit', 25)), 500)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid date or limit. Use date=YYYY-MM-DD and a numeric limit'
+        }), 400
+
+    try:
+        service = JobTraceService()
+        runs = service.get_slowest_runs(trade_date, job_id=request.args.get('job'), limit=limit)
+        return jsonify({
+            'success': True,
+            'date': trade_date.isoformat(),
+            'summary': service.get_day_summary(trade_date),
+            'runs': [run.to_dict() for run in runs]
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error loading job runs: {str(e)}'
+        }), 500
+
+@admin_bp.route('/profiler')
+@login_required
+def profiler_page():
+    """Stack sampling profiler of the worker serving the page, and the profiles of every worker"""
+    return render_template('admin/profiler.html', status=profiler.status(), profiles=profiler.list_profiles())
+
+@admin_bp.route('/profiler/status')
+@login_required
+def profiler_status():
+    """Sampling state of this worker and the collapsed-stack files written so far"""
+    return jsonify({
+        'success': True,
+        'data': profiler.status(),
+        'profiles': profiler.list_profiles()
+    })
+
+@admin_bp.route('/profiler/start', methods=['POST'])
+@login_required
+def profiler_start():
+    """Start sampling this worker (mode cpu|wall, interval_ms, duration seconds, label)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        duration = float(data.get('duration', 60))
+        interval_ms = float(data['interval_ms']) if data.get('interval_ms') else None
+        if not 0 < duration <= 1800:
+            raise ValueError('duration must be between 1 and 1800 seconds')
+        session = profiler.start(
+            mode=data.get('mode', 'cpu'), interval_ms=interval_ms, duration=duration, label=data.get('label')
+        )
+        return jsonify({
+            'success': True,
+            'message': f'Profiling worker {profiler.pid} for {duration:.0f}s',
+            'data': session
+        })
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except RuntimeError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 503
+
+@admin_bp.route('/profiler/stop', methods=['POST'])
+@login_required
+def profiler_stop():
+    """Stop this worker's session and write its collapsed stacks"""
+    result = profiler.stop()
+    if result is None:
+        return jsonify({
+            'success': False,
+            'message': f'No profiling session is running in worker {profiler.pid}'
+        }), 409
+    return jsonify({
+        'success': True,
+        'message': f"Wrote {result['samples']} samples to {result['file']}",
+        'data': result
+    })
+
+@admin_bp.route('/profiler/profiles/<name>')
+@login_required
+def profiler_download(name):
+    """Download a collapsed-stack file (input for flamegraph.pl or speedscope)"""
+    if not name.endswith('.folded'):
+        abort(404)
+    return send_from_directory(os.path.abspath(profiler.directory), name, as_attachment=True, mimetype='text/plain')
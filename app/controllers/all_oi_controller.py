@@ -1,10 +1,16 @@
 from flask import jsonify
 from datetime import datetime, timedelta
 import pytz
+from app.utils import clock
 from app import db
 from app.models.nifty_price import NiftyPrice
 from app.models.banknifty_price import BankNiftyPrice, OptionChainData
 from sqlalchemy import text, desc, func
+import numpy as np
+from app.services.column_query_service import ColumnQueryService
+from app.utils.pagination import keyset_page
+
+column_queries = ColumnQueryService()
 
 def get_all_oi_data(underlying):
     """
@@ -33,7 +39,7 @@ def get_all_oi_data(underlying):
             'summary': summary_stats,
             'strikes': strike_data,
             'total_strikes': len(strike_data),
-            'analysis_time': datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S IST')
+            'analysis_time': clock.now(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S IST')
         })
         
     except Exception as e:
@@ -58,71 +64,55 @@ def get_current_index_price(underlying):
 def get_complete_strike_data(underlying):
     """Get complete OI data for all strikes"""
     try:
-        # Get the latest OI data for each strike
-        # We need the most recent data and also historical data to calculate changes
-        
-        # First, get all unique strikes for the underlying
-        unique_strikes = db.session.query(
-            OptionChainData.strike_price
-        ).filter(
-            OptionChainData.underlying == underlying
-        ).distinct().order_by(OptionChainData.strike_price).all()
-        
-        strike_data = []
-        
-        for strike_tuple in unique_strikes:
-            strike_price = strike_tuple[0]
-            
-            # Get latest data for this strike
-            latest_data = OptionChainData.query.filter(
-                OptionChainData.underlying == underlying,
-                OptionChainData.strike_price == strike_price
-            ).order_by(desc(OptionChainData.timestamp)).first()
-            
-            if not latest_data:
-                continue
-            
-            # Get first data from today for change calculation (start of day)
-            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            first_today_data = OptionChainData.query.filter(
-                OptionChainData.underlying == underlying,
-                OptionChainData.strike_price == strike_price,
-                OptionChainData.timestamp >= today_start
-            ).order_by(OptionChainData.timestamp.asc()).first()
-            
-            # Calculate OI changes from start of day
-            ce_oi_change_percent = 0
-            pe_oi_change_percent = 0
-            
-            if first_today_data and first_today_data.id != latest_data.id:
-                # Calculate CE OI change percentage from start of day
-                if first_today_data.ce_oi and first_today_data.ce_oi > 0:
-                    ce_oi_change_percent = ((latest_data.ce_oi - first_today_data.ce_oi) / first_today_data.ce_oi) * 100
-                
-                # Calculate PE OI change percentage from start of day
-                if first_today_data.pe_oi and first_today_data.pe_oi > 0:
-                    pe_oi_change_percent = ((latest_data.pe_oi - first_today_data.pe_oi) / first_today_data.pe_oi) * 100
-            
-            # Create strike data entry
-            strike_info = {
-                'strike_price': float(strike_price),
-                'ce_oi': latest_data.ce_oi or 0,
-                'pe_oi': latest_data.pe_oi or 0,
-                'ce_oi_change_percent': round(ce_oi_change_percent, 1) if ce_oi_change_percent != 0 else 0,
-                'pe_oi_change_percent': round(pe_oi_change_percent, 1) if pe_oi_change_percent != 0 else 0,
-                'ce_ltp': latest_data.ce_ltp or 0,
-                'pe_ltp': latest_data.pe_ltp or 0,
-                'ce_volume': latest_data.ce_volume or 0,
-                'pe_volume': latest_data.pe_volume or 0,
-                'timestamp': latest_data.timestamp.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            strike_data.append(strike_info)
-        
-        # Sort by strike price
-        strike_data.sort(key=lambda x: x['strike_price'])
-        
-        return strike_data
+        # Two grouped, column-projected queries instead of two ORM queries per strike:
+        # the latest row of every strike and the first row of every strike today
+        today_start = clock.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        latest = column_queries.strike_snapshot_arrays(underlying)
+        first_today = column_queries.strike_snapshot_arrays(underlying, since=today_start, first=True)
+        
+        if len(latest['strike_price']) == 0:
+            return []
+        
+        ce_oi = np.nan_to_num(latest['ce_oi'])
+        pe_oi = np.nan_to_num(latest['pe_oi'])
+        
+        # Align the start-of-day rows with the latest rows by strike
+        position = np.searchsorted(first_today['strike_price'], latest['strike_price'])
+        position = np.minimum(position, max(len(first_today['strike_price']) - 1, 0))
+        if len(first_today['strike_price']):
+            matched = (first_today['strike_price'][position] == latest['strike_price']) & \
+                (first_today['id'][position] != latest['id'])
+            base_ce_oi = np.where(matched, np.nan_to_num(first_today['ce_oi'][position]), 0)
+            base_pe_oi = np.where(matched, np.nan_to_num(first_today['pe_oi'][position]), 0)
+        else:
+            base_ce_oi = base_pe_oi = np.zeros(len(ce_oi))
+        
+        # Calculate OI changes from start of day (0 where there is no positive base)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ce_oi_change_percent = np.where(base_ce_oi > 0, (ce_oi - base_ce_oi) / base_ce_oi * 100, 0).round(1)
+            pe_oi_change_percent = np.where(base_pe_oi > 0, (pe_oi - base_pe_oi) / base_pe_oi * 100, 0).round(1)
+        
+        timestamps = np.datetime_as_string(latest['timestamp'], unit='s')
+        
+        # Rows come back sorted by strike price
+        return [{
+            'strike_price': float(strike_price),
+            'ce_oi': int(ce),
+            'pe_oi': int(pe),
+            'ce_oi_change_percent': float(ce_change),
+            'pe_oi_change_percent': float(pe_change),
+            'ce_ltp': float(ce_ltp),
+            'pe_ltp': float(pe_ltp),
+            'ce_volume': int(ce_volume),
+            'pe_volume': int(pe_volume),
+            'timestamp': timestamp.replace('T', ' ')
+        } for strike_price, ce, pe, ce_change, pe_change, ce_ltp, pe_ltp, ce_volume, pe_volume, timestamp in zip(
+            latest['strike_price'].tolist(), ce_oi.tolist(), pe_oi.tolist(),
+            ce_oi_change_percent.tolist(), pe_oi_change_percent.tolist(),
+            np.nan_to_num(latest['ce_ltp']).tolist(), np.nan_to_num(latest['pe_ltp']).tolist(),
+            np.nan_to_num(latest['ce_volume']).tolist(), np.nan_to_num(latest['pe_volume']).tolist(),
+            timestamps.tolist()
+        )]
         
     except Exception as e:
         print(f"Error getting complete strike data: {e}")
@@ -140,8 +130,13 @@ def calculate_summary_stats(strike_data, current_index_price):
         # Find ATM strike (closest to current price)
         atm_strike = min(strike_data, key=lambda x: abs(x['strike_price'] - current_index_price)) if strike_data else None
         
-        # Calculate max pain (strike with highest total OI)
-        max_pain_strike = max(strike_data, key=lambda x: x['ce_oi'] + x['pe_oi']) if strike_data else None
+        # Calculate max pain (strike with minimum total option-writer payout)
+        from app.services.max_pain_service import MaxPainService
+        max_pain_data = MaxPainService().analyze_arrays(
+            [strike['strike_price'] for strike in strike_data],
+            [strike['ce_oi'] for strike in strike_data],
+            [strike['pe_oi'] for strike in strike_data]
+        ) if strike_data else None
         
         return {
             'total_ce_oi': int(total_ce_oi),
@@ -149,7 +144,7 @@ def calculate_summary_stats(strike_data, current_index_price):
             'current_index_price': current_index_price,
             'pcr_ratio': pcr_ratio,
             'atm_strike': atm_strike['strike_price'] if atm_strike else 0,
-            'max_pain_strike': max_pain_strike['strike_price'] if max_pain_strike else 0,
+            'max_pain_strike': max_pain_data['max_pain_strike'] if max_pain_data else 0,
             'total_strikes': len(strike_data)
         }
         
@@ -165,15 +160,29 @@ def calculate_summary_stats(strike_data, current_index_price):
             'total_strikes': 0
         }
 
-def get_oi_changes_for_strike(underlying, strike_price, hours=24):
-    """Get OI change history for a specific strike (helper function)"""
+def get_oi_changes_for_strike(underlying, strike_price, hours=24, since=None, limit=None):
+    """
+    Get OI change history for a specific strike (helper function)
+    
+    since is a (timestamp, id) key from app.utils.pagination: only changes after it
+    are returned, computed against the row at the key.
+    """
     try:
         # Get OI data for the last N hours
-        records = OptionChainData.query.filter(
+        strike_query = OptionChainData.query.filter(
             OptionChainData.underlying == underlying,
             OptionChainData.strike_price == strike_price,
             OptionChainData.timestamp >= datetime.utcnow() - timedelta(hours=hours)
-        ).order_by(OptionChainData.timestamp).all()
+        )
+        records, _ = keyset_page(
+            strike_query, OptionChainData.timestamp, OptionChainData.id,
+            limit=limit, cursor=since
+        )
+        
+        # The row at the key is the baseline for the first change
+        previous_record = db.session.get(OptionChainData, since[1]) if since else None
+        if previous_record:
+            records = [previous_record] + records
         
         changes = []
         for i, record in enumerate(records):
@@ -0,0 +1,279 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import threading
+import time
+from flask import current_app, jsonify, request, Response
+from werkzeug.datastructures import MultiDict
+from app.services.datetime_filter_service import DateTimeFilterService
+from app.utils.fast_json import dumps
+
+# Widget evaluation threads, shared by all batch requests of this worker
+BATCH_WORKERS = 6
+MAX_WIDGETS = 16
+
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch-widget')
+
+
+class RawJSON(bytes):
+    """Widget result that is already serialised JSON and is spliced into the response as is"""
+
+
+class BatchContext:
+    """
+    Inputs shared by every widget of one batch request.
+
+    Dates are parsed once from the batch parameters; index prices and the latest
+    option chain are loaded on first use and memoised, so widgets that need the
+    same data (the NIFTY and BANKNIFTY timelines, the chain and the strike table)
+    read it once. Memoised values are plain arrays/frames, never ORM objects, so
+    widgets running in other threads (with their own sessions) can share them.
+    """
+
+    def __init__(self, params):
+        self.params = params
+        self.start_date, self.end_date, self.start_time, self.end_time = \
+            DateTimeFilterService().parse_date_params(params, default_today=True)
+        self.target_date = DateTimeFilterService.get_target_date(self.start_date, self.end_date)
+        self._values = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def shared(self, key, loader):
+        """loader() evaluated once per batch for key, however many widgets ask concurrently"""
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._values:
+                self._values[key] = loader()
+            return self._values[key]
+
+    def session_window(self):
+        from app.controllers.oi_controller import market_window_utc
+        return market_window_utc(self.target_date)
+
+    def index_prices(self, underlying):
+        """Index price frame of the target session (plus 5 minutes either side)"""
+        def load():
+            import pandas as pd
+            from app.services.column_query_service import ColumnQueryService
+            start, end = self.session_window()
+            window = pd.Timedelta(minutes=5)
+            return ColumnQueryService().index_price_frame(symbol=underlying, start=start - window, end=end + window)
+        return self.shared(('index_prices', underlying), load)
+
+    def latest_chain(self, underlying):
+        """Latest option chain row per strike of the target session, as arrays"""
+        def load():
+            from app.services.column_query_service import ColumnQueryService
+            start, _ = self.session_window()
+            return ColumnQueryService().strike_snapshot_arrays(underlying, since=start)
+        return self.shared(('latest_chain', underlying), load)
+
+
+# ----------------------------------------------------------------------
+# Widgets: fn(context, params) -> payload of the matching standalone endpoint's 'data'
+# ----------------------------------------------------------------------
+
+def comprehensive_widget(context, params):
+    from app.services.dashboard_snapshot_service import DashboardSnapshotService
+    # Already serialised for /api/dashboard-comprehensive; no need to decode and re-encode
+    return RawJSON(DashboardSnapshotService().get(context.end_date)['body'])
+
+
+def market_signal_widget(context, params):
+    from app.services.market_signal_snapshot_service import MarketSignalSnapshotService
+    return MarketSignalSnapshotService().get_signal(target_date=context.end_date)
+
+
+def market_signal_history_widget(context, params):
+    from app.services.market_signal_snapshot_service import MarketSignalSnapshotService
+    return MarketSignalSnapshotService().get_history(target_date=context.end_date)
+
+
+def sector_performance_widget(context, params):
+    from app.controllers.market_controller import dashboard_cache, DASHBOARD_CACHE_SECONDS, SECTOR_TABLES
+    from app.services.data_version_service import data_versions
+    from app.services.market_service import MarketService
+    return dashboard_cache.get_or_set(
+        'sector_performance',
+        MarketService().get_sector_wise_performance,
+        ttl=DASHBOARD_CACHE_SECONDS,
+        version=data_versions.token(SECTOR_TABLES)
+    )
+
+
+def top_oi_strikes_widget(context, params):
+    from app.controllers.market_controller import dashboard_cache, DASHBOARD_CACHE_SECONDS, TOP_STRIKES_TABLES
+    from app.services.data_version_service import data_versions
+    from app.services.market_service import MarketService
+    return dashboard_cache.get_or_set(
+        'top_oi_strikes',
+        MarketService().get_top_oi_strikes,
+        ttl=DASHBOARD_CACHE_SECONDS,
+        version=data_versions.token(TOP_STRIKES_TABLES)
+    )
+
+
+def macd_signals_widget(context, params):
+    from app.services.super_fast_macd_cache import fast_cache
+    return fast_cache.get_all_timeframes(params.get('symbol', 'NIFTY'))
+
+
+def oi_timeline_widget(context, params):
+    from app.services.market_service import MarketService
+    instrument_type = params.get('type', 'NIFTY').upper()
+    if instrument_type == 'NIFTY':
+        return MarketService().get_nifty_oi_timeline_chart_data()
+    if instrument_type == 'BANKNIFTY':
+        return MarketService().get_banknifty_oi_timeline_chart_data()
+    raise ValueError('Invalid instrument type')
+
+
+def oi_changes_timeline_widget(context, params):
+    from app.controllers.oi_controller import get_oi_changes_timeline
+    underlying = params.get('underlying', 'NIFTY').upper()
+    return get_oi_changes_timeline(underlying, context.target_date, context.index_prices(underlying))
+
+
+def latest_prices_widget(context, params):
+    """Latest NIFTY and BANKNIFTY price of the target session"""
+    from app.utils.fast_json import epoch_ms
+    latest = {}
+    for underlying in ('NIFTY', 'BANKNIFTY'):
+        frame = context.index_prices(underlying)
+        if len(frame):
+            latest[underlying] = {
+                'price': float(frame['price'].iloc[-1]),
+                'timestamp': epoch_ms(frame.index[-1:])[0]
+            }
+        else:
+            latest[underlying] = None
+    return latest
+
+
+def option_chain_widget(context, params):
+    """Latest row per strike of the target session as parallel arrays (timestamps in epoch ms)"""
+    from app.utils.fast_json import epoch_ms
+    chain = context.latest_chain(params.get('underlying', 'NIFTY').upper())
+    return {
+        name: epoch_ms(values) if name == 'timestamp' else values
+        for name, values in chain.items() if name != 'id'
+    }
+
+
+WIDGETS = {
+    'comprehensive': comprehensive_widget,
+    'market_signal': market_signal_widget,
+    'market_signal_history': market_signal_history_widget,
+    'sector_performance': sector_performance_widget,
+    'top_oi_strikes': top_oi_strikes_widget,
+    'macd_signals': macd_signals_widget,
+    'oi_timeline': oi_timeline_widget,
+    'oi_changes_timeline': oi_changes_timeline_widget,
+    'latest_prices': latest_prices_widget,
+    'option_chain': option_chain_widget
+}
+
+
+def parse_batch_request():
+    """
+    (batch params, [(result key, widget name, widget params)]) from the request.
+
+    GET  /api/batch?widgets=market_signal,top_oi_strikes&end_date=2025-01-10
+    POST /api/batch {"params": {"end_date": "2025-01-10"},
+                     "widgets": ["market_signal", {"id": "bnf", "widget": "oi_changes_timeline",
+                                                   "params": {"underlying": "BANKNIFTY"}}]}
+
+    Query string parameters apply to every widget; POST body params override them.
+    Raises ValueError for unknown widgets or a malformed body.
+    """
+    params = MultiDict(request.args)
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get('widgets'), list):
+            raise ValueError('Body must be a JSON object with a widgets list')
+        body_params = body.get('params') or {}
+        if not isinstance(body_params, dict):
+            raise ValueError('Body params must be a JSON object')
+        # Assigned, not updated: MultiDict.update appends and .get() would keep the query string value
+        for name, value in body_params.items():
+            params[name] = value
+        specs = body['widgets']
+    else:
+        specs = [name.strip() for name in request.args.get('widgets', '').split(',') if name.strip()]
+
+    if not specs:
+        raise ValueError(f"No widgets requested. Available: {', '.join(WIDGETS)}")
+    if len(specs) > MAX_WIDGETS:
+        raise ValueError(f'At most {MAX_WIDGETS} widgets per batch')
+
+    widgets = []
+    for spec in specs:
+        if isinstance(spec, str):
+            spec = {'widget': spec}
+        if not isinstance(spec, dict):
+            raise ValueError(f'Invalid widget request: {spec!r}')
+        name = spec.get('widget')
+        if name not in WIDGETS:
+            raise ValueError(f"Unknown widget '{name}'. Available: {', '.join(WIDGETS)}")
+        key = str(spec.get('id') or name)
+        if any(key == existing for existing, _, _ in widgets):
+            raise ValueError(f"Duplicate widget id '{key}'")
+        widgets.append((key, name, spec.get('params') or {}))
+    return params, widgets
+
+
+def _run_widget(app, context, name, params):
+    """Evaluate one widget in a worker thread (own app context, so its own DB session)"""
+    started = time.perf_counter()
+    with app.app_context():
+        try:
+            data = WIDGETS[name](context, params)
+            return True, data, None, time.perf_counter() - started
+        except Exception as e:
+            print(f"Error in batch widget {name}: {str(e)}")
+            return False, None, str(e), time.perf_counter() - started
+
+
+def batch_api():
+    """
+    Evaluate several dashboard widgets in one request.
+
+    Shared inputs (date range, index prices, latest chain) are resolved once per
+    batch and the widgets run concurrently. The response multiplexes every
+    widget under its id: {'success', 'results': {id: {'success', 'data' | 'error',
+    'ms'}}, 'ms'}; one failing widget never fails the batch.
+    """
+    started = time.perf_counter()
+    try:
+        params, widgets = parse_batch_request()
+        context = BatchContext(params)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    app = current_app._get_current_object()
+    futures = [
+        (key, batch_executor.submit(_run_widget, app, context, name, {**params.to_dict(), **widget_params}))
+        for key, name, widget_params in widgets
+    ]
+
+    # Splice per-widget JSON so pre-serialised snapshot bodies are embedded without a decode/encode round trip
+    parts = []
+    for key, future in futures:
+        ok, data, error, seconds = future.result()
+        header = dumps(key) + b':{"success":' + (b'true' if ok else b'false') + b',"ms":' + dumps(round(seconds * 1000, 1))
+        if ok:
+            body = data if isinstance(data, RawJSON) else dumps(data)
+            parts.append(header + b',"data":' + body + b'}')
+        else:
+            parts.append(header + b',"error":' + dumps(error) + b'}')
+
+    payload = (
+        b'{"success":true,"results":{' + b','.join(parts) + b'},"ms":' +
+        dumps(round((time.perf_counter() - started) * 1000, 1)) +
+        b',"timestamp":' + dumps(datetime.utcnow().isoformat()) + b'}'
+    )
+    return Response(payload, mimetype='application/json', headers={'Cache-Control': 'no-store'})
@@ -0,0 +1,37 @@
+from flask import Response, jsonify, request, stream_with_context
+from app.services.export_service import ExportService
+
+
+def export_dataset_api(dataset):
+    """
+    Stream a historical table as CSV, NDJSON or Parquet.
+
+    Query args: format (csv|ndjson|parquet, default csv), start and end
+    ('YYYY-MM-DD' or ISO datetime, UTC like the stored timestamps) and
+    underlying (option_chain_data and futures_oi_data only).
+    """
+    try:
+        export_service = ExportService()
+        fmt = request.args.get('format', 'csv').lower()
+        underlying = request.args.get('underlying')
+        start = export_service.parse_bound(request.args.get('start'))
+        end = export_service.parse_bound(request.args.get('end'), end_of_day=True)
+
+        chunks = export_service.stream(dataset, fmt, start=start, end=end, underlying=underlying)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    mimetype = ExportService.FORMATS[fmt][0]
+    filename = export_service.filename(dataset, fmt, start, end, underlying)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            # Let nginx pass chunks straight through instead of spooling the whole file
+            'X-Accel-Buffering': 'no'
+        }
+    )
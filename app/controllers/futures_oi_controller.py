@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, jsonify
 from app.services.futures_oi_service import FuturesOIService
 from app.services.datetime_filter_service import DateTimeFilterService
+from app.middlewares.response_cache import cached_response
 import logging
 
 futures_oi_bp = Blueprint('futures_oi', __name__)
@@ -33,6 +34,7 @@ def futures_oi_analysis():
                              underlying='NIFTY')
 
 @futures_oi_bp.route('/api/futures-oi-data')
+@cached_response(('futures_oi_data',))
 def futures_oi_data_api():
     """API endpoint for futures OI analysis data"""
     try:
@@ -45,21 +47,26 @@ def futures_oi_data_api():
         if not target_date:
             target_date = DateTimeFilterService.get_today()
         
+        # Optional multi-day window; defaults to the single target date
+        start_date = request.args.get('start_date') or target_date
+        end_date = request.args.get('end_date') or start_date
+        
         # Get futures OI service
         service = FuturesOIService()
         
         # Get futures OI analysis data
-        data = service.get_futures_oi_analysis(
+        result = service.get_futures_oi_analysis(
             underlying=underlying,
-            start_date=target_date,
-            end_date=target_date,
+            start_date=start_date,
+            end_date=end_date,
             start_time=start_time,
             end_time=end_time
         )
         
         return jsonify({
             'success': True,
-            'data': data
+            'data': result['data'],
+            'summary': result['summary']
         })
         
     except Exception as e:
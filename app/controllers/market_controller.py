@@ -1,68 +1,99 @@
-from flask import Blueprint, render_template, jsonify, current_app, request, redirect, url_for, send_from_directory
+from flask import Blueprint, render_template, jsonify, current_app, request, redirect, url_for, send_from_directory, Response
 from app.services.market_service import MarketService
-from app.services.chart_service import ChartService
 from app.services.datetime_filter_service import DateTimeFilterService
+from app.services.market_signal_snapshot_service import MarketSignalSnapshotService
+from app.services.oi_aggregate_service import OIAggregateService
+from app.services.live_update_service import LiveUpdateService
+from app.services.dashboard_snapshot_service import DashboardSnapshotService
+from app.services.shared_cache import SharedCache
+from app.services.data_version_service import data_versions
+from app.middlewares.response_cache import cached_response
+from app.utils.fast_json import json_response
 from app.middlewares.auth_middleware import login_required
+from app.middlewares.metrics import track_job, init_scheduler_metrics
+from app.services.job_trace_service import JobTraceService, JOB_POLICIES, trace_job, span, record_error
 from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta
 from app.controllers.oi_controller import oi_changes
 from app import db
-import pandas as pd
 import pytz
+from app.utils import clock
 
 market_bp = Blueprint('market', __name__)
 
 # Initialize scheduler
 scheduler = BackgroundScheduler()
 
+# Dashboard payloads shared by all gunicorn workers, one key per endpoint stored with the data
+# version of the tables it read, so each ingestion commit is computed once for every worker
+dashboard_cache = SharedCache('dashboard', max_entries=32)
+DASHBOARD_CACHE_SECONDS = 60
+
+# Tables each cached endpoint reads
+OI_TIMELINE_TABLES = ('option_chain_data', 'nifty_prices', 'banknifty_prices')
+SECTOR_TABLES = ('nifty_stocks',)
+TOP_STRIKES_TABLES = ('option_chain_data',)
+
+@track_job('fetch_nifty_price')
+@trace_job('fetch_nifty_price')
 def fetch_price_job():
     """Background job to fetch prices and option data every minute"""
     try:
         # Use stored app reference if available, otherwise try current_app
-        app = getattr(fetch_price_job, 'app', None)
-        if app:
-            with app.app_context():
-                market_service = MarketService()
-                
-                # Fetch Nifty price
-                market_service.fetch_and_save_nifty_price()
-                
-                # Fetch BankNifty price
-                market_service.fetch_and_save_banknifty_price()
-                
-                # Fetch option chain data (every 2 minutes to avoid rate limits)
-                current_minute = datetime.now().minute
-                if current_minute % 2 == 0:  # Every 2 minutes
-                    market_service.fetch_and_save_option_chain("NIFTY")
-                    market_service.fetch_and_save_option_chain("BANKNIFTY")
-                
-                # Fetch futures data (every 5 minutes to avoid rate limits)
-                if current_minute % 5 == 0:  # Every 5 minutes
-                    market_service.fetch_and_save_futures_data("NIFTY")
-                    market_service.fetch_and_save_futures_data("BANKNIFTY")
-                
-                print(f"Market data fetched at {datetime.now()}")
-        else:
-            with current_app.app_context():
-                market_service = MarketService()
+        app = getattr(fetch_price_job, 'app', None) or current_app._get_current_object()
+        with app.app_context():
+            market_service = MarketService()
+            
+            # Fetch Nifty and BankNifty price
+            with span('spot', underlying='NIFTY'):
                 market_service.fetch_and_save_nifty_price()
+            with span('spot', underlying='BANKNIFTY'):
                 market_service.fetch_and_save_banknifty_price()
+            
+            # Assemble today's dashboard once for every page load until the next cycle
+            with span('dashboard_snapshot'):
+                DashboardSnapshotService().refresh()
+            
+            # Push the new prices to open dashboards
+            live_updates = LiveUpdateService()
+            with span('publish'):
+                live_updates.publish_prices()
+            
+            # Fetch option chain data (every 2 minutes to avoid rate limits)
+            current_minute = clock.now().minute
+            if current_minute % 2 == 0:  # Every 2 minutes
+                for underlying in ("NIFTY", "BANKNIFTY"):
+                    with span('option_chain', underlying=underlying):
+                        market_service.fetch_and_save_option_chain(underlying)
                 
-                # Fetch option chain data every 2 minutes
-                current_minute = datetime.now().minute
-                if current_minute % 2 == 0:
-                    market_service.fetch_and_save_option_chain("NIFTY")
-                    market_service.fetch_and_save_option_chain("BANKNIFTY")
+                # Roll the fresh snapshot into the per-minute OI aggregates
+                with span('oi_aggregates'):
+                    aggregate_service = OIAggregateService()
+                    aggregate_service.refresh_recent("NIFTY")
+                    aggregate_service.refresh_recent("BANKNIFTY")
                 
-                # Fetch futures data every 5 minutes
-                if current_minute % 5 == 0:
-                    market_service.fetch_and_save_futures_data("NIFTY")
-                    market_service.fetch_and_save_futures_data("BANKNIFTY")
+                # Materialise the market signal score from the fresh snapshot
+                with span('market_signal'):
+                    signal_data = MarketSignalSnapshotService().materialize()
                 
-                print(f"Market data fetched at {datetime.now()}")
+                with span('publish'):
+                    live_updates.publish_option_chain("NIFTY")
+                    live_updates.publish_option_chain("BANKNIFTY")
+                    live_updates.publish_market_signal(signal_data)
+            
+            # Fetch futures data (every 5 minutes to avoid rate limits)
+            if current_minute % 5 == 0:  # Every 5 minutes
+                for underlying in ("NIFTY", "BANKNIFTY"):
+                    with span('futures', underlying=underlying):
+                        market_service.fetch_and_save_futures_data(underlying)
+            
+            print(f"Market data fetched at {clock.now()}")
     except Exception as e:
+        record_error(e)
         print(f"Error in scheduled job: {str(e)}")
 
+@track_job('macd_cache_update')
+@trace_job('macd_cache_update')
 def macd_cache_update_job():
     """Background job to update MACD cache every 2 minutes for ultra-fast API responses"""
     try:
@@ -83,22 +114,30 @@ def macd_cache_update_job():
                 for symbol in symbols:
                     for tf in timeframes:
                         try:
-                            data = cache_service.calculate_fresh_macd(symbol, tf)
-                            if data.get('success'):
-                                # Store in ultra-fast cache
-                                fast_cache.update_signal(symbol, tf, data)
-                                updated_count += 1
+                            with span('macd', symbol=symbol, timeframe=tf):
+                                data = cache_service.calculate_fresh_macd(symbol, tf)
+                                if data.get('success'):
+                                    # Store in ultra-fast cache
+                                    fast_cache.update_signal(symbol, tf, data)
+                                    updated_count += 1
                         except Exception as e:
                             print(f"Error updating {symbol} {tf}min: {e}")
                 
+                # Push the refreshed signals to open pages
+                with span('publish'):
+                    LiveUpdateService().publish_macd()
+                
                 end_time = datetime.now()
                 update_duration = (end_time - start_time).total_seconds()
                 print(f"✅ MACD cache updated: {updated_count} signals in {update_duration:.2f}s at {end_time.strftime('%H:%M:%S')}")
         else:
             print("MACD cache update failed - no app context")
     except Exception as e:
+        record_error(e)
         print(f"Error in MACD cache update job: {str(e)}")
 
+@track_job('strategy_1_monitor')
+@trace_job('strategy_1_monitor')
 def strategy_1_monitor_job():
     """Background job to monitor Strategy 1 every minute during market hours"""
     try:
@@ -113,30 +152,73 @@ def strategy_1_monitor_job():
                 # Only run during market hours (9:30 AM - 3:15 PM IST)
                 if strategy_service.is_market_hours():
                     # Execute strategy logic
-                    result = strategy_service.execute_strategy_1()
+                    with span('execute'):
+                        result = strategy_service.execute_strategy_1()
+                    with span('publish'):
+                        LiveUpdateService().publish_strategy_1(strategy_service.get_strategy_1_status())
                     if result.get('success'):
-                        print(f"Strategy 1 monitoring completed at {datetime.now()}")
+                        print(f"Strategy 1 monitoring completed at {clock.now()}")
                     else:
+                        record_error(result.get('message', 'Unknown error'))
                         print(f"Strategy 1 monitoring error: {result.get('message', 'Unknown error')}")
                 else:
-                    print(f"Strategy 1 monitoring skipped - outside market hours at {datetime.now()}")
+                    print(f"Strategy 1 monitoring skipped - outside market hours at {clock.now()}")
         else:
             print("Strategy 1 monitoring failed - no app context")
     except ImportError as ie:
+        record_error(ie)
         print(f"Strategy service not available: {str(ie)}")
     except Exception as e:
+        record_error(e)
         print(f"Error in Strategy 1 monitoring job: {str(e)}")
 
+@track_job('data_gap_monitor')
+@trace_job('data_gap_monitor')
+def data_gap_monitor_job():
+    """Background job to find today's ingestion gaps every 5 minutes and backfill them from historical candles"""
+    try:
+        from app.services.data_gap_service import DataGapService
+        
+        app = getattr(data_gap_monitor_job, 'app', None)
+        if app:
+            with app.app_context():
+                gap_service = DataGapService()
+                with span('scan'):
+                    scan = gap_service.scan(record_metrics=True)
+                if not scan['trading_day'] or not scan['missing_slots']:
+                    return
+                
+                print(f"⚠️ Ingestion gaps today: {scan['missing_slots']} missing slots")
+                scan_date = datetime.strptime(scan['date'], '%Y-%m-%d').date()
+                fillable = [i for i in scan['instruments'] if i['backfillable'] and i['missing_slots']]
+                if fillable and app.config.get('GAP_AUTO_BACKFILL'):
+                    with span('backfill', instruments=len(fillable)):
+                        result = gap_service.backfill([scan_date])
+                    for error in result['errors']:
+                        record_error(error)
+                        print(f"Backfill error: {error}")
+                    print(f"✅ Backfilled {result['rows']} with {result['requests']} Kite requests, {result['unfilled']} slots still missing")
+                    # Gauges reflect what is left after the backfill
+                    gap_service.scan(record_metrics=True)
+        else:
+            print("Data gap monitor failed - no app context")
+    except Exception as e:
+        record_error(e)
+        print(f"Error in data gap monitor job: {str(e)}")
+
 # Initialize scheduler after app context is available
 def init_scheduler(app):
-    """Initialize the background scheduler"""
+    """Initialize the background scheduler (unless SCHEDULER_ENABLED is off, e.g. in web workers)"""
+    if not app.config.get('SCHEDULER_ENABLED', True):
+        return
     if not scheduler.running:
         scheduler.add_job(
             func=fetch_price_job,
             trigger="interval",
             minutes=1,
             id='fetch_nifty_price',
-            replace_existing=True
+            replace_existing=True,
+            **JOB_POLICIES['fetch_nifty_price']
         )
         
         # Add MACD cache update job (every 2 minutes for fast API responses)
@@ -145,7 +227,8 @@ def init_scheduler(app):
             trigger="interval",
             minutes=2,
             id='macd_cache_update',
-            replace_existing=True
+            replace_existing=True,
+            **JOB_POLICIES['macd_cache_update']
         )
         print("✅ MACD cache update job added successfully - Updates every 2 minutes")
         print("🚀 This background job ensures your 12ms API responses!")
@@ -157,17 +240,32 @@ def init_scheduler(app):
                 trigger="interval",
                 minutes=1,
                 id='strategy_1_monitor',
-                replace_existing=True
+                replace_existing=True,
+                **JOB_POLICIES['strategy_1_monitor']
             )
             print("Strategy 1 monitoring job added successfully")
         except Exception as e:
             print(f"Failed to add Strategy 1 monitoring job: {str(e)}")
         
+        # Gap monitor: find and backfill missing ingestion slots (every 5 minutes)
+        scheduler.add_job(
+            func=data_gap_monitor_job,
+            trigger="interval",
+            minutes=5,
+            id='data_gap_monitor',
+            replace_existing=True,
+            **JOB_POLICIES['data_gap_monitor']
+        )
+        
+        init_scheduler_metrics(scheduler)
+        # Store every run's phase timings and every skipped run in job_runs
+        JobTraceService.init_app(app, scheduler)
         scheduler.start()
         
         # Store reference to app for context
         fetch_price_job.app = app
         macd_cache_update_job.app = app
+        data_gap_monitor_job.app = app
         try:
             strategy_1_monitor_job.app = app
         except:
@@ -204,7 +302,6 @@ def dashboard():
 def dashboard_new():
     try:
         # Initialize services
-        market_service = MarketService()
         date_filter = DateTimeFilterService()
         
         # Parse date/time parameters with today as default
@@ -212,8 +309,8 @@ def dashboard_new():
             request.args, default_today=True
         )
         
-        # Get comprehensive dashboard data
-        dashboard_data = market_service.get_comprehensive_dashboard_data()
+        # Precomputed dashboard snapshot for the selected day
+        dashboard_data = DashboardSnapshotService().get_payload(end_date)
         
         # Add date filter parameters for template
         dashboard_data.update({
@@ -221,7 +318,7 @@ def dashboard_new():
             'end_date': end_date.strftime('%Y-%m-%d') if end_date else None,
             'start_time': start_time.strftime('%H:%M') if start_time else None,
             'end_time': end_time.strftime('%H:%M') if end_time else None,
-            'today_date': date.today().strftime('%Y-%m-%d')
+            'today_date': clock.today().strftime('%Y-%m-%d')
         })
         
         return render_template('dashboard_new.html', **dashboard_data)
@@ -234,11 +331,11 @@ def dashboard_new():
             'top_gainers': [],
             'top_losers': [],
             'influence_summary': {'positive': 0.0, 'negative': 0.0, 'net': 0.0},
-            'start_date': date.today().strftime('%Y-%m-%d'),
-            'end_date': date.today().strftime('%Y-%m-%d'),
+            'start_date': clock.today().strftime('%Y-%m-%d'),
+            'end_date': clock.today().strftime('%Y-%m-%d'),
             'start_time': '09:00',
             'end_time': '15:30',
-            'today_date': date.today().strftime('%Y-%m-%d')
+            'today_date': clock.today().strftime('%Y-%m-%d')
         }
         return render_template('dashboard_new.html', **fallback_data)
 
@@ -280,6 +377,7 @@ def nifty_chart():
     end_datetime = datetime.combine(end_date, end_time) if end_date else None
     
     # Generate chart using our custom service with date filter
+    from app.services.chart_service import ChartService
     chart_service = ChartService()
     chart_data = chart_service.generate_interactive_chart_with_date_filter(
         timeframe=timeframe, 
@@ -295,7 +393,7 @@ def nifty_chart():
             'end_date': end_date.strftime('%Y-%m-%d') if end_date else None,
             'start_time': start_time.strftime('%H:%M') if start_time else None,
             'end_time': end_time.strftime('%H:%M') if end_time else None,
-            'today_date': date.today().strftime('%Y-%m-%d'),
+            'today_date': clock.today().strftime('%Y-%m-%d'),
             'timeframe': timeframe,
             'days_back': days_back
         })
@@ -396,7 +494,7 @@ def api_current_nifty():
         import pytz
         
         ist = pytz.timezone('Asia/Kolkata')
-        yesterday = date.today() - timedelta(days=1)
+        yesterday = clock.today() - timedelta(days=1)
         
         previous_close = db.session.query(NiftyPrice).filter(
             db.func.date(NiftyPrice.timestamp) == yesterday
@@ -419,7 +517,7 @@ def api_current_nifty():
             'change': change,
             'change_percent': change_percent,
             'timestamp': current_price['timestamp'].isoformat() if current_price.get('timestamp') else None,
-            'last_updated': datetime.now(ist).isoformat()
+            'last_updated': clock.now(ist).isoformat()
         })
         
     except Exception as e:
@@ -446,7 +544,7 @@ def api_macd_analysis():
             'macd_data': analysis['macd_data'],
             'signal_history': analysis['signal_history'],
             'timeframe': f'{timeframe} minutes',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': clock.now().isoformat()
         })
         
     except Exception as e:
@@ -469,7 +567,7 @@ def api_signal_stats():
         return jsonify({
             'success': True,
             'stats': stats,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': clock.now().isoformat()
         })
         
     except Exception as e:
@@ -503,36 +601,10 @@ def api_dashboard_data():
 def api_option_chain(underlying):
     """API endpoint for option chain data - real data only"""
     try:
-        # Check if we have custom expiry settings
-        from app.models.expiry_settings import ExpirySettings
-        custom_expiry = None
-        try:
-            setting = ExpirySettings.query.filter_by(underlying=underlying.upper()).first()
-            if setting:
-                custom_expiry = setting.current_expiry
-        except:
-            pass
-        
-        # Get market service - only real database data
-        market_service = MarketService()
-        option_data = market_service.get_current_option_chain(underlying.upper())
-        trend_data = market_service.get_market_trend(underlying.upper())
-        
-        # Convert SQLAlchemy objects to dictionaries
-        option_data_dicts = []
-        if option_data:
-            option_data_dicts = [opt.to_dict() for opt in option_data]
-        
         # Return only real database data - no demo fallbacks
         return jsonify({
             'success': True,
-            'data': {
-                'option_chain': option_data_dicts,
-                'trend': trend_data.to_dict() if trend_data else None,
-                'demo_mode': False,
-                'using_custom_expiry': bool(custom_expiry),
-                'custom_expiry_date': custom_expiry.isoformat() if custom_expiry else None
-            }
+            'data': LiveUpdateService().build_option_chain_payload(underlying.upper())
         })
     except Exception as e:
         return jsonify({
@@ -578,14 +650,14 @@ def oi_history_page():
 def strategy_analysis_page():
     """Display strategy analysis page"""
     return render_template('strategy_analysis.html', 
-                         current_time=datetime.now())
+                         current_time=clock.now())
 
 @market_bp.route('/all-oi-analysis')
 @login_required
 def all_oi_analysis_page():
     """Display all OI analysis page"""
     return render_template('all_oi_analysis.html', 
-                         current_time=datetime.now())
+                         current_time=clock.now())
 
 @market_bp.route('/nifty-stocks')
 @login_required
@@ -598,8 +670,6 @@ def nifty_stocks_page():
 def dashboard_comprehensive_api():
     """API endpoint for comprehensive dashboard data with date filtering"""
     try:
-        # Initialize services
-        market_service = MarketService()
         date_filter = DateTimeFilterService()
         
         # Parse date/time parameters with today as default
@@ -607,19 +677,23 @@ def dashboard_comprehensive_api():
             request.args, default_today=True
         )
         
-        # Get comprehensive dashboard data with date filters
-        dashboard_data = market_service.get_comprehensive_dashboard_data(
-            start_date=start_date, 
-            end_date=end_date,
-            start_time=start_time,
-            end_time=end_time
-        )
-        return jsonify(dashboard_data)
+        # The payload depends on the end date only; serve that day's pre-serialised snapshot
+        snapshot = DashboardSnapshotService().get(end_date)
+        
+        if request.if_none_match.contains_weak(snapshot['etag']):
+            response = Response(status=304)
+        else:
+            response = Response(snapshot['body'], mimetype='application/json')
+        response.set_etag(snapshot['etag'], weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Data-Version'] = snapshot['version']
+        return response
     except Exception as e:
         print(f"Error in comprehensive dashboard data API: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/api/oi-timeline')
+@cached_response(OI_TIMELINE_TABLES)
 def oi_timeline_api():
     """API endpoint for OI timeline data for charts"""
     try:
@@ -643,8 +717,6 @@ def oi_timeline_api():
 def api_market_signal():
     """API endpoint for market signal analysis with date filtering"""
     try:
-        # Initialize services
-        market_service = MarketService()
         date_filter = DateTimeFilterService()
         
         # Parse date/time parameters with today as default
@@ -652,8 +724,8 @@ def api_market_signal():
             request.args, default_today=True
         )
         
-        # Get market signal analysis for the specified date
-        signal_data = market_service.get_market_signal_analysis(
+        # Serve the precomputed signal for the specified date
+        signal_data = MarketSignalSnapshotService().get_signal(
             target_date=end_date if end_date else None
         )
         return jsonify({
@@ -672,6 +744,29 @@ def api_market_signal():
             }
         })
 
+@market_bp.route('/api/market-signal-history')
+def api_market_signal_history():
+    """API endpoint for the intraday history of the precomputed market signal score"""
+    try:
+        date_filter = DateTimeFilterService()
+        start_date, end_date, start_time, end_time = date_filter.parse_date_params(
+            request.args, default_today=True
+        )
+        
+        history = MarketSignalSnapshotService().get_history(
+            target_date=end_date if end_date else None
+        )
+        return jsonify({
+            'success': True,
+            'data': history
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'data': {'labels': [], 'scores': [], 'count': 0}
+        })
+
 @market_bp.route('/api/market-signal-debug')
 def api_market_signal_debug():
     """Debug API endpoint for detailed market signal analysis"""
@@ -681,8 +776,8 @@ def api_market_signal_debug():
         
         # Add additional debug information
         debug_info = {
-            'current_time_utc': datetime.utcnow().isoformat(),
-            'current_time_ist': (datetime.utcnow() + timedelta(hours=5, minutes=30)).isoformat(),
+            'current_time_utc': clock.utcnow().isoformat(),
+            'current_time_ist': (clock.utcnow() + timedelta(hours=5, minutes=30)).isoformat(),
             'market_hours_check': '9:00 AM - 3:45 PM IST',
         }
         
@@ -691,7 +786,7 @@ def api_market_signal_debug():
         from app.models.banknifty_price import BankNiftyPrice, OptionChainData
         
         # Count of recent data
-        recent_time = datetime.utcnow() - timedelta(hours=24)
+        recent_time = clock.utcnow() - timedelta(hours=24)
         debug_info['data_counts'] = {
             'nifty_prices_24h': NiftyPrice.query.filter(NiftyPrice.timestamp >= recent_time).count(),
             'banknifty_prices_24h': BankNiftyPrice.query.filter(BankNiftyPrice.timestamp >= recent_time).count(),
@@ -738,17 +833,23 @@ def api_market_signal_debug():
         })
 
 @market_bp.route('/api/sector-performance')
+@cached_response(SECTOR_TABLES)
 def get_sector_performance():
     """Get NIFTY 50 sector-wise performance data"""
     try:
         market_service = MarketService()
-        sector_data = market_service.get_sector_wise_performance()
+        sector_data = dashboard_cache.get_or_set(
+            'sector_performance',
+            market_service.get_sector_wise_performance,
+            ttl=DASHBOARD_CACHE_SECONDS,
+            version=data_versions.token(SECTOR_TABLES)
+        )
         
         return jsonify({
             'success': True,
             'data': sector_data,
             'total_sectors': len(sector_data),
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': clock.utcnow().isoformat()
         })
         
     except Exception as e:
@@ -759,16 +860,22 @@ def get_sector_performance():
         }), 500
 
 @market_bp.route('/api/top-oi-strikes')
+@cached_response(TOP_STRIKES_TABLES)
 def get_top_oi_strikes():
     """Get top OI change strikes for NIFTY and BANKNIFTY"""
     try:
         market_service = MarketService()
-        strikes_data = market_service.get_top_oi_strikes()
+        strikes_data = dashboard_cache.get_or_set(
+            'top_oi_strikes',
+            market_service.get_top_oi_strikes,
+            ttl=DASHBOARD_CACHE_SECONDS,
+            version=data_versions.token(TOP_STRIKES_TABLES)
+        )
         
         return jsonify({
             'success': True,
             'data': strikes_data,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': clock.utcnow().isoformat()
         })
         
     except Exception as e:
@@ -785,6 +892,7 @@ def get_chart_data():
         timeframe = request.args.get('timeframe', '30min')
         days_back = int(request.args.get('days', 30))
         
+        from app.services.chart_service import ChartService
         chart_service = ChartService()
         chart_data = chart_service.generate_interactive_chart(timeframe, days_back)
         
@@ -825,16 +933,18 @@ def api_nifty_chart_data():
         
         timeframe = request.args.get('timeframe', 15, type=int)
         symbol = request.args.get('symbol', 'NIFTY')
+        # ts=ms returns epoch-millisecond timestamps instead of formatted strings
+        timestamp_format = 'ms' if request.args.get('ts') == 'ms' else 'string'
         
         chart_service = ChartService()
-        chart_data = chart_service.get_nifty_chart_with_macd(symbol, timeframe)
+        chart_data = chart_service.get_nifty_chart_with_macd(symbol, timeframe, timestamp_format)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'data': chart_data,
             'symbol': symbol,
             'timeframe': f'{timeframe} minutes',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': clock.now().isoformat()
         })
         
     except Exception as e:
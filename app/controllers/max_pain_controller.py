@@ -0,0 +1,69 @@
+from flask import jsonify, request
+from datetime import datetime
+from app.services.max_pain_service import MaxPainService
+from app.services.datetime_filter_service import DateTimeFilterService
+from app.utils.datetime_utils import utc_to_ist
+
+
+def get_max_pain_api(underlying):
+    """API endpoint for max pain and OI walls from the latest option chain snapshot"""
+    try:
+        top_k = request.args.get('top', 3, type=int)
+
+        max_pain_service = MaxPainService()
+        data = max_pain_service.get_latest_max_pain(underlying.upper(), k=top_k)
+
+        if not data:
+            return jsonify({
+                'success': False,
+                'message': f'No option chain data found for {underlying.upper()}'
+            })
+
+        return jsonify({
+            'success': True,
+            'data': data,
+            'last_updated': utc_to_ist(datetime.utcnow()).isoformat()
+        })
+
+    except Exception as e:
+        print(f"Error in get_max_pain_api: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Error calculating max pain: {str(e)}'
+        }), 500
+
+
+def get_max_pain_timeline_api(underlying):
+    """API endpoint for intraday max pain, support and resistance timeline"""
+    try:
+        date_filter = DateTimeFilterService()
+
+        target_date_str = request.args.get('target_date')
+        target_date = date_filter.parse_date(target_date_str) if target_date_str else date_filter.get_today()
+        start_time = date_filter.parse_time(request.args.get('start_time', '09:15'))
+        end_time = date_filter.parse_time(request.args.get('end_time', '15:30'))
+        expiry_str = request.args.get('expiry_date')
+        expiry_date = date_filter.parse_date(expiry_str) if expiry_str else None
+
+        max_pain_service = MaxPainService()
+        timeline = max_pain_service.get_max_pain_timeline(
+            underlying.upper(),
+            target_date=target_date,
+            start_time=start_time,
+            end_time=end_time,
+            expiry_date=expiry_date
+        )
+
+        return jsonify({
+            'success': 'error' not in timeline,
+            'data': timeline,
+            'target_date': target_date.strftime('%Y-%m-%d'),
+            'last_updated': utc_to_ist(datetime.utcnow()).isoformat()
+        })
+
+    except Exception as e:
+        print(f"Error in get_max_pain_timeline_api: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Error loading max pain timeline: {str(e)}'
+        }), 500
@@ -0,0 +1,52 @@
+from flask import Blueprint, Response
+from datetime import datetime
+from sqlalchemy import func, select
+from app import db
+from app.models.nifty_price import NiftyPrice
+from app.models.banknifty_price import BankNiftyPrice, OptionChainData
+from app.models.futures_oi_data import FuturesOIData
+from app.services.metrics_service import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Ingested tables: (table label, model, underlying filter)
+INGESTED_TABLES = (
+    ('nifty_prices', NiftyPrice, None),
+    ('banknifty_prices', BankNiftyPrice, None),
+    ('option_chain_data', OptionChainData, 'NIFTY'),
+    ('option_chain_data', OptionChainData, 'BANKNIFTY'),
+    ('futures_oi_data', FuturesOIData, 'NIFTY'),
+    ('futures_oi_data', FuturesOIData, 'BANKNIFTY'),
+)
+
+
+def ingestion_lag():
+    """Seconds since the newest row of each ingested table (timestamps are stored in UTC)"""
+    now = datetime.utcnow()
+    series = {}
+    for table, model, underlying in INGESTED_TABLES:
+        stmt = select(func.max(model.timestamp))
+        if underlying:
+            stmt = stmt.where(model.underlying == underlying)
+        latest = db.session.execute(stmt).scalar()
+        if latest is None:
+            continue
+        key = (('table', table),) + ((('underlying', underlying),) if underlying else ())
+        series[key] = round((now - latest).total_seconds(), 3)
+    return series
+
+
+@metrics_bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint: metrics of every worker and the scheduler, plus ingestion lag"""
+    extra = {}
+    try:
+        extra['ingestion_lag_seconds'] = ingestion_lag()
+    except Exception as e:
+        # Still expose the in-process metrics when the database is unavailable
+        print(f"Error reading ingestion lag: {str(e)}")
+        db.session.rollback()
+    # Back to the pool before rendering, so the pool gauges do not count the scrape's own connection
+    db.session.close()
+
+    return Response(metrics.render(extra), mimetype='text/plain; version=0.0.4')
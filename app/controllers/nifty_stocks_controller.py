@@ -1,7 +1,6 @@
 from flask import render_template, jsonify, Blueprint
 from app.services.nifty_stocks_service import NiftyStocksService
 from datetime import datetime
-from app.utils.datetime_utils import utc_to_ist
 
 nifty_stocks_bp = Blueprint('nifty_stocks', __name__)
 
@@ -30,27 +29,11 @@ def nifty_stocks_page():
 def nifty_stocks_api():
     """API endpoint for NIFTY 50 stocks data"""
     try:
-        stocks_service = NiftyStocksService()
-        stocks_data = stocks_service.get_nifty_stocks_data()
-        
-        # Convert stocks to dictionary format
-        stocks_dict = []
-        for stock in stocks_data['stocks']:
-            stocks_dict.append(stock.to_dict())
-        
+        # Same payload the nifty_stocks live update topic carries
+        from app.services.live_update_service import LiveUpdateService
         return jsonify({
             'success': True,
-            'stocks': stocks_dict,
-            'summary': {
-                'total_positive_influence': stocks_data['total_positive_influence'],
-                'total_negative_influence': stocks_data['total_negative_influence'],
-                'net_nifty_influence': stocks_data['net_nifty_influence'],
-                'total_stocks': stocks_data['total_stocks'],
-                'gainers': stocks_data['gainers'],
-                'losers': stocks_data['losers'],
-                'unchanged': stocks_data['unchanged']
-            },
-            'last_updated': utc_to_ist(datetime.utcnow()).isoformat()
+            **LiveUpdateService().build_nifty_stocks_payload()
         })
     except Exception as e:
         print(f"Error in nifty_stocks_api: {e}")
@@ -2,6 +2,10 @@ from flask import render_template, jsonify, request, has_request_context
 from app.models.banknifty_price import OptionChainData
 from datetime import datetime
 from app.utils.datetime_utils import utc_to_ist
+from app.utils import clock
+from app.utils.fast_json import json_response, columnar, epoch_ms, wants_columnar
+from app.utils.pagination import page_args, keyset_page
+from app.utils.downsampling import downsample_args, downsample
 from app import db
 from sqlalchemy import distinct
 from app import db
@@ -26,8 +30,6 @@ def oi_changes():
 def oi_changes_timeline_api():
     """API endpoint for OI changes timeline data for chart"""
     try:
-        from sqlalchemy import func
-        from datetime import datetime, timedelta, time
         from flask import request
         from app.services.datetime_filter_service import DateTimeFilterService
         
@@ -45,77 +47,9 @@ def oi_changes_timeline_api():
         # Use the filter service to get the target date
         target_date = DateTimeFilterService.get_target_date(start_date, end_date)
         
-        # Get market hours for the target date: 9:20 AM to 15:30 IST and convert to UTC
-        from datetime import timezone, timedelta
-        today = target_date
-        
-        # Create IST timezone
-        ist_timezone = timezone(timedelta(hours=5, minutes=30))
-        
-        # Create 9:20 AM IST time
-        market_start_ist = datetime.combine(today, time(9, 20)).replace(tzinfo=ist_timezone)
-        
-        # Create 15:30 IST time (market close)
-        market_end_ist = datetime.combine(today, time(15, 30)).replace(tzinfo=ist_timezone)
-        
-        # Convert to UTC for database query
-        market_start_utc = market_start_ist.astimezone(timezone.utc).replace(tzinfo=None)
-        market_end_utc = market_end_ist.astimezone(timezone.utc).replace(tzinfo=None)
-        
-        # Get all records from 9:20 AM today grouped by minute for better readability
-        timeline_data = db.session.query(
-            func.date_trunc('minute', OptionChainData.timestamp).label('time_bucket'),
-            func.sum(OptionChainData.ce_oi_change).label('total_ce_change'),
-            func.sum(OptionChainData.pe_oi_change).label('total_pe_change')
-        ).filter(
-            OptionChainData.timestamp >= market_start_utc,
-            OptionChainData.timestamp <= market_end_utc,
-            OptionChainData.underlying == underlying
-        ).group_by(func.date_trunc('minute', OptionChainData.timestamp)).order_by(func.date_trunc('minute', OptionChainData.timestamp)).all()
-        
-        # Get corresponding index prices for the timeline
-        if underlying == 'NIFTY':
-            from app.models.nifty_price import NiftyPrice
-            price_model = NiftyPrice
-        else:
-            from app.models.banknifty_price import BankNiftyPrice
-            price_model = BankNiftyPrice
-        
-        # Format data for chart
-        chart_data = {
-            'labels': [],
-            'ce_changes': [],
-            'pe_changes': [],
-            'index_prices': []
-        }
-        
-        cumulative_ce_change = 0
-        cumulative_pe_change = 0
-        
-        for record in timeline_data:
-            # Convert timestamp to IST and format for display
-            ist_time = utc_to_ist(record.time_bucket)
-            time_label = ist_time.strftime('%H:%M')
-            
-            # Calculate cumulative changes
-            cumulative_ce_change += (record.total_ce_change or 0)
-            cumulative_pe_change += (record.total_pe_change or 0)
-            
-            # Get corresponding index price (within 5 minutes of the OI timestamp)
-            price_record = price_model.query.filter(
-                func.abs(func.extract('epoch', price_model.timestamp) - func.extract('epoch', record.time_bucket)) < 300
-            ).order_by(func.abs(func.extract('epoch', price_model.timestamp) - func.extract('epoch', record.time_bucket))).first()
-            
-            index_price = price_record.price if price_record else (26000 if underlying == 'NIFTY' else 59000)
-            
-            chart_data['labels'].append(time_label)
-            chart_data['ce_changes'].append(cumulative_ce_change)
-            chart_data['pe_changes'].append(cumulative_pe_change)
-            chart_data['index_prices'].append(float(index_price))
-        
         return jsonify({
             'success': True,
-            'data': chart_data,
+            'data': get_oi_changes_timeline(underlying, target_date),
             'last_updated': utc_to_ist(datetime.utcnow()).isoformat()
         })
         
@@ -127,6 +61,82 @@ def oi_changes_timeline_api():
         }), 500
 
 
+def market_window_utc(target_date):
+    """9:20 AM to 15:30 IST on target_date as naive UTC datetimes (the stored timestamps are UTC)"""
+    from datetime import timezone, timedelta, time
+    
+    # Create IST timezone
+    ist_timezone = timezone(timedelta(hours=5, minutes=30))
+    
+    market_start_ist = datetime.combine(target_date, time(9, 20)).replace(tzinfo=ist_timezone)
+    market_end_ist = datetime.combine(target_date, time(15, 30)).replace(tzinfo=ist_timezone)
+    
+    return (
+        market_start_ist.astimezone(timezone.utc).replace(tzinfo=None),
+        market_end_ist.astimezone(timezone.utc).replace(tzinfo=None)
+    )
+
+
+def get_oi_changes_timeline(underlying, target_date, index_prices=None):
+    """
+    Cumulative CE/PE OI change per minute of the target day's session, with the
+    nearest index price (within 5 minutes) of each minute.
+
+    index_prices is the index price frame of the session (ColumnQueryService.index_price_frame);
+    it is loaded here when not given, so callers that chart several series can share one.
+    """
+    import pandas as pd
+    from app.services.column_query_service import ColumnQueryService
+    from app.services.oi_aggregate_service import OIAggregateService
+    
+    market_start_utc, market_end_utc = market_window_utc(target_date)
+    
+    # Per-minute sums of the session from the minute aggregates (portable: no date_trunc)
+    minutes, totals = OIAggregateService().get_window_series(underlying, market_start_utc, market_end_utc)
+    
+    # Format data for chart
+    chart_data = {
+        'labels': [],
+        'ce_changes': [],
+        'pe_changes': [],
+        'index_prices': []
+    }
+    if not len(minutes):
+        return chart_data
+    
+    # Corresponding index prices: one range read, matched to the nearest price within 5 minutes
+    if index_prices is None:
+        window = pd.Timedelta(minutes=5)
+        index_prices = ColumnQueryService().index_price_frame(
+            symbol=underlying, start=market_start_utc - window, end=market_end_utc + window
+        )
+    default_price = 26000 if underlying == 'NIFTY' else 59000
+    prices = index_prices['price'][~index_prices.index.duplicated()]
+    buckets = pd.DatetimeIndex(minutes.astype('datetime64[ns]'))
+    if len(prices):
+        matched = prices.reindex(buckets, method='nearest', tolerance=pd.Timedelta(seconds=300))
+    else:
+        matched = pd.Series(float('nan'), index=buckets)
+    
+    # Cumulative changes through each minute
+    cumulative_ce_changes = totals['ce_oi_change_sum'].cumsum()
+    cumulative_pe_changes = totals['pe_oi_change_sum'].cumsum()
+    
+    for bucket, ce_change, pe_change, index_price in zip(
+        buckets, cumulative_ce_changes, cumulative_pe_changes, matched.to_numpy()
+    ):
+        # Convert timestamp to IST and format for display
+        ist_time = utc_to_ist(bucket.to_pydatetime())
+        time_label = ist_time.strftime('%H:%M')
+        
+        chart_data['labels'].append(time_label)
+        chart_data['ce_changes'].append(int(ce_change))
+        chart_data['pe_changes'].append(int(pe_change))
+        chart_data['index_prices'].append(float(default_price if index_price != index_price else index_price))
+    
+    return chart_data
+
+
 def oi_changes_api():
     """API endpoint for OI changes data"""
     try:
@@ -225,27 +235,54 @@ def get_oi_history_data(underlying, strike_price, option_type):
         
         strike = float(strike_price)
         
+        try:
+            # The whole day unless the client pages with limit/cursor/since
+            paging = page_args(default_limit=None)
+            method, points = downsample_args()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
         # Get today's date (start of day in IST)
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        today_start = clock.now().replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # Get all records for this strike from today
-        records = db.session.query(OptionChainData).filter(
+        # Records for this strike from today
+        strike_query = db.session.query(OptionChainData).filter(
             and_(
                 OptionChainData.underlying == underlying.upper(),
                 OptionChainData.strike_price == strike,
                 OptionChainData.timestamp >= today_start
             )
-        ).order_by(OptionChainData.timestamp.asc()).all()
+        )
         
-        if not records:
+        # cursor (next page) and since (refresh) both continue after a key in time order
+        after = paging['since'] or paging['cursor']
+        records, page = keyset_page(
+            strike_query, OptionChainData.timestamp, OptionChainData.id,
+            limit=paging['limit'], cursor=after
+        )
+        
+        first_record = strike_query.order_by(OptionChainData.timestamp.asc(), OptionChainData.id.asc()).first()
+        if not first_record:
             return jsonify({
                 'success': False,
                 'message': 'No data found for this strike price'
             })
         
-        # Get first and latest records for summary
-        first_record = records[0]
-        latest_record = records[-1]
+        # The row at the key is the baseline for the first new row's price change
+        previous_record = db.session.get(OptionChainData, after[1]) if after else None
+        if previous_record:
+            records = [previous_record] + records
+        emit_from = 1 if previous_record else 0
+        
+        if not records:
+            records = [first_record]
+            emit_from = 1
+        
+        # Summary covers the whole day, whichever page was asked for
+        latest_record = strike_query.order_by(OptionChainData.timestamp.desc(), OptionChainData.id.desc()).first()
         
         # Calculate summary based on option type
         if option_type.upper() == 'CE':
@@ -267,9 +304,13 @@ def get_oi_history_data(underlying, strike_price, option_type):
         
         # Build history data (only records with changes)
         history_data = []
+        history_timestamps = []
         prev_oi = first_oi
         
         for i, record in enumerate(records):
+            if i < emit_from:
+                continue
+            
             if option_type.upper() == 'CE':
                 current_oi = record.ce_oi
                 current_ltp = record.ce_ltp
@@ -280,7 +321,7 @@ def get_oi_history_data(underlying, strike_price, option_type):
                 oi_change = record.pe_oi_change
             
             # Only include records where there's a meaningful change
-            if i == 0 or abs(oi_change) > 0:
+            if record.id == first_record.id or abs(oi_change) > 0:
                 change_from_start = current_oi - first_oi
                 change_percent_from_start = (change_from_start / first_oi * 100) if first_oi > 0 else 0
                 
@@ -324,6 +365,7 @@ def get_oi_history_data(underlying, strike_price, option_type):
                 # Get index price for this timestamp
                 index_price = get_index_price_for_timestamp(underlying.upper(), record.timestamp)
                 
+                history_timestamps.append(record.timestamp)
                 history_data.append({
                     'timestamp': utc_to_ist(record.timestamp).strftime('%H:%M:%S'),
                     'oi': current_oi,
@@ -352,10 +394,23 @@ def get_oi_history_data(underlying, strike_price, option_type):
                 'first_time': utc_to_ist(first_record.timestamp).strftime('%H:%M:%S'),
                 'latest_time': utc_to_ist(latest_record.timestamp).strftime('%H:%M:%S')
             },
-            'history': history_data
+            'history': history_data,
+            'page': page
         }
         
-        return jsonify(response_data)
+        # ?downsample=lttb|minmax&points=N on the OI series
+        if method:
+            kept = downsample(list(range(len(history_data))), history_timestamps, [h['oi'] for h in history_data], method, points)
+            history_data = response_data['history'] = [history_data[i] for i in kept]
+            history_timestamps = [history_timestamps[i] for i in kept]
+            page['downsampled'] = len(history_data)
+        
+        # ?format=columnar: parallel arrays plus epoch-millisecond (UTC) timestamps
+        if wants_columnar():
+            response_data['history'] = columnar(history_data)
+            response_data['history']['timestamp_ms'] = epoch_ms(history_timestamps)
+        
+        return json_response(response_data)
         
     except Exception as e:
         print(f"Error in get_oi_history_data: {e}")
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, jsonify
 from app.services.datetime_filter_service import DateTimeFilterService
 from app.services.oi_crossover_service import OICrossoverService
 from app.middlewares.auth_middleware import login_required
+from app.middlewares.response_cache import cached_response
 
 oi_crossover_bp = Blueprint('oi_crossover', __name__)
 
@@ -110,6 +111,7 @@ def api_oi_crossover_summary():
         })
 
 @oi_crossover_bp.route('/api/oi-crossover-chart')
+@cached_response(('option_chain_data', 'oi_minute_aggregates', 'nifty_prices', 'banknifty_prices'))
 def api_oi_crossover_chart():
     """API endpoint for OI crossover chart data"""
     try:
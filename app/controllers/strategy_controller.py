@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, jsonify, current_app, request
 from app.services.strategy_service import StrategyService
 from app.middlewares.auth_middleware import login_required
+from app.utils.fast_json import json_response, columnar, epoch_ms, wants_columnar
+from app.utils.pagination import page_args, keyset_page
+from app.utils.downsampling import downsample_args, downsample
 from datetime import datetime, time
+from app.utils import clock
 import traceback
 
 # Create Blueprint for strategy routes
@@ -59,7 +63,7 @@ def fix_entry_data():
     try:
         from app.models.strategy_models import Strategy1Entry, Strategy1LTPHistory, Strategy1Execution
         
-        today = date.today()
+        today = clock.today()
         
         # Find executions with missing entry data
         broken_executions = db.session.query(Strategy1Execution).filter(
@@ -113,12 +117,12 @@ def strategy_1_complete_history():
         from app.models.strategy_models import Strategy1Entry, Strategy1LTPHistory, Strategy1Execution
         from app.models.nifty_price import NiftyPrice
         
-        today = date.today()
+        today = clock.today()
         
-        # Get all NIFTY price records for today to build timeline
-        nifty_records = db.session.query(NiftyPrice).filter(
-            func.date(NiftyPrice.timestamp) == today
-        ).order_by(NiftyPrice.timestamp.asc()).all()
+        # Get all NIFTY prices for today to build timeline (single column-projected query)
+        from app.services.strategy_replay_service import Strategy1ReplayService
+        replay_service = Strategy1ReplayService()
+        nifty_timestamps, nifty_prices = replay_service.load_prices(today)
         
         # Get today's strategy entries and executions
         entries = db.session.query(Strategy1Entry).filter(
@@ -152,10 +156,17 @@ def strategy_1_complete_history():
                 'trigger_type': execution_data.trigger_type
             }
         
+        # Replay theoretical trigger points for the whole day in one vectorised pass
+        replay = None
+        if range_data:
+            replay = replay_service.replay(
+                range_data['high'], range_data['low'], today,
+                price_rows=(nifty_timestamps, nifty_prices)
+            )
+        
         # Process each NIFTY price record
-        for nifty_record in nifty_records:
-            record_time = nifty_record.timestamp
-            nifty_price = float(nifty_record.price)
+        for i, record_time in enumerate(nifty_timestamps):
+            nifty_price = float(nifty_prices[i])
             
             # Initialize record
             history_record = {
@@ -187,7 +198,7 @@ def strategy_1_complete_history():
             if range_data and execution_data:
                 # For simplicity, mark records from last hour as ACTIVE if we have a trade
                 from datetime import timedelta
-                current_time = datetime.now()
+                current_time = clock.now()
                 if (current_time - record_time).total_seconds() < 3600:  # Last 1 hour
                     is_after_trigger = True
             
@@ -228,33 +239,26 @@ def strategy_1_complete_history():
                 })
             
             # Check if this is the trigger point
-            elif range_data and not history_record['triggered']:
-                # Calculate theoretical positions for this price point
-                from app.services.strategy_service import StrategyService
-                strategy_service = StrategyService()
-                theoretical_positions = strategy_service.calculate_strategy_1_positions(
-                    range_data['high'], range_data['low'], nifty_price
-                )
-                
-                if theoretical_positions.get('triggered'):
-                    history_record['status'] = 'TRIGGER_POINT'
-                    history_record.update({
-                        'triggered': True,
-                        'trigger_type': theoretical_positions.get('trigger_type'),
-                        'sell_strike': theoretical_positions.get('sell_strike'),
-                        'buy_strike': theoretical_positions.get('buy_strike'),
-                        'option_type': theoretical_positions.get('option_type'),
-                        'sell_ltp_entry': theoretical_positions.get('sell_ltp_entry'),
-                        'buy_ltp_entry': theoretical_positions.get('buy_ltp_entry'),
-                        'sell_ltp_current': theoretical_positions.get('sell_ltp'),
-                        'buy_ltp_current': theoretical_positions.get('buy_ltp'),
-                        'net_premium_current': theoretical_positions.get('net_premium'),
-                        'sell_pnl': theoretical_positions.get('sell_pnl', 0),
-                        'buy_pnl': theoretical_positions.get('buy_pnl', 0),
-                        'total_pnl': theoretical_positions.get('current_pnl', 0),
-                        'capital_used': theoretical_positions.get('capital_used', 0),
-                        'pnl_percentage': (theoretical_positions.get('current_pnl', 0) / theoretical_positions.get('capital_used', 1)) * 100 if theoretical_positions.get('capital_used', 0) > 0 else 0
-                    })
+            elif replay is not None and replay['triggered'][i]:
+                # Entry and current LTPs coincide at a theoretical trigger point, so P&L is zero
+                history_record['status'] = 'TRIGGER_POINT'
+                history_record.update({
+                    'triggered': True,
+                    'trigger_type': replay['trigger_type'][i],
+                    'sell_strike': Strategy1ReplayService.strike_or_none(replay['sell_strike'][i]),
+                    'buy_strike': Strategy1ReplayService.strike_or_none(replay['buy_strike'][i]),
+                    'option_type': replay['option_type'][i],
+                    'sell_ltp_entry': float(replay['sell_ltp'][i]),
+                    'buy_ltp_entry': float(replay['buy_ltp'][i]),
+                    'sell_ltp_current': float(replay['sell_ltp'][i]),
+                    'buy_ltp_current': float(replay['buy_ltp'][i]),
+                    'net_premium_current': float(replay['net_premium'][i]),
+                    'sell_pnl': 0,
+                    'buy_pnl': 0,
+                    'total_pnl': 0,
+                    'capital_used': float(replay['capital_used'][i]),
+                    'pnl_percentage': 0
+                })
             
             timeline.append(history_record)
         
@@ -267,18 +271,24 @@ def strategy_1_complete_history():
             
             ltp_history_records = [record.to_dict() for record in ltp_history]
         
+        # ?format=columnar: parallel arrays plus epoch-millisecond timestamps instead of row objects
+        if wants_columnar():
+            timeline = columnar(timeline)
+            timeline['datetime_ms'] = epoch_ms(nifty_timestamps)
+            ltp_history_records = columnar(ltp_history_records)
+        
         result = {
             'timeline': timeline,
-            'total_records': len(timeline),
+            'total_records': len(nifty_timestamps),
             'ltp_history': ltp_history_records,
-            'ltp_history_count': len(ltp_history_records),
+            'ltp_history_count': len(ltp_history) if entry_data else 0,
             'entry_data': entry_data.to_dict() if entry_data else None,
             'execution_data': execution_data.to_dict() if execution_data else None,
             'has_active_trade': execution_data is not None,
             'range_data': range_data
         }
         
-        return jsonify(result)
+        return json_response(result)
     except Exception as e:
         current_app.logger.error(f"Error in strategy_1_complete_history: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -286,27 +296,48 @@ def strategy_1_complete_history():
 @strategy_bp.route('/api/strategy-1/ltp-history')
 @login_required
 def strategy_1_ltp_history():
-    """API endpoint for detailed LTP history from new tracking tables"""
+    """API endpoint for detailed LTP history from new tracking tables (?since=&cursor=&limit=, ?downsample=&points=)"""
+    try:
+        # The whole day unless the client pages with limit/cursor/since
+        paging = page_args(default_limit=None)
+        method, points = downsample_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         from app.models.strategy_models import Strategy1Entry, Strategy1LTPHistory
         
-        today = date.today()
+        today = clock.today()
         
         # Get today's entries
         entries = db.session.query(Strategy1Entry).filter(
             Strategy1Entry.entry_date == today
         ).order_by(Strategy1Entry.entry_timestamp.desc()).all()
         
+        # LTP history of all of them in one keyset page; since/cursor skip rows the client already has
+        history_rows, page = keyset_page(
+            db.session.query(Strategy1LTPHistory).filter(
+                Strategy1LTPHistory.entry_id.in_([entry.id for entry in entries])
+            ),
+            Strategy1LTPHistory.timestamp, Strategy1LTPHistory.id,
+            limit=paging['limit'], cursor=paging['since'] or paging['cursor']
+        ) if entries else ([], {'count': 0, 'has_more': False, 'next_cursor': None, 'latest_cursor': None})
+        
+        history_by_entry = {}
+        for record in history_rows:
+            history_by_entry.setdefault(record.entry_id, []).append(record)
+        
         result = {
             'entries': [],
-            'total_entries': len(entries)
+            'total_entries': len(entries),
+            'page': page
         }
         
         for entry in entries:
-            # Get LTP history for this entry
-            ltp_history = db.session.query(Strategy1LTPHistory).filter(
-                Strategy1LTPHistory.entry_id == entry.id
-            ).order_by(Strategy1LTPHistory.timestamp.asc()).all()
+            ltp_history = history_by_entry.get(entry.id, [])
+            ltp_history = downsample(
+                ltp_history, [r.timestamp for r in ltp_history], [r.total_pnl for r in ltp_history], method, points
+            )
             
             entry_data = entry.to_dict()
             entry_data['ltp_history'] = [record.to_dict() for record in ltp_history]
@@ -440,7 +471,7 @@ def analyze_strategies(underlying, strike_gap, protection_gap):
             'market_context': market_context,
             'ce_strategies': ce_strategies[:5],  # Top 5
             'pe_strategies': pe_strategies[:5],  # Top 5
-            'analysis_time': datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S IST')
+            'analysis_time': clock.now(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %H:%M:%S IST')
         })
         
     except Exception as e:
@@ -454,7 +485,7 @@ def get_market_context(underlying):
     try:
         # Get today's price data
         ist_tz = pytz.timezone('Asia/Kolkata')
-        today = datetime.now(ist_tz).date()
+        today = clock.now(ist_tz).date()
         
         # Get index prices for today using SQLAlchemy
         if underlying == 'NIFTY':
@@ -529,7 +560,7 @@ def analyze_ce_strategies(underlying, current_price, strike_gap, protection_gap)
     try:
         # Get today's date in IST
         ist_tz = pytz.timezone('Asia/Kolkata')
-        today = datetime.now(ist_tz).date()
+        today = clock.now(ist_tz).date()
         
         # Generate potential strike combinations
         # Sell strikes: current_price + strike_gap to current_price + (strike_gap * 3)
@@ -590,7 +621,7 @@ def analyze_pe_strategies(underlying, current_price, strike_gap, protection_gap)
     try:
         # Get today's date in IST
         ist_tz = pytz.timezone('Asia/Kolkata')
-        today = datetime.now(ist_tz).date()
+        today = clock.now(ist_tz).date()
         
         # Generate potential strike combinations
         # Sell strikes: current_price - strike_gap to current_price - (strike_gap * 3)
@@ -0,0 +1,70 @@
+import json
+import os
+import queue
+import time
+from flask import Response, request, stream_with_context, jsonify
+from app.services.event_bus import event_bus
+from app.services.live_update_service import LiveUpdateService
+
+# Seconds between keep-alive comments so proxies don't drop idle streams
+KEEPALIVE_SECONDS = 15
+# Streams are closed periodically; EventSource reconnects on its own and gets a fresh snapshot
+MAX_STREAM_SECONDS = 120
+RETRY_MS = 5000
+# Each open stream holds one worker thread (gthread) for up to MAX_STREAM_SECONDS. Past this many
+# per worker process, streams are refused with 503 and pages poll instead, so ordinary requests
+# keep threads; size gunicorn --threads above it (e.g. --threads 8 for the default of 4)
+MAX_STREAMS_PER_WORKER = int(os.getenv('MAX_STREAMS_PER_WORKER', '4'))
+
+
+def _format_event(message):
+    return f"event: {message['topic']}\nid: {message['seq']}\ndata: {json.dumps(message)}\n\n"
+
+
+def stream_events():
+    """Server-Sent Events stream of live updates for the requested topics"""
+    requested = [t for t in request.args.get('topics', '').split(',') if t]
+    topics = [t for t in requested if t in LiveUpdateService.TOPICS]
+
+    if not topics:
+        return jsonify({
+            'success': False,
+            'message': f'No valid topics requested. Available: {", ".join(LiveUpdateService.TOPICS)}'
+        }), 400
+
+    if event_bus.subscriber_count() >= MAX_STREAMS_PER_WORKER:
+        response = jsonify({
+            'success': False,
+            'message': 'Too many live update streams on this worker, poll instead'
+        })
+        response.headers['Retry-After'] = str(MAX_STREAM_SECONDS)
+        return response, 503
+
+    subscriber = event_bus.subscribe(topics)
+
+    def generate():
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+
+            # Current state first, so the page renders without an extra API call
+            for topic in topics:
+                snapshot = event_bus.snapshot(topic)
+                if snapshot:
+                    snapshot['initial'] = True
+                    yield _format_event(snapshot)
+
+            deadline = time.time() + MAX_STREAM_SECONDS
+            while time.time() < deadline:
+                try:
+                    message = subscriber['queue'].get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _format_event(message)
+        finally:
+            event_bus.unsubscribe(subscriber)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
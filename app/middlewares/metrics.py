@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from functools import wraps
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+from app.services.metrics_service import metrics
+
+# Scheduler job whose statements the current thread is running, for the db source label
+_job = threading.local()
+_installed = False
+
+# Connections this process has checked out now and at most, for db_pool_checkout_peak
+_pool = {'in_use': 0, 'peak': 0}
+_pool_lock = threading.Lock()
+
+
+def _db_source():
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return getattr(_job, 'id', None) or 'other'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    metrics.observe('db_query_duration_seconds', elapsed, source=_db_source())
+    if has_request_context() and 'metrics_db_queries' in g:
+        g.metrics_db_queries += 1
+        g.metrics_db_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    # The statement failed: drop its start time so the stack stays balanced
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('metrics_started'):
+        connection.info['metrics_started'].pop()
+
+
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    with _pool_lock:
+        _pool['in_use'] += 1
+        peak = _pool['in_use'] if _pool['in_use'] > _pool['peak'] else None
+        if peak:
+            _pool['peak'] = peak
+    metrics.add_gauge('db_pool_connections_in_use', 1)
+    if peak:
+        metrics.set_gauge('db_pool_checkout_peak', peak)
+
+
+def _pool_checkin(dbapi_connection, connection_record):
+    with _pool_lock:
+        _pool['in_use'] -= 1
+    metrics.add_gauge('db_pool_connections_in_use', -1)
+
+
+def _pool_connect(dbapi_connection, connection_record):
+    metrics.add_gauge('db_pool_connections_open', 1)
+
+
+def _pool_close(dbapi_connection, connection_record):
+    metrics.add_gauge('db_pool_connections_open', -1)
+
+
+def _reset_pool_counts():
+    # A forked worker opens its own connections (and the gauges restart with metrics)
+    global _pool_lock
+    _pool_lock = threading.Lock()
+    _pool.update(in_use=0, peak=0)
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db_queries = 0
+    g.metrics_db_seconds = 0.0
+
+
+def _finish_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    metrics.observe(
+        'http_request_duration_seconds', time.perf_counter() - started,
+        endpoint=endpoint, method=request.method, status=response.status_code
+    )
+    metrics.observe('http_request_db_queries', g.pop('metrics_db_queries', 0), endpoint=endpoint)
+    metrics.observe('http_request_db_seconds', g.pop('metrics_db_seconds', 0.0), endpoint=endpoint)
+    return response
+
+
+def init_app(app):
+    """Time every request and SQL statement and count pool connections (listeners are registered once per process)"""
+    global _installed
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+    if not _installed:
+        _installed = True
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        # Connection pool use: sizes DB_POOL_SIZE against the peak a worker reaches under load
+        event.listen(Pool, 'checkout', _pool_checkout)
+        event.listen(Pool, 'checkin', _pool_checkin)
+        event.listen(Pool, 'connect', _pool_connect)
+        event.listen(Pool, 'close', _pool_close)
+        event.listen(Pool, 'close_detached', _pool_close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_reset_pool_counts)
+
+
+def track_job(job_id):
+    """
+    Record a scheduler job's run time, running count and last success.
+
+    SQL run inside the job is labelled with the job id. Skipped and
+    overlapping runs are counted by the listener init_scheduler_metrics() adds.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            previous, _job.id = getattr(_job, 'id', None), job_id
+            metrics.add_gauge('job_running', 1, job=job_id)
+            outcome = 'error'
+            started = time.perf_counter()
+            try:
+                result = f(*args, **kwargs)
+                outcome = 'ok'
+                metrics.set_gauge('job_last_success_timestamp_seconds', time.time(), job=job_id)
+                return result
+            finally:
+                metrics.observe('job_duration_seconds', time.perf_counter() - started, job=job_id, outcome=outcome)
+                metrics.add_gauge('job_running', -1, job=job_id)
+                _job.id = previous
+        return decorated_function
+    return decorator
+
+
+def init_scheduler_metrics(scheduler):
+    """Count runs APScheduler skipped: missed (misfire grace exceeded) and overlapping (max_instances reached)"""
+    from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
+
+    def listener(scheduler_event):
+        if scheduler_event.code == EVENT_JOB_MISSED:
+            metrics.inc('job_missed_total', job=scheduler_event.job_id)
+        else:
+            metrics.inc('job_overlap_total', job=scheduler_event.job_id)
+
+    scheduler.add_listener(listener, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
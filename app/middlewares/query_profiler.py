@@ -0,0 +1,187 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_installed = False
+
+# Literals that vary between executions of the same statement shape
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\([^)]*\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\([^)]*\)s|%s|:\w+))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """(digest, normalised SQL) of a statement shape: literals and IN lists collapsed"""
+    normalised = _STRING_LITERAL.sub('?', statement)
+    normalised = _NUMBER_LITERAL.sub('?', normalised)
+    normalised = _PLACEHOLDER_LIST.sub('(?)', normalised)
+    normalised = _WHITESPACE.sub(' ', normalised).strip()
+    return hashlib.blake2b(normalised.encode('utf-8'), digest_size=8).hexdigest(), normalised
+
+
+class RequestProfile:
+    """Statements of one profiled request, grouped by shape"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes = {}
+
+    def record(self, statement, seconds):
+        self.statements += 1
+        self.seconds += seconds
+        digest, normalised = fingerprint(statement)
+        shape = self.shapes.get(digest)
+        if shape is None:
+            shape = self.shapes[digest] = {'sql': normalised, 'count': 0, 'seconds': 0.0}
+        shape['count'] += 1
+        shape['seconds'] += seconds
+
+    def repeated(self, threshold):
+        """Shapes run at least threshold times: the loop of an N+1"""
+        return {digest: shape for digest, shape in self.shapes.items() if shape['count'] >= threshold}
+
+
+class QueryProfileReport:
+    """
+    Per-endpoint totals of the profiled requests of this process.
+
+    Repeated shapes are kept per endpoint with how many requests repeated them
+    and the most executions seen in one request, so the worst N+1 loops sort first.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def add(self, endpoint, profile, repeated, elapsed):
+        with self.lock:
+            entry = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'statements': 0, 'sql_seconds': 0.0, 'seconds': 0.0,
+                'max_statements': 0, 'repeated': {}
+            })
+            entry['requests'] += 1
+            entry['statements'] += profile.statements
+            entry['sql_seconds'] += profile.seconds
+            entry['seconds'] += elapsed
+            entry['max_statements'] = max(entry['max_statements'], profile.statements)
+            first_seen = []
+            for digest, shape in repeated.items():
+                known = entry['repeated'].get(digest)
+                if known is None:
+                    known = entry['repeated'][digest] = {
+                        'sql': shape['sql'], 'requests': 0, 'executions': 0,
+                        'max_per_request': 0, 'seconds': 0.0
+                    }
+                    first_seen.append(shape)
+                known['requests'] += 1
+                known['executions'] += shape['count']
+                known['max_per_request'] = max(known['max_per_request'], shape['count'])
+                known['seconds'] += shape['seconds']
+        return first_seen
+
+    def get_report(self):
+        with self.lock:
+            endpoints = {
+                name: dict(entry, repeated=[dict(shape, fingerprint=digest) for digest, shape in entry['repeated'].items()])
+                for name, entry in self.endpoints.items()
+            }
+
+        for entry in endpoints.values():
+            requests = entry['requests']
+            entry['avg_statements'] = round(entry['statements'] / requests, 1)
+            entry['avg_sql_ms'] = round(entry['sql_seconds'] * 1000 / requests, 2)
+            entry['avg_ms'] = round(entry['seconds'] * 1000 / requests, 2)
+            entry['sql_seconds'] = round(entry['sql_seconds'], 4)
+            entry['seconds'] = round(entry['seconds'], 4)
+            for shape in entry['repeated']:
+                shape['seconds'] = round(shape['seconds'], 4)
+            entry['repeated'].sort(key=lambda shape: shape['max_per_request'], reverse=True)
+
+        # Endpoints with the most SQL time per request first
+        return dict(sorted(endpoints.items(), key=lambda item: item[1]['avg_sql_ms'], reverse=True))
+
+    def clear(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+# Process-wide report
+query_report = QueryProfileReport()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and g.get('sql_profile') is not None:
+        conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and g.get('sql_profile') is not None):
+        return
+    started = conn.info.get('profile_started')
+    if started:
+        g.sql_profile.record(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('profile_started'):
+        connection.info['profile_started'].pop()
+
+
+def _start_profile():
+    """Profile this request if it is sampled (or forced with X-SQL-Profile: 1 in debug mode)"""
+    rate = current_app.config.get('SQL_PROFILE_SAMPLE_RATE', 0.0)
+    forced = current_app.debug and request.headers.get('X-SQL-Profile') == '1'
+    if forced or (rate > 0 and random.random() < rate):
+        g.sql_profile = RequestProfile()
+
+
+def _finish_profile(response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+
+    elapsed = time.perf_counter() - profile.started
+    endpoint = request.endpoint or 'unmatched'
+    repeated = profile.repeated(current_app.config.get('SQL_PROFILE_REPEAT_THRESHOLD', 5))
+
+    for shape in query_report.add(endpoint, profile, repeated, elapsed):
+        print(f"⚠️ Possible N+1 in {endpoint}: {shape['count']} executions of {shape['sql'][:160]}")
+
+    timings = [
+        f'db;dur={profile.seconds * 1000:.1f};desc="{profile.statements} queries"',
+        f'app;dur={(elapsed - profile.seconds) * 1000:.1f}'
+    ]
+    if repeated:
+        worst = max(shape['count'] for shape in repeated.values())
+        timings.append(f'n1;desc="{len(repeated)} repeated shapes, worst {worst}x"')
+    response.headers.add('Server-Timing', ', '.join(timings))
+    return response
+
+
+def init_app(app):
+    """
+    Profile SQL per request: statement count and time, repeated statement shapes
+    (N+1 loops) and a Server-Timing header, for a sampled share of requests.
+
+    SQL_PROFILE_SAMPLE_RATE is the share of requests profiled (0 disables it, so
+    unsampled requests only pay a flag check per statement); shapes run at least
+    SQL_PROFILE_REPEAT_THRESHOLD times in one request are reported as N+1 suspects.
+    """
+    global _installed
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+
+    if not _installed:
+        _installed = True
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
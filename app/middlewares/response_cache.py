@@ -0,0 +1,179 @@
+import hashlib
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from flask import request, make_response, Response
+from app.services.data_version_service import data_versions
+from app.services.metrics_service import metrics
+from app.utils import clock
+from app.utils.fast_json import request_encoding, compress
+
+
+class ResponseCache:
+    """
+    Per-process LRU of serialised JSON responses.
+
+    The byte bound counts uncompressed bodies; gzip/brotli variants built on
+    demand are stored alongside and are much smaller.
+
+    Keys include the data versions of the tables a view reads, so entries are
+    never invalidated explicitly: the next ingestion commit bumps a version and
+    the old entries simply stop matching and age out of the LRU.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = Lock()
+        self.stats = {}
+
+    def get(self, key, ttl=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if ttl is not None and time.monotonic() - entry['created'] > ttl:
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = entry
+            self.total_bytes += len(entry['body'])
+            while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                oldest_key = next(iter(self.entries))
+                self._remove(oldest_key)
+                self._count(oldest_key[0], 'evictions')
+                metrics.inc('cache_requests_total', cache='response', key=oldest_key[0], outcome='evictions')
+
+    def record(self, endpoint, outcome):
+        with self.lock:
+            self._count(endpoint, outcome)
+        metrics.inc('cache_requests_total', cache='response', key=endpoint, outcome=outcome)
+
+    def get_stats(self):
+        with self.lock:
+            endpoints = {name: dict(counters) for name, counters in self.stats.items()}
+            entries, total_bytes = len(self.entries), self.total_bytes
+
+        for counters in endpoints.values():
+            lookups = counters['hits'] + counters['misses']
+            counters['hit_ratio'] = round(counters['hits'] / lookups, 4) if lookups else 0.0
+
+        return {
+            'entries': entries,
+            'bytes': total_bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'endpoints': endpoints
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.total_bytes -= len(entry['body'])
+
+    def _count(self, endpoint, outcome):
+        counters = self.stats.setdefault(endpoint, {
+            'hits': 0, 'misses': 0, 'not_modified': 0, 'bypassed': 0, 'evictions': 0
+        })
+        counters[outcome] += 1
+
+
+# Process-wide response cache
+response_cache = ResponseCache()
+
+
+def _normalized_args():
+    """Query args sorted, without empty values and cache busters, so equivalent URLs share an entry"""
+    return tuple(sorted(
+        (name, value) for name, value in request.args.items(multi=True)
+        if value != '' and name not in ('_', 'nocache')
+    ))
+
+
+def _cacheable(response):
+    if response.status_code != 200 or response.direct_passthrough or response.mimetype != 'application/json':
+        return False
+    payload = response.get_json(silent=True)
+    # Don't pin transient failures reported in a 200 body
+    return not (isinstance(payload, dict) and (payload.get('success') is False or 'error' in payload))
+
+
+def _encoded_body(entry):
+    """(body, encoding) in the client's preferred coding; compressed variants are kept with the entry"""
+    encoding = request_encoding(entry['body'])
+    if encoding is None:
+        return entry['body'], None
+    if encoding not in entry['encoded']:
+        entry['encoded'][encoding] = compress(entry['body'], encoding)
+    return entry['encoded'][encoding], encoding
+
+
+def cached_response(tables, ttl=300):
+    """
+    Cache a JSON view's serialised response until any of `tables` changes.
+
+    The key is the path, the normalised query args, the current data version of
+    each table and today's date (views default to "today"). ttl bounds how long
+    an entry lives for views that also depend on the clock. Responses carry a
+    (weak) ETag so browsers revalidate with If-None-Match and get a 304.
+    Place below @login_required so authentication still runs on every request.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            endpoint = request.endpoint or f.__name__
+            # Versions are read before computing so a concurrent commit can only make the entry miss
+            key = (endpoint, request.path, _normalized_args(), data_versions.get_many(tables), clock.today().isoformat())
+
+            entry = response_cache.get(key, ttl)
+            if entry is not None:
+                outcome = 'hits'
+            else:
+                response = make_response(f(*args, **kwargs))
+                if not _cacheable(response):
+                    response_cache.record(endpoint, 'bypassed')
+                    return response
+
+                body = response.get_data()
+                entry = {
+                    'body': body,
+                    'encoded': {},
+                    'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+                    'mimetype': response.mimetype,
+                    'created': time.monotonic()
+                }
+                response_cache.put(key, entry)
+                outcome = 'misses'
+
+            response_cache.record(endpoint, outcome)
+
+            if request.if_none_match.contains_weak(entry['etag']):
+                response_cache.record(endpoint, 'not_modified')
+                cached = Response(status=304)
+            else:
+                body, encoding = _encoded_body(entry)
+                cached = Response(body, mimetype=entry['mimetype'])
+                if encoding:
+                    cached.headers['Content-Encoding'] = encoding
+
+            # Weak: the same entity is served gzip/brotli encoded or plain
+            cached.set_etag(entry['etag'], weak=True)
+            cached.vary.add('Accept-Encoding')
+            cached.headers['Cache-Control'] = 'no-cache'
+            cached.headers['X-Cache'] = 'HIT' if outcome == 'hits' else 'MISS'
+            return cached
+        return decorated_function
+    return decorator
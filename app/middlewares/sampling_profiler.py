@@ -0,0 +1,21 @@
+from flask import current_app
+from app.services.sampling_profiler import profiler
+
+
+def _ensure_always_on():
+    """Start the always-on sampling in this worker (timers do not survive the fork from a preloading master)"""
+    if profiler.background is None:
+        profiler.start_background(current_app.config['PROFILER_ALWAYS_ON_RATE'])
+
+
+def init_app(app):
+    """
+    Install the stack sampler's signal handlers (this has to happen on the main
+    thread, so at startup rather than from the admin request that starts a
+    session) and, with PROFILER_ALWAYS_ON_RATE above 0, sample CPU continuously
+    at that share of the on-demand rate from each worker's first request on.
+    """
+    if not profiler.install():
+        return
+    if app.config.get('PROFILER_ALWAYS_ON_RATE', 0) > 0:
+        app.before_request(_ensure_always_on)
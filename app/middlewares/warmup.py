@@ -0,0 +1,85 @@
+import importlib
+import os
+import threading
+import time
+from flask import current_app
+from sqlalchemy import text
+from app import db
+
+# Worker the warm-up was started in (a forked worker starts its own)
+_state = {'pid': None}
+_lock = threading.Lock()
+
+
+def _import_analytics(app):
+    # Chart service pulls in pandas, plotly and the technical analysis service
+    importlib.import_module('app.services.chart_service')
+    importlib.import_module('app.services.macd_cache_service')
+
+
+def _import_kite(app):
+    if not app.config.get('KITE_SIMULATION'):
+        importlib.import_module('kiteconnect')
+
+
+def _load_macd_cache(app):
+    # Importing it seeds the shared cache from storage/fast_macd_cache.json on a fresh host
+    importlib.import_module('app.services.super_fast_macd_cache')
+
+
+def _open_db_connection(app):
+    with app.app_context():
+        db.session.execute(text('SELECT 1'))
+        db.session.remove()
+
+
+STEPS = (
+    ('analytics_imports', _import_analytics),
+    ('kite_import', _import_kite),
+    ('macd_cache', _load_macd_cache),
+    ('db_connection', _open_db_connection),
+)
+
+
+def _warm_up(app):
+    started = time.perf_counter()
+    steps = []
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        try:
+            step(app)
+            error = None
+        except Exception as e:
+            error = str(e)
+            print(f"Warm-up step {name} failed: {error}")
+        steps.append({'name': name, 'ms': round((time.perf_counter() - step_started) * 1000, 1), 'error': error})
+
+    profile = app.extensions.get('startup_profile')
+    if profile is not None:
+        profile.warmup = {'ms': round((time.perf_counter() - started) * 1000, 1), 'steps': steps}
+
+
+def _start_warmup():
+    """Start this worker's warm-up on its first request"""
+    if _state['pid'] == os.getpid():
+        return
+    with _lock:
+        if _state['pid'] == os.getpid():
+            return
+        _state['pid'] = os.getpid()
+    thread = threading.Thread(
+        target=_warm_up, args=(current_app._get_current_object(),), name='worker-warmup', daemon=True
+    )
+    thread.start()
+
+
+def init_app(app):
+    """
+    Load what create_app leaves out (pandas, plotly, kiteconnect, the MACD
+    cache backup, the first database connection) in a background thread once
+    the worker serves its first request, so boot stays short and later
+    requests do not pay for the imports. WARMUP_ENABLED=false leaves every
+    import to the first request that needs it.
+    """
+    if app.config.get('WARMUP_ENABLED', True):
+        app.before_request(_start_warmup)
@@ -1,5 +1,5 @@
 from app import db
-from datetime import datetime
+from app.utils import clock
 
 class BankNiftyPrice(db.Model):
     __tablename__ = 'banknifty_prices'
@@ -9,7 +9,7 @@ class BankNiftyPrice(db.Model):
     price = db.Column(db.Float, nullable=False)
     change = db.Column(db.Float)
     change_percent = db.Column(db.Float)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    timestamp = db.Column(db.DateTime, default=clock.utcnow, nullable=False, index=True)
     
     def __repr__(self):
         return f'<BankNiftyPrice {self.symbol} - {self.price} at {self.timestamp}>'
@@ -82,7 +82,7 @@ class OptionChainData(db.Model):
     pe_instrument_token = db.Column(db.String(50))  # PE Unique Instrument ID for Kite API
     
     # Metadata
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    timestamp = db.Column(db.DateTime, default=clock.utcnow, nullable=False, index=True)
     is_current_expiry = db.Column(db.Boolean, default=True, index=True)
     
     # Composite indexes for better query performance
@@ -260,7 +260,7 @@ class OptionChainData(db.Model):
         from sqlalchemy import or_
         
         # Get records from last 24 hours
-        since_time = datetime.utcnow() - timedelta(hours=24)
+        since_time = clock.utcnow() - timedelta(hours=24)
         
         query = cls.query.filter(
             cls.underlying == underlying,
@@ -294,7 +294,7 @@ class OptionChainData(db.Model):
         from sqlalchemy import or_, func
         
         # Get records from last 6 hours for more recent activity
-        since_time = datetime.utcnow() - timedelta(hours=6)
+        since_time = clock.utcnow() - timedelta(hours=6)
         
         query = cls.query.filter(
             cls.underlying == underlying,
@@ -314,7 +314,7 @@ class OptionChainData(db.Model):
         return {
             'top_ce_changes': top_ce,
             'top_pe_changes': top_pe,
-            'last_updated': datetime.utcnow()
+            'last_updated': clock.utcnow()
         }
 
 
@@ -345,7 +345,7 @@ class MarketTrend(db.Model):
     key_support_level = db.Column(db.Float, default=0.0)
     key_resistance_level = db.Column(db.Float, default=0.0)
     
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    timestamp = db.Column(db.DateTime, default=clock.utcnow, nullable=False, index=True)
     
     def __repr__(self):
         return f'<MarketTrend {self.underlying} {self.expiry_date} - {self.bullish_percentage}% Bull>'
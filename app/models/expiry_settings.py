@@ -1,5 +1,6 @@
 from app import db
-from datetime import datetime, date
+from datetime import datetime
+from app.utils import clock
 
 class ExpirySettings(db.Model):
     __tablename__ = 'expiry_settings'
@@ -31,7 +32,7 @@ class ExpirySettings(db.Model):
         
         # Fallback to default calculation if not set
         from datetime import timedelta
-        today = date.today()
+        today = clock.today()
         days_ahead = 3 - today.weekday()  # 3 = Thursday
         if days_ahead <= 0:
             days_ahead += 7
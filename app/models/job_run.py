@@ -0,0 +1,42 @@
+from app import db
+from datetime import datetime
+import json
+
+class JobRun(db.Model):
+    """Model to store one row per scheduler job run (or skipped run) with its per-phase span tree"""
+    __tablename__ = 'job_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(50), nullable=False)  # APScheduler job id, e.g. 'fetch_nifty_price'
+    status = db.Column(db.String(10), nullable=False)  # 'ok', 'error', 'overlap' or 'missed'
+    started_at = db.Column(db.DateTime, nullable=False, index=True)  # UTC; the scheduled time for skipped runs
+    duration_ms = db.Column(db.Float)  # None for skipped runs
+    error = db.Column(db.Text)  # First error raised in the run or one of its phases
+    spans = db.Column(db.Text)  # Phase tree as JSON: [{'name', 'attrs', 'ms', 'error', 'children'}]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_job_runs_job_started', 'job_id', 'started_at'),
+    )
+
+    def __repr__(self):
+        return f'<JobRun {self.job_id} {self.status} at {self.started_at} ({self.duration_ms} ms)>'
+
+    def get_spans(self):
+        """Phase tree as recorded by the job trace"""
+        try:
+            return json.loads(self.spans) if self.spans else []
+        except (TypeError, ValueError):
+            return []
+
+    def to_dict(self):
+        """Convert to dictionary for API responses"""
+        return {
+            'id': self.id,
+            'job_id': self.job_id,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': self.duration_ms,
+            'error': self.error,
+            'spans': self.get_spans()
+        }
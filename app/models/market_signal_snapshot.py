@@ -0,0 +1,65 @@
+from app import db
+from datetime import datetime
+import json
+
+class MarketSignalSnapshot(db.Model):
+    """Model to store precomputed market signal scores, one row per ingestion cycle"""
+    __tablename__ = 'market_signal_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    trade_date = db.Column(db.Date, nullable=False, index=True)  # Date the score was computed for
+    signal_score = db.Column(db.Integer, nullable=False)
+    signal_text = db.Column(db.String(20), nullable=False)
+    signal_color = db.Column(db.String(10), nullable=False)
+    nifty_change = db.Column(db.Float)
+    banknifty_change = db.Column(db.Float)
+    nifty_oi_score = db.Column(db.Integer)
+    banknifty_oi_score = db.Column(db.Integer)
+    net_influence = db.Column(db.Float)
+    payload = db.Column(db.Text, nullable=False)  # Full analysis result as JSON
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index('idx_signal_snapshot_date_timestamp', 'trade_date', 'timestamp'),
+    )
+
+    def __repr__(self):
+        return f'<MarketSignalSnapshot {self.trade_date} {self.signal_text} ({self.signal_score}) at {self.timestamp}>'
+
+    def get_payload(self):
+        """Full analysis result as stored by the ingestion pipeline"""
+        try:
+            return json.loads(self.payload)
+        except (TypeError, ValueError):
+            return {}
+
+    def to_dict(self):
+        """Convert to dictionary for history responses"""
+        return {
+            'id': self.id,
+            'trade_date': self.trade_date.isoformat(),
+            'signal_score': self.signal_score,
+            'signal_text': self.signal_text,
+            'signal_color': self.signal_color,
+            'nifty_change': self.nifty_change,
+            'banknifty_change': self.banknifty_change,
+            'nifty_oi_score': self.nifty_oi_score,
+            'banknifty_oi_score': self.banknifty_oi_score,
+            'net_influence': self.net_influence,
+            'timestamp': self.timestamp.isoformat()
+        }
+
+    @classmethod
+    def get_latest(cls, trade_date=None):
+        """Get the latest snapshot, optionally for a specific trade date"""
+        query = cls.query
+        if trade_date:
+            query = query.filter(cls.trade_date == trade_date)
+        return query.order_by(cls.timestamp.desc()).first()
+
+    @classmethod
+    def get_history(cls, trade_date):
+        """Get all snapshots for a trade date in chronological order"""
+        return cls.query.filter(
+            cls.trade_date == trade_date
+        ).order_by(cls.timestamp.asc()).all()
@@ -1,5 +1,5 @@
 from app import db
-from datetime import datetime
+from app.utils import clock
 
 class NiftyPrice(db.Model):
     __tablename__ = 'nifty_prices'
@@ -13,7 +13,7 @@ class NiftyPrice(db.Model):
     close = db.Column(db.Float, nullable=True) # Close price for the period
     change = db.Column(db.Float)
     change_percent = db.Column(db.Float)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    timestamp = db.Column(db.DateTime, default=clock.utcnow, nullable=False, index=True)
     
     def __repr__(self):
         return f'<NiftyPrice {self.symbol} - {self.price} at {self.timestamp}>'
@@ -1,6 +1,7 @@
 from app import db
 from datetime import datetime, date
 from app.utils.datetime_utils import utc_to_ist
+from app.utils import clock
 
 class NiftyStock(db.Model):
     __tablename__ = 'nifty_stocks'
@@ -114,7 +115,7 @@ class NiftyStock(db.Model):
         current_price = float(price_data.get('last_price', 0))
         
         # Set opening price (9:20 AM) if not set for today
-        today = date.today()
+        today = clock.today()
         if stock.trading_date != today or stock.opening_price == 0:
             stock.opening_price = current_price
             stock.trading_date = today
@@ -143,7 +144,7 @@ class NiftyStock(db.Model):
     @classmethod
     def get_nifty_stocks_summary(cls):
         """Get summary of all NIFTY 50 stocks with today's performance"""
-        today = date.today()
+        today = clock.today()
         stocks = cls.query.filter_by(trading_date=today).order_by(cls.nifty_influence.desc()).all()
         
         if not stocks:
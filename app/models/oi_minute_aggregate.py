@@ -0,0 +1,41 @@
+from app import db
+from datetime import datetime
+
+class OIMinuteAggregate(db.Model):
+    """Model to store per-minute CE/PE OI aggregates per underlying, rolled up from option_chain_data"""
+    __tablename__ = 'oi_minute_aggregates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    underlying = db.Column(db.String(20), nullable=False)  # 'NIFTY' or 'BANKNIFTY'
+    minute = db.Column(db.DateTime, nullable=False)  # UTC minute bucket
+
+    ce_oi_change_sum = db.Column(db.BigInteger, default=0, nullable=False)
+    pe_oi_change_sum = db.Column(db.BigInteger, default=0, nullable=False)
+    ce_oi_sum = db.Column(db.BigInteger, default=0, nullable=False)
+    pe_oi_sum = db.Column(db.BigInteger, default=0, nullable=False)
+    ce_oi_count = db.Column(db.Integer, default=0, nullable=False)  # Rows with non-null CE OI (AVG denominator)
+    pe_oi_count = db.Column(db.Integer, default=0, nullable=False)  # Rows with non-null PE OI (AVG denominator)
+    record_count = db.Column(db.Integer, default=0, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('underlying', 'minute', name='uq_oi_minute_underlying_minute'),
+    )
+
+    def __repr__(self):
+        return f'<OIMinuteAggregate {self.underlying} {self.minute} ({self.record_count} rows)>'
+
+    def to_dict(self):
+        """Convert to dictionary for API responses"""
+        return {
+            'underlying': self.underlying,
+            'minute': self.minute.isoformat(),
+            'ce_oi_change_sum': self.ce_oi_change_sum,
+            'pe_oi_change_sum': self.pe_oi_change_sum,
+            'ce_oi_sum': self.ce_oi_sum,
+            'pe_oi_sum': self.pe_oi_sum,
+            'ce_oi_count': self.ce_oi_count,
+            'pe_oi_count': self.pe_oi_count,
+            'record_count': self.record_count
+        }
@@ -1,6 +1,6 @@
 from app import db
-from datetime import datetime
 import pytz
+from app.utils import clock
 
 class Strategy1Entry(db.Model):
     """Separate table to track strategy entry details with NIFTY range data"""
@@ -9,7 +9,7 @@ class Strategy1Entry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Entry timestamp and date
-    entry_timestamp = db.Column(db.DateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')), nullable=False)
+    entry_timestamp = db.Column(db.DateTime, default=lambda: clock.now(pytz.timezone('Asia/Kolkata')), nullable=False)
     entry_date = db.Column(db.Date, nullable=False)
     
     # NIFTY range data during 9:12-9:33 AM
@@ -87,7 +87,7 @@ class Strategy1LTPHistory(db.Model):
     entry_id = db.Column(db.Integer, db.ForeignKey('strategy1_entries.id'), nullable=False)
     
     # Timestamp
-    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')), nullable=False)
+    timestamp = db.Column(db.DateTime, default=lambda: clock.now(pytz.timezone('Asia/Kolkata')), nullable=False)
     
     # Current NIFTY price
     nifty_price = db.Column(db.Float, nullable=False)
@@ -133,7 +133,7 @@ class Strategy1Execution(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Timestamp and basic info
-    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')), nullable=False)
+    timestamp = db.Column(db.DateTime, default=lambda: clock.now(pytz.timezone('Asia/Kolkata')), nullable=False)
     execution_date = db.Column(db.Date, nullable=False)
     
     # NIFTY range data (9:12 - 9:33 AM)
@@ -0,0 +1,336 @@
+"""
+Benchmark Service
+Timed benchmarks of the ingestion, analytics and API hot paths over seeded synthetic datasets, with regression checks
+"""
+
+import contextlib
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, date, timedelta
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.services.market_simulator import MarketSimulator, SimulatedDataLoader
+
+# Trading days per dataset
+DATASETS = {
+    'day': 1,
+    'month': 21,
+    'year': 250
+}
+
+# Median slowdown beyond which a case counts as a regression (per-case overrides in the baseline)
+DEFAULT_THRESHOLD = 0.25
+
+BENCHMARKS = {}
+
+
+def benchmark(name, rounds=None):
+    """
+    Register a benchmark case. The decorated function gets the BenchmarkContext,
+    does its (untimed) setup and returns the callable that is timed.
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = {'name': name, 'setup': setup, 'rounds': rounds, 'doc': (setup.__doc__ or '').strip()}
+        return setup
+    return decorator
+
+
+class BenchmarkContext:
+    """The dataset a run benchmarks against, plus cleanups registered by the cases"""
+
+    def __init__(self, app, dataset, end_date, seed=42):
+        self.app = app
+        self.dataset = dataset
+        self.seed = seed
+        self.simulator = MarketSimulator(seed=seed)
+        self.loader = SimulatedDataLoader(self.simulator)
+        self.days = self._trading_days(end_date, DATASETS[dataset])
+        self.first_day = self.days[0]
+        self.last_day = self.days[-1]
+        self._cleanups = []
+
+    def _trading_days(self, end_date, count):
+        day = end_date if self.simulator.is_trading_day(end_date) else self.simulator.previous_trading_day(end_date)
+        days = [day]
+        while len(days) < count:
+            days.insert(0, self.simulator.previous_trading_day(days[0]))
+        return days
+
+    def after(self, cleanup):
+        """Run cleanup once the current case is done (undo rows the case wrote, stop patches)"""
+        self._cleanups.append(cleanup)
+
+    def cleanup(self):
+        while self._cleanups:
+            self._cleanups.pop()()
+
+    def ensure_data(self, underlyings=('NIFTY', 'BANKNIFTY')):
+        """Load the dataset's sessions unless the database already holds them; days loaded"""
+        from app import db
+        from app.models.nifty_price import NiftyPrice
+
+        db.create_all()
+        loaded = 0
+        for day in self.days:
+            start = self.simulator.minute_timestamp(day, 0)
+            exists = db.session.query(NiftyPrice.id).filter(
+                NiftyPrice.timestamp >= start, NiftyPrice.timestamp < start + timedelta(hours=7)
+            ).first()
+            if exists is None:
+                self.loader.load_day(day, list(underlyings))
+                loaded += 1
+        return loaded
+
+
+class BenchmarkRunner:
+    """
+    Times each case for a number of rounds after a warm-up call, counting the SQL
+    statements of every round, and reports min/median/mean/p95 per case.
+    """
+
+    def __init__(self, context, rounds=10, warmup=1, quiet=True):
+        self.context = context
+        self.rounds = rounds
+        self.warmup = max(warmup, 1)
+        self.quiet = quiet
+        self._statements = 0
+
+    def _count_statement(self, *args):
+        self._statements += 1
+
+    def run(self, names=None, progress=None):
+        names = names or list(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise ValueError(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+        cases = {}
+        event.listen(Engine, 'after_cursor_execute', self._count_statement)
+        try:
+            for name in names:
+                cases[name] = self._run_case(BENCHMARKS[name])
+                if progress:
+                    progress(name, cases[name])
+        finally:
+            event.remove(Engine, 'after_cursor_execute', self._count_statement)
+        return cases
+
+    def _run_case(self, case):
+        from app import db
+
+        rounds = case['rounds'] or self.rounds
+        timings = []
+        statements = []
+        # The services log with print(); keep that out of the timings' output
+        output = open(os.devnull, 'w') if self.quiet else None
+        try:
+            with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+                with self.context.app.test_request_context():
+                    try:
+                        call = case['setup'](self.context)
+                        # The first call is a warm-up whose result is checked: services
+                        # that swallow their errors would otherwise benchmark as fast
+                        failure = _failure(call())
+                        if failure:
+                            raise RuntimeError(failure)
+                        for _ in range(self.warmup - 1):
+                            call()
+                        for _ in range(rounds):
+                            self._statements = 0
+                            started = time.perf_counter()
+                            call()
+                            timings.append(time.perf_counter() - started)
+                            statements.append(self._statements)
+                    except Exception as e:
+                        db.session.rollback()
+                        return {'error': f'{type(e).__name__}: {e}'}
+                    finally:
+                        self.context.cleanup()
+        finally:
+            if output:
+                output.close()
+
+        ordered = sorted(timings)
+        return {
+            'rounds': rounds,
+            'min_ms': round(ordered[0] * 1000, 3),
+            'median_ms': round(statistics.median(ordered) * 1000, 3),
+            'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+            'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+            'stdev_ms': round(statistics.stdev(ordered) * 1000, 3) if len(ordered) > 1 else 0.0,
+            'queries': max(statements)
+        }
+
+    def report(self, cases, **metadata):
+        """Result document stored as JSON"""
+        from app import db
+        return {
+            'created': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'dataset': self.context.dataset,
+            'trading_days': len(self.context.days),
+            'first_day': self.context.first_day.isoformat(),
+            'last_day': self.context.last_day.isoformat(),
+            'seed': self.context.seed,
+            'database': db.engine.dialect.name,
+            'python': platform.python_version(),
+            **metadata,
+            'cases': cases
+        }
+
+
+def _failure(result):
+    """Why a case's result is an error result (None, {'error': ...}, success False, HTTP error), or None"""
+    status = None
+    if isinstance(result, tuple):
+        result, status = result[0], result[1]
+    if hasattr(result, 'get_json'):
+        status = status or result.status_code
+        result = result.get_json(silent=True)
+    if status is not None and status >= 400:
+        return f'HTTP {status}: {(result or {}).get("message", "")}'
+    if result is None:
+        return 'no result'
+    if isinstance(result, dict):
+        if result.get('error'):
+            return str(result['error'])
+        if result.get('success') is False:
+            return str(result.get('message') or result.get('error') or 'success: false')
+    return None
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare a run with a baseline run of the same dataset.
+
+    A case regresses when its median is more than its threshold (baseline
+    'thresholds' entry, else threshold) above the baseline median, or when it
+    issues more SQL statements than the baseline did (a new N+1 shows up here
+    before it shows up in the timings). Returns one row per case.
+    """
+    thresholds = baseline.get('thresholds', {})
+    rows = []
+    for name, current in results['cases'].items():
+        before = baseline.get('cases', {}).get(name)
+        row = {'name': name, 'median_ms': current.get('median_ms'), 'baseline_ms': None, 'change': None}
+        if 'error' in current:
+            row['status'] = 'error'
+        elif before is None or 'error' in before:
+            row['status'] = 'new'
+        else:
+            limit = thresholds.get(name, threshold)
+            change = current['median_ms'] / before['median_ms'] - 1 if before['median_ms'] else 0.0
+            row.update(baseline_ms=before['median_ms'], change=round(change, 3), threshold=limit)
+            if change > limit or current['queries'] > before['queries']:
+                row['status'] = 'regressed'
+            elif change < -limit:
+                row['status'] = 'improved'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+    return rows
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(path, document):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+
+
+# ----------------------------------------------------------------------
+# Cases
+# ----------------------------------------------------------------------
+
+@benchmark('ingestion.option_chain_save', rounds=5)
+def option_chain_save(context):
+    """One NIFTY option chain cycle through OptionChainData.save_option_data (21 strikes)"""
+    from unittest import mock
+    from app import db
+    from app.models.banknifty_price import OptionChainData
+
+    rows = context.simulator.option_chain('NIFTY', context.simulator.minute_timestamp(context.last_day, 300))
+    for row in rows:
+        row.pop('timestamp')
+    last_id = db.session.query(db.func.max(OptionChainData.id)).scalar() or 0
+
+    # save_option_data skips rows outside market hours by the wall clock
+    patch = mock.patch('app.utils.datetime_utils.is_market_hours', return_value=True)
+    patch.start()
+
+    def cleanup():
+        patch.stop()
+        OptionChainData.query.filter(OptionChainData.id > last_id).delete(synchronize_session=False)
+        db.session.commit()
+    context.after(cleanup)
+
+    def cycle():
+        return [OptionChainData.save_option_data(row) for row in rows][-1]
+    return cycle
+
+
+@benchmark('analytics.macd_recompute')
+def macd_recompute(context):
+    """Fresh MACD of every cached timeframe (the macd_cache_update job's work)"""
+    from app.services.macd_cache_service import MacdCacheService
+    service = MacdCacheService()
+
+    def recompute():
+        # A one-day dataset is too short for the 30 minute MACD; fail only if no timeframe computes
+        results = [service.calculate_fresh_macd('NIFTY', timeframe) for timeframe in (30, 15, 12, 6, 3)]
+        return next((result for result in results if result.get('success')), results[0])
+    return recompute
+
+
+@benchmark('analytics.chart_data')
+def chart_data(context):
+    """NIFTY 30 minute candles with indicators over the last 30 days"""
+    from app.services.chart_service import ChartService
+    service = ChartService()
+    days_back = (date.today() - context.first_day).days + 1
+
+    return lambda: service.get_nifty_chart_data('30min', days_back=min(days_back, 30))
+
+
+@benchmark('analytics.oi_timeline')
+def oi_timeline(context):
+    """Cumulative CE/PE OI change timeline of the last session"""
+    from app.controllers.oi_controller import get_oi_changes_timeline
+    return lambda: get_oi_changes_timeline('NIFTY', context.last_day)
+
+
+@benchmark('analytics.crossover_summary')
+def crossover_summary(context):
+    """OI crossover summary of the last session"""
+    from app.services.oi_crossover_service import OICrossoverService
+    service = OICrossoverService()
+    return lambda: service.get_oi_crossover_summary(start_date=context.last_day, end_date=context.last_day)
+
+
+@benchmark('api.all_oi')
+def all_oi(context):
+    """All-OI page data for NIFTY (every strike, latest vs first of the day)"""
+    from app.controllers.all_oi_controller import get_all_oi_data
+    return lambda: get_all_oi_data('NIFTY')
+
+
+@benchmark('analytics.strategy1_history')
+def strategy1_history(context):
+    """Strategy 1 history of today (theoretical replay when there are no executions)"""
+    from app.services.strategy_service import StrategyService
+    service = StrategyService()
+    return service.get_strategy_1_history
+
+
+@benchmark('analytics.market_signal')
+def market_signal(context):
+    """Market signal scoring for the last session"""
+    from app.services.market_service import MarketService
+    service = MarketService()
+    return lambda: service.get_market_signal_analysis(target_date=context.last_day)
@@ -0,0 +1,334 @@
+"""
+Bulk Transfer Service
+Moves whole tables between environments with PostgreSQL COPY (SQLite: executemany) and verifies the result
+"""
+
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from decimal import Decimal
+from sqlalchemy import select, insert, text
+from sqlalchemy.types import Integer, Float, Numeric, DateTime, Date, Boolean
+from app import db
+from app.services.data_version_service import data_versions
+
+
+class BulkTransferService:
+    """
+    Table dumps as CSV files plus a manifest.json of row counts and checksums.
+
+    On PostgreSQL both directions use COPY ... TO/FROM STDIN (CSV, NULL '\\N'),
+    so rows never pass through Python one statement at a time; on SQLite rows are
+    streamed through csv and executemany in batches. Both engines read and write
+    the same file format, so a production PostgreSQL dump loads into a SQLite
+    dev database and back.
+
+    Tables are processed in parallel (one connection each). Imports truncate the
+    target tables, drop their secondary indexes (and, on PostgreSQL, foreign keys)
+    during the load and recreate them once every table is in, then reset id
+    sequences. Each table gets two checksums: sha256 of its file (transfer
+    integrity) and a content checksum over the rows in primary key order that is
+    computed the same way on either engine, so the loaded table can be compared
+    with its source.
+    """
+
+    NULL = '\\N'
+    BATCH_SIZE = 5000
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, engine=None, jobs=4):
+        self.engine = engine or db.engine
+        self.is_postgres = self.engine.dialect.name == 'postgresql'
+        # SQLite has a single writer; parallel loads would only wait on each other
+        self.jobs = jobs if self.is_postgres else 1
+
+    def tables(self, names=None):
+        """Model tables in dependency order, optionally restricted to names"""
+        tables = [t for t in db.metadata.sorted_tables if not names or t.name in names]
+        unknown = set(names or []) - {t.name for t in tables}
+        if unknown:
+            raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+        return tables
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def export_tables(self, directory, names=None):
+        """Dump tables into directory and write the manifest; returns it"""
+        os.makedirs(directory, exist_ok=True)
+        tables = self.tables(names)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            results = list(pool.map(lambda t: self._export_table(t, directory), tables))
+
+        manifest = {
+            'created_at': datetime.utcnow().isoformat(),
+            'source_dialect': self.engine.dialect.name,
+            'tables': {result['table']: result for result in results}
+        }
+        with open(os.path.join(directory, self.MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def _export_table(self, table, directory):
+        started = time.monotonic()
+        path = os.path.join(directory, f'{table.name}.csv')
+        columns = [c.name for c in table.columns]
+
+        # One snapshot for the file and the checksum, even while ingestion keeps writing
+        options = {'isolation_level': 'REPEATABLE READ'} if self.is_postgres else {}
+        with self.engine.connect().execution_options(**options) as connection:
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                if self.is_postgres:
+                    cursor = connection.connection.dbapi_connection.cursor()
+                    cursor.copy_expert(
+                        f"COPY (SELECT {self._column_list(columns)} FROM {self._quote(table.name)} "
+                        f"ORDER BY {self._order_list(table)}) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '{self.NULL}')",
+                        f
+                    )
+                else:
+                    writer = csv.writer(f)
+                    writer.writerow(columns)
+                    for partition in self._partitions(connection, table):
+                        writer.writerows([self._canonical(v) for v in row] for row in partition)
+
+            rows, checksum = self._table_checksum(connection, table)
+            connection.rollback()
+
+        return {
+            'table': table.name,
+            'file': os.path.basename(path),
+            'rows': rows,
+            'checksum': checksum,
+            'sha256': self._file_sha256(path),
+            'seconds': round(time.monotonic() - started, 2)
+        }
+
+    # ------------------------------------------------------------------
+    # Import
+    # ------------------------------------------------------------------
+
+    def import_tables(self, directory, names=None, verify=True):
+        """
+        Replace the contents of the dumped tables with the files in directory.
+
+        Returns {table: {'rows', 'seconds', 'verified'}}; raises ValueError when a
+        file does not match the manifest or a loaded table fails verification.
+        """
+        with open(os.path.join(directory, self.MANIFEST)) as f:
+            manifest = json.load(f)
+
+        tables = self.tables(names or list(manifest['tables']))
+        for table in tables:
+            entry = manifest['tables'].get(table.name)
+            if entry is None:
+                raise ValueError(f'{table.name} is not in the dump')
+            if self._file_sha256(os.path.join(directory, entry['file'])) != entry['sha256']:
+                raise ValueError(f"{entry['file']} does not match its manifest checksum")
+
+        foreign_keys = self._drop_foreign_keys(tables)
+        self._truncate(tables)
+        indexes = self._drop_indexes(tables)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                results = list(pool.map(
+                    lambda t: self._import_table(t, os.path.join(directory, manifest['tables'][t.name]['file'])),
+                    tables
+                ))
+        finally:
+            self._create_indexes(indexes)
+            self._create_foreign_keys(foreign_keys)
+            # COPY bypasses the ORM write tracking; invalidate cached responses for these tables
+            data_versions.bump(*[t.name for t in tables])
+
+        report = {}
+        for table, result in zip(tables, results):
+            expected = manifest['tables'][table.name]
+            if verify:
+                result['verified'] = self._verify(table, expected)
+            report[table.name] = result
+        return report
+
+    def _import_table(self, table, path):
+        started = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as f:
+            header = next(csv.reader([f.readline()]))
+            f.seek(0)
+
+            with self.engine.begin() as connection:
+                if self.is_postgres:
+                    cursor = connection.connection.dbapi_connection.cursor()
+                    cursor.copy_expert(
+                        f"COPY {self._quote(table.name)} ({self._column_list(header)}) "
+                        f"FROM STDIN WITH (FORMAT csv, HEADER true, NULL '{self.NULL}')",
+                        f
+                    )
+                    rows = cursor.rowcount
+                    self._reset_sequence(connection, table)
+                    connection.exec_driver_sql(f'ANALYZE {self._quote(table.name)}')
+                else:
+                    rows = self._executemany(connection, table, header, csv.reader(f))
+
+        return {'rows': rows, 'seconds': round(time.monotonic() - started, 2)}
+
+    def _executemany(self, connection, table, header, reader):
+        next(reader)
+        parsers = [self._parser(table.c[name].type) for name in header]
+        stmt = insert(table)
+        rows = 0
+        batch = []
+        for record in reader:
+            batch.append({name: parse(value) for name, parse, value in zip(header, parsers, record)})
+            if len(batch) >= self.BATCH_SIZE:
+                connection.execute(stmt, batch)
+                rows += len(batch)
+                batch = []
+        if batch:
+            connection.execute(stmt, batch)
+            rows += len(batch)
+        return rows
+
+    def _verify(self, table, expected):
+        with self.engine.connect() as connection:
+            rows, checksum = self._table_checksum(connection, table)
+        if rows != expected['rows'] or checksum != expected['checksum']:
+            raise ValueError(
+                f"{table.name}: loaded {rows} rows (checksum {checksum[:12]}), "
+                f"expected {expected['rows']} rows (checksum {expected['checksum'][:12]})"
+            )
+        return True
+
+    # ------------------------------------------------------------------
+    # Deferred indexes and constraints
+    # ------------------------------------------------------------------
+
+    def _truncate(self, tables):
+        with self.engine.begin() as connection:
+            if self.is_postgres:
+                connection.exec_driver_sql(f"TRUNCATE {', '.join(self._quote(t.name) for t in tables)}")
+            else:
+                for table in reversed(tables):
+                    connection.execute(table.delete())
+
+    def _drop_indexes(self, tables):
+        """Drop the secondary indexes the models declare; returns them for _create_indexes"""
+        dropped = []
+        with self.engine.begin() as connection:
+            for table in tables:
+                for index in table.indexes:
+                    index.drop(connection, checkfirst=True)
+                    dropped.append(index)
+        return dropped
+
+    def _create_indexes(self, indexes):
+        with self.engine.begin() as connection:
+            for index in indexes:
+                index.create(connection, checkfirst=True)
+
+    def _drop_foreign_keys(self, tables):
+        """PostgreSQL only (SQLite does not enforce them by default); returns (table, name, definition) tuples"""
+        if not self.is_postgres:
+            return []
+        names = [t.name for t in tables]
+        with self.engine.begin() as connection:
+            foreign_keys = connection.execute(text("""
+                SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+                FROM pg_constraint
+                WHERE contype = 'f' AND (conrelid::regclass::text = ANY(:names) OR confrelid::regclass::text = ANY(:names))
+            """), {'names': names}).fetchall()
+            for table_name, name, _ in foreign_keys:
+                connection.exec_driver_sql(f'ALTER TABLE {table_name} DROP CONSTRAINT {self._quote(name)}')
+        return foreign_keys
+
+    def _create_foreign_keys(self, foreign_keys):
+        with self.engine.begin() as connection:
+            for table_name, name, definition in foreign_keys:
+                connection.exec_driver_sql(f'ALTER TABLE {table_name} ADD CONSTRAINT {self._quote(name)} {definition}')
+
+    def _reset_sequence(self, connection, table):
+        """Point the id sequence past the loaded rows so new inserts don't collide"""
+        if 'id' not in table.c or not isinstance(table.c.id.type, Integer):
+            return
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence(:table, 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+            f"FROM {self._quote(table.name)}"
+        ), {'table': table.name})
+
+    # ------------------------------------------------------------------
+    # Checksums and value formatting
+    # ------------------------------------------------------------------
+
+    def _table_checksum(self, connection, table):
+        """(row count, blake2b of the canonical rows in primary key order) - identical on either engine"""
+        digest = hashlib.blake2b(digest_size=16)
+        rows = 0
+        for partition in self._partitions(connection, table):
+            for row in partition:
+                digest.update('\x1f'.join(self._canonical(v) for v in row).encode('utf-8'))
+                digest.update(b'\x1e')
+            rows += len(partition)
+        return rows, digest.hexdigest()
+
+    def _partitions(self, connection, table):
+        stmt = select(table).order_by(*self._order_columns(table))
+        result = connection.execution_options(stream_results=True, yield_per=self.BATCH_SIZE).execute(stmt)
+        return result.partitions()
+
+    @classmethod
+    def _canonical(cls, value):
+        """Text form of a value, as PostgreSQL COPY CSV writes it"""
+        if value is None:
+            return cls.NULL
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if isinstance(value, (float, Decimal)):
+            return repr(float(value))
+        if isinstance(value, datetime):
+            return value.replace(tzinfo=None).isoformat(' ')
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)
+
+    @classmethod
+    def _parser(cls, sql_type):
+        """CSV text back to a Python value for executemany"""
+        if isinstance(sql_type, Boolean):
+            convert = lambda v: v.lower() in ('t', 'true', '1')
+        elif isinstance(sql_type, Integer):
+            convert = int
+        elif isinstance(sql_type, (Float, Numeric)):
+            convert = float
+        elif isinstance(sql_type, DateTime):
+            convert = lambda v: datetime.fromisoformat(v).replace(tzinfo=None)
+        elif isinstance(sql_type, Date):
+            convert = date.fromisoformat
+        else:
+            convert = str
+        return lambda v: None if v == cls.NULL else convert(v)
+
+    @staticmethod
+    def _order_columns(table):
+        return list(table.primary_key.columns) or list(table.columns)
+
+    def _order_list(self, table):
+        return ', '.join(self._quote(c.name) for c in self._order_columns(table))
+
+    def _column_list(self, columns):
+        return ', '.join(self._quote(c) for c in columns)
+
+    def _quote(self, name):
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    @staticmethod
+    def _file_sha256(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
@@ -23,41 +23,29 @@ import plotly.offline as pyo
 import json
 from app.models.nifty_price import NiftyPrice
 from app.services.technical_analysis_service import TechnicalAnalysisService
+from app.utils import clock
+from app.services.column_query_service import ColumnQueryService
+from app.utils.fast_json import epoch_ms
 
 
 class ChartService:
     def __init__(self):
         self.ta_service = TechnicalAnalysisService()
+        self.column_queries = ColumnQueryService()
     
     def get_nifty_chart_data(self, timeframe='30min', days_back=30):
         """Get NIFTY data for charting with specified timeframe"""
         try:
             # Get raw data from database
-            end_date = datetime.now()
+            end_date = clock.now()
             start_date = end_date - timedelta(days=days_back)
             
-            # Query NIFTY prices
-            prices = NiftyPrice.query.filter(
-                NiftyPrice.timestamp >= start_date,
-                NiftyPrice.timestamp <= end_date
-            ).order_by(NiftyPrice.timestamp.asc()).all()
+            # Projected OHLC columns straight into a frame (no ORM objects)
+            df = self.column_queries.index_price_frame(start=start_date, end=end_date, ohlc=True)
             
-            if not prices:
+            if df.empty:
                 return None
             
-            # Convert to DataFrame
-            df = pd.DataFrame([{
-                'timestamp': price.timestamp,
-                'open': price.open or price.price,
-                'high': price.high or price.price,
-                'low': price.low or price.price,
-                'close': price.close or price.price,
-                'price': price.price
-            } for price in prices])
-            
-            # Resample based on timeframe
-            df.set_index('timestamp', inplace=True)
-            
             # Define resampling rules
             timeframe_map = {
                 '1min': '1min',
@@ -179,32 +167,12 @@ class ChartService:
     def get_nifty_chart_data_with_date_filter(self, timeframe='30min', start_datetime=None, end_datetime=None):
         """Get NIFTY data for charting with date filter"""
         try:
-            # Query NIFTY prices within date range
-            query = NiftyPrice.query
-            
-            if start_datetime:
-                query = query.filter(NiftyPrice.timestamp >= start_datetime)
-            if end_datetime:
-                query = query.filter(NiftyPrice.timestamp <= end_datetime)
-                
-            prices = query.order_by(NiftyPrice.timestamp.asc()).all()
+            # Projected OHLC columns within the date range (no ORM objects)
+            df = self.column_queries.index_price_frame(start=start_datetime, end=end_datetime, ohlc=True)
             
-            if not prices:
+            if df.empty:
                 return None
             
-            # Convert to DataFrame
-            df = pd.DataFrame([{
-                'timestamp': price.timestamp,
-                'open': price.open or price.price,
-                'high': price.high or price.price,
-                'low': price.low or price.price,
-                'close': price.close or price.price,
-                'price': price.price
-            } for price in prices])
-            
-            # Resample based on timeframe
-            df.set_index('timestamp', inplace=True)
-            
             # Define resampling rules  
             timeframe_map = {
                 '1min': '1T',
@@ -479,10 +447,11 @@ class ChartService:
             print(f"Error in signal analysis: {e}")
             return None
         
-    def get_nifty_chart_with_macd(self, symbol='NIFTY', timeframe_minutes=15):
+    def get_nifty_chart_with_macd(self, symbol='NIFTY', timeframe_minutes=15, timestamp_format='string'):
         """
         Get NIFTY chart data with MACD for Plotly.js rendering
-        Returns JSON-serializable data for frontend charting
+        Returns column arrays (NumPy) for the fast JSON encoder; timestamps are
+        'YYYY-MM-DD HH:MM:SS' strings, or epoch milliseconds with timestamp_format='ms'
         """
         try:
             # Convert timeframe minutes to string format
@@ -528,14 +497,14 @@ class ChartService:
             
             # Prepare data for frontend
             chart_data = {
-                'timestamps': [ts.strftime('%Y-%m-%d %H:%M:%S') for ts in ohlc_df.index],
-                'open': ohlc_df['open'].round(2).fillna(method='ffill').tolist(),
-                'high': ohlc_df['high'].round(2).fillna(method='ffill').tolist(),
-                'low': ohlc_df['low'].round(2).fillna(method='ffill').tolist(),
-                'close': ohlc_df['close'].round(2).fillna(method='ffill').tolist(),
-                'macd_line': macd_df['macd_line'].round(4).fillna(0).tolist(),
-                'signal_line': macd_df['signal_line'].round(4).fillna(0).tolist(),
-                'histogram': macd_df['histogram'].round(4).fillna(0).tolist(),
+                'timestamps': epoch_ms(ohlc_df.index) if timestamp_format == 'ms' else ohlc_df.index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+                'open': ohlc_df['open'].round(2).ffill().to_numpy(),
+                'high': ohlc_df['high'].round(2).ffill().to_numpy(),
+                'low': ohlc_df['low'].round(2).ffill().to_numpy(),
+                'close': ohlc_df['close'].round(2).ffill().to_numpy(),
+                'macd_line': macd_df['macd_line'].round(4).fillna(0).to_numpy(),
+                'signal_line': macd_df['signal_line'].round(4).fillna(0).to_numpy(),
+                'histogram': macd_df['histogram'].round(4).fillna(0).to_numpy(),
                 'current_price': float(ohlc_df['close'].iloc[-1]),
                 'current_signal': self._determine_current_signal(macd_df)
             }
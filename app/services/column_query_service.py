@@ -0,0 +1,162 @@
+"""
+Column Query Service
+Column-projected analytics reads that return NumPy arrays or DataFrames without hydrating ORM objects
+"""
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func, and_
+from sqlalchemy.types import DateTime, Date, Float, Numeric, Integer, BigInteger
+from app import db
+from app.models.nifty_price import NiftyPrice
+from app.models.banknifty_price import BankNiftyPrice, OptionChainData
+
+
+class ColumnQueryService:
+    """
+    Runs Core select() statements and converts the rows straight into typed arrays.
+
+    Rows are streamed in chunks of CHUNK_SIZE (server-side cursor on PostgreSQL)
+    and transposed per chunk, so a 100k-row read never builds ORM entities or
+    per-row dicts. Column dtypes follow the SQL types: DateTime -> datetime64[us],
+    Float/Numeric -> float64 (NULL -> NaN), Integer -> int64 (float64 when NULLs
+    are present); an explicit dtypes mapping overrides the inference.
+    """
+
+    CHUNK_SIZE = 5000
+
+    OHLC_COLUMNS = ('open', 'high', 'low', 'close')
+
+    def select_arrays(self, stmt, dtypes=None):
+        """Execute a select() and return {column name: ndarray}"""
+        dtypes = dtypes or {}
+        columns = list(stmt.selected_columns)
+        names = [column.key for column in columns]
+
+        chunks = {name: [] for name in names}
+        result = db.session.execute(stmt.execution_options(yield_per=self.CHUNK_SIZE))
+        for partition in result.partitions():
+            for name, values in zip(names, zip(*partition)):
+                chunks[name].append(values)
+
+        arrays = {}
+        for name, column in zip(names, columns):
+            values = [value for chunk in chunks[name] for value in chunk]
+            arrays[name] = self._to_array(values, column.type, dtypes.get(name))
+        return arrays
+
+    def select_frame(self, stmt, index=None, dtypes=None):
+        """Execute a select() into a DataFrame, optionally indexed by one of its columns"""
+        df = pd.DataFrame(self.select_arrays(stmt, dtypes))
+        if index:
+            df = df.set_index(index)
+        return df
+
+    # ------------------------------------------------------------------
+    # Common analytics reads
+    # ------------------------------------------------------------------
+
+    def index_price_frame(self, symbol='NIFTY', start=None, end=None, limit=None, ohlc=False, series=None):
+        """
+        Index prices ordered by time as a DataFrame indexed by timestamp.
+
+        With limit, the latest `limit` rows are returned (still in ascending order).
+        series filters NIFTY rows by their symbol column (e.g. 'NIFTY 50').
+        With ohlc (NIFTY only), open/high/low/close are included and fall back to
+        price where missing or zero, as the ORM-based chart code did.
+        """
+        model = BankNiftyPrice if symbol.upper() == 'BANKNIFTY' else NiftyPrice
+        columns = [model.timestamp, model.price]
+        if ohlc:
+            columns += [getattr(model, name) for name in self.OHLC_COLUMNS]
+
+        stmt = select(*columns)
+        if series and model is NiftyPrice:
+            stmt = stmt.where(model.symbol == series)
+        if start is not None:
+            stmt = stmt.where(model.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(model.timestamp <= end)
+
+        if limit:
+            stmt = stmt.order_by(model.timestamp.desc()).limit(limit)
+        else:
+            stmt = stmt.order_by(model.timestamp.asc())
+
+        arrays = self.select_arrays(stmt, dtypes={'price': np.float64})
+        if limit:
+            arrays = {name: values[::-1] for name, values in arrays.items()}
+
+        if ohlc:
+            price = arrays['price']
+            for name in self.OHLC_COLUMNS:
+                values = arrays[name]
+                arrays[name] = np.where(np.isnan(values) | (values == 0), price, values)
+
+        return pd.DataFrame(arrays).set_index('timestamp')
+
+    def strike_snapshot_arrays(self, underlying, since=None, first=False):
+        """
+        One option chain row per strike: the latest (or with first=True the earliest)
+        row at or after `since`, as arrays sorted by strike.
+        """
+        pick = func.min if first else func.max
+        bounds = select(
+            OptionChainData.strike_price.label('strike_price'),
+            pick(OptionChainData.timestamp).label('timestamp')
+        ).where(OptionChainData.underlying == underlying)
+        if since is not None:
+            bounds = bounds.where(OptionChainData.timestamp >= since)
+        bounds = bounds.group_by(OptionChainData.strike_price).subquery()
+
+        stmt = select(
+            OptionChainData.id,
+            OptionChainData.strike_price,
+            OptionChainData.timestamp,
+            OptionChainData.ce_oi,
+            OptionChainData.pe_oi,
+            OptionChainData.ce_ltp,
+            OptionChainData.pe_ltp,
+            OptionChainData.ce_volume,
+            OptionChainData.pe_volume
+        ).join(
+            bounds,
+            and_(
+                OptionChainData.strike_price == bounds.c.strike_price,
+                OptionChainData.timestamp == bounds.c.timestamp
+            )
+        ).where(
+            OptionChainData.underlying == underlying
+        ).order_by(OptionChainData.strike_price.asc(), OptionChainData.id.asc())
+
+        arrays = self.select_arrays(stmt, dtypes={
+            'ce_oi': np.float64, 'pe_oi': np.float64,
+            'ce_ltp': np.float64, 'pe_ltp': np.float64,
+            'ce_volume': np.float64, 'pe_volume': np.float64
+        })
+
+        # Several rows can share the max/min timestamp for a strike; keep one per strike
+        if len(arrays['strike_price']):
+            keep = np.concatenate([[True], arrays['strike_price'][1:] != arrays['strike_price'][:-1]])
+            arrays = {name: values[keep] for name, values in arrays.items()}
+        return arrays
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _to_array(values, sql_type, dtype=None):
+        if dtype is not None:
+            return np.array(values, dtype=dtype)
+        if isinstance(sql_type, DateTime):
+            return np.array(values, dtype='datetime64[us]')
+        if isinstance(sql_type, Date):
+            return np.array(values, dtype='datetime64[D]')
+        if isinstance(sql_type, (Float, Numeric)):
+            return np.array(values, dtype=np.float64)
+        if isinstance(sql_type, (Integer, BigInteger)):
+            if any(value is None for value in values):
+                return np.array(values, dtype=np.float64)
+            return np.array(values, dtype=np.int64)
+        return np.array(values, dtype=object)
@@ -0,0 +1,100 @@
+"""
+Dashboard Snapshot Service
+Assembles the comprehensive dashboard payload once per ingestion cycle and serves it as pre-serialised bytes
+"""
+
+import hashlib
+import json
+import time
+from app.services.shared_cache import SharedCache
+from app.services.data_version_service import data_versions
+from app.services.metrics_service import metrics
+from app.utils.fast_json import dumps
+from app.utils import clock
+
+
+class DashboardSnapshotService:
+    """
+    Service to build, store and serve dashboard snapshots per trade date.
+
+    A snapshot is the serialised /api/dashboard-comprehensive body together with
+    the data version of the tables it was built from and an ETag. Both are kept
+    in one raw shared cache slot (a one-line JSON header, a newline, then the
+    body), so every worker reads a consistent pair without decoding the payload.
+    A snapshot whose version is no longer current (rows backfilled or imported
+    for a past date, a new ingestion cycle today) is rebuilt on read.
+    """
+
+    # Tables the dashboard payload reads
+    TABLES = ('nifty_prices', 'banknifty_prices', 'nifty_stocks')
+
+    # Today plus two weeks of past dates
+    MAX_CACHED_DATES = 15
+
+    # Today's snapshot is rebuilt by the price job every minute; after this many
+    # seconds without a rebuild, the next reader rebuilds it (future dates expire too)
+    REFRESH_SECONDS = 90
+
+    def __init__(self):
+        self.cache = SharedCache('dashboard_snapshot', max_entries=self.MAX_CACHED_DATES, raw=True)
+
+    def build(self, target_date=None):
+        """Assemble the dashboard payload for target_date (default today), publish and return the snapshot"""
+        from app.services.market_service import MarketService
+
+        trade_date = target_date or clock.today()
+
+        # Read before computing so a concurrent commit can only make the snapshot look older
+        version = data_versions.token(self.TABLES)
+        dashboard_data = MarketService().get_comprehensive_dashboard_data(
+            start_date=trade_date,
+            end_date=trade_date
+        )
+        dashboard_data['trade_date'] = trade_date.isoformat()
+
+        body = dumps(dashboard_data)
+        header = {
+            'trade_date': trade_date.isoformat(),
+            'version': version,
+            'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+            'built_at': time.time()
+        }
+
+        # Past dates only change through backfills, caught by the version check in get();
+        # today and dates not reached yet expire
+        ttl = None if trade_date < clock.today() else self.REFRESH_SECONDS
+        self.cache.set(trade_date.isoformat(), json.dumps(header).encode('utf-8') + b'\n' + body, ttl=ttl)
+
+        return dict(header, body=body)
+
+    def get(self, target_date=None):
+        """
+        Snapshot for a trade date: {'trade_date', 'version', 'etag', 'built_at', 'body'}.
+
+        Served from the shared cache while fresh; dates never built (and a today
+        snapshot the price job stopped refreshing) are built on demand.
+        """
+        trade_date = target_date or clock.today()
+
+        raw = self.cache.get(trade_date.isoformat())
+        if raw is not None:
+            header, _, body = raw.partition(b'\n')
+            header = json.loads(header)
+            if header['version'] == data_versions.token(self.TABLES):
+                metrics.inc('cache_requests_total', cache='dashboard_snapshot', key='snapshot', outcome='hits')
+                return dict(header, body=body)
+
+        metrics.inc('cache_requests_total', cache='dashboard_snapshot', key='snapshot', outcome='misses')
+        return self.build(trade_date)
+
+    def get_payload(self, target_date=None):
+        """Snapshot decoded for template rendering"""
+        return json.loads(self.get(target_date)['body'])
+
+    def refresh(self):
+        """Rebuild today's snapshot after an ingestion cycle (errors are logged, never raised)"""
+        try:
+            return self.build()
+        except Exception as e:
+            print(f"Error building dashboard snapshot: {e}")
+            return None
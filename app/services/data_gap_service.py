@@ -0,0 +1,440 @@
+"""
+Data Gap Service
+Finds missing ingestion slots per instrument and backfills index and futures minutes from Kite historical candles
+"""
+
+import threading
+import time as time_module
+import pytz
+from datetime import datetime, time, timedelta, timezone
+from kiteconnect.exceptions import NetworkException
+from app import db
+from app.models.nifty_price import NiftyPrice
+from app.models.banknifty_price import BankNiftyPrice, OptionChainData
+from app.models.futures_oi_data import FuturesOIData
+from app.services.futures_buildup_service import FuturesBuildupService
+from app.services.metrics_service import metrics
+from app.utils import clock
+
+# Index instrument tokens on NSE (fixed by the exchange)
+INDEX_TOKENS = {
+    'NIFTY': 256265,
+    'BANKNIFTY': 260105
+}
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads (Kite allows 3 historical requests a second)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_call = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time_module.monotonic()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time_module.sleep(delay)
+
+
+class DataGapService:
+    """
+    Gap detection and backfill for the tables fetch_price_job fills.
+
+    Each instrument is expected once per cadence (1 minute for index prices, 2
+    for option chains, 5 for futures) from 09:15 IST until the close or until
+    GRACE_MINUTES ago. A gap is a stretch without rows longer than the cadence
+    plus TOLERANCE_SECONDS, so a cycle that ran a few seconds late is not one.
+    Days without any index row are taken as holidays and not reported; today
+    too, once the session has been open HOLIDAY_AFTER_MINUTES (an ingestion
+    outage from the open looks the same, and is left to the job's own alerts).
+
+    Index and futures gaps are backfilled from minute candles (one
+    historical_data request per instrument for up to MAX_DAYS_PER_REQUEST
+    days, spaced by a process-wide rate limiter and retried on network
+    errors). Futures tokens come from the NFO instrument list, which only
+    carries live contracts: days of an expired contract are reported as
+    unfilled. Option chain snapshots cannot be rebuilt from candles and are
+    reported only.
+    """
+
+    SESSION_OPEN = time(9, 15)
+    SESSION_CLOSE = time(15, 30)
+    GRACE_MINUTES = 3
+    HOLIDAY_AFTER_MINUTES = 15
+    TOLERANCE_SECONDS = 60
+    MAX_DAYS_PER_REQUEST = 30
+    MAX_ATTEMPTS = 3
+
+    # (table, underlying, cadence in minutes, model)
+    INSTRUMENTS = (
+        ('nifty_prices', 'NIFTY', 1, NiftyPrice),
+        ('banknifty_prices', 'BANKNIFTY', 1, BankNiftyPrice),
+        ('option_chain_data', 'NIFTY', 2, OptionChainData),
+        ('option_chain_data', 'BANKNIFTY', 2, OptionChainData),
+        ('futures_oi_data', 'NIFTY', 5, FuturesOIData),
+        ('futures_oi_data', 'BANKNIFTY', 5, FuturesOIData),
+    )
+    BACKFILLABLE = ('nifty_prices', 'banknifty_prices', 'futures_oi_data')
+
+    # Shared by every instance: the limit is per API key
+    _limiter = RateLimiter(3)
+
+    def __init__(self, kite_service=None):
+        self.ist_timezone = pytz.timezone('Asia/Kolkata')
+        self._kite_service = kite_service
+        self._futures_tokens = None
+
+    @property
+    def kite_service(self):
+        if self._kite_service is None:
+            from app.services.kite_service import KiteService
+            self._kite_service = KiteService()
+        return self._kite_service
+
+    # ------------------------------------------------------------------
+    # Detection
+    # ------------------------------------------------------------------
+
+    def scan(self, trade_date=None, record_metrics=False):
+        """Gaps of every instrument on an IST trade date (default today)"""
+        trade_date = trade_date or self.ist_today()
+        window = self._expected_window(trade_date)
+        result = {'date': trade_date.isoformat(), 'trading_day': window is not None, 'instruments': [], 'missing_slots': 0}
+        if window is None:
+            return result
+
+        start, end = window
+        if self._is_holiday(trade_date, start, end):
+            result['trading_day'] = False
+            return result
+
+        for table, underlying, cadence, model in self.INSTRUMENTS:
+            timestamps = self._timestamps(model, underlying, start, end + timedelta(minutes=cadence))
+            gaps = self._find_gaps(timestamps, start, end, cadence)
+            missing = sum(len(gap['slots']) for gap in gaps)
+            result['instruments'].append({
+                'table': table,
+                'underlying': underlying,
+                'cadence_minutes': cadence,
+                'expected_slots': int((end - start).total_seconds() // (cadence * 60)) + 1,
+                'missing_slots': missing,
+                'backfillable': table in self.BACKFILLABLE,
+                'gaps': [self._gap_dict(gap) for gap in gaps]
+            })
+            result['missing_slots'] += missing
+            if record_metrics:
+                metrics.set_gauge('ingestion_missing_slots', missing, table=table, underlying=underlying)
+        return result
+
+    def _is_holiday(self, trade_date, start, end):
+        """No index row in the window; today only once the session has been open long enough to tell"""
+        if self._timestamps(NiftyPrice, None, start, end + timedelta(minutes=1)):
+            return False
+        return trade_date != self.ist_today() or end - start >= timedelta(minutes=self.HOLIDAY_AFTER_MINUTES)
+
+    def _expected_window(self, trade_date):
+        """Naive UTC [first slot, last slot] expected so far on trade_date, or None (weekend, future, before the open)"""
+        if trade_date.weekday() >= 5:
+            return None
+        start = self._to_utc(trade_date, self.SESSION_OPEN)
+        end = self._to_utc(trade_date, self.SESSION_CLOSE) - timedelta(minutes=1)
+        now = clock.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=self.GRACE_MINUTES)
+        end = min(end, now)
+        return (start, end) if end >= start else None
+
+    def _timestamps(self, model, underlying, start, end):
+        query = db.session.query(model.timestamp).filter(model.timestamp >= start, model.timestamp < end)
+        if hasattr(model, 'underlying') and underlying:
+            query = query.filter(model.underlying == underlying)
+        return sorted({row[0] for row in query.distinct()})
+
+    def _find_gaps(self, timestamps, start, end, cadence):
+        """
+        Missing slots between consecutive rows, before the first and after the last.
+        Slots follow the rows' own minute alignment; each gap is {'start', 'end', 'slots'}.
+        """
+        step = timedelta(minutes=cadence)
+        allowed = step + timedelta(seconds=self.TOLERANCE_SECONDS)
+        minutes = [ts.replace(second=0, microsecond=0) for ts in timestamps]
+
+        gaps = []
+        if not minutes:
+            return [self._gap(start, end, step)]
+
+        # Before the first row: slots counted back from it, so they stay aligned
+        if minutes[0] - start >= step:
+            first = minutes[0] - step * ((minutes[0] - start) // step)
+            gaps.append(self._gap(first, minutes[0] - step, step))
+
+        for i in range(1, len(minutes)):
+            if timestamps[i] - timestamps[i - 1] > allowed and minutes[i] - minutes[i - 1] > step:
+                gaps.append(self._gap(minutes[i - 1] + step, minutes[i] - step, step))
+
+        # After the last row, up to the last expected slot
+        if end - minutes[-1] >= step:
+            gaps.append(self._gap(minutes[-1] + step, end, step))
+        return [gap for gap in gaps if gap['slots']]
+
+    @staticmethod
+    def _gap(first, last, step):
+        slots = []
+        slot = first
+        while slot <= last:
+            slots.append(slot)
+            slot += step
+        return {'start': first, 'end': slots[-1] if slots else last, 'slots': slots}
+
+    def _gap_dict(self, gap):
+        return {
+            'start': self._ist_label(gap['start']),
+            'end': self._ist_label(gap['end']),
+            'slots': len(gap['slots'])
+        }
+
+    # ------------------------------------------------------------------
+    # Backfill
+    # ------------------------------------------------------------------
+
+    def backfill(self, trade_dates, tables=None):
+        """
+        Fill index and futures gaps of the given IST trade dates from minute candles.
+        Returns requests made, rows inserted per table, slots left unfilled and errors.
+        """
+        tables = set(tables or self.BACKFILLABLE) & set(self.BACKFILLABLE)
+        summary = {'requests': 0, 'rows': {table: 0 for table in sorted(tables)}, 'unfilled': 0, 'errors': []}
+
+        # Missing slots per instrument across all the dates
+        pending = {}
+        for trade_date in sorted(set(trade_dates)):
+            scan = self.scan(trade_date)
+            for instrument in scan['instruments']:
+                if instrument['table'] not in tables or not instrument['missing_slots']:
+                    continue
+                key = (instrument['table'], instrument['underlying'])
+                slots = self._missing_slots(trade_date, instrument)
+                pending.setdefault(key, {})[trade_date] = slots
+
+        for (table, underlying), by_date in pending.items():
+            dates = sorted(by_date)
+            # One request per instrument for up to MAX_DAYS_PER_REQUEST days (per futures contract)
+            for batch in self._batches(table, underlying, dates):
+                slots = [slot for trade_date in batch for slot in by_date[trade_date]]
+                try:
+                    candles = self._fetch_candles(table, underlying, batch, summary)
+                    inserted = self._insert(table, underlying, batch, slots, candles)
+                    summary['rows'][table] += inserted
+                    summary['unfilled'] += len(slots) - inserted
+                    if inserted:
+                        metrics.inc('ingestion_backfill_rows_total', inserted, table=table)
+                except Exception as e:
+                    db.session.rollback()
+                    summary['unfilled'] += len(slots)
+                    summary['errors'].append(f'{table} {underlying} {batch[0]}..{batch[-1]}: {str(e)}')
+        return summary
+
+    def _missing_slots(self, trade_date, instrument):
+        """Missing slot minutes (naive UTC) of a scanned instrument"""
+        window = self._expected_window(trade_date)
+        start, end = window
+        model = next(m for t, u, c, m in self.INSTRUMENTS if t == instrument['table'] and u == instrument['underlying'])
+        timestamps = self._timestamps(model, instrument['underlying'], start, end + timedelta(minutes=instrument['cadence_minutes']))
+        gaps = self._find_gaps(timestamps, start, end, instrument['cadence_minutes'])
+        return [slot for gap in gaps for slot in gap['slots']]
+
+    def _batches(self, table, underlying, dates):
+        batches = []
+        for trade_date in dates:
+            current = batches[-1] if batches else None
+            same_contract = table != 'futures_oi_data' or (
+                current and self._contract(underlying, current[0]) == self._contract(underlying, trade_date)
+            )
+            if current and same_contract and (trade_date - current[0]).days < self.MAX_DAYS_PER_REQUEST:
+                current.append(trade_date)
+            else:
+                batches.append([trade_date])
+        return batches
+
+    def _contract(self, underlying, trade_date):
+        return self.kite_service.get_futures_contract(underlying, trade_date)
+
+    def _fetch_candles(self, table, underlying, dates, summary):
+        """Minute candles of the batch's dates, keyed by naive UTC minute"""
+        kite = self.kite_service.get_kite_instance()
+        futures = table == 'futures_oi_data'
+        if futures:
+            symbol, _ = self._contract(underlying, dates[0])
+            token = self._futures_token(kite, symbol, summary)
+        else:
+            token = INDEX_TOKENS[underlying]
+
+        candles = self._call(
+            summary, kite.historical_data, token,
+            # Kite reads naive datetimes as IST
+            datetime.combine(dates[0], self.SESSION_OPEN),
+            datetime.combine(dates[-1], self.SESSION_CLOSE),
+            'minute', oi=futures
+        )
+
+        by_minute = {}
+        for candle in candles:
+            moment = candle['date']
+            if moment.tzinfo is None:
+                moment = self.ist_timezone.localize(moment)
+            by_minute[moment.astimezone(timezone.utc).replace(tzinfo=None)] = candle
+        return by_minute
+
+    def _futures_token(self, kite, symbol, summary):
+        """Instrument token of an NFO futures symbol, from the instrument list (one request per instance)"""
+        if self._futures_tokens is None:
+            instruments = self._call(summary, kite.instruments, 'NFO')
+            self._futures_tokens = {
+                f"NFO:{row['tradingsymbol']}": row['instrument_token']
+                for row in instruments if row.get('instrument_type') == 'FUT'
+            }
+        token = self._futures_tokens.get(symbol)
+        if token is None:
+            raise ValueError(f'{symbol} is not in the NFO instrument list (expired contracts cannot be backfilled)')
+        return token
+
+    def _call(self, summary, method, *args, **kwargs):
+        """Rate-limited Kite call, retried with backoff on network errors (timeouts, 429s)"""
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            self._limiter.wait()
+            summary['requests'] += 1
+            try:
+                return method(*args, **kwargs)
+            except NetworkException:
+                if attempt == self.MAX_ATTEMPTS:
+                    raise
+                time_module.sleep(attempt)
+
+    def _insert(self, table, underlying, dates, slots, candles):
+        if table == 'futures_oi_data':
+            return self._insert_futures(underlying, dates, slots, candles)
+        return self._insert_index(table, dates, slots, candles)
+
+    def _insert_index(self, table, dates, slots, candles):
+        model = NiftyPrice if table == 'nifty_prices' else BankNiftyPrice
+        symbol = 'NIFTY 50' if table == 'nifty_prices' else 'NIFTY BANK'
+        previous_closes = {trade_date: self._previous_close(model, trade_date) for trade_date in dates}
+
+        existing = self._stored_minutes(model, None, slots)
+        rows = []
+        for slot in slots:
+            candle = candles.get(slot)
+            if candle is None or slot in existing:
+                continue
+            close = float(candle['close'])
+            previous_close = previous_closes[self._ist_date(slot)]
+            change = round(close - previous_close, 2) if previous_close else None
+            row = model(
+                symbol=symbol,
+                price=close,
+                change=change,
+                change_percent=round(change / previous_close * 100, 2) if previous_close else None,
+                timestamp=slot
+            )
+            if model is NiftyPrice:
+                row.open, row.high, row.low, row.close = (float(candle[k]) for k in ('open', 'high', 'low', 'close'))
+            rows.append(row)
+
+        db.session.add_all(rows)
+        db.session.commit()
+        return len(rows)
+
+    def _insert_futures(self, underlying, dates, slots, candles):
+        _, expiry_date = self._contract(underlying, dates[0])
+
+        # Quotes carry the day's cumulative volume; candles the minute's
+        day_volume = {}
+        for minute in sorted(candles):
+            trade_date = self._ist_date(minute)
+            day_volume[trade_date] = day_volume.get(trade_date, 0) + int(candles[minute].get('volume') or 0)
+            candles[minute] = dict(candles[minute], cumulative_volume=day_volume[trade_date])
+
+        existing = self._stored_minutes(FuturesOIData, underlying, slots)
+        rows = []
+        for slot in slots:
+            candle = candles.get(slot)
+            if candle is None or slot in existing:
+                continue
+            rows.append(FuturesOIData(
+                underlying=underlying,
+                expiry_date=expiry_date,
+                timestamp=slot,
+                futures_price=float(candle['close']),
+                open_interest=int(candle.get('oi') or 0),
+                volume=candle['cumulative_volume']
+            ))
+        db.session.add_all(rows)
+        db.session.flush()
+
+        # Rows after a filled gap were compared with the row before it: redo the deltas of the days
+        for trade_date in dates:
+            self._reclassify_futures(underlying, trade_date)
+        db.session.commit()
+        return len(rows)
+
+    def _reclassify_futures(self, underlying, trade_date):
+        start, end = self._to_utc(trade_date, time(0, 0)), self._to_utc(trade_date + timedelta(days=1), time(0, 0))
+        rows = FuturesOIData.query.filter(
+            FuturesOIData.underlying == underlying,
+            FuturesOIData.timestamp >= start, FuturesOIData.timestamp < end
+        ).order_by(FuturesOIData.timestamp).all()
+        if not rows:
+            return
+
+        previous = db.session.query(FuturesOIData.futures_price, FuturesOIData.open_interest, FuturesOIData.expiry_date).filter(
+            FuturesOIData.underlying == underlying, FuturesOIData.timestamp < start
+        ).order_by(FuturesOIData.timestamp.desc()).first()
+        same_contract = previous is not None and previous[2] == rows[0].expiry_date
+
+        analysis = FuturesBuildupService.analyze(
+            [row.futures_price for row in rows], [row.open_interest for row in rows],
+            expiry_dates=[row.expiry_date for row in rows],
+            prev_price=previous[0] if same_contract else None,
+            prev_oi=previous[1] if same_contract else None
+        )
+        for i, row in enumerate(rows):
+            row.price_change = float(analysis['price_change'][i])
+            row.oi_change = int(analysis['oi_change'][i])
+            row.meaning = str(analysis['meaning'][i])
+            row.trend = str(analysis['trend'][i])
+
+    def _previous_close(self, model, trade_date):
+        """Previous session's close: from a stored row's change on the day, else the last row before it"""
+        start, end = self._to_utc(trade_date, time(0, 0)), self._to_utc(trade_date + timedelta(days=1), time(0, 0))
+        row = db.session.query(model.price, model.change).filter(
+            model.timestamp >= start, model.timestamp < end, model.change.isnot(None)
+        ).order_by(model.timestamp).first()
+        if row is not None:
+            return row[0] - row[1]
+        row = db.session.query(model.price).filter(model.timestamp < start).order_by(model.timestamp.desc()).first()
+        return row[0] if row else None
+
+    def _stored_minutes(self, model, underlying, slots):
+        """Minutes among the slots' range where the live job stored a row meanwhile, in one query"""
+        if not slots:
+            return set()
+        timestamps = self._timestamps(model, underlying, min(slots), max(slots) + timedelta(minutes=1))
+        return {ts.replace(second=0, microsecond=0) for ts in timestamps}
+
+    # ------------------------------------------------------------------
+    # Date helpers
+    # ------------------------------------------------------------------
+
+    def ist_today(self):
+        return clock.now(self.ist_timezone).date()
+
+    def _to_utc(self, trade_date, at):
+        return self.ist_timezone.localize(datetime.combine(trade_date, at)).astimezone(timezone.utc).replace(tzinfo=None)
+
+    def _ist_date(self, utc_minute):
+        return utc_minute.replace(tzinfo=timezone.utc).astimezone(self.ist_timezone).date()
+
+    def _ist_label(self, utc_minute):
+        return utc_minute.replace(tzinfo=timezone.utc).astimezone(self.ist_timezone).strftime('%H:%M')
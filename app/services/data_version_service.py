@@ -0,0 +1,93 @@
+"""
+Data Version Service
+Monotonic per-table version numbers, bumped after every committed write, used to key response caches
+"""
+
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from app.services.shared_cache import SharedCache
+
+
+class DataVersionService:
+    """
+    Per-table data versions shared by every process.
+
+    Inserts, updates and deletes executed through SQLAlchemy (ORM flushes and
+    bulk_*_mappings alike) are recorded per thread and the affected tables are
+    bumped once the session commits, so a reader that sees a new version is
+    guaranteed to also see the committed rows. Rolled back writes are dropped.
+    """
+
+    _pending = threading.local()
+    _installed = False
+
+    def __init__(self):
+        self.cache = SharedCache('data_version')
+
+    def get(self, table):
+        """Current version of a table (0 until its first tracked write)"""
+        return self.cache.get(table, default=0)
+
+    def get_many(self, tables):
+        """Versions for several tables as a tuple, in the given order"""
+        return tuple(self.get(table) for table in tables)
+
+    def token(self, tables):
+        """Compact string of the versions, for embedding in cache keys"""
+        return '.'.join(str(v) for v in self.get_many(tables))
+
+    def get_all(self):
+        return {table: self.get(table) for table in sorted(self.cache.keys())}
+
+    def bump(self, *tables):
+        """Advance the version of each table (called automatically after commits)"""
+        for table in tables:
+            try:
+                self.cache.incr(table)
+            except Exception as e:
+                print(f"Error bumping data version for {table}: {e}")
+
+    @classmethod
+    def install(cls):
+        """Register the SQLAlchemy listeners that track writes (idempotent)"""
+        if cls._installed:
+            return
+        cls._installed = True
+
+        event.listen(Engine, 'after_execute', cls._record_write)
+        event.listen(Session, 'after_commit', cls._flush_pending)
+        event.listen(Session, 'after_rollback', cls._discard_pending)
+
+    @classmethod
+    def _pending_tables(cls):
+        tables = getattr(cls._pending, 'tables', None)
+        if tables is None:
+            tables = cls._pending.tables = set()
+        return tables
+
+    @classmethod
+    def _record_write(cls, conn, clauseelement, multiparams, params, execution_options, result):
+        if isinstance(clauseelement, UpdateBase):
+            table = getattr(clauseelement, 'table', None)
+            name = getattr(table, 'name', None)
+            if name:
+                cls._pending_tables().add(name)
+
+    @classmethod
+    def _flush_pending(cls, session):
+        tables = cls._pending_tables()
+        if tables:
+            written = sorted(tables)
+            tables.clear()
+            data_versions.bump(*written)
+
+    @classmethod
+    def _discard_pending(cls, session):
+        cls._pending_tables().clear()
+
+
+# Process-wide instance
+data_versions = DataVersionService()
@@ -5,6 +5,7 @@ Provides standardized date/time filtering across all pages
 
 from datetime import datetime, date, timedelta
 import pytz
+from app.utils import clock
 
 class DateTimeFilterService:
     """Service for handling date/time filters across the application"""
@@ -14,7 +15,7 @@ class DateTimeFilterService:
     
     def get_default_date_range(self):
         """Get default date range (today)"""
-        today = date.today()
+        today = clock.today()
         return {
             'start_date': today,
             'end_date': today,
@@ -37,12 +38,12 @@ class DateTimeFilterService:
             if start_date_str:
                 start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
             else:
-                start_date = date.today() if default_today else None
+                start_date = clock.today() if default_today else None
                 
             if end_date_str:
                 end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
             else:
-                end_date = start_date if start_date else date.today()
+                end_date = start_date if start_date else clock.today()
             
             # Parse times
             start_time = datetime.strptime(start_time_str, '%H:%M').time()
@@ -54,7 +55,7 @@ class DateTimeFilterService:
         except (ValueError, TypeError) as e:
             print(f"Error parsing date parameters: {e}")
             # Return tuple format for consistency
-            today = date.today()
+            today = clock.today()
             return today, today, datetime.strptime('09:00', '%H:%M').time(), datetime.strptime('15:30', '%H:%M').time()
     
     def format_date_for_display(self, dt):
@@ -74,7 +75,7 @@ class DateTimeFilterService:
     def get_market_hours_filter(self, target_date=None):
         """Get market hours filter for a specific date"""
         if target_date is None:
-            target_date = date.today()
+            target_date = clock.today()
             
         # Market hours: 9:00 AM to 3:30 PM IST
         start_datetime = datetime.combine(target_date, datetime.strptime('09:00', '%H:%M').time())
@@ -96,7 +97,7 @@ class DateTimeFilterService:
     
     def get_quick_date_options(self):
         """Get quick date selection options"""
-        today = date.today()
+        today = clock.today()
         return {
             'today': {
                 'label': 'Today',
@@ -165,7 +166,7 @@ class DateTimeFilterService:
     @staticmethod
     def get_today():
         """Get today's date"""
-        return date.today()
+        return clock.today()
     
     @staticmethod
     def get_target_date(start_date, end_date):
@@ -175,4 +176,4 @@ class DateTimeFilterService:
         elif end_date:
             return end_date
         else:
-            return date.today()
+            return clock.today()
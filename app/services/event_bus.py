@@ -0,0 +1,225 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: publishers are serialised per process only
+    fcntl = None
+
+
+class EventBus:
+    """
+    Topic-based publish/subscribe for live page updates.
+
+    The ingestion jobs publish one payload per topic after each snapshot is
+    committed. The latest payload of every topic is written atomically to
+    storage/events so that web workers in other processes (gunicorn forks) see
+    it too: each process runs a single watcher thread that stats those files
+    and fans new versions out to its local subscribers. Per-client cost is a
+    queue, never a database query.
+
+    Publishers in any process (jobs, web workers) take the topic's file lock and
+    number the new version from the topic file, so seq only grows per topic
+    however stale this process's view of it is.
+    """
+
+    EVENTS_DIR = os.getenv('EVENTS_DIR', 'storage/events')
+    WATCH_INTERVAL_SECONDS = 1.0
+    SUBSCRIBER_QUEUE_SIZE = 100
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latest = {}        # topic -> {'seq', 'payload', 'published_at'}
+        self.file_mtimes = {}   # topic -> mtime of the last file version seen
+        self.subscribers = {}   # id -> {'topics', 'queue'}
+        self.watcher = None
+        os.makedirs(self.EVENTS_DIR, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    def publish(self, topic, payload):
+        """Publish a new full payload for a topic; subscribers receive the diff against the previous one"""
+        payload = json.loads(json.dumps(payload, default=self._json_default))
+
+        with self._topic_lock(topic):
+            with self.lock:
+                # The file is authoritative; this process's copy may predate other publishers
+                candidates = [e for e in (self._read_topic_file(topic), self.latest.get(topic)) if e]
+                previous = max(candidates, key=lambda e: e['seq']) if candidates else None
+                if previous and previous['payload'] == payload:
+                    return previous['seq']
+
+                seq = (previous['seq'] if previous else 0) + 1
+                entry = {'seq': seq, 'payload': payload, 'published_at': datetime.utcnow().isoformat()}
+                self._write_topic_file(topic, entry)
+                self.latest[topic] = entry
+
+        self._dispatch(topic, previous, entry)
+        return seq
+
+    # ------------------------------------------------------------------
+    # Subscribing
+    # ------------------------------------------------------------------
+
+    def subscribe(self, topics):
+        """Register a subscriber queue for the given topics"""
+        self._ensure_watcher()
+        subscriber = {'topics': set(topics), 'queue': queue.Queue(maxsize=self.SUBSCRIBER_QUEUE_SIZE)}
+        with self.lock:
+            self.subscribers[id(subscriber)] = subscriber
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.pop(id(subscriber), None)
+
+    def snapshot(self, topic):
+        """Latest full message for a topic (sent to clients when they connect)"""
+        with self.lock:
+            entry = self.latest.get(topic) or self._read_topic_file(topic)
+            if entry:
+                self.latest[topic] = entry
+        if not entry:
+            return None
+        return {'topic': topic, 'seq': entry['seq'], 'full': entry['payload'], 'published_at': entry['published_at']}
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(self.subscribers)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _dispatch(self, topic, previous, entry):
+        message = self._build_message(topic, previous, entry)
+        with self.lock:
+            targets = [s for s in self.subscribers.values() if topic in s['topics']]
+
+        for subscriber in targets:
+            try:
+                subscriber['queue'].put_nowait(message)
+            except queue.Full:
+                # Slow client: drop its backlog and make it resync from a full snapshot
+                self._drain(subscriber['queue'])
+                subscriber['queue'].put_nowait({'topic': topic, 'seq': entry['seq'], 'full': entry['payload'],
+                                                'published_at': entry['published_at']})
+
+    @staticmethod
+    def _drain(q):
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _build_message(self, topic, previous, entry):
+        """Incremental diff of top-level keys when both versions are dicts, otherwise the full payload"""
+        message = {'topic': topic, 'seq': entry['seq'], 'published_at': entry['published_at']}
+        old, new = (previous or {}).get('payload'), entry['payload']
+
+        if isinstance(old, dict) and isinstance(new, dict) and previous['seq'] == entry['seq'] - 1:
+            message['base_seq'] = previous['seq']
+            message['patch'] = {
+                'set': {k: v for k, v in new.items() if old.get(k) != v or k not in old},
+                'unset': [k for k in old if k not in new]
+            }
+        else:
+            message['full'] = new
+        return message
+
+    def _ensure_watcher(self):
+        with self.lock:
+            if self.watcher and self.watcher.is_alive():
+                return
+            self.watcher = threading.Thread(target=self._watch, name='event-bus-watcher', daemon=True)
+            self.watcher.start()
+
+    def _watch(self):
+        """Pick up topic versions published by other processes"""
+        while True:
+            try:
+                for filename in os.listdir(self.EVENTS_DIR):
+                    if not filename.endswith('.json'):
+                        continue
+                    topic = self._topic_from_filename(filename)
+                    mtime = os.path.getmtime(os.path.join(self.EVENTS_DIR, filename))
+                    if self.file_mtimes.get(topic) == mtime:
+                        continue
+                    self.file_mtimes[topic] = mtime
+
+                    entry = self._read_topic_file(topic)
+                    with self.lock:
+                        previous = self.latest.get(topic)
+                        if not entry or (previous and previous['seq'] >= entry['seq']):
+                            continue
+                        self.latest[topic] = entry
+                    self._dispatch(topic, previous, entry)
+            except Exception as e:
+                print(f"Event bus watcher error: {e}")
+            time.sleep(self.WATCH_INTERVAL_SECONDS)
+
+    def _topic_path(self, topic):
+        return os.path.join(self.EVENTS_DIR, topic.replace(':', '__') + '.json')
+
+    @staticmethod
+    def _topic_from_filename(filename):
+        return filename[:-len('.json')].replace('__', ':')
+
+    def _topic_lock(self, topic):
+        return _TopicFileLock(self._topic_path(topic) + '.lock')
+
+    def _read_topic_file(self, topic):
+        try:
+            with open(self._topic_path(topic), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_topic_file(self, topic, entry):
+        """Write to a temp file and rename so readers never see a partial version"""
+        path = self._topic_path(topic)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing event topic {topic}: {e}")
+
+    @staticmethod
+    def _json_default(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+
+class _TopicFileLock:
+    """Exclusive flock on a topic's lock file; a no-op where fcntl is missing (the caller's thread lock still applies)"""
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self.lock_file = None
+
+    def __enter__(self):
+        if fcntl:
+            self.lock_file = open(self.lock_path, 'a')
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.lock_file:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+        return False
+
+
+# Process-wide event bus
+event_bus = EventBus()
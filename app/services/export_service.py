@@ -0,0 +1,206 @@
+"""
+Export Service
+Streams historical tables as CSV, NDJSON or Parquet in constant memory
+"""
+
+import csv
+import io
+from datetime import datetime, date, time as dt_time
+from sqlalchemy import select
+from sqlalchemy.types import Integer, Float, Numeric, DateTime, Date, Boolean
+from app import db
+from app.models.nifty_price import NiftyPrice
+from app.models.banknifty_price import BankNiftyPrice, OptionChainData
+from app.models.futures_oi_data import FuturesOIData
+from app.models.strategy_models import Strategy1Entry, Strategy1LTPHistory, Strategy1Execution
+from app.utils.fast_json import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV and NDJSON only
+    pa = pq = None
+
+
+class ExportService:
+    """
+    Streams a table as chunks of encoded bytes.
+
+    Rows are read over a dedicated connection with a server-side cursor
+    (stream_results) in chunks of CHUNK_SIZE and encoded chunk by chunk, so
+    memory stays bounded by one chunk whatever the range. The export runs in its
+    own read-only transaction and never holds locks the ingestion jobs wait on.
+    """
+
+    CHUNK_SIZE = 10000
+
+    # dataset name -> (model, time column, has underlying column)
+    DATASETS = {
+        'option_chain_data': (OptionChainData, 'timestamp', True),
+        'nifty_prices': (NiftyPrice, 'timestamp', False),
+        'banknifty_prices': (BankNiftyPrice, 'timestamp', False),
+        'futures_oi_data': (FuturesOIData, 'timestamp', True),
+        'strategy1_entries': (Strategy1Entry, 'entry_timestamp', False),
+        'strategy1_ltp_history': (Strategy1LTPHistory, 'timestamp', False),
+        'strategy1_executions': (Strategy1Execution, 'timestamp', False)
+    }
+
+    FORMATS = {
+        'csv': ('text/csv', 'csv'),
+        'ndjson': ('application/x-ndjson', 'ndjson'),
+        'parquet': ('application/vnd.apache.parquet', 'parquet')
+    }
+
+    def validate(self, dataset, fmt, underlying=None):
+        """Raise ValueError for an unknown dataset/format or an unusable filter"""
+        if dataset not in self.DATASETS:
+            raise ValueError(f"Unknown dataset '{dataset}'. Available: {', '.join(self.DATASETS)}")
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown format '{fmt}'. Available: {', '.join(self.FORMATS)}")
+        if fmt == 'parquet' and pq is None:
+            raise ValueError('Parquet export requires pyarrow; use csv or ndjson')
+        if underlying and not self.DATASETS[dataset][2]:
+            raise ValueError(f"Dataset '{dataset}' has no underlying column")
+
+    def build_query(self, dataset, start=None, end=None, underlying=None):
+        """Core select of every column, filtered and ordered by the dataset's time column"""
+        model, time_column, _ = self.DATASETS[dataset]
+        table = model.__table__
+        column = table.c[time_column]
+
+        stmt = select(table)
+        if start is not None:
+            stmt = stmt.where(column >= start)
+        if end is not None:
+            stmt = stmt.where(column <= end)
+        if underlying:
+            stmt = stmt.where(table.c.underlying == underlying.upper())
+        return stmt.order_by(column.asc(), table.c.id.asc())
+
+    def stream(self, dataset, fmt='csv', start=None, end=None, underlying=None):
+        """Generator of encoded byte chunks for the filtered table"""
+        self.validate(dataset, fmt, underlying)
+        stmt = self.build_query(dataset, start, end, underlying)
+        columns = list(stmt.selected_columns)
+        encode = getattr(self, f'_encode_{fmt}')
+        return encode(columns, self._iter_partitions(stmt))
+
+    def filename(self, dataset, fmt, start=None, end=None, underlying=None):
+        parts = [dataset]
+        if underlying:
+            parts.append(underlying.upper())
+        if start:
+            parts.append(start.strftime('%Y%m%d'))
+        if end:
+            parts.append(end.strftime('%Y%m%d'))
+        return f"{'_'.join(parts)}.{self.FORMATS[fmt][1]}"
+
+    @staticmethod
+    def parse_bound(value, end_of_day=False):
+        """'YYYY-MM-DD' or ISO datetime to a naive datetime (dates cover the whole day for end bounds)"""
+        if not value:
+            return None
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime.combine(value, dt_time.max if end_of_day else dt_time.min)
+        if len(value) == 10:
+            return datetime.combine(date.fromisoformat(value), dt_time.max if end_of_day else dt_time.min)
+        return datetime.fromisoformat(value)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _iter_partitions(self, stmt):
+        """Row chunks from a server-side cursor on a connection of its own"""
+        with db.engine.connect() as connection:
+            if connection.dialect.name == 'postgresql':
+                connection.exec_driver_sql('SET TRANSACTION READ ONLY')
+            result = connection.execution_options(
+                stream_results=True,
+                yield_per=self.CHUNK_SIZE
+            ).execute(stmt)
+            for partition in result.partitions():
+                yield partition
+
+    # ------------------------------------------------------------------
+    # Encoders
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _encode_csv(columns, partitions):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([column.name for column in columns])
+        for partition in partitions:
+            writer.writerows(
+                [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+                for row in partition
+            )
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _encode_ndjson(columns, partitions):
+        names = [column.name for column in columns]
+        for partition in partitions:
+            yield b''.join(dumps(dict(zip(names, row))) + b'\n' for row in partition)
+
+    @classmethod
+    def _encode_parquet(cls, columns, partitions):
+        """One row group per chunk; bytes are handed on as soon as each row group is written"""
+        # Schema from the SQL types, so columns that are NULL in the first chunk keep their type
+        schema = pa.schema([(column.name, cls._arrow_type(column.type)) for column in columns])
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        for partition in partitions:
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*partition), schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def _arrow_type(sql_type):
+        if isinstance(sql_type, Boolean):
+            return pa.bool_()
+        if isinstance(sql_type, Integer):
+            return pa.int64()
+        if isinstance(sql_type, (Float, Numeric)):
+            return pa.float64()
+        if isinstance(sql_type, DateTime):
+            return pa.timestamp('us')
+        if isinstance(sql_type, Date):
+            return pa.date32()
+        return pa.string()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that keeps only the bytes not yet drained"""
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = bytearray()
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
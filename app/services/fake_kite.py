@@ -0,0 +1,390 @@
+"""
+Fake KiteConnect
+Offline stand-in for kiteconnect.KiteConnect serving MarketSimulator data, with injectable latency and errors
+"""
+
+import random
+import re
+import threading
+import time
+from datetime import datetime, date, timedelta, timezone
+from functools import lru_cache
+from kiteconnect.exceptions import NetworkException, DataException
+from app.services.market_simulator import MarketSimulator, IST, SESSION_MINUTES, MONTHS
+from app.utils.clock import utcnow
+
+_OPTION = re.compile(r'^(NIFTY|BANKNIFTY)(\d{2})([A-Z]{3})(\d+)(CE|PE)$')
+_FUTURES = re.compile(r'^(NIFTY|BANKNIFTY)(\d{2})([A-Z]{3})FUT$')
+
+# Minutes per candle for the intervals historical_data accepts
+INTERVALS = {
+    'minute': 1, '3minute': 3, '5minute': 5, '10minute': 10, '15minute': 15,
+    '30minute': 30, '60minute': 60, 'day': None
+}
+
+
+@lru_cache(maxsize=8)
+def shared_simulator(seed=42):
+    """Process-wide simulator per seed, so its path caches outlive the per-call KiteService instances"""
+    return MarketSimulator(seed=seed)
+
+
+@lru_cache(maxsize=8)
+def shared_client(seed=42, latency_ms=0, jitter_ms=0, error_rate=0.0):
+    """Process-wide client per settings, so error injection draws one seeded stream across calls"""
+    return FakeKiteConnect(
+        simulator=shared_simulator(seed), seed=seed,
+        latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate
+    )
+
+
+class FakeKiteConnect:
+    """
+    Drop-in for the KiteConnect methods the app calls: quote, ltp, ohlc,
+    instruments and historical_data, plus the session helpers.
+
+    Prices come from a MarketSimulator at the time clock() returns (naive UTC,
+    app.utils.clock by default), so a replay that installs a clock drives the
+    market too. Every API call sleeps latency_ms +/- jitter_ms and fails with
+    probability error_rate, raising the kiteconnect exception a real outage
+    raises (timeouts, 429 rate limits, bad data). Injection draws from its own
+    seeded stream, so a run with the same seed fails the same calls.
+    """
+
+    ERRORS = (
+        (NetworkException, 'Gateway timed out (simulated)', 504),
+        (NetworkException, 'Too many requests (simulated)', 429),
+        (DataException, 'Unknown Content-Type (simulated)', 502),
+    )
+
+    def __init__(self, api_key=None, simulator=None, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 seed=42, clock=None, **kwargs):
+        self.api_key = api_key
+        self.simulator = simulator or MarketSimulator(seed=seed)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.clock = clock or utcnow
+        self.access_token = None
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Session
+    # ------------------------------------------------------------------
+
+    def login_url(self):
+        return f'https://kite.zerodha.com/connect/login?api_key={self.api_key}&v=3&simulated=1'
+
+    def set_access_token(self, access_token):
+        self.access_token = access_token
+
+    def set_session_expiry_hook(self, method):
+        pass
+
+    def generate_session(self, request_token, api_secret=None):
+        self._call()
+        return {'access_token': f'simulated-{request_token}', 'user_id': 'SIM001', 'user_name': 'Simulator'}
+
+    def profile(self):
+        self._call()
+        return {'user_id': 'SIM001', 'user_name': 'Simulator', 'broker': 'SIMULATED', 'exchanges': ['NSE', 'NFO']}
+
+    # ------------------------------------------------------------------
+    # Market data
+    # ------------------------------------------------------------------
+
+    def quote(self, *instruments):
+        """Full quotes keyed by 'EXCHANGE:TRADINGSYMBOL'; unknown symbols are left out, as Kite does"""
+        self._call()
+        now = self.clock()
+        quotes = {}
+        for instrument in self._flatten(instruments):
+            data = self._quote(instrument, now)
+            if data is not None:
+                quotes[instrument] = data
+        return quotes
+
+    def ltp(self, *instruments):
+        return {
+            instrument: {'instrument_token': data['instrument_token'], 'last_price': data['last_price']}
+            for instrument, data in self.quote(*instruments).items()
+        }
+
+    def ohlc(self, *instruments):
+        return {
+            instrument: {
+                'instrument_token': data['instrument_token'],
+                'last_price': data['last_price'],
+                'ohlc': data['ohlc']
+            }
+            for instrument, data in self.quote(*instruments).items()
+        }
+
+    def instruments(self, exchange=None):
+        """Index, weekly option and monthly futures instruments around today's open"""
+        self._call()
+        return self._instrument_rows(exchange)
+
+    def _instrument_rows(self, exchange=None):
+        day, _ = self.simulator.session_minute(self.clock())
+        rows = []
+        for underlying, params in self.simulator.UNDERLYINGS.items():
+            if exchange in (None, 'NSE'):
+                rows.append(self._instrument(
+                    params['instrument_token'], params['quote_symbol'].split(':', 1)[1], underlying,
+                    None, 0.0, 'EQ', 'INDICES', 'NSE', 0
+                ))
+            if exchange not in (None, 'NFO'):
+                continue
+
+            spot = float(self.simulator.index_path(underlying, day)[0])
+            interval = params['strike_interval']
+            atm = round(spot / interval) * interval
+            # Symbols carry only year and month, so one weekly expiry is listed
+            expiry = self.simulator.weekly_expiry(day)
+            for offset in range(-40, 41):
+                strike = float(atm + offset * interval)
+                for option_type in ('CE', 'PE'):
+                    symbol = self.simulator.option_symbol(underlying, expiry, strike, option_type)
+                    rows.append(self._instrument(
+                        self.simulator.instrument_token(symbol), symbol, underlying, expiry,
+                        strike, option_type, 'NFO-OPT', 'NFO', params['lot_size']
+                    ))
+
+            expiry = self.simulator.futures_expiry(day)
+            for _ in range(2):
+                symbol = self.simulator.futures_symbol(underlying, expiry)
+                rows.append(self._instrument(
+                    self.simulator.instrument_token(symbol), symbol, underlying, expiry,
+                    0.0, 'FUT', 'NFO-FUT', 'NFO', params['lot_size']
+                ))
+                expiry = self.simulator.futures_expiry(expiry + timedelta(days=1))
+        return rows
+
+    def historical_data(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
+        """Candles with IST-aware dates, like kiteconnect returns them"""
+        self._call()
+        if interval not in INTERVALS:
+            raise DataException(f'invalid interval: {interval}', code=400)
+        resolve = self._resolve_token(int(instrument_token))
+        if resolve is None:
+            raise DataException(f'invalid token: {instrument_token}', code=400)
+
+        start = self._as_ist(from_date)
+        end = self._as_ist(to_date, end_of_day=True)
+        now = self.simulator.to_ist(self.clock())
+        end = min(end, now)
+
+        candles = []
+        day = start.date()
+        while day <= end.date():
+            if self.simulator.is_trading_day(day):
+                bars = resolve(day)
+                if bars is not None:
+                    candles.extend(self._candles(day, bars, INTERVALS[interval], start, end, oi))
+            day += timedelta(days=1)
+        return candles
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _call(self):
+        """Latency and error injection for one API call"""
+        with self._random_lock:
+            self.calls += 1
+            delay = self.latency_ms + (self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            error = self._random.choice(self.ERRORS) if failed else None
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if error is not None:
+            exception, message, code = error
+            raise exception(message, code=code)
+
+    @staticmethod
+    def _flatten(instruments):
+        for item in instruments:
+            if isinstance(item, (list, tuple)):
+                yield from item
+            else:
+                yield item
+
+    def _quote(self, instrument, now):
+        exchange, _, symbol = instrument.partition(':')
+        simulator = self.simulator
+
+        for underlying, params in simulator.UNDERLYINGS.items():
+            if instrument == params['quote_symbol']:
+                data = simulator.index_quote(underlying, now)
+                return self._quote_payload(
+                    params['instrument_token'], data['last_price'], data['timestamp'],
+                    {'open': data['open'], 'high': data['high'], 'low': data['low'], 'close': data['previous_close']},
+                    data['net_change'], volume=0, oi=0
+                )
+
+        match = _OPTION.match(symbol)
+        if exchange == 'NFO' and match:
+            underlying, year, month, strike, option_type = match.groups()
+            expiry = self._option_expiry(int(year), month, now)
+            if expiry is None:
+                return None
+            data = simulator.option_quote(underlying, float(strike), option_type, expiry, now)
+            return self._quote_payload(
+                simulator.instrument_token(symbol), data['last_price'], data['timestamp'],
+                {'open': data['open'], 'high': max(data['open'], data['last_price']),
+                 'low': min(data['open'], data['last_price']), 'close': data['previous_close']},
+                data['net_change'], volume=data['volume'], oi=data['oi'],
+                oi_day_high=data['oi_day_high'], oi_day_low=data['oi_day_low']
+            )
+
+        match = _FUTURES.match(symbol)
+        if exchange == 'NFO' and match:
+            underlying, year, month = match.groups()
+            expiry = simulator.monthly_expiry(2000 + int(year), self._month_number(month))
+            day, _ = simulator.session_minute(now)
+            if expiry < day:
+                return None
+            data = simulator.futures_quote(underlying, now, expiry)
+            return self._quote_payload(
+                simulator.instrument_token(symbol), data['last_price'], data['timestamp'],
+                {'open': data['open'], 'high': data['high'], 'low': data['low'], 'close': data['open']},
+                round(data['last_price'] - data['open'], 2), volume=data['volume'], oi=data['oi']
+            )
+        return None
+
+    def _option_expiry(self, year, month, now):
+        """
+        Expiry an option symbol refers to. Symbols carry only year and month, as
+        KiteService builds them; the nearest weekly expiry in that month is used.
+        """
+        day, _ = self.simulator.session_minute(now)
+        month_number = self._month_number(month)
+        expiry = self.simulator.weekly_expiry(max(day, date(2000 + year, month_number, 1)))
+        if expiry.month != month_number:
+            expiry = self.simulator.monthly_expiry(2000 + year, month_number)
+        return expiry if expiry >= day else None
+
+    @staticmethod
+    def _month_number(month):
+        if month not in MONTHS:
+            raise DataException(f'invalid month: {month}', code=400)
+        return MONTHS.index(month) + 1
+
+    @staticmethod
+    def _quote_payload(token, last_price, timestamp, ohlc, net_change, volume, oi, oi_day_high=None, oi_day_low=None):
+        ist = timestamp.replace(tzinfo=timezone.utc).astimezone(IST).replace(tzinfo=None)
+        return {
+            'instrument_token': token,
+            'timestamp': ist,
+            'last_trade_time': ist,
+            'last_price': last_price,
+            'last_quantity': 0,
+            'buy_quantity': 0,
+            'sell_quantity': 0,
+            'volume': volume,
+            'average_price': last_price,
+            'oi': oi,
+            'oi_day_high': oi_day_high if oi_day_high is not None else oi,
+            'oi_day_low': oi_day_low if oi_day_low is not None else oi,
+            'net_change': net_change,
+            'lower_circuit_limit': round(last_price * 0.9, 2),
+            'upper_circuit_limit': round(last_price * 1.1, 2),
+            'ohlc': ohlc,
+            'depth': {'buy': [], 'sell': []}
+        }
+
+    @staticmethod
+    def _instrument(token, symbol, name, expiry, strike, instrument_type, segment, exchange, lot_size):
+        return {
+            'instrument_token': token,
+            'exchange_token': str(token // 256),
+            'tradingsymbol': symbol,
+            'name': name,
+            'last_price': 0.0,
+            'expiry': expiry,
+            'strike': strike,
+            'tick_size': 0.05,
+            'lot_size': lot_size,
+            'instrument_type': instrument_type,
+            'segment': segment,
+            'exchange': exchange
+        }
+
+    def _resolve_token(self, token):
+        """day -> (closes, cumulative volume, oi) arrays for the instrument, or None if the token is unknown"""
+        simulator = self.simulator
+        for underlying, params in simulator.UNDERLYINGS.items():
+            if token == params['instrument_token']:
+                return lambda day, u=underlying: (simulator.index_path(u, day), None, None)
+
+        for instrument in self._instrument_rows('NFO'):
+            if instrument['instrument_token'] != token:
+                continue
+            underlying, expiry = instrument['name'], instrument['expiry']
+            if instrument['instrument_type'] == 'FUT':
+                def futures_bars(day, u=underlying, e=expiry):
+                    if e < day:
+                        return None
+                    prices, oi, volume = simulator._futures_path(u, day, e)
+                    return prices, volume, oi
+                return futures_bars
+
+            strike, option_type = instrument['strike'], instrument['instrument_type']
+
+            def option_bars(day, u=underlying, e=expiry, k=strike, t=option_type):
+                if e < day:
+                    return None
+                path = simulator.index_path(u, day)
+                prices = [
+                    simulator.option_price(u, float(path[m]), k, simulator._years_to(e, day, m), t)[0]
+                    for m in range(SESSION_MINUTES + 1)
+                ]
+                oi, volume = simulator._open_interest_path(u, day, e, float(k), t)
+                return prices, volume, oi
+            return option_bars
+        return None
+
+    @staticmethod
+    def _as_ist(value, end_of_day=False):
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value) if len(value) > 10 else date.fromisoformat(value)
+        if not isinstance(value, datetime):
+            value = datetime.combine(value, datetime.max.time() if end_of_day else datetime.min.time())
+        return value.replace(tzinfo=IST) if value.tzinfo is None else value.astimezone(IST)
+
+    def _candles(self, day, bars, minutes, start, end, with_oi):
+        prices, volume, oi = bars
+        session = [
+            (datetime.combine(day, datetime.min.time(), tzinfo=IST) + timedelta(hours=9, minutes=15 + m), m)
+            for m in range(SESSION_MINUTES + 1)
+        ]
+        marks = [(ts, m) for ts, m in session if start <= ts <= end]
+        if not marks:
+            return []
+
+        groups = {}
+        for ts, m in marks:
+            if minutes is None:
+                bucket = datetime.combine(day, datetime.min.time(), tzinfo=IST)
+            else:
+                bucket = session[0][0] + timedelta(minutes=(m // minutes) * minutes)
+            groups.setdefault(bucket, []).append(m)
+
+        candles = []
+        for bucket, indexes in groups.items():
+            values = [float(prices[m]) for m in indexes]
+            candle = {
+                'date': bucket,
+                'open': round(float(prices[indexes[0] - 1]) if indexes[0] > 0 else values[0], 2),
+                'high': round(max(values), 2),
+                'low': round(min(values), 2),
+                'close': round(values[-1], 2),
+                'volume': int(volume[indexes[-1]] - (volume[indexes[0] - 1] if indexes[0] > 0 else 0)) if volume is not None else 0
+            }
+            if with_oi:
+                candle['oi'] = int(oi[indexes[-1]]) if oi is not None else 0
+            candles.append(candle)
+        return candles
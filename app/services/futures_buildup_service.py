@@ -0,0 +1,185 @@
+"""
+Futures Buildup Service
+Vectorised price/OI delta and buildup classification for futures OI data, shared by ingestion and the API
+"""
+
+import numpy as np
+from app.models.futures_oi_data import FuturesOIData
+from app import db
+from sqlalchemy import and_, desc
+
+
+class FuturesBuildupService:
+    """
+    Classifies futures rows into buildups from price and OI deltas.
+
+    Price | OI | Meaning        | Trend
+    ↑     | ↑  | Long buildup   | Bullish
+    ↓     | ↑  | Short buildup  | Bearish
+    ↑     | ↓  | Short covering | Bullish
+    ↓     | ↓  | Long unwinding | Bearish
+    """
+
+    MEANINGS = ['Long buildup', 'Short buildup', 'Short covering', 'Long unwinding']
+    TRENDS = ['Bullish', 'Bearish', 'Bullish', 'Bearish']
+    NO_SIGNAL = ('No clear signal', 'Neutral')
+
+    # Rows in the rolling window used to normalise OI change intensity
+    INTENSITY_WINDOW = 20
+
+    @classmethod
+    def classify(cls, price_change, oi_change):
+        """Meaning and trend arrays for price/OI change arrays (same rules as FuturesOIData.calculate_meaning_and_trend)"""
+        price_change = np.asarray(price_change, dtype=np.float64)
+        oi_change = np.asarray(oi_change, dtype=np.float64)
+
+        conditions = [
+            (price_change > 0) & (oi_change > 0),
+            (price_change < 0) & (oi_change > 0),
+            (price_change > 0) & (oi_change < 0),
+            (price_change < 0) & (oi_change < 0),
+        ]
+        meaning = np.select(conditions, cls.MEANINGS, default=cls.NO_SIGNAL[0])
+        trend = np.select(conditions, cls.TRENDS, default=cls.NO_SIGNAL[1])
+        return meaning, trend
+
+    @classmethod
+    def analyze(cls, prices, open_interest, expiry_dates=None, prev_price=None, prev_oi=None):
+        """
+        Deltas, buildup classification, streaks and intensity for rows in ascending time order.
+
+        Args:
+            prices: futures prices (N,)
+            open_interest: open interest (N,)
+            expiry_dates: contract expiry per row (N,); deltas reset to 0 across a contract roll
+            prev_price, prev_oi: the row just before the window, so the first row gets a real delta
+
+        Returns:
+            dict of (N,) arrays: price_change, oi_change, oi_change_percent, meaning, trend,
+            streak (consecutive rows with the same meaning, ending at this row) and
+            intensity (|OI change| relative to its rolling mean, 1.0 = typical)
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        open_interest = np.asarray(open_interest, dtype=np.float64)
+        n = len(prices)
+
+        if n == 0:
+            empty = np.array([])
+            return {
+                'price_change': empty, 'oi_change': empty, 'oi_change_percent': empty,
+                'meaning': empty.astype(str), 'trend': empty.astype(str),
+                'streak': empty.astype(int), 'intensity': empty
+            }
+
+        first_price = prices[0] if prev_price is None else prev_price
+        first_oi = open_interest[0] if prev_oi is None else prev_oi
+
+        price_change = np.diff(prices, prepend=first_price)
+        oi_change = np.diff(open_interest, prepend=first_oi)
+
+        if expiry_dates is not None and n > 1:
+            expiry_dates = np.asarray(expiry_dates)
+            rolled = np.concatenate([[False], expiry_dates[1:] != expiry_dates[:-1]])
+            price_change[rolled] = 0
+            oi_change[rolled] = 0
+
+        previous_oi = open_interest - oi_change
+        oi_change_percent = np.divide(oi_change * 100, previous_oi, out=np.zeros(n), where=previous_oi > 0)
+
+        meaning, trend = cls.classify(price_change, oi_change)
+
+        return {
+            'price_change': price_change,
+            'oi_change': oi_change,
+            'oi_change_percent': oi_change_percent,
+            'meaning': meaning,
+            'trend': trend,
+            'streak': cls._streaks(meaning),
+            'intensity': cls._intensity(oi_change, cls.INTENSITY_WINDOW)
+        }
+
+    @classmethod
+    def summarize(cls, analysis):
+        """Window-level buildup aggregates for an analyze() result"""
+        meaning = analysis['meaning']
+        oi_change = analysis['oi_change']
+
+        if len(meaning) == 0:
+            return {
+                'counts': {m: 0 for m in cls.MEANINGS},
+                'oi_change_by_meaning': {m: 0 for m in cls.MEANINGS},
+                'dominant_buildup': cls.NO_SIGNAL[0],
+                'current_buildup': cls.NO_SIGNAL[0],
+                'current_streak': 0,
+                'longest_streak': {'meaning': cls.NO_SIGNAL[0], 'length': 0},
+                'bullish_rows': 0,
+                'bearish_rows': 0
+            }
+
+        counts = {m: int(np.count_nonzero(meaning == m)) for m in cls.MEANINGS}
+        oi_by_meaning = {m: int(np.abs(oi_change[meaning == m]).sum()) for m in cls.MEANINGS}
+
+        classified = meaning != cls.NO_SIGNAL[0]
+        streak = np.where(classified, analysis['streak'], 0)
+        longest = int(np.argmax(streak))
+
+        return {
+            'counts': counts,
+            'oi_change_by_meaning': oi_by_meaning,
+            'dominant_buildup': max(oi_by_meaning, key=oi_by_meaning.get) if any(oi_by_meaning.values()) else cls.NO_SIGNAL[0],
+            'current_buildup': str(meaning[-1]),
+            'current_streak': int(analysis['streak'][-1]),
+            'longest_streak': {
+                'meaning': str(meaning[longest]) if streak[longest] else cls.NO_SIGNAL[0],
+                'length': int(streak[longest])
+            },
+            'bullish_rows': int(np.count_nonzero(analysis['trend'] == 'Bullish')),
+            'bearish_rows': int(np.count_nonzero(analysis['trend'] == 'Bearish'))
+        }
+
+    @classmethod
+    def prepare_record(cls, record):
+        """Fill price_change, oi_change, meaning and trend on a new record from the previous stored row"""
+        prev_record = db.session.query(
+            FuturesOIData.futures_price,
+            FuturesOIData.open_interest
+        ).filter(
+            and_(
+                FuturesOIData.underlying == record.underlying,
+                FuturesOIData.expiry_date == record.expiry_date,
+                FuturesOIData.timestamp < record.timestamp
+            )
+        ).order_by(desc(FuturesOIData.timestamp)).first()
+
+        analysis = cls.analyze(
+            [record.futures_price], [record.open_interest],
+            prev_price=prev_record[0] if prev_record else None,
+            prev_oi=prev_record[1] if prev_record else None
+        )
+
+        record.price_change = float(analysis['price_change'][0])
+        record.oi_change = int(analysis['oi_change'][0])
+        record.meaning = str(analysis['meaning'][0])
+        record.trend = str(analysis['trend'][0])
+        return record
+
+    @staticmethod
+    def _streaks(labels):
+        """Length of the run of equal labels ending at each position"""
+        n = len(labels)
+        if n == 0:
+            return np.array([], dtype=int)
+        idx = np.arange(n)
+        run_start = np.concatenate([[True], labels[1:] != labels[:-1]])
+        start_idx = np.maximum.accumulate(np.where(run_start, idx, 0))
+        return idx - start_idx + 1
+
+    @staticmethod
+    def _intensity(oi_change, window):
+        """|OI change| divided by the trailing rolling mean of |OI change| (including the row itself)"""
+        magnitude = np.abs(oi_change)
+        cumsum = np.concatenate([[0.0], np.cumsum(magnitude)])
+        idx = np.arange(1, len(magnitude) + 1)
+        lower = np.maximum(idx - window, 0)
+        rolling_mean = (cumsum[idx] - cumsum[lower]) / (idx - lower)
+        return np.divide(magnitude, rolling_mean, out=np.zeros(len(magnitude)), where=rolling_mean > 0)
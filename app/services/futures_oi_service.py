@@ -1,9 +1,11 @@
 from app.models.futures_oi_data import FuturesOIData
 from app.services.datetime_filter_service import DateTimeFilterService
-from app.utils.datetime_utils import format_ist_time_only
+from app.services.futures_buildup_service import FuturesBuildupService
+from app.utils.datetime_utils import format_ist_time_only, utc_to_ist
 from app import db
 from sqlalchemy import func, and_, desc
 from datetime import datetime, timedelta
+import numpy as np
 import pytz
 import logging
 
@@ -15,6 +17,7 @@ class FuturesOIService:
     def get_futures_oi_analysis(self, underlying='NIFTY', start_date=None, end_date=None, start_time=None, end_time=None):
         """
         Get futures OI analysis data with trend calculations
+        Returns {'data': rows newest first, 'summary': window buildup aggregates}; windows may span several days
         """
         try:
             # Convert dates to datetime objects for filtering
@@ -65,78 +68,108 @@ class FuturesOIService:
             
             print(f"DEBUG: Getting futures OI data for {underlying} from {start_datetime_naive} to {end_datetime_naive} UTC")
             
-            # Query futures OI data
-            query = db.session.query(FuturesOIData).filter(
-                and_(
-                    FuturesOIData.underlying == underlying,
-                    FuturesOIData.timestamp >= start_datetime_naive,
-                    FuturesOIData.timestamp <= end_datetime_naive
-                )
-            ).order_by(FuturesOIData.timestamp.desc())
-            
-            futures_data = query.all()
-            
-            # If no data exists, return empty list (live data only)
-            if not futures_data:
-                print(f"DEBUG: No futures data found for {underlying}. Live data will be collected during market hours.")
-                return []
-            
-            # Calculate changes and trends
-            analyzed_data = self._calculate_trends(futures_data)
-            
-            return analyzed_data
+            return self._analyze_window(underlying, start_datetime_naive, end_datetime_naive)
             
         except Exception as e:
             print(f"Error in get_futures_oi_analysis for {underlying}: {str(e)}")
-            return []
+            return {'data': [], 'summary': FuturesBuildupService.summarize(FuturesBuildupService.analyze([], []))}
     
-    def _calculate_trends(self, futures_data):
-        """Calculate price changes, OI changes, meanings and trends"""
-        analyzed_data = []
+    def _analyze_window(self, underlying, start_datetime, end_datetime):
+        """Load the window in one column-projected query and classify it in a single vectorised pass"""
+        rows = db.session.query(
+            FuturesOIData.id,
+            FuturesOIData.timestamp,
+            FuturesOIData.expiry_date,
+            FuturesOIData.futures_price,
+            FuturesOIData.open_interest,
+            FuturesOIData.volume,
+            FuturesOIData.meaning,
+            FuturesOIData.trend
+        ).filter(
+            and_(
+                FuturesOIData.underlying == underlying,
+                FuturesOIData.timestamp >= start_datetime,
+                FuturesOIData.timestamp <= end_datetime
+            )
+        ).order_by(FuturesOIData.timestamp.asc()).all()
         
-        for i, record in enumerate(futures_data):
-            # Calculate changes from previous record
-            if i > 0:
-                prev_record = futures_data[i-1]
-                price_change = record.futures_price - prev_record.futures_price
-                oi_change = record.open_interest - prev_record.open_interest
-            else:
-                price_change = 0
-                oi_change = 0
-            
-            # Calculate meaning and trend
-            meaning, trend = FuturesOIData.calculate_meaning_and_trend(price_change, oi_change)
-            
-            # Update database record if needed
-            if record.meaning != meaning or record.trend != trend:
-                record.price_change = price_change
-                record.oi_change = oi_change
-                record.meaning = meaning
-                record.trend = trend
-                record.updated_at = datetime.now(pytz.UTC)
-            
-            # Add to analyzed data
+        # If no data exists, return empty list (live data only)
+        if not rows:
+            print(f"DEBUG: No futures data found for {underlying}. Live data will be collected during market hours.")
+            return {'data': [], 'summary': FuturesBuildupService.summarize(FuturesBuildupService.analyze([], []))}
+        
+        # Row just before the window (same contract) so the first row has a real delta
+        prev_row = db.session.query(
+            FuturesOIData.futures_price,
+            FuturesOIData.open_interest
+        ).filter(
+            and_(
+                FuturesOIData.underlying == underlying,
+                FuturesOIData.expiry_date == rows[0].expiry_date,
+                FuturesOIData.timestamp < start_datetime
+            )
+        ).order_by(desc(FuturesOIData.timestamp)).first()
+        
+        analysis = FuturesBuildupService.analyze(
+            [row.futures_price for row in rows],
+            [row.open_interest for row in rows],
+            expiry_dates=[row.expiry_date for row in rows],
+            prev_price=prev_row[0] if prev_row else None,
+            prev_oi=prev_row[1] if prev_row else None
+        )
+        
+        self._sync_stored_trends(rows, analysis)
+        
+        analyzed_data = []
+        # Newest first, as the table displays it
+        for i in range(len(rows) - 1, -1, -1):
+            row = rows[i]
+            trend = str(analysis['trend'][i])
             analyzed_data.append({
-                'id': record.id,
-                'time': format_ist_time_only(record.timestamp),
-                'futures_price': record.futures_price,
-                'open_interest': record.open_interest,
-                'volume': record.volume,
-                'price_change': round(price_change, 2),
-                'oi_change': oi_change,
-                'meaning': meaning,
+                'id': row.id,
+                'date': utc_to_ist(row.timestamp).strftime('%Y-%m-%d'),
+                'time': format_ist_time_only(row.timestamp),
+                'futures_price': row.futures_price,
+                'open_interest': row.open_interest,
+                'volume': row.volume,
+                'price_change': round(float(analysis['price_change'][i]), 2),
+                'oi_change': int(analysis['oi_change'][i]),
+                'oi_change_percent': round(float(analysis['oi_change_percent'][i]), 3),
+                'meaning': str(analysis['meaning'][i]),
                 'trend': trend,
-                'trend_color': self._get_trend_color(trend)
+                'trend_color': self._get_trend_color(trend),
+                'streak': int(analysis['streak'][i]),
+                'intensity': round(float(analysis['intensity'][i]), 2)
             })
         
-        # Commit any database updates
+        return {'data': analyzed_data, 'summary': FuturesBuildupService.summarize(analysis)}
+    
+    def _sync_stored_trends(self, rows, analysis):
+        """Persist recomputed classifications only for rows whose stored values differ"""
+        stored_meaning = np.array([row.meaning or '' for row in rows])
+        stored_trend = np.array([row.trend or '' for row in rows])
+        stale = np.flatnonzero((stored_meaning != analysis['meaning']) | (stored_trend != analysis['trend']))
+        
+        if not len(stale):
+            return
+        
         try:
+            now = datetime.now(pytz.UTC)
+            db.session.bulk_update_mappings(FuturesOIData, [
+                {
+                    'id': rows[i].id,
+                    'price_change': float(analysis['price_change'][i]),
+                    'oi_change': int(analysis['oi_change'][i]),
+                    'meaning': str(analysis['meaning'][i]),
+                    'trend': str(analysis['trend'][i]),
+                    'updated_at': now
+                }
+                for i in stale
+            ])
             db.session.commit()
         except Exception as e:
             print(f"Error updating futures data: {str(e)}")
             db.session.rollback()
-        
-        return analyzed_data
     
     def _get_trend_color(self, trend):
         """Get color class for trend display"""
@@ -155,43 +188,19 @@ class FuturesOIService:
             if not timestamp:
                 timestamp = datetime.now(pytz.UTC)
             
-            # Get previous record for change calculation
-            prev_record = db.session.query(FuturesOIData).filter(
-                and_(
-                    FuturesOIData.underlying == underlying,
-                    FuturesOIData.expiry_date == expiry_date
-                )
-            ).order_by(desc(FuturesOIData.timestamp)).first()
-            
-            # Calculate changes
-            if prev_record:
-                price_change = futures_price - prev_record.futures_price
-                oi_change = open_interest - prev_record.open_interest
-            else:
-                price_change = 0
-                oi_change = 0
-            
-            # Calculate meaning and trend
-            meaning, trend = FuturesOIData.calculate_meaning_and_trend(price_change, oi_change)
-            
-            # Create new record
+            # Create new record with deltas and buildup from the previous stored row
             record = FuturesOIData(
                 underlying=underlying,
                 expiry_date=expiry_date,
                 timestamp=timestamp,
                 futures_price=futures_price,
                 open_interest=open_interest,
-                volume=volume,
-                price_change=price_change,
-                oi_change=oi_change,
-                meaning=meaning,
-                trend=trend
+                volume=volume
             )
+            FuturesBuildupService.prepare_record(record)
             
             db.session.add(record)
             db.session.commit()
-            
-            print(f"DEBUG: Stored futures data for {underlying}: Price={futures_price}, OI={open_interest}, Trend={trend}")
             return record
             
         except Exception as e:
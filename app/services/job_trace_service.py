@@ -0,0 +1,269 @@
+"""
+Job Trace Service
+Per-phase span trees of the scheduler job runs, stored in job_runs, and the overlap/skip policy of each job
+"""
+
+import json
+import statistics
+import threading
+import time
+import pytz
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from app import db
+from app.models.job_run import JobRun
+from app.services.metrics_service import metrics
+from app.utils import clock
+
+# APScheduler options per job. One instance at a time: a run that comes due while the
+# previous one is still going is skipped (stored as 'overlap') instead of piling up on
+# the thread pool; coalesce folds a backlog of due runs into one; a run that could not
+# start within its grace time is dropped (stored as 'missed'), its data would be stale.
+JOB_POLICIES = {
+    'fetch_nifty_price': {'max_instances': 1, 'coalesce': True, 'misfire_grace_time': 20},
+    'strategy_1_monitor': {'max_instances': 1, 'coalesce': True, 'misfire_grace_time': 30},
+    'macd_cache_update': {'max_instances': 1, 'coalesce': True, 'misfire_grace_time': 60},
+    'data_gap_monitor': {'max_instances': 1, 'coalesce': True, 'misfire_grace_time': 120},
+}
+
+# Days of job runs kept in the table
+RETENTION_DAYS = 14
+
+# Trace of the job the current thread is running
+_local = threading.local()
+
+
+class Span:
+    """One timed phase of a job run"""
+
+    def __init__(self, name, attrs=None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.children = []
+        self.error = None
+        self.ms = None
+        self.started = time.perf_counter()
+
+    def finish(self):
+        self.ms = round((time.perf_counter() - self.started) * 1000, 2)
+
+    def to_dict(self):
+        node = {'name': self.name, 'ms': self.ms, 'children': [child.to_dict() for child in self.children]}
+        if self.attrs:
+            node['attrs'] = self.attrs
+        if self.error:
+            node['error'] = self.error
+        return node
+
+
+class JobTrace:
+    """Span tree of one job run"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.started_at = clock.utcnow()
+        self.root = Span(job_id)
+        self.stack = [self.root]
+        self.error = None
+
+    def fail(self, error):
+        """Remember the first error of the run"""
+        if self.error is None:
+            self.error = _describe(error)
+
+
+def _describe(error):
+    return error if isinstance(error, str) else f'{type(error).__name__}: {error}'
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a phase of the running job; spans opened inside it become its children.
+    An exception passing through marks the span and the run as failed. Outside a
+    traced job (API requests calling the same services) this does nothing.
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield None
+        return
+
+    node = Span(name, attrs)
+    trace.stack[-1].children.append(node)
+    trace.stack.append(node)
+    try:
+        yield node
+    except Exception as e:
+        node.error = _describe(e)
+        trace.fail(e)
+        raise
+    finally:
+        node.finish()
+        trace.stack.pop()
+        metrics.observe('job_phase_duration_seconds', node.ms / 1000, job=trace.job_id, phase=name)
+
+
+def record_error(error):
+    """Mark the running job as failed for an error it handled itself (most jobs log and carry on)"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.fail(error)
+
+
+def trace_job(job_id):
+    """
+    Trace a scheduler job: the run and its spans are timed and stored in job_runs
+    once it returns. A traced job called from another traced job joins its trace.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if getattr(_local, 'trace', None) is not None:
+                return f(*args, **kwargs)
+
+            trace = _local.trace = JobTrace(job_id)
+            try:
+                return f(*args, **kwargs)
+            except Exception as e:
+                trace.fail(e)
+                raise
+            finally:
+                _local.trace = None
+                trace.root.finish()
+                JobTraceService().record(trace)
+        return decorated_function
+    return decorator
+
+
+class JobTraceService:
+    """Service storing scheduler job runs and reading them back for the admin page"""
+
+    # App the runs are stored with; jobs finish outside their own app context
+    _app = None
+    _purged_on = None
+    _purge_lock = threading.Lock()
+
+    def __init__(self):
+        self.ist_timezone = pytz.timezone('Asia/Kolkata')
+
+    @classmethod
+    def init_app(cls, app, scheduler=None):
+        """Store job runs with app; with a scheduler, also store the runs it skipped"""
+        from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
+
+        cls._app = app
+        if scheduler is not None:
+            scheduler.add_listener(cls._on_skipped, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
+    @classmethod
+    def _on_skipped(cls, scheduler_event):
+        from apscheduler.events import EVENT_JOB_MISSED
+
+        if scheduler_event.code == EVENT_JOB_MISSED:
+            status, run_times = 'missed', [scheduler_event.scheduled_run_time]
+        else:
+            status, run_times = 'overlap', scheduler_event.scheduled_run_times
+        for run_time in run_times:
+            cls().record_skip(scheduler_event.job_id, status, run_time)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, trace):
+        """Store a finished run"""
+        self._store(JobRun(
+            job_id=trace.job_id,
+            status='error' if trace.error else 'ok',
+            started_at=trace.started_at,
+            duration_ms=trace.root.ms,
+            error=trace.error,
+            spans=json.dumps([child.to_dict() for child in trace.root.children])
+        ))
+
+    def record_skip(self, job_id, status, scheduled_at):
+        """Store a run the scheduler skipped ('overlap' or 'missed') at its scheduled time"""
+        if scheduled_at.tzinfo is not None:
+            scheduled_at = scheduled_at.astimezone(timezone.utc).replace(tzinfo=None)
+        self._store(JobRun(job_id=job_id, status=status, started_at=scheduled_at))
+
+    def _store(self, run):
+        app = self._app
+        if app is None:
+            return
+        with app.app_context():
+            try:
+                db.session.add(run)
+                db.session.commit()
+                self._purge()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error recording job run of {run.job_id}: {str(e)}")
+
+    def _purge(self):
+        """Drop runs older than RETENTION_DAYS, once a day"""
+        today = clock.now(self.ist_timezone).date()
+        with self._purge_lock:
+            if JobTraceService._purged_on == today:
+                return
+            JobTraceService._purged_on = today
+        cutoff = clock.utcnow() - timedelta(days=RETENTION_DAYS)
+        JobRun.query.filter(JobRun.started_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def get_day_summary(self, trade_date):
+        """Per job: run counts by status and run time percentiles of the IST day"""
+        start, end = self._day_bounds(trade_date)
+        rows = db.session.query(JobRun.job_id, JobRun.status, JobRun.duration_ms).filter(
+            JobRun.started_at >= start, JobRun.started_at < end
+        ).all()
+
+        jobs = {}
+        for job_id, status, duration_ms in rows:
+            job = jobs.setdefault(job_id, {'job_id': job_id, 'runs': 0, 'ok': 0, 'error': 0,
+                                           'overlap': 0, 'missed': 0, 'durations': []})
+            job['runs'] += 1
+            job[status] = job.get(status, 0) + 1
+            if duration_ms is not None:
+                job['durations'].append(duration_ms)
+
+        summary = []
+        for job_id in sorted(jobs):
+            job = jobs[job_id]
+            durations = sorted(job.pop('durations'))
+            job['median_ms'] = round(statistics.median(durations), 1) if durations else None
+            job['p95_ms'] = round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 1) if durations else None
+            job['max_ms'] = round(durations[-1], 1) if durations else None
+            job['total_s'] = round(sum(durations) / 1000, 1)
+            job['policy'] = JOB_POLICIES.get(job_id)
+            summary.append(job)
+        return summary
+
+    def get_slowest_runs(self, trade_date, job_id=None, limit=25):
+        """Slowest completed runs of the IST day, slowest first"""
+        start, end = self._day_bounds(trade_date)
+        query = JobRun.query.filter(
+            JobRun.started_at >= start, JobRun.started_at < end, JobRun.duration_ms.isnot(None)
+        )
+        if job_id:
+            query = query.filter(JobRun.job_id == job_id)
+        return query.order_by(JobRun.duration_ms.desc()).limit(limit).all()
+
+    def get_skipped_runs(self, trade_date, limit=50):
+        """Overlapping and missed runs of the IST day, latest first"""
+        start, end = self._day_bounds(trade_date)
+        return JobRun.query.filter(
+            JobRun.started_at >= start, JobRun.started_at < end, JobRun.status.in_(('overlap', 'missed'))
+        ).order_by(JobRun.started_at.desc()).limit(limit).all()
+
+    def _day_bounds(self, trade_date):
+        """IST calendar day as a naive UTC [start, end) range"""
+        start_ist = self.ist_timezone.localize(datetime.combine(trade_date, datetime.min.time()))
+        end_ist = self.ist_timezone.localize(datetime.combine(trade_date + timedelta(days=1), datetime.min.time()))
+        return (start_ist.astimezone(timezone.utc).replace(tzinfo=None),
+                end_ist.astimezone(timezone.utc).replace(tzinfo=None))
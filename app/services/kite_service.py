@@ -1,16 +1,59 @@
-from kiteconnect import KiteConnect
 from flask import current_app
 from app.utils.token_manager import TokenManager
 import logging
 import json
 import os
+import time
 from datetime import datetime
+from app.services.metrics_service import metrics
+from app.utils import clock
+
+
+class TimedKiteConnect:
+    """KiteConnect proxy recording the latency of every API call per method (quote, ltp, historical_data, ...)"""
+    
+    # Local helpers that never reach the Kite API
+    UNTIMED = {'set_access_token', 'login_url', 'set_session_expiry_hook'}
+    
+    def __init__(self, kite):
+        self._kite = kite
+    
+    def __getattr__(self, name):
+        attribute = getattr(self._kite, name)
+        if name in self.UNTIMED or name.startswith('_') or not callable(attribute):
+            return attribute
+        
+        def timed_call(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = attribute(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                metrics.observe('kite_request_duration_seconds', time.perf_counter() - started,
+                                endpoint=name, outcome=outcome)
+        return timed_call
 
 class KiteService:
     def __init__(self):
         self.api_key = current_app.config['KITE_API_KEY']
         self.api_secret = current_app.config['KITE_API_SECRET']
-        self.kite = KiteConnect(api_key=self.api_key)
+        self.simulated = current_app.config.get('KITE_SIMULATION', False)
+        if self.simulated:
+            from app.services.fake_kite import shared_client
+            # A replay can serve its own client (e.g. archived ticks) through KITE_SIM_CLIENT_FACTORY
+            factory = current_app.config.get('KITE_SIM_CLIENT_FACTORY')
+            self.kite = TimedKiteConnect(factory() if factory else shared_client(
+                current_app.config['KITE_SIM_SEED'],
+                current_app.config['KITE_SIM_LATENCY_MS'],
+                current_app.config['KITE_SIM_JITTER_MS'],
+                current_app.config['KITE_SIM_ERROR_RATE']
+            ))
+        else:
+            # kiteconnect pulls in twisted for its ticker: imported on first use, not at worker boot
+            from kiteconnect import KiteConnect
+            self.kite = TimedKiteConnect(KiteConnect(api_key=self.api_key))
         self.token_manager = TokenManager(current_app.config['TOKEN_FILE_PATH'])
         
         # Setup API logging
@@ -128,6 +171,9 @@ class KiteService:
             raise Exception(f"Error generating session: {str(e)}")
     
     def get_kite_instance(self):
+        if self.simulated:
+            return self.kite
+        
         access_token = self.token_manager.get_token()
         if not access_token:
             raise Exception("No access token found. Please login first.")
@@ -231,7 +277,7 @@ class KiteService:
             except:
                 # Fallback to automatic calculation
                 from datetime import datetime, timedelta
-                today = datetime.now().date()
+                today = clock.today()
                 days_ahead = 3 - today.weekday()  # 3 = Thursday
                 if days_ahead <= 0:
                     days_ahead += 7
@@ -370,22 +416,13 @@ class KiteService:
             else:
                 bullish_percentage = bearish_percentage = 50
             
-            # Find Max Pain (strike with highest total OI)
-            max_pain_strike = 0
-            max_total_oi = 0
-            
-            for item in option_chain_data:
-                total_oi = item['ce_oi'] + item['pe_oi']
-                if total_oi > max_total_oi:
-                    max_total_oi = total_oi
-                    max_pain_strike = item['strike_price']
+            # Max pain (minimum option-writer payout) and OI walls over the full strike ladder
+            from app.services.max_pain_service import MaxPainService
+            max_pain_data = MaxPainService().analyze_chain(option_chain_data)
             
-            # Simple support/resistance based on high OI levels
-            sorted_by_oi = sorted(option_chain_data, key=lambda x: x['ce_oi'] + x['pe_oi'], reverse=True)
-            key_levels = sorted_by_oi[:3]  # Top 3 OI levels
-            
-            support_level = min(level['strike_price'] for level in key_levels)
-            resistance_level = max(level['strike_price'] for level in key_levels)
+            max_pain_strike = max_pain_data['max_pain_strike'] if max_pain_data else 0
+            support_level = max_pain_data['key_support_level'] if max_pain_data else 0
+            resistance_level = max_pain_data['key_resistance_level'] if max_pain_data else 0
             
             return {
                 'underlying': underlying,
@@ -408,7 +445,7 @@ class KiteService:
             raise Exception(f"Error calculating market trend: {str(e)}")
     
     def is_authenticated(self):
-        return self.token_manager.token_exists()
+        return self.simulated or self.token_manager.token_exists()
     
     def logout(self):
         self.token_manager.delete_token()
@@ -478,32 +515,7 @@ class KiteService:
             kite = self.get_kite_instance()
             
             # Get current month futures symbol
-            from datetime import datetime, timedelta
-            import calendar
-            
-            # Calculate current month expiry (last Thursday)
-            today = datetime.now()
-            year = today.year
-            month = today.month
-            
-            # Find last Thursday of current month
-            last_day = calendar.monthrange(year, month)[1]
-            last_date = datetime(year, month, last_day)
-            
-            # Find last Thursday
-            while last_date.weekday() != 3:  # Thursday is 3
-                last_date -= timedelta(days=1)
-            
-            # Format expiry date for symbol (YYMM format without day)
-            expiry_str = last_date.strftime("%y%b").upper()
-            
-            # Construct futures symbol
-            if underlying == "NIFTY":
-                symbol = f"NFO:NIFTY{expiry_str}FUT"
-            elif underlying == "BANKNIFTY":
-                symbol = f"NFO:BANKNIFTY{expiry_str}FUT"
-            else:
-                raise ValueError(f"Unsupported underlying: {underlying}")
+            symbol, expiry_date = self.get_futures_contract(underlying)
             
             # Fetch futures quote
             quote_data = kite.quote([symbol])
@@ -514,15 +526,34 @@ class KiteService:
                 return {
                     'underlying': underlying,
                     'symbol': symbol,
-                    'expiry_date': last_date.date(),
+                    'expiry_date': expiry_date,
                     'futures_price': data.get('last_price', 0),
                     'open_interest': data.get('oi', 0),
                     'volume': data.get('volume', 0),
-                    'timestamp': datetime.now()
+                    'timestamp': clock.now()
                 }
             
             return None
             
         except Exception as e:
             print(f"Error fetching futures data for {underlying}: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+    
+    def get_futures_contract(self, underlying="NIFTY", on_date=None):
+        """Current month futures symbol and expiry (last Thursday of the month) on on_date (default today)"""
+        import calendar
+        from datetime import date, timedelta
+        
+        today = on_date or clock.now().date()
+        
+        # Find last Thursday of the month
+        last_date = date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
+        while last_date.weekday() != 3:  # Thursday is 3
+            last_date -= timedelta(days=1)
+        
+        # Format expiry date for symbol (YYMM format without day)
+        expiry_str = last_date.strftime("%y%b").upper()
+        
+        if underlying not in ("NIFTY", "BANKNIFTY"):
+            raise ValueError(f"Unsupported underlying: {underlying}")
+        return f"NFO:{underlying}{expiry_str}FUT", last_date
@@ -0,0 +1,103 @@
+from app.services.event_bus import event_bus
+from app.models.nifty_price import NiftyPrice
+from app.models.banknifty_price import BankNiftyPrice
+
+
+class LiveUpdateService:
+    """Builds topic payloads once per ingestion cycle and publishes them to the event bus"""
+
+    UNDERLYINGS = ['NIFTY', 'BANKNIFTY']
+    MACD_TIMEFRAMES = [3, 6, 12, 15, 30]
+
+    # Topics a client may subscribe to
+    TOPICS = (
+        ['prices', 'market_signal', 'strategy_1', 'nifty_stocks'] +
+        [f'option_chain:{u}' for u in UNDERLYINGS] +
+        [f'macd:{u}' for u in UNDERLYINGS]
+    )
+
+    def build_prices_payload(self):
+        """Latest NIFTY and BANKNIFTY price rows"""
+        latest_nifty = NiftyPrice.query.order_by(NiftyPrice.timestamp.desc()).first()
+        latest_banknifty = BankNiftyPrice.query.order_by(BankNiftyPrice.timestamp.desc()).first()
+        return {
+            'nifty': latest_nifty.to_dict() if latest_nifty else None,
+            'banknifty': latest_banknifty.to_dict() if latest_banknifty else None
+        }
+
+    def build_option_chain_payload(self, underlying):
+        """Same data block as /api/option-chain/<underlying>"""
+        from app.services.market_service import MarketService
+        from app.models.expiry_settings import ExpirySettings
+
+        custom_expiry = None
+        try:
+            setting = ExpirySettings.query.filter_by(underlying=underlying).first()
+            if setting:
+                custom_expiry = setting.current_expiry
+        except Exception:
+            pass
+
+        market_service = MarketService()
+        option_data = market_service.get_current_option_chain(underlying)
+        trend_data = market_service.get_market_trend(underlying)
+
+        return {
+            'option_chain': [opt.to_dict() for opt in option_data] if option_data else [],
+            'trend': trend_data.to_dict() if trend_data else None,
+            'demo_mode': False,
+            'using_custom_expiry': bool(custom_expiry),
+            'custom_expiry_date': custom_expiry.isoformat() if custom_expiry else None
+        }
+
+    def build_macd_payload(self, symbol):
+        """Cached MACD signal per timeframe, keyed like the /api/macd-signal responses"""
+        from app.services.super_fast_macd_cache import fast_cache
+        return {str(tf): fast_cache.get_fast_signal(symbol, tf) for tf in self.MACD_TIMEFRAMES}
+
+    def build_nifty_stocks_payload(self):
+        """Same body as /api/nifty-stocks, without the success flag"""
+        from datetime import datetime
+        from app.services.nifty_stocks_service import NiftyStocksService
+        from app.utils.datetime_utils import utc_to_ist
+
+        stocks_data = NiftyStocksService().get_nifty_stocks_data()
+        return {
+            'stocks': [stock.to_dict() for stock in stocks_data['stocks']],
+            'summary': {
+                'total_positive_influence': stocks_data['total_positive_influence'],
+                'total_negative_influence': stocks_data['total_negative_influence'],
+                'net_nifty_influence': stocks_data['net_nifty_influence'],
+                'total_stocks': stocks_data['total_stocks'],
+                'gainers': stocks_data['gainers'],
+                'losers': stocks_data['losers'],
+                'unchanged': stocks_data['unchanged']
+            },
+            'last_updated': utc_to_ist(datetime.utcnow()).isoformat()
+        }
+
+    def publish_prices(self):
+        self._publish('prices', self.build_prices_payload)
+
+    def publish_option_chain(self, underlying):
+        self._publish(f'option_chain:{underlying}', lambda: self.build_option_chain_payload(underlying))
+
+    def publish_market_signal(self, signal_data):
+        self._publish('market_signal', lambda: signal_data)
+
+    def publish_macd(self):
+        for symbol in self.UNDERLYINGS:
+            self._publish(f'macd:{symbol}', lambda s=symbol: self.build_macd_payload(s))
+
+    def publish_strategy_1(self, status_data):
+        self._publish('strategy_1', lambda: status_data)
+
+    def publish_nifty_stocks(self):
+        self._publish('nifty_stocks', self.build_nifty_stocks_payload)
+
+    @staticmethod
+    def _publish(topic, build_payload):
+        try:
+            event_bus.publish(topic, build_payload())
+        except Exception as e:
+            print(f"Error publishing live update for {topic}: {e}")
@@ -0,0 +1,471 @@
+"""
+Load Test Service
+Simulated dashboard users (browser tabs polling and streaming over keep-alive HTTP) with per-endpoint latency percentiles and database connection use
+"""
+
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlencode, urlsplit
+
+# Connections a browser opens to one host over HTTP/1.1; an open live-update stream holds one of them
+BROWSER_CONNECTIONS = 6
+
+# Seconds between publishes of each live-update topic and seconds past the period the job publishes it
+# (prices and Strategy 1 every minute, option chains and the market signal on even minutes, MACD from its 2-minute cache job)
+TOPIC_SCHEDULE = {
+    'prices': (60, 5),
+    'strategy_1': (60, 10),
+    'market_signal': (120, 15),
+    'option_chain:NIFTY': (120, 15),
+    'option_chain:BANKNIFTY': (120, 15),
+    'macd:NIFTY': (120, 30),
+    'macd:BANKNIFTY': (120, 30),
+}
+
+# Spread of the clients' reaction to one publish (network and browser scheduling)
+JITTER_SECONDS = 2.0
+
+# EventSource reconnect delay (RETRY_MS of the stream controller)
+STREAM_RETRY_SECONDS = 5.0
+
+DASHBOARD_WIDGETS = [
+    'comprehensive',
+    'market_signal',
+    'sector_performance',
+    'top_oi_strikes',
+    {'id': 'nifty_oi', 'widget': 'oi_changes_timeline', 'params': {'underlying': 'NIFTY'}},
+    {'id': 'banknifty_oi', 'widget': 'oi_changes_timeline', 'params': {'underlying': 'BANKNIFTY'}}
+]
+
+MACD_TIMEFRAMES = (30, 15, 12, 6, 3)
+
+
+def build_pages(trade_date):
+    """
+    What each page's script fetches: on load, and on each live-update topic it
+    listens to. A step is a list of requests sent together; steps run in order.
+    """
+    window = urlencode({'target_date': trade_date.isoformat(), 'start_time': '09:15', 'end_time': '15:30', 'underlying': 'NIFTY'})
+    batch = ('POST', '/api/batch', {'widgets': DASHBOARD_WIDGETS})
+    macd = [('GET', f'/api/macd-signal?symbol=NIFTY&timeframe={timeframe}') for timeframe in MACD_TIMEFRAMES]
+    # Signal cards load together, the history table one timeframe at a time
+    macd_steps = [macd] + [[request] for request in macd]
+    history = [[('GET', '/strategies/api/strategy-1/complete-history')]]
+    all_oi = [[('GET', '/api/all-oi-analysis/NIFTY')]]
+    oi_changes = [[('GET', '/api/oi-changes'), ('GET', '/api/oi-changes-timeline')]]
+
+    return {
+        'dashboard': {
+            'path': '/dashboard-new', 'weight': 3,
+            'load': [[batch]],
+            'topics': {'prices': [[batch]], 'market_signal': [[('GET', '/api/market-signal')]]}
+        },
+        'oi_crossover': {
+            'path': '/oi-crossover', 'weight': 2,
+            # MACD updates arrive in the stream event itself
+            'load': [[('GET', f'/api/oi-crossover-summary?{window}'), ('GET', f'/api/oi-crossover-chart?{window}')]] + macd_steps,
+            'topics': {'macd:NIFTY': []}
+        },
+        'strategy_1': {
+            'path': '/strategies/strategy-1', 'weight': 2,
+            # The status arrives in the stream event; the history is refetched
+            'load': [[('GET', '/strategies/api/strategy-1/status')]] + history,
+            'topics': {'strategy_1': history}
+        },
+        'option_chain': {
+            # Chain updates arrive in the stream event itself
+            'path': '/option-chain', 'weight': 1,
+            'load': [[('GET', '/api/option-chain/NIFTY')]],
+            'topics': {'option_chain:NIFTY': []}
+        },
+        'all_oi': {
+            'path': '/all-oi-analysis', 'weight': 1,
+            'load': all_oi,
+            'topics': {'option_chain:NIFTY': all_oi}
+        },
+        'oi_changes': {
+            'path': '/oi-changes', 'weight': 1,
+            'load': oi_changes,
+            'topics': {'option_chain:NIFTY': oi_changes}
+        },
+        'futures_oi': {
+            'path': '/futures-oi-analysis', 'weight': 0.5,
+            'load': [[('GET', f'/api/futures-oi-data?{window}')]],
+            'topics': {}
+        },
+    }
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection (just enough of the protocol for the app's responses)"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    @property
+    def is_open(self):
+        return self.writer is not None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=2 ** 20)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def send(self, method, target, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        lines = [f'{method} {target} HTTP/1.1', f'Host: {self.host}:{self.port}', 'User-Agent: kite-load-test']
+        if body is not None:
+            lines += ['Content-Type: application/json', f'Content-Length: {len(payload)}']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + payload)
+        await self.writer.drain()
+
+    async def read_head(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed by the server')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return status, headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    async def iter_body(self, headers):
+        """Body pieces as they arrive (chunked, or up to the end of a connection without Content-Length)"""
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # Trailers (none from gunicorn) end with a blank line
+                    while (await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return
+                yield await self.reader.readexactly(size)
+                await self.reader.readline()
+        while True:
+            data = await self.reader.read(65536)
+            if not data:
+                self.close()
+                return
+            yield data
+
+    async def read_body(self, headers):
+        if 'content-length' in headers:
+            return await self.reader.readexactly(int(headers['content-length']))
+        return b''.join([piece async for piece in self.iter_body(headers)])
+
+    async def request(self, method, target, body=None, headers=None):
+        """(status, body) of one request; a keep-alive connection the server dropped while idle is reopened once"""
+        reused = self.is_open
+        if not reused:
+            await self.open()
+        try:
+            await self.send(method, target, body, headers)
+            status, response_headers = await self.read_head()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            if not reused:
+                raise
+            await self.open()
+            await self.send(method, target, body, headers)
+            status, response_headers = await self.read_head()
+        # No body on 204 and 304, whatever the headers say
+        content = b'' if status in (204, 304) else await self.read_body(response_headers)
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, content
+
+
+class BrowserConnections:
+    """A user's connections to the app, capped like a browser's; streams hold one for as long as they are open"""
+
+    def __init__(self, host, port, limit=BROWSER_CONNECTIONS):
+        self.host = host
+        self.port = port
+        self.slots = asyncio.Semaphore(limit)
+        self.idle = []
+
+    async def request(self, method, target, body=None):
+        async with self.slots:
+            connection = self.idle.pop() if self.idle else HttpConnection(self.host, self.port)
+            try:
+                result = await connection.request(method, target, body, {'Accept-Encoding': 'gzip'})
+            except BaseException:
+                connection.close()
+                raise
+            if connection.is_open:
+                self.idle.append(connection)
+            return result
+
+    def close(self):
+        for connection in self.idle:
+            connection.close()
+        self.idle = []
+
+
+class LoadTestStats:
+    """Request latencies by endpoint, stream outcomes and database connection samples of one run"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.latencies = {}
+        self.errors = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.streams = {'opened': 0, 'failed': 0, 'refused': 0, 'events': 0, 'open': 0, 'open_peak': 0}
+        self.db_samples = []
+
+    def record(self, endpoint, seconds, error=None):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if error:
+            errors = self.errors.setdefault(endpoint, {})
+            errors[error] = errors.get(error, 0) + 1
+
+    @staticmethod
+    def _percentile(ordered, share):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * share))] * 1000, 1)
+
+    def report(self):
+        elapsed = time.time() - self.started
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            endpoints[endpoint] = {
+                'count': len(ordered),
+                'errors': sum(self.errors.get(endpoint, {}).values()),
+                'error_kinds': self.errors.get(endpoint, {}),
+                'p50_ms': self._percentile(ordered, 0.50),
+                'p95_ms': self._percentile(ordered, 0.95),
+                'p99_ms': self._percentile(ordered, 0.99),
+                'max_ms': round(ordered[-1] * 1000, 1)
+            }
+        total = sum(stats['count'] for stats in endpoints.values())
+        errors = sum(stats['errors'] for stats in endpoints.values())
+        every = sorted(latency for latencies in self.latencies.values() for latency in latencies)
+        return {
+            'seconds': round(elapsed, 1),
+            'requests': total,
+            'errors': errors,
+            'requests_per_second': round(total / elapsed, 2) if elapsed else None,
+            'p50_ms': self._percentile(every, 0.50) if every else None,
+            'p95_ms': self._percentile(every, 0.95) if every else None,
+            'p99_ms': self._percentile(every, 0.99) if every else None,
+            'peak_in_flight': self.peak_in_flight,
+            'streams': self.streams,
+            'db_connections': self._db_report(),
+            'endpoints': endpoints
+        }
+
+    def _db_report(self):
+        samples = [sample for sample in self.db_samples if sample.get('db_pool_connections_in_use') is not None]
+        if not samples:
+            return None
+        in_use = [sample['db_pool_connections_in_use'] for sample in samples]
+        opened = [sample.get('db_pool_connections_open') or 0 for sample in samples]
+        return {
+            'samples': len(samples),
+            'in_use_max': max(in_use),
+            'in_use_mean': round(sum(in_use) / len(in_use), 2),
+            'open_max': max(opened),
+            # Per process: the pool size one worker needed (since the worker started)
+            'worker_checkout_peak': max(sample.get('db_pool_checkout_peak') or 0 for sample in samples)
+        }
+
+
+class LoadTest:
+    """
+    Simulated users of the dashboards against a running app.
+
+    Each user opens `tabs` pages, picked by page weight, and behaves like the
+    page's script: it sends the page's load requests, keeps its live-update
+    stream open and refetches what the page refetches for each topic. With
+    refresh='timer' the refetches follow the jobs' publish schedule (every user
+    at the same moments, compressed by time_scale); with refresh='events' they
+    follow the events the server actually streams, which needs the scheduler
+    running. Latency is timed from sending a request (after the user got a free
+    connection) to the end of its response.
+    """
+
+    DB_METRICS = ('db_pool_connections_in_use', 'db_pool_connections_open', 'db_pool_checkout_peak')
+
+    def __init__(self, base_url, trade_date, users=10, tabs=3, duration=60, ramp=10, refresh='timer',
+                 time_scale=1.0, streams=True, seed=42, timeout=30, sample_seconds=2):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.pages = build_pages(trade_date)
+        self.users = users
+        self.tabs = tabs
+        self.duration = duration
+        self.ramp = ramp
+        self.refresh = refresh
+        self.time_scale = time_scale
+        self.streams = streams
+        self.seed = seed
+        self.timeout = timeout
+        self.sample_seconds = sample_seconds
+        self.stats = LoadTestStats()
+
+    def run(self):
+        """Run the users for `duration` seconds; the stats report"""
+        asyncio.run(self._run())
+        return self.stats.report()
+
+    def page_mix(self):
+        """Pages of every user's tabs (seeded, so runs with the same options are comparable)"""
+        chooser = random.Random(self.seed)
+        names = list(self.pages)
+        weights = [self.pages[name]['weight'] for name in names]
+        return [chooser.choices(names, weights, k=self.tabs) for _ in range(self.users)]
+
+    async def _run(self):
+        self.stats = LoadTestStats()
+        tasks = [asyncio.create_task(self._sample_server())]
+        for index, pages in enumerate(self.page_mix()):
+            delay = self.ramp * index / self.users if self.users else 0
+            tasks.append(asyncio.create_task(self._user(index, pages, delay)))
+        await asyncio.sleep(self.duration)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _user(self, index, pages, delay):
+        await asyncio.sleep(delay)
+        connections = BrowserConnections(self.host, self.port)
+        chooser = random.Random(self.seed + index)
+        try:
+            await asyncio.gather(*(self._tab(connections, self.pages[name], chooser) for name in pages))
+        finally:
+            connections.close()
+
+    async def _tab(self, connections, page, chooser):
+        await self._run_steps(connections, [[('GET', page['path'])]] + page['load'])
+        tasks = []
+        if self.streams and page['topics']:
+            tasks.append(self._stream(connections, page))
+        if self.refresh == 'timer':
+            tasks += [self._timer(connections, topic, steps, chooser) for topic, steps in page['topics'].items() if steps]
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _run_steps(self, connections, steps):
+        for step in steps:
+            await asyncio.gather(*(self._fetch(connections, *request) for request in step))
+
+    async def _fetch(self, connections, method, target, body=None):
+        endpoint = f"{method} {target.split('?')[0]}"
+        stats = self.stats
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        error = None
+        started = time.perf_counter()
+        try:
+            status, _ = await asyncio.wait_for(connections.request(method, target, body), self.timeout)
+            if status >= 400:
+                error = str(status)
+        except asyncio.TimeoutError:
+            error = 'timeout'
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            error = type(e).__name__
+        finally:
+            stats.in_flight -= 1
+        stats.record(endpoint, time.perf_counter() - started, error)
+
+    async def _timer(self, connections, topic, steps, chooser):
+        period, offset = (value / self.time_scale for value in TOPIC_SCHEDULE[topic])
+        while True:
+            # Next publish on the shared schedule, so every user refetches at the same moment
+            await asyncio.sleep((offset - time.time()) % period + chooser.uniform(0, JITTER_SECONDS))
+            await self._run_steps(connections, steps)
+
+    async def _stream(self, connections, page):
+        target = f"/api/stream?{urlencode({'topics': ','.join(page['topics'])})}"
+        refetches = set()
+        while True:
+            async with connections.slots:
+                connection = HttpConnection(self.host, self.port)
+                try:
+                    await connection.open()
+                    await connection.send('GET', target, headers={'Accept': 'text/event-stream'})
+                    status, headers = await connection.read_head()
+                    if status == 503:
+                        # Worker's stream cap reached: EventSource gives up and the page polls
+                        self.stats.streams['refused'] += 1
+                        return
+                    if status != 200:
+                        raise ConnectionError(f'stream status {status}')
+                    streams = self.stats.streams
+                    streams['opened'] += 1
+                    streams['open'] += 1
+                    streams['open_peak'] = max(streams['open_peak'], streams['open'])
+                    try:
+                        buffer = b''
+                        async for data in connection.iter_body(headers):
+                            buffer += data
+                            while b'\n\n' in buffer:
+                                block, buffer = buffer.split(b'\n\n', 1)
+                                self._on_event(connections, page, block, refetches)
+                    finally:
+                        streams['open'] -= 1
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    self.stats.streams['failed'] += 1
+                finally:
+                    connection.close()
+            await asyncio.sleep(STREAM_RETRY_SECONDS)
+
+    def _on_event(self, connections, page, block, refetches):
+        topic, data = None, None
+        for line in block.decode('utf-8', 'replace').splitlines():
+            if line.startswith('event:'):
+                topic = line[len('event:'):].strip()
+            elif line.startswith('data:'):
+                data = line[len('data:'):].strip()
+        if topic is None:
+            return
+        self.stats.streams['events'] += 1
+        if self.refresh != 'events' or not page['topics'].get(topic):
+            return
+        # The snapshot sent on connect is what the page already loaded
+        if data and json.loads(data).get('initial'):
+            return
+        task = asyncio.create_task(self._run_steps(connections, page['topics'][topic]))
+        refetches.add(task)
+        task.add_done_callback(refetches.discard)
+
+    async def _sample_server(self):
+        """Database connection gauges from /metrics (all workers merged) every sample_seconds"""
+        connection = HttpConnection(self.host, self.port)
+        try:
+            while True:
+                try:
+                    status, content = await connection.request('GET', '/metrics')
+                    if status == 200:
+                        sample = parse_metrics(content.decode(), self.DB_METRICS)
+                        sample['at'] = round(time.time() - self.stats.started, 1)
+                        self.stats.db_samples.append(sample)
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    connection.close()
+                await asyncio.sleep(self.sample_seconds)
+        finally:
+            connection.close()
+
+
+def parse_metrics(text, names):
+    """Values of unlabelled metrics in Prometheus text format; None for the ones missing"""
+    values = dict.fromkeys(names)
+    for line in text.splitlines():
+        name, _, value = line.partition(' ')
+        if name in values:
+            values[name] = float(value)
+    return values
@@ -4,10 +4,9 @@ import pandas as pd
 import pytz
 from datetime import datetime, timedelta
 from typing import Dict, Optional
-from app.models.nifty_price import NiftyPrice
-from app.models.banknifty_price import BankNiftyPrice
-from app import db
+from app.services.column_query_service import ColumnQueryService
 import numpy as np
+from app.utils import clock
 
 class MacdCacheService:
     """Fast MACD calculation service using file-based caching"""
@@ -16,6 +15,7 @@ class MacdCacheService:
         self.cache_dir = 'storage/macd_cache'
         self.ensure_cache_dir()
         self.ist = pytz.timezone('Asia/Kolkata')
+        self.column_queries = ColumnQueryService()
         
     def ensure_cache_dir(self):
         """Ensure cache directory exists"""
@@ -38,7 +38,7 @@ class MacdCacheService:
                 
             # Check if cache is recent (less than 2 minutes old)
             cache_time = datetime.fromisoformat(data['last_updated'])
-            if datetime.utcnow() - cache_time > timedelta(minutes=2):
+            if clock.utcnow() - cache_time > timedelta(minutes=2):
                 return None
                 
             return data
@@ -51,7 +51,7 @@ class MacdCacheService:
         cache_file = self.get_cache_file_path(symbol, timeframe)
         
         try:
-            macd_data['last_updated'] = datetime.utcnow().isoformat()
+            macd_data['last_updated'] = clock.utcnow().isoformat()
             
             with open(cache_file, 'w') as f:
                 json.dump(macd_data, f, indent=2)
@@ -62,34 +62,16 @@ class MacdCacheService:
     def calculate_fresh_macd(self, symbol: str, timeframe: int) -> Dict:
         """Calculate fresh MACD data (super optimized version)"""
         try:
-            # Handle different symbols with their respective tables
-            if symbol.upper() == 'NIFTY':
-                # Use NIFTY price table
-                prices = db.session.query(NiftyPrice).filter(
-                    NiftyPrice.symbol == 'NIFTY 50'
-                ).order_by(NiftyPrice.timestamp.desc()).limit(3000).all()
-            elif symbol.upper() == 'BANKNIFTY':
-                # Use BANKNIFTY price table
-                from app.models.banknifty_price import BankNiftyPrice
-                prices = db.session.query(BankNiftyPrice).order_by(
-                    BankNiftyPrice.timestamp.desc()
-                ).limit(3000).all()
-            else:
-                # Default to NIFTY
-                prices = db.session.query(NiftyPrice).filter(
-                    NiftyPrice.symbol == 'NIFTY 50'
-                ).order_by(NiftyPrice.timestamp.desc()).limit(3000).all()
-            
-            if len(prices) < 100:
-                raise ValueError(f'Insufficient data: {len(prices)} records')
-            
-            # Convert to DataFrame (optimized processing)
-            # Use list comprehension for speed
-            price_data = [(p.timestamp, float(p.price)) for p in reversed(prices)]
-            df = pd.DataFrame(price_data, columns=['timestamp', 'price'])
+            # Latest 3000 ticks, timestamp and price columns only (no ORM objects);
+            # unknown symbols default to NIFTY
+            df = self.column_queries.index_price_frame(
+                symbol='BANKNIFTY' if symbol.upper() == 'BANKNIFTY' else 'NIFTY',
+                series='NIFTY 50',
+                limit=3000
+            )
             
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df.set_index('timestamp', inplace=True)
+            if len(df) < 100:
+                raise ValueError(f'Insufficient data: {len(df)} records')
             
             # Apply IST timezone (faster method)
             if df.index.tz is None:
@@ -230,7 +212,7 @@ class MacdCacheService:
     def cleanup_old_cache(self, max_age_hours: int = 24):
         """Remove old cache files"""
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=max_age_hours)
+            cutoff_time = clock.utcnow() - timedelta(hours=max_age_hours)
             
             for filename in os.listdir(self.cache_dir):
                 if filename.endswith('.json'):
@@ -2,8 +2,12 @@ from app.models.nifty_price import NiftyPrice
 from app.models.banknifty_price import BankNiftyPrice, OptionChainData, MarketTrend
 from app.models.futures_oi_data import FuturesOIData
 from app.services.kite_service import KiteService
+from app.services.futures_buildup_service import FuturesBuildupService
 from app import db
+from app.utils.pagination import keyset_page
 from datetime import datetime, timedelta
+from app.utils import clock
+from app.services.job_trace_service import span
 
 class MarketService:
     def __init__(self):
@@ -11,10 +15,12 @@ class MarketService:
     
     def fetch_and_save_nifty_price(self):
         try:
-            price_data = self.kite_service.get_nifty_price()
+            with span('fetch_quote'):
+                price_data = self.kite_service.get_nifty_price()
             
             if price_data:
-                NiftyPrice.save_price(price_data)
+                with span('save_price'):
+                    NiftyPrice.save_price(price_data)
                 return price_data
             return None
         except Exception as e:
@@ -23,10 +29,12 @@ class MarketService:
     
     def fetch_and_save_banknifty_price(self):
         try:
-            price_data = self.kite_service.get_banknifty_price()
+            with span('fetch_quote'):
+                price_data = self.kite_service.get_banknifty_price()
             
             if price_data:
-                BankNiftyPrice.save_price(price_data)
+                with span('save_price'):
+                    BankNiftyPrice.save_price(price_data)
                 return price_data
             return None
         except Exception as e:
@@ -36,18 +44,21 @@ class MarketService:
     def fetch_and_save_option_chain(self, underlying="NIFTY"):
         """Fetch and save option chain data for given underlying - real data only"""
         try:
-            option_chain_data = self.kite_service.get_option_chain_data(underlying)
+            with span('fetch_chain'):
+                option_chain_data = self.kite_service.get_option_chain_data(underlying)
             
             if option_chain_data:
                 saved_count = 0
-                for option_data in option_chain_data:
-                    OptionChainData.save_option_data(option_data)
-                    saved_count += 1
+                with span('save_chain', rows=len(option_chain_data)):
+                    for option_data in option_chain_data:
+                        OptionChainData.save_option_data(option_data)
+                        saved_count += 1
                 
                 # Calculate and save market trend
-                trend_data = self.kite_service.calculate_market_trend(option_chain_data, underlying)
-                if trend_data:
-                    MarketTrend.save_trend_data(trend_data)
+                with span('trend'):
+                    trend_data = self.kite_service.calculate_market_trend(option_chain_data, underlying)
+                    if trend_data:
+                        MarketTrend.save_trend_data(trend_data)
                 
                 print(f"Saved {saved_count} option chain records for {underlying}")
                 return option_chain_data
@@ -61,21 +72,26 @@ class MarketService:
     def fetch_and_save_futures_data(self, underlying="NIFTY"):
         """Fetch and save futures OI data for given underlying"""
         try:
-            futures_data = self.kite_service.get_futures_data(underlying)
+            with span('fetch_futures'):
+                futures_data = self.kite_service.get_futures_data(underlying)
             
             if futures_data:
-                # Create FuturesOIData instance and save
-                futures_record = FuturesOIData(
-                    underlying=underlying,
-                    expiry_date=futures_data.get('expiry_date'),
-                    futures_price=futures_data.get('futures_price', 0),
-                    open_interest=futures_data.get('open_interest', 0),
-                    volume=futures_data.get('volume', 0),
-                    timestamp=datetime.utcnow()
-                )
-                
-                db.session.add(futures_record)
-                db.session.commit()
+                with span('save_futures'):
+                    # Create FuturesOIData instance and save
+                    futures_record = FuturesOIData(
+                        underlying=underlying,
+                        expiry_date=futures_data.get('expiry_date'),
+                        futures_price=futures_data.get('futures_price', 0),
+                        open_interest=futures_data.get('open_interest', 0),
+                        volume=futures_data.get('volume', 0),
+                        timestamp=clock.utcnow()
+                    )
+                    
+                    # Deltas and buildup classification against the previous stored row
+                    FuturesBuildupService.prepare_record(futures_record)
+                    
+                    db.session.add(futures_record)
+                    db.session.commit()
                 
                 print(f"Saved futures data for {underlying}: Price={futures_data.get('futures_price')}, OI={futures_data.get('open_interest')}")
                 return futures_data
@@ -87,24 +103,31 @@ class MarketService:
             db.session.rollback()
             return None
     
-    def get_latest_prices(self, limit=100):
-        return NiftyPrice.get_latest_prices(limit)
+    def get_latest_prices(self, limit=100, cursor=None, since=None):
+        """Newest NIFTY prices first; cursor pages to older rows, since keeps only newer ones"""
+        return keyset_page(
+            NiftyPrice.query, NiftyPrice.timestamp, NiftyPrice.id,
+            limit=limit, cursor=cursor, since=since, descending=True
+        )
     
     def get_latest_banknifty_prices(self, limit=100):
         return BankNiftyPrice.get_latest_prices(limit)
     
-    def get_price_history(self, hours=24):
+    def get_price_history(self, hours=24, limit=None, cursor=None, since=None):
+        """NIFTY prices of the last `hours`, newest first, as (rows, page meta)"""
         from datetime import datetime, timedelta
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        cutoff_time = clock.utcnow() - timedelta(hours=hours)
         
-        prices = NiftyPrice.query.filter(
-            NiftyPrice.timestamp >= cutoff_time
-        ).order_by(NiftyPrice.timestamp.desc()).all()
+        prices, page = keyset_page(
+            NiftyPrice.query.filter(NiftyPrice.timestamp >= cutoff_time),
+            NiftyPrice.timestamp, NiftyPrice.id,
+            limit=limit, cursor=cursor, since=since, descending=True
+        )
         
-        return [price.to_dict() for price in prices]
+        return [price.to_dict() for price in prices], page
     
     def get_banknifty_price_history(self, hours=24):
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        cutoff_time = clock.utcnow() - timedelta(hours=hours)
         
         prices = BankNiftyPrice.query.filter(
             BankNiftyPrice.timestamp >= cutoff_time
@@ -178,7 +201,7 @@ class MarketService:
                 model = BankNiftyPrice
             
             # Use provided date or default to today
-            target_date = target_date or date.today()
+            target_date = target_date or clock.today()
             print(f"DEBUG: Getting {underlying} price for date: {target_date}")
             
             # Get latest price for the target date
@@ -233,7 +256,7 @@ class MarketService:
         """Get comprehensive dashboard data for new dashboard with date filtering"""
         try:
             # Use end_date for getting the latest prices on that specific day
-            target_date = end_date.date() if end_date else None
+            target_date = end_date.date() if isinstance(end_date, datetime) else end_date
             
             # Get latest prices with daily change calculation for the target date
             nifty_price = self._get_price_with_daily_change('NIFTY', target_date)
@@ -288,7 +311,7 @@ class MarketService:
         """Get current market status"""
         import pytz
         ist = pytz.timezone('Asia/Kolkata')
-        current_time = datetime.now(ist)
+        current_time = clock.now(ist)
         current_hour = current_time.hour
         current_minute = current_time.minute
         
@@ -313,7 +336,7 @@ class MarketService:
             
             # Get aggregated OI changes by timestamp for NIFTY from today starting 9:20 AM
             from datetime import date, datetime, time
-            today = date.today()
+            today = clock.today()
             market_start_time = datetime.combine(today, time(9, 20))
             
             # Group by 5-minute intervals for better chart readability
@@ -387,7 +410,7 @@ class MarketService:
             
             # Get aggregated OI changes by timestamp for BANKNIFTY from today starting 9:20 AM
             from datetime import date, datetime, time
-            today = date.today()
+            today = clock.today()
             market_start_time = datetime.combine(today, time(9, 20))
             
             # Group by 1-minute intervals for better chart readability
@@ -713,7 +736,7 @@ class MarketService:
                 'calculation_breakdown': calculation_breakdown,
                 'total_possible_score': 200,  # Updated for 5 factors (40+40+30+30+40)
                 'method': '4_factor_analysis_v1',
-                'timestamp': datetime.utcnow()
+                'timestamp': clock.utcnow()
             }
             
         except Exception as e:
@@ -724,7 +747,7 @@ class MarketService:
                 'signal_color': '#ff0000',
                 'details': {'error': str(e)},
                 'calculation_breakdown': {'error': str(e)},
-                'timestamp': datetime.utcnow()
+                'timestamp': clock.utcnow()
             }
     
     def _analyze_oi_sentiment(self, underlying):
@@ -733,7 +756,7 @@ class MarketService:
             # Get latest OI data
             latest_oi = OptionChainData.query.filter(
                 OptionChainData.underlying == underlying,
-                OptionChainData.timestamp >= datetime.utcnow() - timedelta(hours=1)
+                OptionChainData.timestamp >= clock.utcnow() - timedelta(hours=1)
             ).all()
             
             if not latest_oi:
@@ -815,7 +838,7 @@ class MarketService:
             from sqlalchemy import func
             
             # Get target day data only (from 00:00:00 target date)
-            today = target_date or date.today()
+            today = target_date or clock.today()
             today_start = datetime.combine(today, datetime.min.time())
             
             print(f"DEBUG: Analyzing {underlying} OI changes for today: {today}")
@@ -961,7 +984,7 @@ class MarketService:
             from sqlalchemy import func
             
             # Get current day data only
-            today = date.today()
+            today = clock.today()
             today_start = datetime.combine(today, datetime.min.time())
             
             results = {'NIFTY': [], 'BANKNIFTY': []}
@@ -0,0 +1,151 @@
+"""
+Market Signal Snapshot Service
+Materialises the 5-factor market signal score once per ingestion cycle so the API can serve it without recomputing
+"""
+
+import json
+from app import db
+from app.models.market_signal_snapshot import MarketSignalSnapshot
+from app.services.shared_cache import SharedCache
+from app.services.metrics_service import metrics
+from app.utils.datetime_utils import utc_to_ist
+from app.utils import clock
+
+
+class MarketSignalSnapshotService:
+    """Service to precompute, store and serve market signal snapshots"""
+
+    # Keep only a handful of dates in the shared cache
+    MAX_CACHED_DATES = 7
+
+    # Today's signal is republished every option chain cycle (2 minutes); after this
+    # many seconds without a publish, readers fall back to the table
+    REFRESH_SECONDS = 150
+
+    def __init__(self):
+        # Latest signal per trade date, shared by every worker process
+        self.cache = SharedCache('market_signal', max_entries=self.MAX_CACHED_DATES)
+
+    def materialize(self, target_date=None):
+        """Compute the market signal for target_date, store it and publish it as the latest value"""
+        from app.services.market_service import MarketService
+
+        trade_date = target_date or clock.today()
+        signal_data = self._serialize(MarketService().get_market_signal_analysis(target_date=target_date))
+
+        if signal_data.get('signal_text') == 'ERROR':
+            print(f"Market signal snapshot skipped: {signal_data.get('details', {}).get('error')}")
+            return signal_data
+
+        try:
+            latest = MarketSignalSnapshot.get_latest(trade_date)
+            if latest and self._same_signal(latest, signal_data):
+                # Nothing moved since the previous cycle (e.g. outside market hours)
+                signal_data['snapshot_time'] = latest.timestamp.isoformat()
+            else:
+                snapshot = self._build_snapshot(trade_date, signal_data)
+                db.session.add(snapshot)
+                db.session.commit()
+                signal_data['snapshot_time'] = snapshot.timestamp.isoformat()
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error saving market signal snapshot: {str(e)}")
+
+        self._publish(trade_date, signal_data)
+        return signal_data
+
+    def get_signal(self, target_date=None):
+        """
+        Latest market signal for a trade date.
+
+        Served from the shared cache when fresh, otherwise from the latest stored
+        snapshot; only dates that have never been materialised are computed on demand.
+        A past date is computed without storing a snapshot: a row stamped now would
+        land in that day's intraday history after its session closed.
+        """
+        trade_date = target_date or clock.today()
+
+        signal_data = self.cache.get(trade_date.isoformat())
+        if signal_data is not None:
+            metrics.inc('cache_requests_total', cache='market_signal', key='signal', outcome='hits')
+            return signal_data
+        metrics.inc('cache_requests_total', cache='market_signal', key='signal', outcome='misses')
+
+        snapshot = MarketSignalSnapshot.get_latest(trade_date)
+        if snapshot:
+            signal_data = snapshot.get_payload()
+            signal_data['snapshot_time'] = snapshot.timestamp.isoformat()
+            self._publish(trade_date, signal_data)
+            return signal_data
+
+        if trade_date < clock.today():
+            return self._compute_past(trade_date)
+        return self.materialize(trade_date)
+
+    def _compute_past(self, trade_date):
+        """Signal of a closed session, cached for every worker but not stored as a snapshot"""
+        from app.services.market_service import MarketService
+
+        signal_data = self._serialize(MarketService().get_market_signal_analysis(target_date=trade_date))
+        if signal_data.get('signal_text') != 'ERROR':
+            self._publish(trade_date, signal_data)
+        return signal_data
+
+    def get_history(self, target_date=None):
+        """Intraday history of the signal score for charting"""
+        trade_date = target_date or clock.today()
+        snapshots = MarketSignalSnapshot.get_history(trade_date)
+
+        return {
+            'trade_date': trade_date.isoformat(),
+            'labels': [utc_to_ist(s.timestamp).strftime('%H:%M') for s in snapshots],
+            'scores': [s.signal_score for s in snapshots],
+            'signal_texts': [s.signal_text for s in snapshots],
+            'signal_colors': [s.signal_color for s in snapshots],
+            'nifty_change': [s.nifty_change for s in snapshots],
+            'banknifty_change': [s.banknifty_change for s in snapshots],
+            'net_influence': [s.net_influence for s in snapshots],
+            'count': len(snapshots)
+        }
+
+    def _publish(self, trade_date, signal_data):
+        """Publish the latest signal for a date to every worker; past dates do not expire"""
+        ttl = self.REFRESH_SECONDS if trade_date == clock.today() else None
+        self.cache.set(trade_date.isoformat(), signal_data, ttl=ttl)
+
+    @staticmethod
+    def _serialize(signal_data):
+        """Round-trip through JSON so memory, table and API all carry the same shape"""
+        return json.loads(json.dumps(signal_data, default=lambda o: o.isoformat() if hasattr(o, 'isoformat') else str(o)))
+
+    @staticmethod
+    def _factor_score(signal_data, factor):
+        return signal_data.get('calculation_breakdown', {}).get(factor, {}).get('score')
+
+    def _build_snapshot(self, trade_date, signal_data):
+        details = signal_data.get('details', {})
+        return MarketSignalSnapshot(
+            trade_date=trade_date,
+            signal_score=int(signal_data.get('signal_score', 0)),
+            signal_text=signal_data.get('signal_text', 'NEUTRAL'),
+            signal_color=signal_data.get('signal_color', '#ffd700'),
+            nifty_change=details.get('nifty_change'),
+            banknifty_change=details.get('banknifty_change'),
+            nifty_oi_score=self._factor_score(signal_data, 'nifty_oi'),
+            banknifty_oi_score=self._factor_score(signal_data, 'banknifty_oi'),
+            net_influence=details.get('net_influence', {}).get('value'),
+            payload=json.dumps(signal_data),
+            timestamp=clock.utcnow()
+        )
+
+    def _same_signal(self, snapshot, signal_data):
+        details = signal_data.get('details', {})
+        return (
+            snapshot.signal_score == int(signal_data.get('signal_score', 0)) and
+            snapshot.nifty_change == details.get('nifty_change') and
+            snapshot.banknifty_change == details.get('banknifty_change') and
+            snapshot.nifty_oi_score == self._factor_score(signal_data, 'nifty_oi') and
+            snapshot.banknifty_oi_score == self._factor_score(signal_data, 'banknifty_oi') and
+            snapshot.net_influence == details.get('net_influence', {}).get('value')
+        )
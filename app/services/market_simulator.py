@@ -0,0 +1,543 @@
+"""
+Market Simulator
+Deterministic synthetic NIFTY/BANKNIFTY index paths, option chains and futures for offline testing
+"""
+
+import hashlib
+import math
+from datetime import datetime, date, time as dt_time, timedelta, timezone
+from functools import lru_cache
+import numpy as np
+
+IST = timezone(timedelta(hours=5, minutes=30))
+SESSION_OPEN = dt_time(9, 15)
+SESSION_MINUTES = 375  # 09:15 to 15:30 IST, one mark per minute including both ends
+TRADING_DAYS = 252
+REFERENCE_DATE = date(2024, 1, 1)
+
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+
+def _norm_cdf(x):
+    return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+
+
+class MarketSimulator:
+    """
+    Synthetic market for one seed: every value is a pure function of (seed,
+    instrument, trade date, minute), so two runs with the same seed see the same
+    market and any minute can be asked for in any order.
+
+    - Index: daily closes follow a geometric Brownian motion from REFERENCE_DATE;
+      each session is a Brownian bridge from the gapped open to that close, with
+      the U-shaped intraday volatility of Indian index sessions.
+    - Options: Black-Scholes prices off the index with a volatility smile, weekly
+      (Thursday) expiries. Open interest starts from a profile concentrated near
+      the money (calls above spot, puts below), builds through the day and is
+      written into the side the index moves against; volume is cumulative and
+      heavier near the money, at the open/close and on large moves.
+    - Futures: spot carried to the monthly (last Thursday) expiry plus a
+      mean-reverting basis, with OI that builds with the trend.
+
+    Timestamps in and out are naive UTC datetimes, as the app stores them.
+    """
+
+    UNDERLYINGS = {
+        'NIFTY': {
+            'spot': 24000.0, 'vol': 0.13, 'strike_interval': 50, 'lot_size': 75,
+            'quote_symbol': 'NSE:NIFTY 50', 'instrument_token': 256265, 'oi_scale': 4_000_000
+        },
+        'BANKNIFTY': {
+            'spot': 52000.0, 'vol': 0.16, 'strike_interval': 100, 'lot_size': 35,
+            'quote_symbol': 'NSE:NIFTY BANK', 'instrument_token': 260105, 'oi_scale': 1_500_000
+        }
+    }
+
+    RATE = 0.065           # risk-free rate for option and futures carry
+    IV_PREMIUM = 1.1       # implied over realised volatility
+    SMILE = (0.05, -0.04)  # quadratic and linear smile terms in standardised moneyness
+
+    def __init__(self, seed=42, drift=0.10):
+        self.seed = seed
+        self.drift = drift
+
+    # ------------------------------------------------------------------
+    # Clock helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def to_ist(timestamp):
+        """Naive UTC (or aware) datetime to aware IST"""
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.astimezone(IST)
+
+    @staticmethod
+    def is_trading_day(day):
+        return day.weekday() < 5
+
+    @classmethod
+    def previous_trading_day(cls, day):
+        day -= timedelta(days=1)
+        while not cls.is_trading_day(day):
+            day -= timedelta(days=1)
+        return day
+
+    @classmethod
+    def session_minute(cls, timestamp):
+        """
+        (trade date, minute index 0..SESSION_MINUTES) the market shows at a UTC timestamp.
+
+        Before the open or on a holiday the previous session's close is shown,
+        after the close the day's close, as a live quote would.
+        """
+        ist = cls.to_ist(timestamp)
+        day = ist.date()
+        if not cls.is_trading_day(day):
+            return cls.previous_trading_day(day), SESSION_MINUTES
+        minutes = (ist.hour * 60 + ist.minute) - (SESSION_OPEN.hour * 60 + SESSION_OPEN.minute)
+        if minutes < 0:
+            return cls.previous_trading_day(day), SESSION_MINUTES
+        return day, min(minutes, SESSION_MINUTES)
+
+    @staticmethod
+    def minute_timestamp(day, minute):
+        """Naive UTC datetime of a session minute"""
+        ist = datetime.combine(day, SESSION_OPEN, tzinfo=IST) + timedelta(minutes=minute)
+        return ist.astimezone(timezone.utc).replace(tzinfo=None)
+
+    @classmethod
+    def session_timestamps(cls, day, step=1):
+        return [cls.minute_timestamp(day, m) for m in range(0, SESSION_MINUTES + 1, step)]
+
+    @staticmethod
+    def weekly_expiry(day):
+        """Next Thursday on or after day (the app's default weekly expiry)"""
+        return day + timedelta(days=(3 - day.weekday()) % 7)
+
+    @staticmethod
+    def monthly_expiry(year, month):
+        """Last Thursday of a month"""
+        last = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1))
+        return last - timedelta(days=(last.weekday() - 3) % 7)
+
+    @classmethod
+    def futures_expiry(cls, day):
+        expiry = cls.monthly_expiry(day.year, day.month)
+        if expiry < day:
+            expiry = cls.monthly_expiry(day.year + day.month // 12, day.month % 12 + 1)
+        return expiry
+
+    # ------------------------------------------------------------------
+    # Random streams
+    # ------------------------------------------------------------------
+
+    def _rng(self, *parts):
+        """Independent generator for a named stream (stable across processes, unlike hash())"""
+        digest = hashlib.blake2b(repr((self.seed,) + parts).encode('utf-8'), digest_size=16).digest()
+        return np.random.default_rng(int.from_bytes(digest, 'little'))
+
+    @staticmethod
+    def _intraday_weights():
+        """Relative volatility per minute: high after the open and into the close"""
+        t = np.linspace(0.0, 1.0, SESSION_MINUTES)
+        return 0.7 + 1.6 * (t - 0.5) ** 2 + 0.8 * np.exp(-t * 25)
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    @lru_cache(maxsize=64)
+    def daily_closes(self, underlying, until):
+        """{trade date: close} from REFERENCE_DATE to until (GBM on trading days)"""
+        params = self.UNDERLYINGS[underlying]
+        days = []
+        day = REFERENCE_DATE
+        while day <= until:
+            if self.is_trading_day(day):
+                days.append(day)
+            day += timedelta(days=1)
+
+        sigma = params['vol'] / math.sqrt(TRADING_DAYS)
+        mu = self.drift / TRADING_DAYS - sigma ** 2 / 2
+        returns = self._rng('daily', underlying).normal(mu, sigma, size=len(days) + 1)[:len(days)]
+        closes = params['spot'] * np.exp(np.cumsum(returns))
+        return dict(zip(days, closes))
+
+    @lru_cache(maxsize=256)
+    def index_path(self, underlying, day):
+        """Index level at each session minute of a trade date (SESSION_MINUTES + 1 values)"""
+        closes = self.daily_closes(underlying, day)
+        if day not in closes:
+            raise ValueError(f'{day} is not a trading day')
+        previous = self.previous_trading_day(day)
+        previous_close = closes.get(previous, self.UNDERLYINGS[underlying]['spot'])
+
+        rng = self._rng('intraday', underlying, day.toordinal())
+        sigma = self.UNDERLYINGS[underlying]['vol'] / math.sqrt(TRADING_DAYS)
+        log_open = math.log(previous_close) + rng.normal(0, sigma * 0.3)
+        log_close = math.log(closes[day])
+
+        # Brownian bridge from the open to the close with the intraday volatility shape
+        weights = self._intraday_weights()
+        steps = rng.normal(0, 1, SESSION_MINUTES) * weights
+        steps *= sigma / math.sqrt(np.sum(weights ** 2))
+        walk = np.concatenate([[0.0], np.cumsum(steps)])
+        fraction = np.linspace(0.0, 1.0, SESSION_MINUTES + 1)
+        bridge = walk - fraction * walk[-1]
+        return np.exp(log_open + fraction * (log_close - log_open) + bridge)
+
+    def index_bar(self, underlying, day, minute):
+        """OHLC of one session minute"""
+        path = self.index_path(underlying, day)
+        close = float(path[minute])
+        open_ = float(path[minute - 1]) if minute > 0 else close
+        wick = abs(self._rng('wick', underlying, day.toordinal()).normal(0, 0.0002, SESSION_MINUTES + 1)[minute])
+        return {
+            'open': open_,
+            'high': max(open_, close) * (1 + wick),
+            'low': min(open_, close) * (1 - wick),
+            'close': close
+        }
+
+    def index_quote(self, underlying, timestamp):
+        """Spot, day OHLC and previous close at a timestamp"""
+        day, minute = self.session_minute(timestamp)
+        path = self.index_path(underlying, day)[:minute + 1]
+        previous_close = self.daily_closes(underlying, day).get(
+            self.previous_trading_day(day), self.UNDERLYINGS[underlying]['spot']
+        )
+        price = float(path[-1])
+        return {
+            'trade_date': day,
+            'minute': minute,
+            'timestamp': self.minute_timestamp(day, minute),
+            'last_price': round(price, 2),
+            'open': round(float(path[0]), 2),
+            'high': round(float(path.max()), 2),
+            'low': round(float(path.min()), 2),
+            'previous_close': round(float(previous_close), 2),
+            'net_change': round(price - previous_close, 2),
+            'change_percent': round((price / previous_close - 1) * 100, 2)
+        }
+
+    # ------------------------------------------------------------------
+    # Options
+    # ------------------------------------------------------------------
+
+    def implied_vol(self, underlying, spot, strike, years):
+        base = self.UNDERLYINGS[underlying]['vol'] * self.IV_PREMIUM
+        moneyness = math.log(strike / spot) / (base * math.sqrt(years))
+        quadratic, linear = self.SMILE
+        return max(base * (1 + quadratic * moneyness ** 2 + linear * moneyness), base * 0.5)
+
+    def option_price(self, underlying, spot, strike, years, option_type):
+        """Black-Scholes premium (rounded to the 0.05 tick) and the volatility used"""
+        iv = self.implied_vol(underlying, spot, strike, years)
+        sd = iv * math.sqrt(years)
+        d1 = (math.log(spot / strike) + (self.RATE + iv ** 2 / 2) * years) / sd
+        d2 = d1 - sd
+        discount = math.exp(-self.RATE * years)
+        if option_type == 'CE':
+            price = spot * _norm_cdf(d1) - strike * discount * _norm_cdf(d2)
+        else:
+            price = strike * discount * _norm_cdf(-d2) - spot * _norm_cdf(-d1)
+        return max(round(round(price / 0.05) * 0.05, 2), 0.05), iv
+
+    @staticmethod
+    def _years_to(expiry, day, minute):
+        """Year fraction from a session minute to 15:30 IST on expiry (at least one minute)"""
+        minutes_left = (expiry - day).days * 24 * 60 + (SESSION_MINUTES - minute)
+        return max(minutes_left, 1) / (365 * 24 * 60)
+
+    @lru_cache(maxsize=4096)
+    def _open_interest_path(self, underlying, day, expiry, strike, option_type):
+        """OI and cumulative volume of one contract at each session minute"""
+        params = self.UNDERLYINGS[underlying]
+        path = self.index_path(underlying, day)
+        spot_open = float(path[0])
+        interval = params['strike_interval']
+        rng = self._rng('oi', underlying, day.toordinal(), expiry.toordinal(), strike, option_type)
+
+        # Opening OI: writers sit above spot in calls and below it in puts; round strikes draw more
+        distance = (strike - spot_open) / (interval * 6)
+        side = distance if option_type == 'CE' else -distance
+        profile = math.exp(-0.5 * (side - 0.8) ** 2) + 0.15 * math.exp(-0.5 * distance ** 2)
+        if strike % (interval * 2) == 0:
+            profile *= 1.3
+        oi_open = params['oi_scale'] * profile * rng.uniform(0.7, 1.3) + params['lot_size'] * 100
+
+        # Intraday: steady build-up, writing against the move, noise
+        returns = np.diff(np.log(path))
+        against = -returns if option_type == 'CE' else returns
+        flow = 0.0004 + 6.0 * against + rng.normal(0, 0.002, SESSION_MINUTES)
+        oi = oi_open * np.exp(np.concatenate([[0.0], np.cumsum(flow)]))
+        oi = np.maximum(np.round(oi / params['lot_size']) * params['lot_size'], params['lot_size'])
+
+        # Volume: heavier near the money, at the open and close, and on large moves
+        atm_weight = math.exp(-0.5 * (distance * 1.5) ** 2) + 0.05
+        per_minute = (
+            params['oi_scale'] * 0.004 * atm_weight * self._intraday_weights()
+            * (1 + 400 * np.abs(returns)) * rng.lognormal(0, 0.4, SESSION_MINUTES)
+        )
+        volume = np.concatenate([[0.0], np.cumsum(np.round(per_minute / params['lot_size']) * params['lot_size'])])
+        return oi.astype(np.int64), volume.astype(np.int64)
+
+    def option_quote(self, underlying, strike, option_type, expiry, timestamp):
+        """Premium, IV, OI and volume of one option contract at a timestamp"""
+        day, minute = self.session_minute(timestamp)
+        if expiry < day:
+            raise ValueError(f'{underlying} {strike}{option_type} expired on {expiry}')
+        path = self.index_path(underlying, day)
+        spot = float(path[minute])
+        years = self._years_to(expiry, day, minute)
+        price, iv = self.option_price(underlying, spot, strike, years, option_type)
+        oi, volume = self._open_interest_path(underlying, day, expiry, float(strike), option_type)
+
+        previous_day = self.previous_trading_day(day)
+        previous_close, _ = self.option_price(
+            underlying,
+            float(self.index_path(underlying, previous_day)[-1]) if previous_day >= REFERENCE_DATE else spot,
+            strike, self._years_to(expiry, previous_day, SESSION_MINUTES), option_type
+        )
+        open_price, _ = self.option_price(underlying, float(path[0]), strike, self._years_to(expiry, day, 0), option_type)
+
+        return {
+            'last_price': price,
+            'iv': round(iv * 100, 2),
+            'oi': int(oi[minute]),
+            'oi_day_high': int(oi[:minute + 1].max()),
+            'oi_day_low': int(oi[:minute + 1].min()),
+            'volume': int(volume[minute]),
+            'open': open_price,
+            'previous_close': previous_close,
+            'net_change': round(price - previous_close, 2),
+            'timestamp': self.minute_timestamp(day, minute)
+        }
+
+    def option_chain(self, underlying, timestamp, strikes_each_side=10, expiry=None):
+        """
+        One row per strike around the money, shaped like the rows the option chain
+        job stores (OptionChainData columns; oi_change is left to the caller).
+        """
+        params = self.UNDERLYINGS[underlying]
+        day, minute = self.session_minute(timestamp)
+        expiry = expiry or self.weekly_expiry(day)
+        spot = float(self.index_path(underlying, day)[minute])
+        interval = params['strike_interval']
+        atm = round(spot / interval) * interval
+
+        rows = []
+        for offset in range(-strikes_each_side, strikes_each_side + 1):
+            strike = float(atm + offset * interval)
+            row = {
+                'underlying': underlying,
+                'strike_price': strike,
+                'expiry_date': expiry,
+                'is_current_expiry': True,
+                'timestamp': self.minute_timestamp(day, minute)
+            }
+            for option_type in ('CE', 'PE'):
+                quote = self.option_quote(underlying, strike, option_type, expiry, timestamp)
+                prefix = option_type.lower()
+                symbol = self.option_symbol(underlying, expiry, strike, option_type)
+                row.update({
+                    f'{prefix}_oi': quote['oi'],
+                    f'{prefix}_volume': quote['volume'],
+                    f'{prefix}_ltp': quote['last_price'],
+                    f'{prefix}_change': quote['net_change'],
+                    f'{prefix}_change_percent': round(quote['net_change'] / quote['previous_close'] * 100, 2),
+                    f'{prefix}_iv': quote['iv'],
+                    f'{prefix}_strike_symbol': f'NFO:{symbol}',
+                    f'{prefix}_instrument_token': str(self.instrument_token(symbol))
+                })
+            rows.append(row)
+        return rows
+
+    # ------------------------------------------------------------------
+    # Futures
+    # ------------------------------------------------------------------
+
+    @lru_cache(maxsize=64)
+    def _futures_path(self, underlying, day, expiry):
+        params = self.UNDERLYINGS[underlying]
+        path = self.index_path(underlying, day)
+        rng = self._rng('futures', underlying, day.toordinal(), expiry.toordinal())
+
+        years = np.array([self._years_to(expiry, day, m) for m in range(SESSION_MINUTES + 1)])
+        basis = np.zeros(SESSION_MINUTES + 1)
+        noise = rng.normal(0, 0.00015, SESSION_MINUTES)
+        for i in range(1, SESSION_MINUTES + 1):
+            basis[i] = basis[i - 1] * 0.95 + noise[i - 1]
+        prices = np.round(path * np.exp(self.RATE * years + basis) / 0.05) * 0.05
+
+        returns = np.diff(np.log(path))
+        trend = np.sign(np.cumsum(returns))
+        flow = 0.0002 + 0.0005 * trend * np.abs(returns) * 400 + rng.normal(0, 0.001, SESSION_MINUTES)
+        oi = params['oi_scale'] * 3 * np.exp(np.concatenate([[0.0], np.cumsum(flow)]))
+        oi = np.round(oi / params['lot_size']) * params['lot_size']
+        per_minute = params['oi_scale'] * 0.01 * self._intraday_weights() * rng.lognormal(0, 0.3, SESSION_MINUTES)
+        volume = np.concatenate([[0.0], np.cumsum(np.round(per_minute / params['lot_size']) * params['lot_size'])])
+        return prices, oi.astype(np.int64), volume.astype(np.int64)
+
+    def futures_quote(self, underlying, timestamp, expiry=None):
+        """Current-month futures price, OI and volume at a timestamp"""
+        day, minute = self.session_minute(timestamp)
+        expiry = expiry or self.futures_expiry(day)
+        prices, oi, volume = self._futures_path(underlying, day, expiry)
+        return {
+            'underlying': underlying,
+            'expiry_date': expiry,
+            'last_price': round(float(prices[minute]), 2),
+            'open': round(float(prices[0]), 2),
+            'high': round(float(prices[:minute + 1].max()), 2),
+            'low': round(float(prices[:minute + 1].min()), 2),
+            'oi': int(oi[minute]),
+            'volume': int(volume[minute]),
+            'timestamp': self.minute_timestamp(day, minute)
+        }
+
+    # ------------------------------------------------------------------
+    # Symbols
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def option_symbol(underlying, expiry, strike, option_type):
+        """Trading symbol in the format KiteService builds: NIFTY25DEC26000CE"""
+        return f"{underlying}{expiry.strftime('%y')}{MONTHS[expiry.month - 1]}{int(strike)}{option_type}"
+
+    @staticmethod
+    def futures_symbol(underlying, expiry):
+        return f"{underlying}{expiry.strftime('%y')}{MONTHS[expiry.month - 1]}FUT"
+
+    @staticmethod
+    def instrument_token(symbol):
+        """Stable instrument token for a trading symbol"""
+        digest = hashlib.blake2b(symbol.encode('utf-8'), digest_size=4).digest()
+        return 10_000_000 + int.from_bytes(digest, 'little') % 90_000_000
+
+
+class SimulatedDataLoader:
+    """
+    Writes simulated sessions into the ingestion tables at the live jobs' cadence:
+    index prices every minute, option chains every chain_step minutes (with OI
+    change against the previous snapshot) and futures every futures_step minutes.
+    """
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, simulator=None, strikes_each_side=10, chain_step=2, futures_step=5):
+        self.simulator = simulator or MarketSimulator()
+        self.strikes_each_side = strikes_each_side
+        self.chain_step = chain_step
+        self.futures_step = futures_step
+
+    def trading_days(self, start, end):
+        days = []
+        day = start
+        while day <= end:
+            if self.simulator.is_trading_day(day):
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def clear(self, start, end, underlyings):
+        """Delete the rows of the underlyings between start and end; {table: rows deleted}"""
+        from app import db
+        from app.models.nifty_price import NiftyPrice
+        from app.models.banknifty_price import BankNiftyPrice, OptionChainData
+        from app.models.futures_oi_data import FuturesOIData
+
+        window_start = self.simulator.minute_timestamp(start, 0) - timedelta(hours=1)
+        window_end = self.simulator.minute_timestamp(end, 0) + timedelta(days=1)
+        models = [OptionChainData, FuturesOIData]
+        if 'NIFTY' in underlyings:
+            models.append(NiftyPrice)
+        if 'BANKNIFTY' in underlyings:
+            models.append(BankNiftyPrice)
+
+        deleted = {}
+        for model in models:
+            query = model.query.filter(model.timestamp >= window_start, model.timestamp < window_end)
+            if hasattr(model, 'underlying'):
+                query = query.filter(model.underlying.in_(underlyings))
+            deleted[model.__tablename__] = query.delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def load_day(self, day, underlyings):
+        """Insert one session of every underlying; {table: rows inserted}"""
+        from app import db
+        from app.models.nifty_price import NiftyPrice
+        from app.models.banknifty_price import BankNiftyPrice, OptionChainData
+        from app.models.futures_oi_data import FuturesOIData
+
+        counts = {}
+        for underlying in underlyings:
+            price_model = NiftyPrice if underlying == 'NIFTY' else BankNiftyPrice
+            tables = (
+                (price_model, self.price_rows(underlying, day, with_ohlc=price_model is NiftyPrice)),
+                (OptionChainData, self.chain_rows(underlying, day)),
+                (FuturesOIData, self.futures_rows(underlying, day)),
+            )
+            for model, rows in tables:
+                for offset in range(0, len(rows), self.BATCH_SIZE):
+                    db.session.bulk_insert_mappings(model, rows[offset:offset + self.BATCH_SIZE])
+                counts[model.__tablename__] = counts.get(model.__tablename__, 0) + len(rows)
+            db.session.commit()
+        return counts
+
+    def price_rows(self, underlying, day, with_ohlc=False):
+        """One row per minute; NIFTY rows carry the minute bar as the price job stores it"""
+        rows = []
+        for minute, timestamp in enumerate(self.simulator.session_timestamps(day)):
+            quote = self.simulator.index_quote(underlying, timestamp)
+            row = {
+                'price': quote['last_price'],
+                'change': quote['net_change'],
+                'change_percent': quote['change_percent'],
+                'timestamp': timestamp
+            }
+            if with_ohlc:
+                bar = self.simulator.index_bar(underlying, day, minute)
+                row.update({key: round(value, 2) for key, value in bar.items()})
+            rows.append(row)
+        return rows
+
+    def chain_rows(self, underlying, day):
+        """Option chain snapshots with OI change against the previous snapshot of the same strike"""
+        rows = []
+        previous = {}
+        for timestamp in self.simulator.session_timestamps(day, self.chain_step):
+            for row in self.simulator.option_chain(underlying, timestamp, self.strikes_each_side):
+                last = previous.get(row['strike_price'])
+                row['ce_oi_change'] = row['ce_oi'] - last['ce_oi'] if last else 0
+                row['pe_oi_change'] = row['pe_oi'] - last['pe_oi'] if last else 0
+                previous[row['strike_price']] = row
+                rows.append(row)
+        return rows
+
+    def futures_rows(self, underlying, day):
+        from app.models.futures_oi_data import FuturesOIData
+
+        rows = []
+        last = None
+        for timestamp in self.simulator.session_timestamps(day, self.futures_step):
+            quote = self.simulator.futures_quote(underlying, timestamp)
+            price_change = round(quote['last_price'] - last['futures_price'], 2) if last else 0.0
+            oi_change = quote['oi'] - last['open_interest'] if last else 0
+            meaning, trend = FuturesOIData.calculate_meaning_and_trend(price_change, oi_change)
+            last = {
+                'underlying': underlying,
+                'expiry_date': quote['expiry_date'],
+                'timestamp': timestamp,
+                'futures_price': quote['last_price'],
+                'open_interest': quote['oi'],
+                'volume': quote['volume'],
+                'price_change': price_change,
+                'oi_change': oi_change,
+                'meaning': meaning,
+                'trend': trend
+            }
+            rows.append(last)
+        return rows
@@ -0,0 +1,262 @@
+"""
+Max Pain and OI Wall Analytics Service
+Vectorised max-pain computation over the full strike ladder for live and stored option chains
+"""
+
+import numpy as np
+import pytz
+from datetime import datetime, time, timezone
+from app import db
+from app.models.banknifty_price import OptionChainData
+from app.utils.datetime_utils import utc_to_ist
+from app.utils import clock
+
+
+class MaxPainService:
+    """Service for max pain, OI wall (support/resistance) and intraday max pain timeline"""
+
+    def __init__(self):
+        self.ist_timezone = pytz.timezone('Asia/Kolkata')
+
+    @staticmethod
+    def writer_payout(strikes, ce_oi, pe_oi, candidates=None):
+        """
+        Total option-writer payout at each candidate expiry price.
+
+        Builds the candidates x strikes intrinsic value matrices once and reduces
+        them against the OI vectors, so the whole ladder is priced in two mat-vec
+        products instead of a Python double loop.
+
+        Args:
+            strikes: 1-D array of strike prices (K,)
+            ce_oi: CE open interest per strike (K,) or per snapshot (T, K)
+            pe_oi: PE open interest per strike (K,) or per snapshot (T, K)
+            candidates: candidate expiry prices (C,), defaults to the strikes
+
+        Returns:
+            (candidates, payout) where payout is (C,) or (T, C)
+        """
+        strikes = np.asarray(strikes, dtype=np.float64)
+        candidates = strikes if candidates is None else np.asarray(candidates, dtype=np.float64)
+
+        # diff[c, k] = settlement price - strike
+        diff = candidates[:, None] - strikes[None, :]
+        call_intrinsic = np.maximum(diff, 0.0)
+        put_intrinsic = np.maximum(-diff, 0.0)
+
+        ce_oi = np.asarray(ce_oi, dtype=np.float64)
+        pe_oi = np.asarray(pe_oi, dtype=np.float64)
+
+        payout = ce_oi @ call_intrinsic.T + pe_oi @ put_intrinsic.T
+        return candidates, payout
+
+    @staticmethod
+    def top_k_strikes(strikes, oi, k=3):
+        """Return the k strikes with the highest OI (largest first) using argpartition"""
+        strikes = np.asarray(strikes, dtype=np.float64)
+        oi = np.asarray(oi, dtype=np.float64)
+
+        if oi.size == 0:
+            return []
+
+        k = min(k, oi.size)
+        top_idx = np.argpartition(-oi, k - 1)[:k]
+        top_idx = top_idx[np.argsort(-oi[top_idx], kind='stable')]
+
+        return [
+            {'strike': float(strikes[i]), 'oi': int(oi[i])}
+            for i in top_idx if oi[i] > 0
+        ]
+
+    def analyze_arrays(self, strikes, ce_oi, pe_oi, k=3):
+        """Max pain and OI walls for a single chain snapshot given as arrays"""
+        strikes = np.asarray(strikes, dtype=np.float64)
+        ce_oi = np.nan_to_num(np.asarray(ce_oi, dtype=np.float64))
+        pe_oi = np.nan_to_num(np.asarray(pe_oi, dtype=np.float64))
+
+        if strikes.size == 0:
+            return None
+
+        order = np.argsort(strikes, kind='stable')
+        strikes, ce_oi, pe_oi = strikes[order], ce_oi[order], pe_oi[order]
+
+        candidates, payout = self.writer_payout(strikes, ce_oi, pe_oi)
+        min_idx = int(np.argmin(payout))
+
+        resistance = self.top_k_strikes(strikes, ce_oi, k)
+        support = self.top_k_strikes(strikes, pe_oi, k)
+
+        total_ce_oi = float(ce_oi.sum())
+        total_pe_oi = float(pe_oi.sum())
+
+        return {
+            'max_pain_strike': float(candidates[min_idx]),
+            'max_pain_payout': float(payout[min_idx]),
+            'resistance_levels': resistance,
+            'support_levels': support,
+            'key_resistance_level': resistance[0]['strike'] if resistance else 0.0,
+            'key_support_level': support[0]['strike'] if support else 0.0,
+            'total_ce_oi': int(total_ce_oi),
+            'total_pe_oi': int(total_pe_oi),
+            'pcr_oi': round(total_pe_oi / total_ce_oi, 4) if total_ce_oi > 0 else 0,
+            'payout_curve': {
+                'strikes': candidates.tolist(),
+                'payout': payout.tolist()
+            }
+        }
+
+    def analyze_chain(self, option_chain_data, k=3):
+        """Max pain and OI walls for a live option chain (list of dicts from KiteService)"""
+        if not option_chain_data:
+            return None
+
+        strikes = np.fromiter((item['strike_price'] for item in option_chain_data), dtype=np.float64)
+        ce_oi = np.fromiter((item.get('ce_oi') or 0 for item in option_chain_data), dtype=np.float64)
+        pe_oi = np.fromiter((item.get('pe_oi') or 0 for item in option_chain_data), dtype=np.float64)
+
+        return self.analyze_arrays(strikes, ce_oi, pe_oi, k)
+
+    def get_latest_max_pain(self, underlying='NIFTY', k=3):
+        """Max pain and OI walls for the latest stored snapshot of each strike"""
+        try:
+            latest_chain = OptionChainData.get_oi_analysis(underlying)
+            if not latest_chain:
+                return None
+
+            strikes = np.array([row.strike_price for row in latest_chain], dtype=np.float64)
+            ce_oi = np.array([row.ce_oi or 0 for row in latest_chain], dtype=np.float64)
+            pe_oi = np.array([row.pe_oi or 0 for row in latest_chain], dtype=np.float64)
+
+            result = self.analyze_arrays(strikes, ce_oi, pe_oi, k)
+            if result:
+                latest_timestamp = max(row.timestamp for row in latest_chain)
+                result['underlying'] = underlying
+                result['timestamp'] = utc_to_ist(latest_timestamp).isoformat()
+            return result
+
+        except Exception as e:
+            print(f"Error getting latest max pain for {underlying}: {str(e)}")
+            return None
+
+    def get_max_pain_timeline(self, underlying='NIFTY', target_date=None, start_time=None, end_time=None, k=3,
+                              expiry_date=None):
+        """
+        Intraday max pain timeline from stored option chain history.
+
+        Covers one expiry (default: the nearest one stored in the window, i.e. the
+        current expiry of that day). Rows are pivoted into a snapshots x strikes OI
+        matrix (forward filled per strike), and the payout for every snapshot and
+        candidate is computed with a single matrix product.
+        """
+        empty = {
+            'labels': [],
+            'max_pain': [],
+            'support': [],
+            'resistance': [],
+            'pcr_oi': [],
+            'strikes': []
+        }
+
+        try:
+            start_utc, end_utc = self._prepare_datetime_range(target_date, start_time, end_time)
+            window = (
+                OptionChainData.underlying == underlying,
+                OptionChainData.timestamp >= start_utc,
+                OptionChainData.timestamp <= end_utc
+            )
+
+            if expiry_date is None:
+                expiry_date = db.session.query(db.func.min(OptionChainData.expiry_date)).filter(
+                    *window, OptionChainData.expiry_date >= (target_date or clock.today())
+                ).scalar()
+                if expiry_date is None:
+                    return empty
+
+            rows = db.session.query(
+                OptionChainData.timestamp,
+                OptionChainData.strike_price,
+                OptionChainData.ce_oi,
+                OptionChainData.pe_oi
+            ).filter(
+                *window,
+                OptionChainData.expiry_date == expiry_date
+            ).order_by(OptionChainData.timestamp.asc()).all()
+
+            if not rows:
+                return empty
+
+            timestamps = np.array([row[0] for row in rows], dtype='datetime64[s]')
+            row_strikes = np.array([row[1] for row in rows], dtype=np.float64)
+            row_ce = np.array([row[2] or 0 for row in rows], dtype=np.float64)
+            row_pe = np.array([row[3] or 0 for row in rows], dtype=np.float64)
+
+            # One snapshot per fetch cycle minute
+            buckets = timestamps.astype('datetime64[m]')
+            snapshot_times, snapshot_idx = np.unique(buckets, return_inverse=True)
+            strikes, strike_idx = np.unique(row_strikes, return_inverse=True)
+
+            ce_matrix = self._forward_fill(self._pivot(snapshot_idx, strike_idx, row_ce, len(snapshot_times), len(strikes)))
+            pe_matrix = self._forward_fill(self._pivot(snapshot_idx, strike_idx, row_pe, len(snapshot_times), len(strikes)))
+
+            candidates, payout = self.writer_payout(strikes, ce_matrix, pe_matrix)
+            max_pain = candidates[np.argmin(payout, axis=1)]
+
+            # Top-1 walls per snapshot
+            resistance = strikes[np.argmax(ce_matrix, axis=1)]
+            support = strikes[np.argmax(pe_matrix, axis=1)]
+
+            total_ce = ce_matrix.sum(axis=1)
+            total_pe = pe_matrix.sum(axis=1)
+            pcr = np.divide(total_pe, total_ce, out=np.zeros_like(total_pe), where=total_ce > 0)
+
+            labels = [
+                utc_to_ist(ts.astype('datetime64[s]').astype(datetime)).strftime('%H:%M')
+                for ts in snapshot_times
+            ]
+
+            latest = self.analyze_arrays(strikes, ce_matrix[-1], pe_matrix[-1], k)
+
+            return {
+                'labels': labels,
+                'max_pain': max_pain.tolist(),
+                'support': support.tolist(),
+                'resistance': resistance.tolist(),
+                'pcr_oi': np.round(pcr, 4).tolist(),
+                'strikes': strikes.tolist(),
+                'expiry_date': expiry_date.isoformat(),
+                'latest': latest
+            }
+
+        except Exception as e:
+            print(f"Error getting max pain timeline for {underlying}: {str(e)}")
+            empty['error'] = str(e)
+            return empty
+
+    @staticmethod
+    def _pivot(row_idx, col_idx, values, n_rows, n_cols):
+        """Scatter (row, col, value) triples into a NaN-initialised matrix (last write wins)"""
+        matrix = np.full((n_rows, n_cols), np.nan)
+        matrix[row_idx, col_idx] = values
+        return matrix
+
+    @staticmethod
+    def _forward_fill(matrix):
+        """Forward fill NaNs down each column, remaining leading NaNs become 0"""
+        n_rows = matrix.shape[0]
+        valid = ~np.isnan(matrix)
+        idx = np.where(valid, np.arange(n_rows)[:, None], 0)
+        np.maximum.accumulate(idx, axis=0, out=idx)
+        filled = matrix[idx, np.arange(matrix.shape[1])]
+        return np.nan_to_num(filled)
+
+    def _prepare_datetime_range(self, target_date=None, start_time=None, end_time=None):
+        """Convert an IST date/time window to naive UTC datetimes for database queries"""
+        target_date = target_date or clock.today()
+        start_time = start_time or time(9, 0)
+        end_time = end_time or time(15, 30)
+
+        start_ist = self.ist_timezone.localize(datetime.combine(target_date, start_time))
+        end_ist = self.ist_timezone.localize(datetime.combine(target_date, end_time))
+
+        return (start_ist.astimezone(timezone.utc).replace(tzinfo=None),
+                end_ist.astimezone(timezone.utc).replace(tzinfo=None))
@@ -0,0 +1,346 @@
+"""
+Metrics Service
+In-process counters, gauges and histograms, aggregated across processes and exposed in Prometheus text format
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: compaction is not serialised between processes
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 120.0, 300.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# name -> (type, help, histogram buckets or gauge aggregation across processes)
+METRICS = {
+    'http_request_duration_seconds': (
+        'histogram', 'Flask request latency by endpoint, method and status', LATENCY_BUCKETS),
+    'http_request_db_queries': (
+        'histogram', 'SQL statements executed per request by endpoint', COUNT_BUCKETS),
+    'http_request_db_seconds': (
+        'histogram', 'Time spent in SQL per request by endpoint', LATENCY_BUCKETS),
+    'db_query_duration_seconds': (
+        'histogram', 'SQL statement latency by source (request endpoint, job id or other)', LATENCY_BUCKETS),
+    'db_pool_connections_open': (
+        'gauge', 'Database connections held open by the connection pools', 'sum'),
+    'db_pool_connections_in_use': (
+        'gauge', 'Database connections checked out of the connection pools', 'sum'),
+    'db_pool_checkout_peak': (
+        'gauge', 'Most connections one process had checked out at once since it started', 'max'),
+    'kite_request_duration_seconds': (
+        'histogram', 'Kite Connect call latency by API method and outcome', LATENCY_BUCKETS),
+    'job_duration_seconds': (
+        'histogram', 'Scheduler job run time by job id and outcome', JOB_BUCKETS),
+    'job_phase_duration_seconds': (
+        'histogram', 'Scheduler job phase (trace span) run time by job id and phase', LATENCY_BUCKETS),
+    'job_missed_total': (
+        'counter', 'Scheduler runs skipped because they were past their misfire grace time', None),
+    'job_overlap_total': (
+        'counter', 'Scheduler runs skipped because the previous run of the job was still going', None),
+    'job_running': (
+        'gauge', 'Scheduler jobs currently running', 'sum'),
+    'job_last_success_timestamp_seconds': (
+        'gauge', 'Unix time the job last finished without raising', 'max'),
+    'cache_requests_total': (
+        'counter', 'Cache lookups by cache, key group and outcome', None),
+    'ingestion_lag_seconds': (
+        'gauge', 'Seconds since the latest stored row of each ingested table', 'max'),
+    'app_boot_seconds': (
+        'gauge', 'Wall time create_app took in the process', 'max'),
+    'ingestion_missing_slots': (
+        'gauge', 'Expected ingestion slots without a row today by table and underlying', 'max'),
+    'ingestion_backfill_rows_total': (
+        'counter', 'Rows inserted from Kite historical candles to fill ingestion gaps by table', None),
+}
+
+
+class MetricsService:
+    """
+    Metric values of this process, persisted for a shared scrape.
+
+    Every process (gunicorn workers, the scheduler's process, CLI scripts)
+    keeps its own values in memory and writes them to <METRICS_DIR>/<pid>-<token>.json
+    at most every FLUSH_SECONDS. A scrape of any worker merges the files of all
+    processes: counters and histograms are summed, gauges are combined as their
+    definition says (sum or max) and only from live processes. Files of exited
+    processes are folded into archive.json so their counts are not lost.
+
+    Recording is a dict update under a lock; nothing here touches the database.
+    """
+
+    BASE_DIR = os.getenv('METRICS_DIR', 'storage/metrics')
+    FLUSH_SECONDS = 5
+    ARCHIVE = 'archive.json'
+
+    def __init__(self, directory=None):
+        self.directory = directory or self.BASE_DIR
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            # A forked worker must not report the parent's counts a second time
+            os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush, force=True)
+
+    def _reset(self):
+        # New lock too: another thread may have held the parent's at fork time
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.token = f'{self.pid}-{time.time_ns()}'
+        self.values = {}
+        self.last_flush = 0.0
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = self._key(labels)
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+        self._maybe_flush()
+
+    def set_gauge(self, name, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values.setdefault(name, {})[key] = value
+        self._maybe_flush()
+
+    def add_gauge(self, name, value, **labels):
+        """Move a gauge up or down (e.g. in-flight counts)"""
+        self.inc(name, value, **labels)
+
+    def observe(self, name, value, **labels):
+        """Record one histogram observation"""
+        buckets = METRICS[name][2]
+        key = self._key(labels)
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+        self._maybe_flush()
+
+    def timer(self, name, **labels):
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self, name, labels)
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    # ------------------------------------------------------------------
+    # Sharing between processes
+    # ------------------------------------------------------------------
+
+    def _maybe_flush(self):
+        if time.monotonic() - self.last_flush >= self.FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self, force=False):
+        """Write this process's values to its file (atomically, so a scrape never reads half a file)"""
+        if os.getpid() != self.pid:
+            self._reset()
+        with self.lock:
+            if not force and time.monotonic() - self.last_flush < self.FLUSH_SECONDS:
+                return
+            self.last_flush = time.monotonic()
+            snapshot = self._serialise(self.values)
+        try:
+            self._write(os.path.join(self.directory, f'{self.token}.json'), snapshot)
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+
+    def collect(self):
+        """Merged values of every process: {name: {label key: value}}"""
+        self.flush(force=True)
+        self._compact()
+
+        merged = {}
+        for filename in self._files():
+            data = self._read(os.path.join(self.directory, filename))
+            if data is not None:
+                self._merge(merged, data, live=True)
+        archive = self._read(os.path.join(self.directory, self.ARCHIVE))
+        if archive is not None:
+            self._merge(merged, archive, live=False)
+        return merged
+
+    def _files(self):
+        try:
+            return [name for name in os.listdir(self.directory) if name.endswith('.json') and name != self.ARCHIVE]
+        except OSError:
+            return []
+
+    def _compact(self):
+        """Fold the files of exited processes into the archive (counters and histograms only)"""
+        dead = [name for name in self._files() if not self._alive(name[:-len('.json')])]
+        if not dead:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            archive_path = os.path.join(self.directory, self.ARCHIVE)
+            merged = {}
+            archive = self._read(archive_path)
+            if archive is not None:
+                self._merge(merged, archive, live=False)
+            for name in dead:
+                data = self._read(os.path.join(self.directory, name))
+                if data is not None:
+                    self._merge(merged, data, live=False)
+            self._write(archive_path, self._serialise(merged))
+            for name in dead:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _alive(self, token):
+        pid_text, _, _ = token.partition('-')
+        try:
+            pid = int(pid_text)
+        except ValueError:
+            return False
+        if pid == self.pid:
+            return token == self.token
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        except OSError:
+            return False
+        return True
+
+    @staticmethod
+    def _merge(merged, data, live):
+        for name, series in data.items():
+            definition = METRICS.get(name)
+            if definition is None:
+                continue
+            kind, _, option = definition
+            if kind == 'gauge' and not live:
+                continue
+            target = merged.setdefault(name, {})
+            for labels, value in series:
+                key = tuple(tuple(pair) for pair in labels)
+                current = target.get(key)
+                if current is None:
+                    target[key] = list(value) if kind == 'histogram' else value
+                elif kind == 'histogram':
+                    target[key] = [a + b for a, b in zip(current, value)]
+                elif kind == 'gauge' and option == 'max':
+                    target[key] = max(current, value)
+                else:
+                    target[key] = current + value
+
+    @staticmethod
+    def _serialise(values):
+        return {name: [[list(key), value] for key, value in series.items()] for name, series in values.items()}
+
+    def _write(self, path, data):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------
+    # Exposition
+    # ------------------------------------------------------------------
+
+    def render(self, extra=None):
+        """
+        Prometheus text exposition (format 0.0.4) of the merged values.
+
+        extra holds values computed at scrape time, in collect()'s shape, e.g.
+        ingestion lag read from the database.
+        """
+        merged = self.collect()
+        for name, series in (extra or {}).items():
+            merged.setdefault(name, {}).update(series)
+
+        lines = []
+        for name, (kind, help_text, option) in METRICS.items():
+            series = merged.get(name)
+            if not series:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key in sorted(series):
+                value = series[key]
+                if kind != 'histogram':
+                    lines.append(f'{name}{self._labels(key)} {self._number(value)}')
+                    continue
+                for bound, count in zip(option, value):
+                    lines.append(f'{name}_bucket{self._labels(key, le=self._number(bound))} {count}')
+                lines.append(f'{name}_bucket{self._labels(key, le="+Inf")} {value[-1]}')
+                lines.append(f'{name}_sum{self._labels(key)} {self._number(value[-2])}')
+                lines.append(f'{name}_count{self._labels(key)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _labels(key, le=None):
+        pairs = list(key) + ([('le', le)] if le is not None else [])
+        if not pairs:
+            return ''
+        escaped = (
+            f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for name, value in pairs
+        )
+        return '{' + ','.join(escaped) + '}'
+
+    @staticmethod
+    def _number(value):
+        if isinstance(value, float):
+            if math.isinf(value):
+                return '+Inf' if value > 0 else '-Inf'
+            if value.is_integer():
+                return str(int(value)) if abs(value) < 1e15 else repr(value)
+            return repr(value)
+        return str(value)
+
+
+class _Timer:
+    def __init__(self, service, name, labels):
+        self.service = service
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and 'outcome' in self.labels:
+            self.labels['outcome'] = 'error'
+        self.service.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+# Process-wide registry
+metrics = MetricsService()
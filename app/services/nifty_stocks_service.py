@@ -1,6 +1,7 @@
 from app.models.nifty_stocks import NiftyStock
 from app.services.kite_service import KiteService
 from app import db
+from app.utils import clock
 import logging
 
 class NiftyStocksService:
@@ -40,6 +41,10 @@ class NiftyStocksService:
                     continue
             
             self.logger.info(f"Updated {updated_count} NIFTY 50 stocks")
+            if updated_count:
+                # Open NIFTY 50 pages render the new prices from the pushed payload
+                from app.services.live_update_service import LiveUpdateService
+                LiveUpdateService().publish_nifty_stocks()
             return updated_count
             
         except Exception as e:
@@ -84,7 +89,7 @@ class NiftyStocksService:
         """Get top gaining and losing stocks"""
         try:
             from datetime import date
-            today = date.today()
+            today = clock.today()
             
             # Top gainers by percentage change
             gainers = NiftyStock.query.filter(
@@ -132,7 +137,7 @@ class NiftyStocksService:
             from datetime import date
             from sqlalchemy import func
             
-            today = date.today()
+            today = clock.today()
             
             sector_data = db.session.query(
                 NiftyStock.sector,
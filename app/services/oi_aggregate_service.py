@@ -0,0 +1,304 @@
+"""
+OI Aggregate Service
+Per-minute CE/PE OI aggregates per underlying, kept as prefix sums so any window summary is an O(1) difference
+"""
+
+import numpy as np
+import pytz
+from datetime import datetime, timedelta, time, timezone
+from threading import Lock
+from app import db
+from app.models.banknifty_price import OptionChainData
+from app.models.oi_minute_aggregate import OIMinuteAggregate
+from app.utils import clock
+
+
+class OIAggregateService:
+    """Service maintaining per-minute OI aggregates and their prefix sums"""
+
+    # Aggregate columns, in the order they are kept in the prefix-sum matrix
+    FIELDS = (
+        'ce_oi_change_sum', 'pe_oi_change_sum',
+        'ce_oi_sum', 'pe_oi_sum',
+        'ce_oi_count', 'pe_oi_count',
+        'record_count'
+    )
+
+    # (underlying, IST trade date) -> {'minutes', 'prefix', 'loaded_at'}, shared by every instance
+    _indexes = {}
+    _lock = Lock()
+
+    # (underlying, past IST trade date) with no option chain rows to roll up (weekends, holidays)
+    _empty_days = set()
+
+    # Today's index re-reads new minutes from the table after this many seconds
+    REFRESH_SECONDS = 30
+    # Calendar days kept per underlying: a month-long window fits without evicting its own days
+    MAX_CACHED_DAYS = 31
+    MAX_EMPTY_DAYS = 1000
+
+    def __init__(self):
+        self.ist_timezone = pytz.timezone('Asia/Kolkata')
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def refresh_recent(self, underlying):
+        """
+        Roll up raw option chain rows since the last stored minute into the table.
+        Called by the ingestion job after each option chain fetch.
+        """
+        try:
+            day_start, _ = self._day_bounds(self._ist_today())
+            last_minute = db.session.query(db.func.max(OIMinuteAggregate.minute)).filter(
+                OIMinuteAggregate.underlying == underlying,
+                OIMinuteAggregate.minute >= day_start
+            ).scalar()
+
+            # Re-aggregate the last stored minute too, it may have been partially filled
+            since = last_minute or day_start
+            minutes, values = self._aggregate_raw(underlying, since, clock.utcnow() + timedelta(minutes=1))
+            if len(minutes):
+                self._upsert(underlying, minutes, values)
+                self._extend_index(underlying, self._ist_today(), minutes, values)
+            return len(minutes)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error refreshing OI minute aggregates for {underlying}: {str(e)}")
+            return 0
+
+    def backfill_day(self, underlying, trade_date):
+        """Roll up a full IST trading day of raw option chain rows into the table"""
+        try:
+            day_start, day_end = self._day_bounds(trade_date)
+            minutes, values = self._aggregate_raw(underlying, day_start, day_end)
+            if len(minutes):
+                self._upsert(underlying, minutes, values)
+            return len(minutes)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error backfilling OI minute aggregates for {underlying} {trade_date}: {str(e)}")
+            return 0
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get_window_totals(self, underlying, start_datetime, end_datetime):
+        """Totals of every aggregate field over [start, end] (naive UTC), as prefix-sum differences"""
+        totals = np.zeros(len(self.FIELDS))
+        for trade_date in self._trade_dates(start_datetime, end_datetime):
+            index = self._get_index(underlying, trade_date)
+            i, j = self._slice_bounds(index['minutes'], start_datetime, end_datetime)
+            totals += index['prefix'][j] - index['prefix'][i]
+        return dict(zip(self.FIELDS, totals.tolist()))
+
+    def get_window_series(self, underlying, start_datetime, end_datetime):
+        """
+        Per-minute aggregates over [start, end] (naive UTC).
+
+        Returns (minutes, values) where minutes is datetime64[m] (UTC) and values
+        maps each field to a per-minute array sliced out of the prefix sums.
+        """
+        minute_parts = []
+        value_parts = []
+        for trade_date in self._trade_dates(start_datetime, end_datetime):
+            index = self._get_index(underlying, trade_date)
+            i, j = self._slice_bounds(index['minutes'], start_datetime, end_datetime)
+            minute_parts.append(index['minutes'][i:j])
+            value_parts.append(np.diff(index['prefix'][i:j + 1], axis=0))
+
+        if not minute_parts:
+            return np.array([], dtype='datetime64[m]'), {field: np.array([]) for field in self.FIELDS}
+
+        minutes = np.concatenate(minute_parts)
+        values = np.concatenate(value_parts) if value_parts else np.zeros((0, len(self.FIELDS)))
+        return minutes, {field: values[:, k] for k, field in enumerate(self.FIELDS)}
+
+    # ------------------------------------------------------------------
+    # Prefix-sum index
+    # ------------------------------------------------------------------
+
+    def _get_index(self, underlying, trade_date):
+        key = (underlying, trade_date)
+        is_today = trade_date == self._ist_today()
+
+        with self._lock:
+            index = self._indexes.get(key)
+
+        if index is None:
+            index = self._load_index(underlying, trade_date)
+            if not len(index['minutes']) and key not in self._empty_days:
+                if self.backfill_day(underlying, trade_date):
+                    index = self._load_index(underlying, trade_date)
+                elif not is_today:
+                    self._remember_empty(key)
+            self._store_index(key, index)
+
+        elif is_today and (clock.utcnow() - index['loaded_at']).total_seconds() >= self.REFRESH_SECONDS:
+            # Pick up minutes written by the ingestion job (possibly in another worker)
+            since = index['minutes'][-1].astype(datetime) if len(index['minutes']) else self._day_bounds(trade_date)[0]
+            minutes, values = self._read_table(underlying, since, self._day_bounds(trade_date)[1])
+            if len(minutes):
+                index = self._extend_index(underlying, trade_date, minutes, values) or index
+            else:
+                index['loaded_at'] = clock.utcnow()
+
+        return index
+
+    def _load_index(self, underlying, trade_date):
+        day_start, day_end = self._day_bounds(trade_date)
+        minutes, values = self._read_table(underlying, day_start, day_end)
+        return self._build_index(minutes, values)
+
+    def _build_index(self, minutes, values, base=None):
+        prefix = np.zeros((len(minutes) + 1, len(self.FIELDS)))
+        if base is not None:
+            prefix[0] = base
+        if len(minutes):
+            prefix[1:] = prefix[0] + np.cumsum(values, axis=0)
+        return {'minutes': minutes, 'prefix': prefix, 'loaded_at': clock.utcnow()}
+
+    def _extend_index(self, underlying, trade_date, minutes, values):
+        """Replace the tail of a loaded index from the first refreshed minute onwards"""
+        key = (underlying, trade_date)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                return None
+
+            cut = int(np.searchsorted(index['minutes'], minutes[0], side='left'))
+            tail = self._build_index(minutes, values, base=index['prefix'][cut])
+
+            index = {
+                'minutes': np.concatenate([index['minutes'][:cut], tail['minutes']]),
+                'prefix': np.concatenate([index['prefix'][:cut + 1], tail['prefix'][1:]]),
+                'loaded_at': tail['loaded_at']
+            }
+            self._indexes[key] = index
+            return index
+
+    def _store_index(self, key, index):
+        with self._lock:
+            self._indexes[key] = index
+            # Capped per underlying, so a NIFTY window never evicts the BANKNIFTY days of the same request
+            same_underlying = [k for k in self._indexes if k[0] == key[0]]
+            if len(same_underlying) > self.MAX_CACHED_DAYS:
+                oldest_key = min(same_underlying, key=lambda k: self._indexes[k]['loaded_at'])
+                self._indexes.pop(oldest_key, None)
+
+    def _remember_empty(self, key):
+        with self._lock:
+            if len(self._empty_days) >= self.MAX_EMPTY_DAYS:
+                self._empty_days.clear()
+            self._empty_days.add(key)
+
+    @staticmethod
+    def _slice_bounds(minutes, start_datetime, end_datetime):
+        start_minute = np.datetime64(start_datetime, 'm')
+        end_minute = np.datetime64(end_datetime, 'm')
+        i = int(np.searchsorted(minutes, start_minute, side='left'))
+        j = int(np.searchsorted(minutes, end_minute, side='right'))
+        return i, max(i, j)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _read_table(self, underlying, start_datetime, end_datetime):
+        """Stored minute rows in [start, end) as (datetime64[m] minutes, (N, F) values)"""
+        columns = [getattr(OIMinuteAggregate, field) for field in self.FIELDS]
+        rows = db.session.query(OIMinuteAggregate.minute, *columns).filter(
+            OIMinuteAggregate.underlying == underlying,
+            OIMinuteAggregate.minute >= start_datetime,
+            OIMinuteAggregate.minute < end_datetime
+        ).order_by(OIMinuteAggregate.minute.asc()).all()
+
+        if not rows:
+            return np.array([], dtype='datetime64[m]'), np.zeros((0, len(self.FIELDS)))
+
+        minutes = np.array([row[0] for row in rows], dtype='datetime64[m]')
+        values = np.array([row[1:] for row in rows], dtype=np.float64)
+        return minutes, values
+
+    def _aggregate_raw(self, underlying, start_datetime, end_datetime):
+        """Group raw option chain rows in [start, end) into minute buckets"""
+        rows = db.session.query(
+            OptionChainData.timestamp,
+            OptionChainData.ce_oi_change,
+            OptionChainData.pe_oi_change,
+            OptionChainData.ce_oi,
+            OptionChainData.pe_oi
+        ).filter(
+            OptionChainData.underlying == underlying,
+            OptionChainData.timestamp >= start_datetime,
+            OptionChainData.timestamp < end_datetime
+        ).all()
+
+        if not rows:
+            return np.array([], dtype='datetime64[m]'), np.zeros((0, len(self.FIELDS)))
+
+        buckets = np.array([row[0] for row in rows], dtype='datetime64[m]')
+        raw = np.array([[np.nan if v is None else v for v in row[1:]] for row in rows], dtype=np.float64)
+
+        minutes, inverse = np.unique(buckets, return_inverse=True)
+        n = len(minutes)
+
+        def bucket_sum(column):
+            return np.bincount(inverse, weights=np.nan_to_num(column), minlength=n)
+
+        def bucket_count(column):
+            return np.bincount(inverse, weights=(~np.isnan(column)).astype(np.float64), minlength=n)
+
+        values = np.column_stack([
+            bucket_sum(raw[:, 0]),
+            bucket_sum(raw[:, 1]),
+            bucket_sum(raw[:, 2]),
+            bucket_sum(raw[:, 3]),
+            bucket_count(raw[:, 2]),
+            bucket_count(raw[:, 3]),
+            np.bincount(inverse, minlength=n).astype(np.float64)
+        ])
+        return minutes, values
+
+    def _upsert(self, underlying, minutes, values):
+        minute_datetimes = [m.astype(datetime) for m in minutes.astype('datetime64[s]')]
+        existing = {
+            row.minute: row for row in OIMinuteAggregate.query.filter(
+                OIMinuteAggregate.underlying == underlying,
+                OIMinuteAggregate.minute.in_(minute_datetimes)
+            ).all()
+        }
+
+        for minute, row_values in zip(minute_datetimes, values):
+            row = existing.get(minute)
+            if row is None:
+                row = OIMinuteAggregate(underlying=underlying, minute=minute)
+                db.session.add(row)
+            for field, value in zip(self.FIELDS, row_values):
+                setattr(row, field, int(value))
+
+        db.session.commit()
+
+    # ------------------------------------------------------------------
+    # Date helpers
+    # ------------------------------------------------------------------
+
+    def _ist_today(self):
+        return clock.now(self.ist_timezone).date()
+
+    def _day_bounds(self, trade_date):
+        """IST calendar day as a naive UTC [start, end) range"""
+        start_ist = self.ist_timezone.localize(datetime.combine(trade_date, time(0, 0)))
+        end_ist = self.ist_timezone.localize(datetime.combine(trade_date + timedelta(days=1), time(0, 0)))
+        return (start_ist.astimezone(timezone.utc).replace(tzinfo=None),
+                end_ist.astimezone(timezone.utc).replace(tzinfo=None))
+
+    def _trade_dates(self, start_datetime, end_datetime):
+        """IST trade dates covered by a naive UTC range"""
+        start_date = start_datetime.replace(tzinfo=timezone.utc).astimezone(self.ist_timezone).date()
+        end_date = end_datetime.replace(tzinfo=timezone.utc).astimezone(self.ist_timezone).date()
+        return [start_date + timedelta(days=d) for d in range((end_date - start_date).days + 1)]
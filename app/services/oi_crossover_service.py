@@ -1,9 +1,10 @@
 from app import db
-from app.models.banknifty_price import OptionChainData
 from app.models.nifty_price import NiftyPrice
 from app.models.banknifty_price import BankNiftyPrice
 from datetime import datetime, timedelta, time, timezone
-from sqlalchemy import func
+from app.services.oi_aggregate_service import OIAggregateService
+from app.utils import clock
+import numpy as np
 import pytz
 
 class OICrossoverService:
@@ -11,6 +12,7 @@ class OICrossoverService:
     
     def __init__(self):
         self.ist_timezone = pytz.timezone('Asia/Kolkata')
+        self.aggregate_service = OIAggregateService()
         
     def get_oi_crossover_summary(self, start_date=None, end_date=None, start_time=None, end_time=None, underlying='NIFTY'):
         """
@@ -60,22 +62,11 @@ class OICrossoverService:
     def _calculate_oi_summary(self, underlying, start_datetime, end_datetime):
         """Calculate OI change summary for a specific underlying"""
         try:
-            from sqlalchemy import func
+            # Window totals are O(1) differences of the per-minute prefix sums
+            totals = self.aggregate_service.get_window_totals(underlying, start_datetime, end_datetime)
+            record_count = int(totals['record_count'])
             
-            # Get cumulative OI changes during the time period
-            oi_changes = db.session.query(
-                func.sum(OptionChainData.pe_oi_change).label('total_pe_change'),
-                func.sum(OptionChainData.ce_oi_change).label('total_ce_change'),
-                func.avg(OptionChainData.pe_oi).label('avg_pe_oi'),
-                func.avg(OptionChainData.ce_oi).label('avg_ce_oi'),
-                func.count(OptionChainData.id).label('record_count')
-            ).filter(
-                OptionChainData.underlying == underlying,
-                OptionChainData.timestamp >= start_datetime,
-                OptionChainData.timestamp <= end_datetime
-            ).first()
-            
-            if not oi_changes or oi_changes.record_count == 0:
+            if record_count == 0:
                 return {
                     'pe_change_percent': 0,
                     'ce_change_percent': 0,
@@ -86,13 +77,13 @@ class OICrossoverService:
                     'records_count': 0
                 }
             
-            print(f"DEBUG: {underlying} - Analyzing {oi_changes.record_count} records from {start_datetime} to {end_datetime}")
+            print(f"DEBUG: {underlying} - Analyzing {record_count} records from {start_datetime} to {end_datetime}")
             
             # Get the cumulative changes and average OI values
-            total_pe_change = oi_changes.total_pe_change or 0
-            total_ce_change = oi_changes.total_ce_change or 0
-            avg_pe_oi = oi_changes.avg_pe_oi or 0
-            avg_ce_oi = oi_changes.avg_ce_oi or 0
+            total_pe_change = totals['pe_oi_change_sum']
+            total_ce_change = totals['ce_oi_change_sum']
+            avg_pe_oi = totals['pe_oi_sum'] / totals['pe_oi_count'] if totals['pe_oi_count'] else 0
+            avg_ce_oi = totals['ce_oi_sum'] / totals['ce_oi_count'] if totals['ce_oi_count'] else 0
             
             # Calculate percentage changes based on average OI as baseline
             pe_change_percent = (total_pe_change / avg_pe_oi * 100) if avg_pe_oi > 0 else 0
@@ -110,7 +101,7 @@ class OICrossoverService:
                 'total_ce_oi': avg_ce_oi,
                 'total_pe_change': total_pe_change,
                 'total_ce_change': total_ce_change,
-                'records_count': oi_changes.record_count
+                'records_count': record_count
             }
             
         except Exception as e:
@@ -144,13 +135,9 @@ class OICrossoverService:
             if underlying == 'NIFTY':
                 primary_data = nifty_data
                 secondary_data = banknifty_data
-                secondary_prefix = 'banknifty'
-                nifty_prefix = 'nifty'
             else:
                 primary_data = banknifty_data
                 secondary_data = nifty_data
-                secondary_prefix = 'nifty'
-                nifty_prefix = 'nifty'
             
             # Build chart data with primary underlying as main datasets
             chart_data = primary_data.copy()
@@ -194,22 +181,8 @@ class OICrossoverService:
         """
         Get chart data for a single underlying
         """
-        # Get OI data grouped by time intervals (5-minute intervals)
-        timeline_data = db.session.query(
-            func.date_trunc('minute', OptionChainData.timestamp).label('time_bucket'),
-            func.sum(OptionChainData.ce_oi_change).label('total_ce_change'),
-            func.sum(OptionChainData.pe_oi_change).label('total_pe_change'),
-            func.avg(OptionChainData.ce_oi).label('avg_ce_oi'),
-            func.avg(OptionChainData.pe_oi).label('avg_pe_oi')
-        ).filter(
-            OptionChainData.timestamp >= start_datetime,
-            OptionChainData.timestamp <= end_datetime,
-            OptionChainData.underlying == underlying
-        ).group_by(
-            func.date_trunc('minute', OptionChainData.timestamp)
-        ).order_by(
-            func.date_trunc('minute', OptionChainData.timestamp)
-        ).all()
+        # Per-minute aggregates are slices of the prefix-sum index
+        minutes, values = self.aggregate_service.get_window_series(underlying, start_datetime, end_datetime)
         
         # Get corresponding index prices
         if underlying == 'NIFTY':
@@ -227,46 +200,70 @@ class OICrossoverService:
             'ce_change_percentages': []
         }
         
-        cumulative_pe_change = 0
-        cumulative_ce_change = 0
+        if not len(minutes):
+            return chart_data
         
-        for record in timeline_data:
-            # Convert timestamp to IST and format for display
-            ist_time = self._utc_to_ist(record.time_bucket)
-            time_label = ist_time.strftime('%H:%M')
-            
-            # Calculate percentage changes
-            pe_change_pct = (record.total_pe_change / record.avg_pe_oi * 100) if record.avg_pe_oi and record.avg_pe_oi > 0 else 0
-            ce_change_pct = (record.total_ce_change / record.avg_ce_oi * 100) if record.avg_ce_oi and record.avg_ce_oi > 0 else 0
-            
-            # Calculate cumulative changes
-            cumulative_pe_change += (record.total_pe_change or 0)
-            cumulative_ce_change += (record.total_ce_change or 0)
-            
-            # Get corresponding index price (within 5 minutes of the OI timestamp)
-            price_record = price_model.query.filter(
-                func.abs(func.extract('epoch', price_model.timestamp) - func.extract('epoch', record.time_bucket)) < 300
-            ).order_by(
-                func.abs(func.extract('epoch', price_model.timestamp) - func.extract('epoch', record.time_bucket))
-            ).first()
-            
-            index_price = price_record.price if price_record else (26000 if underlying == 'NIFTY' else 59000)
-            
-            chart_data['labels'].append(time_label)
-            chart_data['pe_changes'].append(cumulative_pe_change)
-            chart_data['ce_changes'].append(cumulative_ce_change)
-            chart_data['pe_change_percentages'].append(round(pe_change_pct, 2))
-            chart_data['ce_change_percentages'].append(round(ce_change_pct, 2))
-            chart_data['index_prices'].append(float(index_price))
+        pe_change = values['pe_oi_change_sum']
+        ce_change = values['ce_oi_change_sum']
+        avg_pe_oi = np.divide(values['pe_oi_sum'], values['pe_oi_count'], out=np.zeros(len(minutes)), where=values['pe_oi_count'] > 0)
+        avg_ce_oi = np.divide(values['ce_oi_sum'], values['ce_oi_count'], out=np.zeros(len(minutes)), where=values['ce_oi_count'] > 0)
+        
+        # Calculate percentage changes
+        pe_change_pct = np.divide(pe_change * 100, avg_pe_oi, out=np.zeros(len(minutes)), where=avg_pe_oi > 0)
+        ce_change_pct = np.divide(ce_change * 100, avg_ce_oi, out=np.zeros(len(minutes)), where=avg_ce_oi > 0)
+        
+        # Get corresponding index price (nearest within 5 minutes of the OI bucket)
+        index_prices = self._nearest_prices(
+            price_model, minutes,
+            default_price=26000 if underlying == 'NIFTY' else 59000
+        )
+        
+        chart_data['labels'] = [
+            self._utc_to_ist(m.astype(datetime)).strftime('%H:%M')
+            for m in minutes
+        ]
+        chart_data['pe_changes'] = np.cumsum(pe_change).tolist()
+        chart_data['ce_changes'] = np.cumsum(ce_change).tolist()
+        chart_data['pe_change_percentages'] = np.round(pe_change_pct, 2).tolist()
+        chart_data['ce_change_percentages'] = np.round(ce_change_pct, 2).tolist()
+        chart_data['index_prices'] = index_prices.tolist()
         
         return chart_data
     
+    def _nearest_prices(self, price_model, minutes, default_price, tolerance_seconds=300):
+        """Index price nearest to each minute bucket, loaded with a single range query"""
+        bucket_seconds = minutes.astype('datetime64[s]').astype(np.int64)
+        window_start = minutes[0].astype(datetime) - timedelta(seconds=tolerance_seconds)
+        window_end = minutes[-1].astype(datetime) + timedelta(seconds=tolerance_seconds)
+        
+        rows = db.session.query(price_model.timestamp, price_model.price).filter(
+            price_model.timestamp >= window_start,
+            price_model.timestamp <= window_end
+        ).order_by(price_model.timestamp.asc()).all()
+        
+        prices = np.full(len(minutes), float(default_price))
+        if not rows:
+            return prices
+        
+        price_seconds = np.array([row[0] for row in rows], dtype='datetime64[s]').astype(np.int64)
+        price_values = np.array([row[1] for row in rows], dtype=np.float64)
+        
+        # Compare the neighbours on either side of each bucket
+        right = np.clip(np.searchsorted(price_seconds, bucket_seconds), 0, len(price_seconds) - 1)
+        left = np.clip(right - 1, 0, len(price_seconds) - 1)
+        right_gap = np.abs(price_seconds[right] - bucket_seconds)
+        left_gap = np.abs(price_seconds[left] - bucket_seconds)
+        nearest = np.where(left_gap <= right_gap, left, right)
+        gap = np.minimum(left_gap, right_gap)
+        
+        return np.where(gap < tolerance_seconds, price_values[nearest], prices)
+    
     def _prepare_datetime_range(self, start_date, end_date, start_time, end_time):
         """Convert date/time parameters to UTC datetime objects for database queries"""
         try:
             # Use provided dates or default to today
             if not start_date:
-                start_date = datetime.now().date()
+                start_date = clock.now().date()
             if not end_date:
                 end_date = start_date
                 
@@ -293,7 +290,7 @@ class OICrossoverService:
         except Exception as e:
             print(f"Error preparing datetime range: {str(e)}")
             # Fallback to today's market hours
-            today = datetime.now().date()
+            today = clock.now().date()
             start_dt = self.ist_timezone.localize(datetime.combine(today, time(9, 0)))
             end_dt = self.ist_timezone.localize(datetime.combine(today, time(15, 30)))
             
@@ -0,0 +1,367 @@
+"""
+Replay Service
+Replays a market day through the real scheduler jobs on an injected clock, measuring per-cycle latency and DB growth
+"""
+
+import bisect
+import contextlib
+import io
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, select, text
+from app.services.fake_kite import FakeKiteConnect, _FUTURES
+from app.services.market_simulator import MarketSimulator, SimulatedDataLoader, SESSION_MINUTES
+from app.utils import clock
+
+
+class ArchivedMarket:
+    """
+    Ticks of one recorded session read from another database (production dump,
+    bulk import), looked up as of a timestamp: the last row at or before it.
+    """
+
+    def __init__(self, database_url, trade_date):
+        import pandas as pd
+
+        self.trade_date = trade_date
+        start = MarketSimulator.minute_timestamp(trade_date, 0) - timedelta(minutes=30)
+        end = MarketSimulator.minute_timestamp(trade_date, SESSION_MINUTES) + timedelta(minutes=30)
+        engine = create_engine(database_url)
+        window = {'start': start, 'end': end}
+        try:
+            with engine.connect() as connection:
+                def read(sql):
+                    return pd.read_sql(text(sql), connection, params=window, parse_dates=['timestamp'])
+
+                nifty = read('SELECT timestamp, price, open, high, low, close FROM nifty_prices '
+                             'WHERE timestamp BETWEEN :start AND :end ORDER BY timestamp')
+                banknifty = read('SELECT timestamp, price FROM banknifty_prices '
+                                 'WHERE timestamp BETWEEN :start AND :end ORDER BY timestamp')
+                chain = read(
+                    'SELECT timestamp, ce_strike_symbol, ce_instrument_token, ce_oi, ce_volume, ce_ltp, ce_change, '
+                    'pe_strike_symbol, pe_instrument_token, pe_oi, pe_volume, pe_ltp, pe_change '
+                    'FROM option_chain_data WHERE timestamp BETWEEN :start AND :end ORDER BY timestamp'
+                )
+                futures = read('SELECT timestamp, underlying, futures_price, open_interest, volume FROM futures_oi_data '
+                               'WHERE timestamp BETWEEN :start AND :end ORDER BY timestamp')
+        finally:
+            engine.dispose()
+
+        if nifty.empty:
+            raise ValueError(f'No archived NIFTY prices on {trade_date}')
+
+        # key -> (sorted timestamps, quote dicts)
+        self.series = {}
+        self._add_index('NSE:NIFTY 50', 256265, nifty)
+        self._add_index('NSE:NIFTY BANK', 260105, banknifty)
+        for side in ('ce', 'pe'):
+            for row in chain.itertuples(index=False):
+                symbol = getattr(row, f'{side}_strike_symbol')
+                if not symbol:
+                    continue
+                token = getattr(row, f'{side}_instrument_token')
+                self._append(symbol, row.timestamp, {
+                    'instrument_token': int(token) if token and str(token).isdigit() else 0,
+                    'last_price': float(getattr(row, f'{side}_ltp') or 0.0),
+                    'volume': int(getattr(row, f'{side}_volume') or 0),
+                    'oi': int(getattr(row, f'{side}_oi') or 0),
+                    'net_change': float(getattr(row, f'{side}_change') or 0.0)
+                })
+        for row in futures.itertuples(index=False):
+            self._append(f'FUT:{row.underlying}', row.timestamp, {
+                'instrument_token': 0,
+                'last_price': float(row.futures_price),
+                'volume': int(row.volume or 0),
+                'oi': int(row.open_interest or 0),
+                'net_change': 0.0
+            })
+
+    def _add_index(self, key, token, frame):
+        if frame.empty:
+            return
+        opening = float(frame['price'].iloc[0])
+        high = low = opening
+        for row in frame.itertuples(index=False):
+            high, low = max(high, row.price), min(low, row.price)
+            self._append(key, row.timestamp, {
+                'instrument_token': token,
+                'last_price': float(row.price),
+                'volume': 0,
+                'oi': 0,
+                'net_change': round(float(row.price) - opening, 2),
+                'ohlc': {'open': opening, 'high': float(high), 'low': float(low), 'close': opening}
+            })
+
+    def _append(self, key, timestamp, quote):
+        timestamps, quotes = self.series.setdefault(key, ([], []))
+        timestamps.append(timestamp.to_pydatetime())
+        quotes.append(quote)
+
+    def quote(self, key, moment):
+        """Last archived quote of key at or before moment (naive UTC), or None"""
+        series = self.series.get(key)
+        if series is None:
+            return None
+        position = bisect.bisect_right(series[0], moment) - 1
+        if position < 0:
+            return None
+        return dict(series[1][position], timestamp=series[0][position])
+
+
+class ArchiveKiteConnect(FakeKiteConnect):
+    """FakeKiteConnect quoting an ArchivedMarket instead of the simulator (same latency and error injection)"""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def _quote(self, instrument, now):
+        # Options and indices are archived under their quote symbol, futures per underlying
+        exchange, _, symbol = instrument.partition(':')
+        futures = _FUTURES.match(symbol) if exchange == 'NFO' else None
+        key = f'FUT:{futures.group(1)}' if futures else instrument
+
+        data = self.archive.quote(key, now)
+        if data is None:
+            return None
+        last_price = data['last_price']
+        ohlc = data.get('ohlc') or {'open': last_price, 'high': last_price, 'low': last_price,
+                                    'close': round(last_price - data['net_change'], 2)}
+        return self._quote_payload(
+            data['instrument_token'], last_price, data['timestamp'], ohlc,
+            data['net_change'], volume=data['volume'], oi=data['oi']
+        )
+
+
+class MarketReplay:
+    """
+    Drives fetch_price_job, strategy_1_monitor_job and macd_cache_update_job
+    minute by minute through a trading session on a ReplayClock, the way the
+    scheduler calls them (prices/strategy every minute, MACD every 2 minutes).
+
+    The app must run in simulation mode (KITE_SIMULATION) so the jobs quote the
+    fake Kite client, which reads the same clock. speed is a multiple of real
+    time (375 minutes in 30 seconds is 750); 0 replays as fast as the jobs run.
+    Each cycle records the latency of every job, the rows each table grew by and
+    any error lines the jobs logged; a cycle that takes longer than its share of
+    wall time counts as an overrun.
+    """
+
+    JOBS = (
+        ('fetch_nifty_price', 1),
+        ('strategy_1_monitor', 1),
+        ('macd_cache_update', 2),
+    )
+    ERROR_MARKERS = ('Error', 'error', '❌')
+
+    def __init__(self, app, trade_date, speed=0, start_minute=0, end_minute=SESSION_MINUTES, offset_seconds=5):
+        self.app = app
+        self.trade_date = trade_date
+        self.speed = speed
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+        self.offset_seconds = offset_seconds
+        self.clock = ReplayClockFor(trade_date, start_minute, offset_seconds)
+
+    def warm_up(self, days, seed=42, archive_url=None):
+        """Sessions before the trade date, so MACD and the range lookups have history; days loaded"""
+        from app import db
+
+        simulator = MarketSimulator(seed=seed)
+        day = self.trade_date
+        loaded = 0
+        with self.app.app_context():
+            # Scratch database: create_app leaves the schema to migrations
+            db.create_all()
+            for _ in range(days):
+                day = simulator.previous_trading_day(day)
+                if archive_url:
+                    self._copy_archived_prices(archive_url, day)
+                else:
+                    SimulatedDataLoader(simulator).load_day(day, ['NIFTY', 'BANKNIFTY'])
+                loaded += 1
+            db.session.commit()
+        return loaded
+
+    def _copy_archived_prices(self, archive_url, day):
+        import pandas as pd
+        from app import db
+        from app.models.nifty_price import NiftyPrice
+        from app.models.banknifty_price import BankNiftyPrice
+
+        start = MarketSimulator.minute_timestamp(day, 0) - timedelta(minutes=30)
+        window = {'start': start, 'end': start + timedelta(hours=7)}
+        engine = create_engine(archive_url)
+        try:
+            with engine.connect() as connection:
+                for model, columns in ((NiftyPrice, 'price, open, high, low, close, change, change_percent, timestamp'),
+                                       (BankNiftyPrice, 'price, change, change_percent, timestamp')):
+                    frame = pd.read_sql(
+                        text(f'SELECT {columns} FROM {model.__tablename__} WHERE timestamp BETWEEN :start AND :end'),
+                        connection, params=window, parse_dates=['timestamp']
+                    )
+                    rows = frame.astype(object).where(frame.notna(), None).to_dict('records')
+                    for row in rows:
+                        row['timestamp'] = row['timestamp'].to_pydatetime()
+                    db.session.bulk_insert_mappings(model, rows)
+        finally:
+            engine.dispose()
+
+    def run(self, progress=None):
+        from app import db
+        from app.controllers.market_controller import fetch_price_job, strategy_1_monitor_job, macd_cache_update_job
+
+        jobs = {
+            'fetch_nifty_price': fetch_price_job,
+            'strategy_1_monitor': strategy_1_monitor_job,
+            'macd_cache_update': macd_cache_update_job,
+        }
+        for job in jobs.values():
+            job.app = self.app
+
+        with self.app.app_context():
+            tables = self._tracked_tables()
+            start_ids = self._max_ids(tables)
+            start_size = self._database_size()
+
+        cycles = []
+        interval = 60.0 / self.speed if self.speed else 0.0
+        wall_start = time.perf_counter()
+        last_ids = dict(start_ids)
+
+        with clock.use_clock(self.clock):
+            for minute in range(self.start_minute, self.end_minute + 1):
+                self.clock.to_minute(minute)
+                cycle_start = time.perf_counter()
+                cycle = {'minute': minute, 'time': self.clock.ist_label(), 'jobs': {}, 'errors': []}
+
+                for name, every in self.JOBS:
+                    if minute % every:
+                        continue
+                    output = io.StringIO()
+                    started = time.perf_counter()
+                    with contextlib.redirect_stdout(output):
+                        jobs[name]()
+                    cycle['jobs'][name] = round((time.perf_counter() - started) * 1000, 2)
+                    cycle['errors'].extend(
+                        f'{name}: {line.strip()}' for line in output.getvalue().splitlines()
+                        if any(marker in line for marker in self.ERROR_MARKERS)
+                    )
+
+                cycle['ms'] = round((time.perf_counter() - cycle_start) * 1000, 2)
+                with self.app.app_context():
+                    ids = self._max_ids(tables)
+                    db.session.remove()
+                cycle['rows'] = {table: ids[table] - last_ids[table] for table in tables if ids[table] != last_ids[table]}
+                last_ids = ids
+
+                if interval:
+                    deadline = wall_start + (minute - self.start_minute + 1) * interval
+                    remaining = deadline - time.perf_counter()
+                    cycle['overrun'] = remaining < 0
+                    if remaining > 0:
+                        time.sleep(remaining)
+                cycles.append(cycle)
+                if progress:
+                    progress(cycle)
+
+        wall_seconds = time.perf_counter() - wall_start
+        with self.app.app_context():
+            end_size = self._database_size()
+            outcome = self._outcome()
+        return self._report(cycles, start_ids, last_ids, start_size, end_size, wall_seconds, outcome)
+
+    # ------------------------------------------------------------------
+    # Measurements
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _tracked_tables():
+        """Tables with an integer id primary key (row growth is the change of max(id))"""
+        from app import db
+        return {
+            table.name: table for table in db.metadata.sorted_tables
+            if 'id' in table.c and table.c.id.primary_key
+        }
+
+    @staticmethod
+    def _max_ids(tables):
+        from app import db
+        return {name: db.session.execute(select(func.max(table.c.id))).scalar() or 0 for name, table in tables.items()}
+
+    @staticmethod
+    def _database_size():
+        """Database size in bytes (SQLite file or PostgreSQL database), None when unknown"""
+        from app import db
+        engine = db.engine
+        if engine.dialect.name == 'sqlite' and engine.url.database:
+            return os.path.getsize(engine.url.database) if os.path.exists(engine.url.database) else None
+        if engine.dialect.name == 'postgresql':
+            return db.session.execute(text('SELECT pg_database_size(current_database())')).scalar()
+        return None
+
+    def _outcome(self):
+        """End-of-day state to compare between replays of the same day"""
+        from app import db
+        from app.models.strategy_models import Strategy1Execution
+        from app.models.market_signal_snapshot import MarketSignalSnapshot
+
+        trades = db.session.query(Strategy1Execution).filter(
+            Strategy1Execution.execution_date == self.trade_date
+        ).count()
+        snapshot = db.session.query(MarketSignalSnapshot).order_by(MarketSignalSnapshot.id.desc()).first()
+        return {
+            'strategy1_executions': trades,
+            'last_market_signal': getattr(snapshot, 'signal_score', None) if snapshot else None
+        }
+
+    def _report(self, cycles, start_ids, end_ids, start_size, end_size, wall_seconds, outcome):
+        def summary(values):
+            if not values:
+                return None
+            ordered = sorted(values)
+            return {
+                'count': len(ordered),
+                'median_ms': round(statistics.median(ordered), 2),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                'max_ms': round(ordered[-1], 2),
+                'total_s': round(sum(ordered) / 1000, 3)
+            }
+
+        jobs = {name: summary([c['jobs'][name] for c in cycles if name in c['jobs']]) for name, _ in self.JOBS}
+        return {
+            'trade_date': self.trade_date.isoformat(),
+            'created': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'speed': self.speed,
+            'minutes': len(cycles),
+            'wall_seconds': round(wall_seconds, 2),
+            'cycle': summary([c['ms'] for c in cycles]),
+            'jobs': jobs,
+            'overruns': sum(1 for c in cycles if c.get('overrun')),
+            'error_cycles': sum(1 for c in cycles if c['errors']),
+            'rows': {table: end_ids[table] - start_ids[table] for table in end_ids if end_ids[table] != start_ids[table]},
+            'database_bytes': {'start': start_size, 'end': end_size,
+                               'growth': end_size - start_size if start_size is not None and end_size is not None else None},
+            'outcome': outcome,
+            'cycles': cycles
+        }
+
+
+class ReplayClockFor(clock.ReplayClock):
+    """ReplayClock positioned at session minutes of one trade date (offset_seconds after each minute)"""
+
+    def __init__(self, trade_date, minute=0, offset_seconds=5):
+        self.trade_date = trade_date
+        self.offset_seconds = offset_seconds
+        super().__init__(self._moment(minute))
+
+    def _moment(self, minute):
+        return MarketSimulator.minute_timestamp(self.trade_date, minute) + timedelta(seconds=self.offset_seconds)
+
+    def to_minute(self, minute):
+        self.set(self._moment(minute))
+
+    def ist_label(self):
+        return MarketSimulator.to_ist(self()).strftime('%H:%M')
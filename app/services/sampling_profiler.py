@@ -0,0 +1,330 @@
+"""
+Sampling Profiler
+Signal-timer stack sampler for a worker process, written as collapsed stacks (flamegraph input) under logs/profiles
+"""
+
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+# mode -> (interval timer, signal it raises). cpu: the timer runs on the process's CPU time
+# and only threads whose own CPU clock moved are sampled; wall: real time, every busy thread
+MODES = {}
+if hasattr(signal, 'setitimer'):
+    MODES = {
+        'cpu': (signal.ITIMER_PROF, signal.SIGPROF),
+        'wall': (signal.ITIMER_REAL, signal.SIGALRM)
+    }
+
+# Top frames of threads parked waiting for work (pool workers, accept loops, the scheduler);
+# left out of wall samples, where they would otherwise dominate every flamegraph
+IDLE_FRAMES = {
+    ('threading', 'wait'),
+    ('selectors', 'select'),
+    ('queue', 'get'),
+    ('concurrent.futures.thread', '_worker'),
+    ('socketserver', 'serve_forever'),
+    ('gunicorn.workers.sync', 'wait'),
+    ('gunicorn.workers.gthread', 'wait_for_and_dispatch_events'),
+}
+
+
+class ProfileSession:
+    """Stack counts of one sampling run"""
+
+    def __init__(self, mode, interval_ms, label):
+        self.mode = mode
+        self.interval_ms = interval_ms
+        self.label = label
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.counts = {}
+        self.samples = 0
+
+    def status(self):
+        return {
+            'mode': self.mode,
+            'interval_ms': self.interval_ms,
+            'label': self.label,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds': round(time.perf_counter() - self.started, 1),
+            'samples': self.samples,
+            'stacks': len(self.counts)
+        }
+
+
+class SamplingProfiler:
+    """
+    Stack sampler of this process, driven by an interval timer signal.
+
+    The handler runs on the main thread between bytecodes and reads every
+    thread's frame from sys._current_frames(), so it sees gthread request
+    threads and scheduler jobs as well. A sample costs a stack walk per busy
+    thread (code labels are cached), nothing is recorded between timer ticks.
+
+    An on-demand session (start/stop, e.g. from the admin pages) is written to
+    <label>-<pid>-<time>.folded when it stops. The always-on mode samples CPU at
+    a fraction of the on-demand rate and rewrites always-<pid>-<hour>.folded
+    every FLUSH_SECONDS; it pauses while an on-demand session runs.
+
+    Sampling needs setitimer (not on Windows) and handlers installed from the
+    main thread: call install() at startup, before a worker serves requests.
+    """
+
+    BASE_DIR = os.getenv('PROFILE_DIR', 'logs/profiles')
+    FLUSH_SECONDS = 60
+    DEFAULT_INTERVAL_MS = 10
+
+    def __init__(self, directory=None):
+        self.directory = directory or self.BASE_DIR
+        # Handlers outlive fork, so this is not reset in workers
+        self._installed = False
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            # Timers and flush threads do not survive fork: a worker starts idle
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.session = None
+        self.background = None
+        self.background_rate = None
+        self._stop_timer = None
+        self._flusher = None
+        self._flush_event = None
+        self._own_threads = set()
+        self._cpu_clocks = {}
+        self._labels = {}
+
+    @property
+    def available(self):
+        return bool(MODES)
+
+    # ------------------------------------------------------------------
+    # Signal handling
+    # ------------------------------------------------------------------
+
+    def install(self):
+        """Install the sampling signal handlers (main thread only); True when sampling is possible"""
+        if not self.available or threading.current_thread() is not threading.main_thread():
+            return False
+        for _, signum in MODES.values():
+            previous = signal.getsignal(signum)
+            if getattr(previous, '__self__', None) is self:
+                continue
+            signal.signal(signum, self._make_handler(previous))
+        self._installed = True
+        return True
+
+    def _make_handler(self, previous):
+        def handler(signum, frame):
+            active = self.session or self.background
+            if active is not None and MODES[active.mode][1] == signum:
+                self._sample(active, frame)
+            elif callable(previous):
+                previous(signum, frame)
+        handler.__self__ = self
+        return handler
+
+    def _arm(self):
+        """Point the interval timer at the active run: an on-demand session, else the always-on sampling"""
+        for which, _ in MODES.values():
+            signal.setitimer(which, 0)
+        active = self.session or self.background
+        if active is not None:
+            interval = active.interval_ms / 1000
+            signal.setitimer(MODES[active.mode][0], interval, interval)
+
+    def _sample(self, run, frame):
+        frames = sys._current_frames()
+        # The main thread's frame there is this handler; use the frame it interrupted
+        frames[threading.main_thread().ident] = frame
+        counts = run.counts
+        cpu_mode = run.mode == 'cpu'
+        clocks = {}
+        for ident, top in frames.items():
+            if ident in self._own_threads or top is None:
+                continue
+            if cpu_mode:
+                # Only threads whose CPU clock moved since the last tick (all where there is no such clock)
+                used = clocks[ident] = _thread_cpu_time(ident)
+                last = self._cpu_clocks.get(ident)
+                if used is not None and (last is None or used <= last):
+                    continue
+            stack = self._collapse(top, skip_idle=not cpu_mode)
+            if stack:
+                counts[stack] = counts.get(stack, 0) + 1
+        if cpu_mode:
+            self._cpu_clocks = clocks
+        run.samples += 1
+
+    def _collapse(self, frame, skip_idle):
+        """'module:function;...' from the outermost frame in, or None for a parked thread"""
+        labels = self._labels
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                module = frame.f_globals.get('__name__', '?')
+                label = labels[code] = (module, code.co_name, f"{module}:{getattr(code, 'co_qualname', code.co_name)}")
+            if skip_idle and not names and (label[0], label[1]) in IDLE_FRAMES:
+                return None
+            names.append(label[2])
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+    # ------------------------------------------------------------------
+    # On-demand sessions
+    # ------------------------------------------------------------------
+
+    def start(self, mode='cpu', interval_ms=None, duration=None, label=None):
+        """Start an on-demand session, stopped by stop() or after duration seconds"""
+        if not self.available:
+            raise RuntimeError('Sampling needs signal.setitimer, which this platform does not have')
+        if not self._installed:
+            raise RuntimeError('Sampling handlers are not installed in this process')
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}, use one of: {', '.join(MODES)}")
+        interval_ms = interval_ms or self.DEFAULT_INTERVAL_MS
+        if not 1 <= interval_ms <= 1000:
+            raise ValueError('interval_ms must be between 1 and 1000')
+        label = ''.join(c for c in (label or 'profile') if c.isalnum() or c in '-_')[:40] or 'profile'
+
+        with self.lock:
+            if self.session is not None:
+                raise ValueError('A profiling session is already running in this worker')
+            self.session = ProfileSession(mode, interval_ms, label)
+            self._arm()
+            if duration:
+                self._stop_timer = threading.Timer(duration, self.stop)
+                self._stop_timer.daemon = True
+                self._stop_timer.start()
+                self._own_threads.add(self._stop_timer.ident)
+            return self.session.status()
+
+    def stop(self):
+        """Stop the on-demand session and write its stacks; the session's status with the file, or None"""
+        with self.lock:
+            session, self.session = self.session, None
+            if session is None:
+                return None
+            if self._stop_timer is not None:
+                self._stop_timer.cancel()
+                self._own_threads.discard(self._stop_timer.ident)
+                self._stop_timer = None
+            self._arm()
+
+        status = session.status()
+        name = f"{session.label}-{self.pid}-{session.started_at.strftime('%Y%m%d-%H%M%S')}.folded"
+        status['file'] = self._write(name, session.counts)
+        return status
+
+    # ------------------------------------------------------------------
+    # Always-on sampling
+    # ------------------------------------------------------------------
+
+    def start_background(self, rate=0.01):
+        """Always-on CPU sampling at rate times the on-demand sampling rate (0.01: every second at 10 ms)"""
+        if not self._installed or not 0 < rate <= 1:
+            return False
+        with self.lock:
+            if self.background is not None:
+                return True
+            self.background_rate = rate
+            self.background = ProfileSession('cpu', self.DEFAULT_INTERVAL_MS / rate, 'always')
+            if self.session is None:
+                self._arm()
+            self._flush_event = threading.Event()
+            self._flusher = threading.Thread(
+                target=self._flush_loop, args=(self._flush_event,), name='sampling-profiler-flush', daemon=True
+            )
+            self._flusher.start()
+            self._own_threads.add(self._flusher.ident)
+        return True
+
+    def stop_background(self):
+        with self.lock:
+            background, self.background = self.background, None
+            if background is None:
+                return False
+            self._flush_event.set()
+            self._own_threads.discard(self._flusher.ident)
+            self._flusher = None
+            if self.session is None:
+                self._arm()
+        self._flush_background(background)
+        return True
+
+    def _flush_loop(self, stopped):
+        while not stopped.wait(self.FLUSH_SECONDS):
+            background = self.background
+            if background is not None:
+                self._flush_background(background)
+
+    def _flush_background(self, background):
+        """Rewrite the current hour's file; a new hour starts a new file and new counts"""
+        hour = datetime.now().strftime('%Y%m%d-%H')
+        if background.started_at.strftime('%Y%m%d-%H') != hour:
+            fresh = ProfileSession(background.mode, background.interval_ms, background.label)
+            with self.lock:
+                if self.background is background:
+                    self.background = fresh
+            # Ticks between the snapshot and the swap land in the old hour's file
+        self._write(f"always-{self.pid}-{background.started_at.strftime('%Y%m%d-%H')}.folded", background.counts)
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    def _write(self, name, counts):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        snapshot = dict(counts)
+        temp = f'{path}.tmp'
+        with open(temp, 'w') as f:
+            for stack, count in sorted(snapshot.items(), key=lambda item: item[1], reverse=True):
+                f.write(f'{stack} {count}\n')
+        os.replace(temp, path)
+        return path
+
+    def list_profiles(self):
+        """Profile files of every worker, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.folded'):
+                stat = os.stat(os.path.join(self.directory, name))
+                profiles.append({
+                    'name': name,
+                    'bytes': stat.st_size,
+                    'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds')
+                })
+        return sorted(profiles, key=lambda profile: profile['modified'], reverse=True)
+
+    def status(self):
+        return {
+            'pid': self.pid,
+            'available': self.available,
+            'session': self.session.status() if self.session else None,
+            'always_on': dict(self.background.status(), rate=self.background_rate) if self.background else None,
+            'directory': self.directory
+        }
+
+
+def _thread_cpu_time(ident):
+    """CPU seconds a thread has used, or None where per-thread clocks are not available"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None
+
+
+# Process-wide profiler
+profiler = SamplingProfiler()
@@ -0,0 +1,411 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote, unquote
+from app.services.metrics_service import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: writers are serialised per process only
+    fcntl = None
+
+
+class SharedCache:
+    """
+    Key/value cache shared by every process on the host (gunicorn workers, scheduler, scripts).
+
+    Each key lives in its own memory-mapped file under storage/shared_cache/<namespace>.
+    The ingestion side publishes a value with set(); web workers read it with get()
+    without taking any lock. Consistency uses a seqlock: the writer makes the
+    sequence number odd, writes the payload and header, then makes it even again;
+    a reader retries when it sees an odd number or the number changed while it
+    copied the payload. The decoded value is memoised per process together with
+    its sequence number, so a read of an unchanged key costs one header unpack.
+
+    Slot layout: 64 byte header (seq, payload length, published_at, expires_at,
+    moved flag) followed by the JSON payload (or, in a raw namespace, the bytes
+    exactly as given, for values that are served pre-serialised). A payload larger than the slot is
+    written to a bigger replacement file and the old one is flagged as moved so
+    readers reopen it.
+
+    Each process keeps at most MAX_OPEN_SLOTS mappings open, least recently
+    used first out; a mapping whose file was replaced or deleted is closed the
+    next time a reader sees its moved flag.
+    """
+
+    BASE_DIR = os.getenv('SHARED_CACHE_DIR', 'storage/shared_cache')
+    HEADER = struct.Struct('<QQddQ')
+    HEADER_SIZE = 64
+    MOVED_OFFSET = 32
+    DEFAULT_CAPACITY = 64 * 1024
+    READ_RETRIES = 100
+    MAX_OPEN_SLOTS = int(os.getenv('SHARED_CACHE_MAX_OPEN_SLOTS', '512'))
+
+    # Open mappings per process, shared by every instance: path -> slot, least recently used first
+    _slots = OrderedDict()
+    _slots_lock = threading.Lock()
+    _write_locks = {}
+
+    def __init__(self, namespace, max_entries=None, raw=False):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.raw = raw
+        self.directory = os.path.join(self.BASE_DIR, namespace)
+        os.makedirs(self.directory, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def get(self, key, default=None, allow_stale=False):
+        """Value for key if present and not expired (or expired, with allow_stale)"""
+        entry = self.get_entry(key)
+        if entry and (entry['fresh'] or allow_stale):
+            return entry['value']
+        return default
+
+    def get_entry(self, key):
+        """
+        Value with its metadata, or None if the key was never published.
+
+        Returns {'value', 'published_at', 'expires_at', 'age_seconds', 'fresh'};
+        expires_at is None for keys stored without a TTL. The value object is
+        shared by every reader in the process and must not be mutated.
+        """
+        path = self._path(key)
+        slot = self._open_slot(path)
+        if not slot:
+            return None
+
+        for _ in range(self.READ_RETRIES):
+            mm = slot['mmap']
+            try:
+                seq, length, published_at, expires_at, moved = self.HEADER.unpack_from(mm, 0)
+            except ValueError:
+                # Mapping closed by LRU eviction in another thread
+                moved = True
+
+            if moved:
+                slot = self._reopen_slot(path)
+                if not slot:
+                    return None
+                continue
+            if seq == 0:
+                return None
+            if seq & 1:
+                # Writer in progress
+                time.sleep(0)
+                continue
+
+            cached = slot['cached']
+            if cached and cached[0] == seq:
+                return self._entry(*cached[1:])
+
+            try:
+                payload = mm[self.HEADER_SIZE:self.HEADER_SIZE + length]
+                if struct.unpack_from('<Q', mm, 0)[0] != seq:
+                    continue
+            except ValueError:
+                continue
+
+            try:
+                value = payload if self.raw else json.loads(payload)
+            except ValueError:
+                continue
+            slot['cached'] = (seq, value, published_at, expires_at)
+            return self._entry(value, published_at, expires_at)
+
+        # Could not get a consistent copy; serve the last value this process decoded
+        if slot['cached']:
+            return self._entry(*slot['cached'][1:])
+        return None
+
+    def get_or_set(self, key, compute, ttl=None, version=None):
+        """
+        Fresh cached value, or compute(), publish and return it.
+
+        With a version (a data_versions token), the value is stored together
+        with it and an entry published under any other version is a miss, so
+        one stable key per endpoint and arguments follows the data without
+        leaving a file behind per version. Not supported in a raw namespace.
+        """
+        entry = self.get_entry(key)
+        # Keys carry arguments after the first ':'; group hit rates by the endpoint prefix
+        group = key.split(':', 1)[0]
+        if entry and entry['fresh'] and (version is None or self._version_of(entry['value']) == version):
+            metrics.inc('cache_requests_total', cache=self.namespace, key=group, outcome='hits')
+            return entry['value'] if version is None else entry['value']['value']
+        metrics.inc('cache_requests_total', cache=self.namespace, key=group, outcome='misses')
+        value = compute()
+        if version is None:
+            return self.set(key, value, ttl=ttl)
+        return self.set(key, {'version': version, 'value': value}, ttl=ttl)['value']
+
+    def keys(self):
+        """Keys currently stored in this namespace"""
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [unquote(name[:-len('.bin')]) for name in filenames if name.endswith('.bin')]
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def set(self, key, value, ttl=None):
+        """
+        Publish a value atomically for every process.
+
+        ttl is in seconds; None keeps the value fresh until it is replaced.
+        Returns the value as readers will see it (JSON round-tripped, or the
+        bytes unchanged in a raw namespace).
+        """
+        path = self._path(key)
+        with self._write_lock(path):
+            is_new = not os.path.exists(path)
+            stored = self._write(path, value, ttl)
+
+        if is_new and self.max_entries:
+            self._evict()
+        return stored
+
+    def incr(self, key, amount=1):
+        """Atomically increment an integer value (missing keys start at 0) and return the new value"""
+        path = self._path(key)
+        with self._write_lock(path):
+            entry = self.get_entry(key)
+            return self._write(path, (entry['value'] if entry else 0) + amount, None)
+
+    def delete(self, key):
+        """Remove a key for every process, with its lock file"""
+        path = self._path(key)
+        with self._write_lock(path):
+            slot = self._open_slot(path)
+            if slot:
+                struct.pack_into('<Q', slot['mmap'], self.MOVED_OFFSET, 1)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            # Writers waiting on these locks see they were retired and take fresh ones
+            try:
+                os.remove(path + '.lock')
+            except OSError:
+                pass
+            with self._slots_lock:
+                self._write_locks.pop(path, None)
+                self._close_slot(self._slots.pop(path, None))
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _entry(self, value, published_at, expires_at):
+        now = time.time()
+        return {
+            'value': value,
+            'published_at': published_at,
+            'expires_at': expires_at or None,
+            'age_seconds': now - published_at,
+            'fresh': not expires_at or now < expires_at
+        }
+
+    def _write(self, path, value, ttl):
+        """Seqlock write of one entry; the caller holds the key's write lock"""
+        payload = bytes(value) if self.raw else json.dumps(value, default=self._json_default).encode('utf-8')
+        published_at = time.time()
+        expires_at = published_at + ttl if ttl is not None else 0.0
+        slot = self._open_slot(path, create_capacity=self._capacity_for(len(payload)))
+
+        seq = struct.unpack_from('<Q', slot['mmap'], 0)[0]
+        if seq & 1:
+            # A previous writer died mid-update
+            seq += 1
+
+        if self.HEADER_SIZE + len(payload) > len(slot['mmap']):
+            slot = self._grow_slot(path, slot, seq + 2, payload, published_at, expires_at)
+        else:
+            mm = slot['mmap']
+            struct.pack_into('<Q', mm, 0, seq + 1)
+            mm[self.HEADER_SIZE:self.HEADER_SIZE + len(payload)] = payload
+            self.HEADER.pack_into(mm, 0, seq + 1, len(payload), published_at, expires_at, 0)
+            struct.pack_into('<Q', mm, 0, seq + 2)
+
+        stored = payload if self.raw else json.loads(payload)
+        slot['cached'] = (seq + 2, stored, published_at, expires_at)
+        return stored
+
+    def _path(self, key):
+        return os.path.join(self.directory, quote(str(key), safe='') + '.bin')
+
+    def _capacity_for(self, payload_size):
+        capacity = self.DEFAULT_CAPACITY
+        while capacity < self.HEADER_SIZE + payload_size:
+            capacity *= 2
+        return capacity
+
+    def _open_slot(self, path, create_capacity=None):
+        with self._slots_lock:
+            slot = self._slots.get(path)
+            if slot:
+                self._slots.move_to_end(path)
+                return slot
+
+            if not os.path.exists(path):
+                if not create_capacity:
+                    return None
+                self._create_file(path, create_capacity)
+
+            try:
+                with open(path, 'r+b') as f:
+                    mm = mmap.mmap(f.fileno(), 0)
+            except (OSError, ValueError):
+                return None
+
+            slot = {'mmap': mm, 'cached': None}
+            self._slots[path] = slot
+            self._trim_slots()
+            return slot
+
+    def _reopen_slot(self, path):
+        """Close the mapping of a moved or deleted file and map the current one, if any"""
+        with self._slots_lock:
+            self._close_slot(self._slots.pop(path, None))
+        return self._open_slot(path)
+
+    def _trim_slots(self):
+        """Close the least recently used mappings beyond MAX_OPEN_SLOTS; the caller holds _slots_lock"""
+        excess = len(self._slots) - self.MAX_OPEN_SLOTS
+        for path in list(self._slots):
+            if excess <= 0:
+                break
+            write_lock = self._write_locks.get(path)
+            if write_lock and write_lock.locked():
+                # Being written in this process; the writer still uses the mapping
+                continue
+            self._close_slot(self._slots.pop(path))
+            excess -= 1
+
+    @staticmethod
+    def _close_slot(slot):
+        if not slot:
+            return
+        try:
+            slot['mmap'].close()
+        except BufferError:
+            # A reader still holds a view of it; the mapping closes when that is released
+            pass
+
+    def _create_file(self, path, capacity):
+        """Zero-filled slot file, created under a temp name so readers never map a short file"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.truncate(capacity)
+        os.replace(tmp_path, path)
+
+    def _grow_slot(self, path, slot, seq, payload, published_at, expires_at):
+        """Write the entry to a larger file, swap it in and flag the old mapping so readers follow"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.truncate(self._capacity_for(len(payload)))
+        with open(tmp_path, 'r+b') as f:
+            mm = mmap.mmap(f.fileno(), 0)
+
+        # Complete entry before the rename; the sequence stays monotonic across the move
+        mm[self.HEADER_SIZE:self.HEADER_SIZE + len(payload)] = payload
+        self.HEADER.pack_into(mm, 0, seq, len(payload), published_at, expires_at, 0)
+        os.replace(tmp_path, path)
+        struct.pack_into('<Q', slot['mmap'], self.MOVED_OFFSET, 1)
+
+        new_slot = {'mmap': mm, 'cached': None}
+        with self._slots_lock:
+            self._close_slot(self._slots.pop(path, None))
+            self._slots[path] = new_slot
+        return new_slot
+
+    def _write_lock(self, path):
+        return _SlotWriteLock(self, path)
+
+    def _thread_lock(self, path):
+        with self._slots_lock:
+            return self._write_locks.setdefault(path, threading.Lock())
+
+    def _evict(self):
+        """Drop the least recently published keys beyond max_entries"""
+        try:
+            keys = self.keys()
+            if len(keys) <= self.max_entries:
+                return
+            published = {key: self._published_at(self._path(key)) for key in keys}
+            for key in sorted(keys, key=published.get)[:len(keys) - self.max_entries]:
+                self.delete(key)
+        except OSError as e:
+            print(f"Error evicting shared cache entries in {self.namespace}: {e}")
+
+    @staticmethod
+    def _version_of(value):
+        return value.get('version') if isinstance(value, dict) else None
+
+    def _published_at(self, path):
+        """Header read from the file, so eviction does not map every key in the namespace"""
+        try:
+            with open(path, 'rb') as f:
+                return self.HEADER.unpack(f.read(self.HEADER.size))[2]
+        except (OSError, struct.error):
+            return 0.0
+
+    @staticmethod
+    def _json_default(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+
+class _SlotWriteLock:
+    """
+    Serialises writers of one key across threads and, where fcntl exists, across processes.
+
+    delete() retires both locks of its key, so a writer that was waiting on
+    one checks after acquiring it that it is still current and otherwise
+    starts again with the new one.
+    """
+
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.thread_lock = None
+        self.lock_file = None
+
+    def __enter__(self):
+        while True:
+            self.thread_lock = self.cache._thread_lock(self.path)
+            self.thread_lock.acquire()
+            if self.cache._write_locks.get(self.path) is self.thread_lock:
+                break
+            self.thread_lock.release()
+
+        if fcntl:
+            while True:
+                self.lock_file = open(self.lock_path, 'a')
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+                try:
+                    if os.stat(self.lock_path).st_ino == os.fstat(self.lock_file.fileno()).st_ino:
+                        break
+                except OSError:
+                    pass
+                self.lock_file.close()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.lock_file:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+        self.thread_lock.release()
+        return False
@@ -0,0 +1,176 @@
+"""
+Strategy 1 Replay Service
+Vectorised minute-by-minute replay of Strategy 1 over a day of NIFTY prices and option LTP history
+"""
+
+import numpy as np
+from app.utils import clock
+from app import db
+from app.models.nifty_price import NiftyPrice
+from app.models.banknifty_price import OptionChainData
+from sqlalchemy import func, and_
+
+
+class Strategy1ReplayService:
+    """
+    Replays Strategy 1 trigger, leg selection and P&L for every price row of a day.
+
+    Prices and the option LTP history of the four candidate strikes are loaded
+    with one query each and as-of joined on timestamp, so a full session costs
+    two queries instead of four LTP lookups per price row.
+    """
+
+    LOTS = 3
+    QUANTITY_PER_LOT = 75
+    TOTAL_QUANTITY = LOTS * QUANTITY_PER_LOT
+
+    @staticmethod
+    def round_to_nearest_50(value):
+        """Round value to nearest 50 (same rounding as StrategyService)"""
+        return round(value / 50) * 50
+
+    def leg_strikes(self, high, low):
+        """Sell/buy strikes for both breakout directions; they depend only on the range"""
+        ce_sell = self.round_to_nearest_50(high + 100)
+        ce_buy = self.round_to_nearest_50(ce_sell + 200)
+        pe_sell = self.round_to_nearest_50(low - 100)
+        pe_buy = self.round_to_nearest_50(pe_sell - 200)
+        return {
+            'LOW_BREAK': {'option_type': 'CE', 'sell_strike': ce_sell, 'buy_strike': ce_buy},
+            'HIGH_BREAK': {'option_type': 'PE', 'sell_strike': pe_sell, 'buy_strike': pe_buy}
+        }
+
+    def load_prices(self, target_date=None):
+        """NIFTY price rows for the day as (timestamps list, price array)"""
+        target_date = target_date or clock.today()
+        rows = db.session.query(NiftyPrice.timestamp, NiftyPrice.price).filter(
+            func.date(NiftyPrice.timestamp) == target_date
+        ).order_by(NiftyPrice.timestamp.asc()).all()
+
+        timestamps = [row[0] for row in rows]
+        prices = np.array([row[1] or 0 for row in rows], dtype=np.float64)
+        return timestamps, prices
+
+    def load_leg_ltps(self, legs, target_date=None):
+        """
+        LTP history for every leg strike in one query.
+
+        Returns {(strike, option_type): (datetime64 timestamps, ltp array)} in ascending time order.
+        """
+        target_date = target_date or clock.today()
+        strikes = sorted({leg[key] for leg in legs.values() for key in ('sell_strike', 'buy_strike')})
+
+        rows = db.session.query(
+            OptionChainData.timestamp,
+            OptionChainData.strike_price,
+            OptionChainData.ce_ltp,
+            OptionChainData.pe_ltp
+        ).filter(
+            and_(
+                OptionChainData.underlying == 'NIFTY',
+                OptionChainData.strike_price.in_(strikes),
+                func.date(OptionChainData.timestamp) == target_date
+            )
+        ).order_by(OptionChainData.timestamp.asc()).all()
+
+        timestamps = np.array([row[0] for row in rows], dtype='datetime64[us]')
+        row_strikes = np.array([row[1] for row in rows], dtype=np.float64)
+        ce_ltp = np.array([row[2] or 0 for row in rows], dtype=np.float64)
+        pe_ltp = np.array([row[3] or 0 for row in rows], dtype=np.float64)
+
+        series = {}
+        for leg in legs.values():
+            ltp = ce_ltp if leg['option_type'] == 'CE' else pe_ltp
+            for key in ('sell_strike', 'buy_strike'):
+                mask = row_strikes == leg[key]
+                series[(leg[key], leg['option_type'])] = (timestamps[mask], ltp[mask])
+        return series
+
+    @staticmethod
+    def as_of(series_timestamps, series_values, timestamps):
+        """Latest series value at or before each timestamp (0 before the first observation)"""
+        if not len(series_timestamps):
+            return np.zeros(len(timestamps))
+        idx = np.searchsorted(series_timestamps, timestamps, side='right') - 1
+        return np.where(idx >= 0, series_values[np.clip(idx, 0, None)], 0.0)
+
+    def replay(self, high, low, target_date=None, price_rows=None):
+        """
+        Vectorised Strategy 1 replay for a day.
+
+        Returns a dict of per-row arrays (timestamps, price, triggered, trigger_type,
+        option_type, sell/buy strike, sell/buy LTP, net premium, capital used,
+        entry LTPs, sell/buy/total P&L, P&L %) plus the entry row index (or None).
+        """
+        timestamps, prices = price_rows if price_rows is not None else self.load_prices(target_date)
+        n = len(prices)
+        legs = self.leg_strikes(high, low)
+        row_times = np.array(timestamps, dtype='datetime64[us]')
+
+        # Trigger: below the range low -> CE credit spread, above the high -> PE credit spread
+        low_break = prices < low
+        high_break = (prices > high) & ~low_break
+        triggered = low_break | high_break
+        conditions = [low_break, high_break]
+
+        trigger_type = np.select(conditions, ['LOW_BREAK', 'HIGH_BREAK'], default=None)
+        option_type = np.select(conditions, ['CE', 'PE'], default=None)
+        sell_strike = np.select(conditions, [legs['LOW_BREAK']['sell_strike'], legs['HIGH_BREAK']['sell_strike']], default=np.nan)
+        buy_strike = np.select(conditions, [legs['LOW_BREAK']['buy_strike'], legs['HIGH_BREAK']['buy_strike']], default=np.nan)
+
+        # As-of join of each leg's LTP history onto the price rows
+        ltp_series = self.load_leg_ltps(legs, target_date) if n else {}
+
+        def leg_ltp(trigger, key):
+            leg = legs[trigger]
+            series_ts, series_ltp = ltp_series.get((leg[key], leg['option_type']), (np.array([], dtype='datetime64[us]'), np.array([])))
+            return self.as_of(series_ts, series_ltp, row_times)
+
+        sell_ltp = np.select(conditions, [leg_ltp('LOW_BREAK', 'sell_strike'), leg_ltp('HIGH_BREAK', 'sell_strike')], default=0.0) if n else np.zeros(0)
+        buy_ltp = np.select(conditions, [leg_ltp('LOW_BREAK', 'buy_strike'), leg_ltp('HIGH_BREAK', 'buy_strike')], default=0.0) if n else np.zeros(0)
+        net_premium = sell_ltp - buy_ltp
+
+        spread_width = np.abs(np.nan_to_num(buy_strike) - np.nan_to_num(sell_strike))
+        capital_used = np.where(triggered, spread_width * self.TOTAL_QUANTITY, 0.0)
+
+        # Entry is the first triggered row; P&L is marked against it on later triggered rows
+        entry_index = int(np.argmax(triggered)) if triggered.any() else None
+        in_trade = np.zeros(n, dtype=bool)
+        sell_ltp_entry = np.zeros(n)
+        buy_ltp_entry = np.zeros(n)
+        if entry_index is not None:
+            in_trade[entry_index:] = True
+            in_trade &= triggered
+            sell_ltp_entry[entry_index:] = sell_ltp[entry_index]
+            buy_ltp_entry[entry_index:] = buy_ltp[entry_index]
+
+        sell_pnl = np.where(in_trade, (sell_ltp_entry - sell_ltp) * self.TOTAL_QUANTITY, 0.0)
+        buy_pnl = np.where(in_trade, (buy_ltp - buy_ltp_entry) * self.TOTAL_QUANTITY, 0.0)
+        total_pnl = sell_pnl + buy_pnl
+        pnl_percentage = np.divide(total_pnl * 100, capital_used, out=np.zeros(n), where=capital_used > 0)
+
+        return {
+            'timestamps': timestamps,
+            'price': prices,
+            'triggered': triggered,
+            'trigger_type': trigger_type,
+            'option_type': option_type,
+            'sell_strike': sell_strike,
+            'buy_strike': buy_strike,
+            'sell_ltp': sell_ltp,
+            'buy_ltp': buy_ltp,
+            'net_premium': net_premium,
+            'capital_used': capital_used,
+            'sell_ltp_entry': sell_ltp_entry,
+            'buy_ltp_entry': buy_ltp_entry,
+            'sell_pnl': sell_pnl,
+            'buy_pnl': buy_pnl,
+            'total_pnl': total_pnl,
+            'pnl_percentage': pnl_percentage,
+            'entry_index': entry_index
+        }
+
+    @staticmethod
+    def strike_or_none(value):
+        """Strike as a plain int for JSON (strikes are multiples of 50), None when not triggered"""
+        return None if np.isnan(value) else int(value)
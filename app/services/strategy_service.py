@@ -1,12 +1,14 @@
-from datetime import datetime, time, date, timedelta
+from datetime import time, timedelta
 import pytz
 from app import db
 from app.models.nifty_price import NiftyPrice
 from app.models.banknifty_price import OptionChainData
 from app.models.strategy_models import Strategy1Execution, Strategy1Entry, Strategy1LTPHistory
+from app.services.strategy_replay_service import Strategy1ReplayService
 from sqlalchemy import text, func, and_, or_, desc
 import math
 import logging
+from app.utils import clock
 
 class StrategyService:
     def __init__(self):
@@ -15,7 +17,7 @@ class StrategyService:
         
     def get_current_ist_time(self):
         """Get current IST time"""
-        return datetime.now(self.ist_timezone)
+        return clock.now(self.ist_timezone)
     
     def is_market_hours(self):
         """Check if current time is within market hours (9:30 AM - 3:15 PM IST)"""
@@ -33,7 +35,7 @@ class StrategyService:
     def get_nifty_high_low_range(self, start_time=None, end_time=None):
         """Get NIFTY high and low for specific time range (default: 9:12-9:33 AM IST)"""
         try:
-            today = date.today()
+            today = clock.today()
             
             # Set default time range for Strategy 1 (IST)
             if start_time is None:
@@ -145,7 +147,7 @@ class StrategyService:
         """Get current NIFTY price"""
         try:
             latest_price = db.session.query(NiftyPrice).filter(
-                func.date(NiftyPrice.timestamp) == date.today()
+                func.date(NiftyPrice.timestamp) == clock.today()
             ).order_by(NiftyPrice.timestamp.desc()).first()
             
             if latest_price:
@@ -173,7 +175,7 @@ class StrategyService:
                 and_(
                     OptionChainData.underlying == 'NIFTY',
                     OptionChainData.strike_price == strike,
-                    func.date(OptionChainData.timestamp) == date.today()
+                    func.date(OptionChainData.timestamp) == clock.today()
                 )
             ).order_by(OptionChainData.timestamp.desc()).first()
             
@@ -419,7 +421,7 @@ class StrategyService:
     def get_strategy_1_history(self):
         """Get comprehensive execution history with detailed price tracking"""
         try:
-            today = date.today()
+            today = clock.today()
             
             # Get all Strategy 1 executions for today
             executions = db.session.query(Strategy1Execution).filter(
@@ -482,74 +484,39 @@ class StrategyService:
     def get_detailed_theoretical_history(self):
         """Get detailed theoretical history with comprehensive price tracking"""
         try:
-            today = date.today()
-            
-            # Get all NIFTY price records for today
-            price_history = db.session.query(NiftyPrice).filter(
-                func.date(NiftyPrice.timestamp) == today
-            ).order_by(NiftyPrice.timestamp.asc()).all()
-            
-            history_data = []
             range_data = self.get_nifty_high_low_range()
             
             if not range_data:
                 return {'history': [], 'range_data': None}
             
-            entry_positions = None  # Track entry position for P&L calculation
+            # Replay the whole day in one vectorised pass (prices and leg LTPs are as-of joined)
+            replay = Strategy1ReplayService().replay(range_data['high'], range_data['low'])
+            entry_index = replay['entry_index']
+            entry_option_type = replay['option_type'][entry_index] if entry_index is not None else 'CE'
+            strike_or_none = Strategy1ReplayService.strike_or_none
             
-            for price_record in price_history:
-                # Calculate theoretical positions for this timestamp
-                positions = self.calculate_strategy_1_positions(
-                    range_data['high'],
-                    range_data['low'],
-                    float(price_record.price)
-                )
-                
-                # Track entry positions when first triggered
-                if positions.get('triggered') and entry_positions is None:
-                    entry_positions = {
-                        'sell_ltp': positions.get('sell_ltp', 0),
-                        'buy_ltp': positions.get('buy_ltp', 0),
-                        'trigger_type': positions.get('trigger_type'),
-                        'sell_strike': positions.get('sell_strike'),
-                        'buy_strike': positions.get('buy_strike')
-                    }
-                
-                # Calculate detailed P&L with individual option breakdown
-                sell_pnl = 0
-                buy_pnl = 0
-                total_pnl = 0
-                pnl_percentage = 0
-                
-                if entry_positions and positions.get('triggered'):
-                    total_qty = 225  # 3 lots * 75 per lot
-                    sell_pnl = (entry_positions['sell_ltp'] - positions.get('sell_ltp', 0)) * total_qty
-                    buy_pnl = (positions.get('buy_ltp', 0) - entry_positions['buy_ltp']) * total_qty
-                    total_pnl = sell_pnl + buy_pnl
-                    
-                    if positions.get('capital_used', 0) > 0:
-                        pnl_percentage = (total_pnl / positions.get('capital_used', 1)) * 100
-                
+            history_data = []
+            for i, timestamp in enumerate(replay['timestamps']):
                 history_data.append({
-                    'timestamp': price_record.timestamp.strftime('%H:%M'),
-                    'nifty_price': float(price_record.price),
-                    'triggered': positions.get('triggered', False),
-                    'trigger_type': positions.get('trigger_type'),
-                    'sell_strike': positions.get('sell_strike'),
-                    'buy_strike': positions.get('buy_strike'),
-                    'sell_ltp_entry': entry_positions['sell_ltp'] if entry_positions else 0,
-                    'buy_ltp_entry': entry_positions['buy_ltp'] if entry_positions else 0,
-                    'sell_ltp': positions.get('sell_ltp', 0),
-                    'buy_ltp': positions.get('buy_ltp', 0),
-                    'net_premium': positions.get('net_premium', 0),
-                    'sell_pnl': sell_pnl,
-                    'buy_pnl': buy_pnl,
-                    'current_pnl': total_pnl,
-                    'capital_used': positions.get('capital_used', 0),
-                    'pnl_percentage': pnl_percentage,
+                    'timestamp': timestamp.strftime('%H:%M'),
+                    'nifty_price': float(replay['price'][i]),
+                    'triggered': bool(replay['triggered'][i]),
+                    'trigger_type': replay['trigger_type'][i],
+                    'sell_strike': strike_or_none(replay['sell_strike'][i]),
+                    'buy_strike': strike_or_none(replay['buy_strike'][i]),
+                    'sell_ltp_entry': float(replay['sell_ltp_entry'][i]),
+                    'buy_ltp_entry': float(replay['buy_ltp_entry'][i]),
+                    'sell_ltp': float(replay['sell_ltp'][i]),
+                    'buy_ltp': float(replay['buy_ltp'][i]),
+                    'net_premium': float(replay['net_premium'][i]),
+                    'sell_pnl': float(replay['sell_pnl'][i]),
+                    'buy_pnl': float(replay['buy_pnl'][i]),
+                    'current_pnl': float(replay['total_pnl'][i]),
+                    'capital_used': float(replay['capital_used'][i]),
+                    'pnl_percentage': float(replay['pnl_percentage'][i]),
                     'trade_status': 'THEORETICAL',
                     'trade_id': None,
-                    'option_type': entry_positions['trigger_type'][-2:] if entry_positions else 'CE'
+                    'option_type': entry_option_type
                 })
             
             return {
@@ -675,7 +642,7 @@ class StrategyService:
     def get_today_trade_count(self):
         """Get number of trades taken today"""
         try:
-            today = date.today()
+            today = clock.today()
             trade_count = db.session.query(Strategy1Execution).filter(
                 and_(
                     Strategy1Execution.execution_date == today,
@@ -691,7 +658,7 @@ class StrategyService:
     def get_active_trade(self):
         """Get currently active trade if any"""
         try:
-            today = date.today()
+            today = clock.today()
             
             # First check if there's an active entry in the new Strategy1Entry table
             active_entry = db.session.query(Strategy1Entry).filter(
@@ -803,7 +770,7 @@ class StrategyService:
             if not positions.get('triggered'):
                 return None
             
-            today = date.today()
+            today = clock.today()
             option_type = 'CE' if positions.get('trigger_type') == 'LOW_BREAK' else 'PE'
             
             # Create Strategy1Entry record (main entry data)
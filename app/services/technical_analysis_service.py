@@ -3,6 +3,7 @@ import numpy as np
 from datetime import datetime, date, timedelta
 from app import db
 from app.models.nifty_price import NiftyPrice
+from app.utils import clock
 import logging
 
 class TechnicalAnalysisService:
@@ -131,7 +132,7 @@ class TechnicalAnalysisService:
     def get_nifty_30min_data(self, days_back=30):
         """Get NIFTY data for 30-minute intervals"""
         try:
-            end_date = date.today()
+            end_date = clock.today()
             start_date = end_date - timedelta(days=days_back)
             
             # Get all NIFTY price records for the period
@@ -0,0 +1,94 @@
+"""
+Injectable wall clock
+
+- utcnow(), now(tz), today(): drop-ins for datetime.utcnow(), datetime.now(tz) and
+  date.today() that read the installed clock source
+- set_clock() / reset_clock() / use_clock(): install a source (a callable returning
+  naive UTC), so replays and tests can run the jobs at any market time
+- ReplayClock: a source that is stepped by hand or runs at a speed multiple
+  (ReplayClock.at_ist() starts it at an IST moment)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+_source = None
+
+# India has no daylight saving: IST is always UTC+5:30
+IST_OFFSET = timedelta(hours=5, minutes=30)
+
+
+def utcnow():
+    """Current time as naive UTC (the way timestamps are stored)"""
+    return _source() if _source is not None else datetime.utcnow()
+
+
+def now(tz=None):
+    """Current time in tz (aware), or naive local time like datetime.now()"""
+    if _source is None:
+        return datetime.now(tz)
+    current = _source().replace(tzinfo=timezone.utc)
+    return current.astimezone(tz) if tz is not None else current.astimezone().replace(tzinfo=None)
+
+
+def today():
+    """Local date, like date.today()"""
+    return now().date()
+
+
+def set_clock(source):
+    """Install source (callable returning naive UTC) for the whole process; None restores the wall clock"""
+    global _source
+    _source = source
+
+
+def reset_clock():
+    set_clock(None)
+
+
+def is_simulated():
+    return _source is not None
+
+
+@contextmanager
+def use_clock(source):
+    previous = _source
+    set_clock(source)
+    try:
+        yield source
+    finally:
+        set_clock(previous)
+
+
+class ReplayClock:
+    """
+    Clock source for replays: starts at a naive UTC time and moves by advance()/set(),
+    or by itself at speed times real time when speed is given.
+    """
+
+    def __init__(self, start, speed=None):
+        self.lock = threading.Lock()
+        self.current = start
+        self.speed = speed
+        self.started = time.monotonic()
+
+    def __call__(self):
+        with self.lock:
+            if self.speed:
+                return self.current + timedelta(seconds=(time.monotonic() - self.started) * self.speed)
+            return self.current
+
+    @classmethod
+    def at_ist(cls, label, speed=None):
+        """ReplayClock starting at an IST 'YYYY-MM-DDTHH:MM' moment"""
+        return cls(datetime.strptime(label, '%Y-%m-%dT%H:%M') - IST_OFFSET, speed)
+
+    def set(self, moment):
+        with self.lock:
+            self.current = moment
+            self.started = time.monotonic()
+
+    def advance(self, seconds):
+        self.set(self() + timedelta(seconds=seconds))
@@ -1,4 +1,5 @@
-from datetime import datetime, timezone, timedelta
+from datetime import timezone, timedelta
+from app.utils import clock
 
 def utc_to_ist(utc_datetime):
     """Convert UTC datetime to IST (Indian Standard Time)"""
@@ -42,7 +43,7 @@ def is_market_hours(check_datetime=None):
         bool: True if within market hours, False otherwise
     """
     if check_datetime is None:
-        check_datetime = datetime.utcnow()
+        check_datetime = clock.utcnow()
     
     # Convert to IST if it's a UTC datetime
     if check_datetime.tzinfo is None:
@@ -77,7 +78,7 @@ def get_next_market_open():
     Returns:
         datetime: Next market opening datetime in IST timezone
     """
-    now_ist = utc_to_ist(datetime.utcnow())
+    now_ist = utc_to_ist(clock.utcnow())
     
     # Market opens at 9:00 AM IST
     market_open_time = now_ist.replace(hour=9, minute=0, second=0, microsecond=0)
@@ -0,0 +1,101 @@
+"""
+Server-side downsampling for chart series
+
+- lttb_indices(): Largest-Triangle-Three-Buckets, keeps the visual shape of a line
+- minmax_indices(): min and max of every x bucket (one bucket per pixel column), keeps spikes
+- downsample(): apply either to a list of rows, driven by ?downsample=lttb|minmax&points=N
+"""
+
+import numpy as np
+from flask import request
+
+METHODS = ('lttb', 'minmax')
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+
+
+def _as_float(values):
+    """Numbers, datetimes or ISO datetime strings as float64 (datetimes in epoch milliseconds)"""
+    values = np.asarray(values)
+    if values.dtype.kind in 'MU' or (values.dtype.kind == 'O' and len(values) and hasattr(values[0], 'year')):
+        values = values.astype('datetime64[ms]').astype(np.int64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the threshold points LTTB keeps (first and last always included)"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = _as_float(y)
+    bucket_size = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        avg_start = int((i + 1) * bucket_size) + 1
+        avg_end = min(int((i + 2) * bucket_size) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = np.nanmean(y[avg_start:avg_end]) if np.isfinite(y[avg_start:avg_end]).any() else y[a]
+
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        indices[i + 1] = a
+
+    return indices
+
+
+def minmax_indices(x, y, buckets):
+    """Indices of the min and max y in each of `buckets` equal-width x buckets, plus the endpoints"""
+    n = len(y)
+    if buckets * 2 >= n or buckets < 1:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = _as_float(y)
+    order = np.argsort(x, kind='stable')
+    edges = np.linspace(x[order[0]], x[order[-1]], buckets + 1)
+    bounds = np.searchsorted(x[order], edges[1:-1], side='left')
+
+    keep = {int(order[0]), int(order[-1])}
+    for bucket in np.split(order, bounds):
+        values = y[bucket]
+        if len(bucket) == 0 or not np.isfinite(values).any():
+            continue
+        keep.add(int(bucket[np.nanargmin(values)]))
+        keep.add(int(bucket[np.nanargmax(values)]))
+    return np.array(sorted(keep), dtype=np.int64)
+
+
+def downsample_args(default_points=DEFAULT_POINTS, max_points=MAX_POINTS):
+    """(method, points) from ?downsample=&points=; method is None when not requested"""
+    method = request.args.get('downsample')
+    if not method:
+        return None, None
+    if method not in METHODS:
+        raise ValueError(f"downsample must be one of: {', '.join(METHODS)}")
+    points = request.args.get('points', default_points, type=int)
+    if points < 3:
+        raise ValueError('points must be at least 3')
+    return method, min(points, max_points)
+
+
+def downsample(rows, x, y, method, points):
+    """Subset of rows chosen on the (x, y) series; rows unchanged when method is None or they already fit"""
+    if not method or len(rows) <= points:
+        return rows
+    if method == 'lttb':
+        indices = lttb_indices(x, y, points)
+    else:
+        indices = minmax_indices(x, y, points // 2)
+    return [rows[i] for i in indices]
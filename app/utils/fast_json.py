@@ -0,0 +1,155 @@
+"""
+Fast JSON utilities for large chart and history payloads
+
+- dumps(): orjson with native NumPy/datetime support, stdlib json fallback
+- json_response(): Flask response from pre-serialised bytes
+- columnar() / epoch_ms(): parallel-array payloads with epoch-millisecond timestamps
+- init_app(): gzip/brotli compression of JSON responses negotiated by Accept-Encoding
+"""
+
+import gzip
+import json
+from decimal import Decimal
+import numpy as np
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(value):
+    """Types neither encoder handles natively (pandas Timestamps, NumPy scalars and arrays, Decimal)"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload):
+    """Serialise payload to UTF-8 JSON bytes (NaN becomes null, like the browser expects)"""
+    if orjson is not None:
+        return orjson.dumps(
+            payload,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(_replace_nan(payload), default=_default, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+def _replace_nan(value):
+    """stdlib json writes NaN literals, which are not valid JSON; orjson writes null"""
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, dict):
+        return {k: _replace_nan(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_nan(v) for v in value]
+    if isinstance(value, np.ndarray) and value.dtype.kind == 'f':
+        return [None if v != v else v for v in value.tolist()]
+    return value
+
+
+def json_response(payload, status=200):
+    """Flask JSON response serialised with dumps(); compression is applied by the after_request hook"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def epoch_ms(values):
+    """
+    Datetimes (list, pandas index or datetime64 array) as epoch milliseconds.
+
+    Naive values are taken as they are stored: UTC for database timestamps.
+    """
+    if len(values) == 0:
+        return []
+    if hasattr(values, 'tz') and values.tz is not None:
+        values = values.tz_convert('UTC').tz_localize(None)
+    return np.asarray(values, dtype='datetime64[ms]').astype(np.int64).tolist()
+
+
+def columnar(rows, columns=None):
+    """List of dicts to a dict of parallel lists (keys of the first row unless columns is given)"""
+    if not rows:
+        return {column: [] for column in (columns or [])}
+    columns = columns or list(rows[0].keys())
+    return {column: [row.get(column) for row in rows] for column in columns}
+
+
+def wants_columnar():
+    """Clients opt into parallel-array payloads with ?format=columnar"""
+    return request.args.get('format') == 'columnar'
+
+
+def negotiate_encoding(accept_encoding):
+    """Best supported content coding for an Accept-Encoding header value, or None"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def request_encoding(body):
+    """Content coding to use for this request's response body, or None"""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return None
+    return negotiate_encoding(request.headers.get('Accept-Encoding'))
+
+
+def compress_json_response(response):
+    """after_request hook: compress JSON bodies the client can decode"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = request_encoding(body)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    """Register response compression for the app"""
+    app.after_request(compress_json_response)
@@ -0,0 +1,105 @@
+"""
+Keyset pagination for history APIs
+
+Rows are addressed by their (timestamp, id) key, so a page costs one index range
+scan however deep the client has paged, and rows inserted meanwhile never shift
+later pages. Keys travel as opaque URL-safe cursor tokens:
+
+- cursor: continue after the last row of the previous page (next_cursor)
+- since:  only rows newer than a key (latest_cursor of the previous response),
+          for incremental refreshes
+"""
+
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+
+def encode_cursor(timestamp, row_id):
+    """Opaque token for a (timestamp, id) key"""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token):
+    """(timestamp, id) key of a token; ValueError if it was not issued by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError(f'Invalid cursor: {token}')
+
+
+def after_key(timestamp_column, id_column, key):
+    """Filter for rows strictly after key in (timestamp, id) order"""
+    timestamp, row_id = key
+    return or_(timestamp_column > timestamp, and_(timestamp_column == timestamp, id_column > row_id))
+
+
+def before_key(timestamp_column, id_column, key):
+    """Filter for rows strictly before key in (timestamp, id) order"""
+    timestamp, row_id = key
+    return or_(timestamp_column < timestamp, and_(timestamp_column == timestamp, id_column < row_id))
+
+
+def page_args(default_limit=DEFAULT_PAGE_SIZE, max_limit=MAX_PAGE_SIZE):
+    """limit, cursor and since from the query string, cursors decoded; ValueError on bad input"""
+    limit = request.args.get('limit', type=int) or default_limit
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be positive')
+
+    cursor = request.args.get('cursor')
+    since = request.args.get('since')
+    return {
+        'limit': min(limit, max_limit) if limit else None,
+        'cursor': decode_cursor(cursor) if cursor else None,
+        'since': decode_cursor(since) if since else None
+    }
+
+
+def keyset_page(query, timestamp_column, id_column, limit=None, cursor=None, since=None, descending=False):
+    """
+    One page of an ORM/Core query in (timestamp, id) order.
+
+    cursor continues in the page direction (older rows when descending); since
+    restricts to rows newer than a key in either direction. Returns (rows, meta)
+    where meta has count, has_more, next_cursor (to request the following page)
+    and latest_cursor (the newest key seen, to pass as since on refresh).
+    """
+    if since is not None:
+        query = query.filter(after_key(timestamp_column, id_column, since))
+    if cursor is not None:
+        keyset = before_key if descending else after_key
+        query = query.filter(keyset(timestamp_column, id_column, cursor))
+
+    if descending:
+        query = query.order_by(timestamp_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(timestamp_column.asc(), id_column.asc())
+
+    rows = query.limit(limit + 1).all() if limit else query.all()
+    has_more = bool(limit) and len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+
+    def key_of(row):
+        return encode_cursor(getattr(row, timestamp_column.key), getattr(row, id_column.key))
+
+    if rows:
+        latest_cursor = key_of(rows[0] if descending else rows[-1])
+    else:
+        # Nothing new: keep handing back the key the client already has
+        latest_cursor = encode_cursor(*since) if since else None
+
+    return rows, {
+        'count': len(rows),
+        'has_more': has_more,
+        'next_cursor': key_of(rows[-1]) if has_more else None,
+        'latest_cursor': latest_cursor
+    }
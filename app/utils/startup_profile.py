@@ -0,0 +1,44 @@
+"""
+Startup profile
+Phase timings of create_app and the background warm-up, reported per worker at /api/startup-profile
+"""
+
+import os
+import sys
+import time
+
+# Libraries that should stay out of worker boot and load with the warm-up (or the first request using them)
+DEFERRED_MODULES = ('pandas', 'plotly', 'kiteconnect', 'twisted')
+
+
+class StartupProfile:
+    """Wall time of each create_app phase, recorded with mark() after the phase"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = []
+        self.total_ms = None
+        self.warmup = None
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append({'name': name, 'ms': round((now - self.last) * 1000, 1)})
+        self.last = now
+
+    def finish(self):
+        self.total_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        # Loaded by boot itself: anything here is an import to move into the function using it
+        self.deferred_loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+        self.modules = len(sys.modules)
+        return self
+
+    def report(self):
+        return {
+            'pid': os.getpid(),
+            'total_ms': self.total_ms,
+            'phases': self.phases,
+            'modules_at_boot': self.modules,
+            'deferred_loaded_at_boot': self.deferred_loaded,
+            'warmup': self.warmup
+        }
@@ -1,5 +1,4 @@
-// Auto-refresh dashboard data
-let autoRefreshInterval;
+// Dashboard data, updated from the live prices stream
 
 function loadCurrentPrice() {
     fetch('/api/price/current')
@@ -40,18 +39,34 @@ function updateCurrentPrice(priceData) {
     })} IST`;
 }
 
+// Rows shown in the recent prices table, newest first
+const RECENT_PRICES_LIMIT = 10;
+let recentPrices = [];
+
 function loadRecentPrices() {
-    fetch('/api/prices/latest?limit=10')
+    fetch(`/api/prices/latest?limit=${RECENT_PRICES_LIMIT}`)
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-                updateRecentPrices(data.data);
-                updateStats(data.data);
+                recentPrices = data.data;
+                updateRecentPrices(recentPrices);
+                updateStats(recentPrices);
             }
         })
         .catch(error => console.error('Error fetching recent prices:', error));
 }
 
+// A pushed price row: update the header and prepend it to the table, no refetch
+function applyPriceUpdate(payload) {
+    const latest = payload.nifty;
+    if (!latest) return;
+    updateCurrentPrice(latest);
+    if (recentPrices.length && recentPrices[0].id === latest.id) return;
+    recentPrices = [latest].concat(recentPrices).slice(0, RECENT_PRICES_LIMIT);
+    updateRecentPrices(recentPrices);
+    updateStats(recentPrices);
+}
+
 function updateRecentPrices(prices) {
     const tbody = document.getElementById('recentPrices');
     
@@ -119,7 +134,7 @@ document.getElementById('refreshBtn').addEventListener('click', function() {
 loadCurrentPrice();
 loadRecentPrices();
 
-// Auto-refresh every 30 seconds
-autoRefreshInterval = setInterval(() => {
-    loadRecentPrices();
-}, 30000);
\ No newline at end of file
+// New price rows are pushed by the ingestion job; poll only when the stream is unavailable
+LiveUpdates
+    .on('prices', applyPriceUpdate, { skipInitial: true, fallback: loadRecentPrices, fallbackMs: 30000 })
+    .start();
\ No newline at end of file
@@ -0,0 +1,99 @@
+// Live updates over Server-Sent Events (/api/stream)
+//
+// Pages register topic handlers and call start(); one EventSource per page
+// carries every topic. Messages are either a full payload or a patch against
+// the previous version, so each handler always receives the complete payload.
+// When EventSource is unavailable or the stream is closed for good, handlers
+// with a `fallback` function go back to polling every `fallbackMs`.
+const LiveUpdates = (function () {
+    const handlers = {};   // topic -> [{handler, options}]
+    const state = {};      // topic -> {seq, data}
+    let source = null;
+    let fallbackTimers = [];
+
+    function on(topic, handler, options = {}) {
+        (handlers[topic] = handlers[topic] || []).push({ handler, options });
+        return this;
+    }
+
+    function start() {
+        if (!Object.keys(handlers).length) return;
+        if (source) {
+            // Handlers registered after the first start(): resubscribe with every topic
+            reconnect();
+            return;
+        }
+        if (!window.EventSource) {
+            startFallback();
+            return;
+        }
+        connect();
+    }
+
+    function connect() {
+        const topics = Object.keys(handlers);
+        source = new EventSource('/api/stream?topics=' + encodeURIComponent(topics.join(',')));
+
+        topics.forEach(topic => {
+            source.addEventListener(topic, event => handleMessage(JSON.parse(event.data)));
+        });
+
+        source.onopen = stopFallback;
+        source.onerror = () => {
+            // CONNECTING means the browser is already retrying; CLOSED means it gave up
+            if (source.readyState === EventSource.CLOSED) {
+                startFallback();
+            }
+        };
+    }
+
+    function reconnect() {
+        if (source) source.close();
+        connect();
+    }
+
+    function handleMessage(message) {
+        const current = state[message.topic];
+        let data;
+
+        if ('full' in message) {
+            if (current && current.seq === message.seq) return;  // snapshot we already have (reconnect)
+            data = message.full;
+        } else if (current && current.seq === message.base_seq) {
+            data = Object.assign({}, current.data, message.patch.set);
+            message.patch.unset.forEach(key => delete data[key]);
+        } else {
+            // Missed a version: reconnect to get a fresh snapshot
+            reconnect();
+            return;
+        }
+
+        const firstMessage = !current;
+        state[message.topic] = { seq: message.seq, data: data };
+
+        (handlers[message.topic] || []).forEach(({ handler, options }) => {
+            if (firstMessage && message.initial && options.skipInitial) return;
+            try {
+                handler(data, message);
+            } catch (error) {
+                console.error(`Error handling live update for ${message.topic}:`, error);
+            }
+        });
+    }
+
+    function startFallback() {
+        if (fallbackTimers.length) return;
+        Object.values(handlers).forEach(list => list.forEach(({ options }) => {
+            if (typeof options.fallback === 'function') {
+                fallbackTimers.push(setInterval(options.fallback, options.fallbackMs || 30000));
+            }
+        }));
+    }
+
+    function stopFallback() {
+        fallbackTimers.forEach(timer => clearInterval(timer));
+        fallbackTimers = [];
+    }
+
+    return { on, start };
+})();
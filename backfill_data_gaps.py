@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Data gap backfill
+Scans the ingested tables for missing slots on one or more IST trade dates and
+fills index prices and futures OI from Kite minute candles. Option chain gaps
+are listed but cannot be rebuilt from candles, nor futures gaps of an expired
+contract. Exit status is 1 when slots are left missing.
+
+Usage:
+    python backfill_data_gaps.py
+    python backfill_data_gaps.py --date 2025-12-17 --dry-run
+    python backfill_data_gaps.py --date 2025-12-17 --days 5
+"""
+
+import sys
+import os
+import argparse
+import contextlib
+from datetime import date, timedelta
+
+# Add the app directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find and backfill ingestion gaps from Kite historical candles')
+    parser.add_argument('--date', help='Last trade date to check (YYYY-MM-DD, default: today IST)')
+    parser.add_argument('--days', type=int, default=1, help='Calendar days to check back from --date (default: 1, max 60)')
+    parser.add_argument('--dry-run', action='store_true', help='Only list the gaps')
+
+    args = parser.parse_args()
+    if not 1 <= args.days <= 60:
+        print('❌ --days must be between 1 and 60')
+        return 1
+
+    # Keep the app's own print() logging off stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        from app import create_app
+        from app.controllers.market_controller import scheduler
+        from app.services.data_gap_service import DataGapService
+
+        app = create_app()
+        # Only the scan and backfill below should touch the tables
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+
+    with app.app_context():
+        gap_service = DataGapService()
+        end_date = date.fromisoformat(args.date) if args.date else gap_service.ist_today()
+        dates = [end_date - timedelta(days=offset) for offset in reversed(range(args.days))]
+
+        missing = 0
+        for trade_date in dates:
+            scan = gap_service.scan(trade_date)
+            if not scan['trading_day']:
+                print(f"📅 {trade_date}: no session")
+                continue
+            print(f"📅 {trade_date}: {scan['missing_slots']} missing slots")
+            for instrument in scan['instruments']:
+                if not instrument['missing_slots']:
+                    continue
+                spans = ', '.join(f"{gap['start']}-{gap['end']}" for gap in instrument['gaps'][:8])
+                more = f" (+{len(instrument['gaps']) - 8} more)" if len(instrument['gaps']) > 8 else ''
+                note = '' if instrument['backfillable'] else ' [report only]'
+                print(f"   {instrument['table']:<18} {instrument['underlying']:<10} "
+                      f"{instrument['missing_slots']:>4}/{instrument['expected_slots']} missing: {spans}{more}{note}")
+            missing += scan['missing_slots']
+
+        if args.dry_run or not missing:
+            return 1 if missing else 0
+
+        print('\n🔄 Backfilling from historical candles...')
+        result = gap_service.backfill(dates)
+        for table, rows in result['rows'].items():
+            print(f"   ✅ {table}: {rows} rows")
+        for error in result['errors']:
+            print(f"   ❌ {error}")
+        print(f"📊 {result['requests']} Kite requests, {result['unfilled']} slots still missing")
+
+        left = sum(gap_service.scan(trade_date)['missing_slots'] for trade_date in dates)
+        print(f"📉 Missing slots: {missing} -> {left}")
+        return 1 if left else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,23 +11,55 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool per process (DB_POOL_SIZE / DB_MAX_OVERFLOW, SQLAlchemy's defaults when unset)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        key: int(os.environ[name])
+        for key, name in (('pool_size', 'DB_POOL_SIZE'), ('max_overflow', 'DB_MAX_OVERFLOW'))
+        if os.getenv(name)
+    }
     
     # Kite Configuration
     KITE_API_KEY = os.getenv('KITE_API_KEY')
     KITE_API_SECRET = os.getenv('KITE_API_SECRET')
     KITE_REDIRECT_URL = os.getenv('KITE_REDIRECT_URL')
     
+    # Offline market simulator in place of the Kite API (load tests, demos without a login)
+    KITE_SIMULATION = os.getenv('KITE_SIMULATION', 'false').lower() == 'true'
+    KITE_SIM_SEED = int(os.getenv('KITE_SIM_SEED', '42'))
+    KITE_SIM_LATENCY_MS = float(os.getenv('KITE_SIM_LATENCY_MS', '0'))
+    KITE_SIM_JITTER_MS = float(os.getenv('KITE_SIM_JITTER_MS', '0'))
+    KITE_SIM_ERROR_RATE = float(os.getenv('KITE_SIM_ERROR_RATE', '0'))
+    # Simulated wall clock started at this IST moment (YYYY-MM-DDTHH:MM), e.g. a seeded session for load tests
+    KITE_SIM_CLOCK = os.getenv('KITE_SIM_CLOCK')
+    
     # Token Storage
     TOKEN_FILE_PATH = os.getenv('TOKEN_FILE_PATH', 'storage/tokens/access_token.json')
     
     # Logging
     LOG_FILE = 'logs/app.log'
     
+    # SQL profiler: share of requests profiled (0 = off) and repeats of one statement shape flagged as N+1
+    SQL_PROFILE_SAMPLE_RATE = float(os.getenv('SQL_PROFILE_SAMPLE_RATE', '0'))
+    SQL_PROFILE_REPEAT_THRESHOLD = int(os.getenv('SQL_PROFILE_REPEAT_THRESHOLD', '5'))
+    
+    # Stack sampling profiler: always-on CPU sampling at this share of the on-demand rate (0 = on demand only)
+    PROFILER_ALWAYS_ON_RATE = float(os.getenv('PROFILER_ALWAYS_ON_RATE', '0'))
+    
+    # Data gap monitor: fill index and futures gaps from Kite historical candles as they are found
+    GAP_AUTO_BACKFILL = os.getenv('GAP_AUTO_BACKFILL', 'true').lower() == 'true'
+    
+    # Startup: background warm-up from each worker's first request, and whether this process runs the scheduler
+    # (SCHEDULER_ENABLED=false for web workers when run_scheduler.py runs the jobs)
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    
 class DevelopmentConfig(Config):
     DEBUG = True
+    SQL_PROFILE_SAMPLE_RATE = float(os.getenv('SQL_PROFILE_SAMPLE_RATE', '1'))
     
 class ProductionConfig(Config):
     DEBUG = False
+    SQL_PROFILE_SAMPLE_RATE = float(os.getenv('SQL_PROFILE_SAMPLE_RATE', '0.01'))
     
 config = {
     'development': DevelopmentConfig,
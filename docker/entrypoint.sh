@@ -10,15 +10,10 @@ while ! nc -z redis 6379; do
 done
 echo "Redis is ready!"
 
-# Initialize database if needed
+# Initialize database if needed (create_app no longer creates tables):
+# a new database gets the models' schema stamped at head, a migrated one is upgraded
 echo "Initializing database..."
-python -c "
-from app import create_app, db
-app = create_app()
-with app.app_context():
-    db.create_all()
-    print('Database initialized successfully')
-"
+flask --app run init-db
 
 # Create necessary directories
 mkdir -p /app/storage/logs /app/storage/tokens
@@ -28,7 +23,8 @@ echo "Starting Flask application with Gunicorn..."
 exec gunicorn \
     --bind 0.0.0.0:8000 \
     --workers 4 \
-    --threads 2 \
+    --worker-class gthread \
+    --threads 16 \
     --timeout 120 \
     --keepalive 2 \
     --max-requests 1000 \
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Streaming table export
+Writes option chain, price, futures OI and strategy tables as CSV, NDJSON or Parquet
+in constant memory (same code path as /api/export/<dataset>)
+
+Usage:
+    python export_data.py option_chain_data --start 2025-01-01 --end 2025-03-31 --underlying NIFTY
+    python export_data.py nifty_prices --format parquet --output nifty.parquet
+    python export_data.py futures_oi_data --format ndjson --output - > futures.ndjson
+"""
+
+import sys
+import os
+import argparse
+import contextlib
+
+# Add the app directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.export_service import ExportService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a table to CSV, NDJSON or Parquet')
+    parser.add_argument('dataset', choices=list(ExportService.DATASETS),
+                        help='Table to export')
+    parser.add_argument('--format', default='csv', choices=list(ExportService.FORMATS),
+                        help='Output format (default: csv)')
+    parser.add_argument('--start', help="Start bound, 'YYYY-MM-DD' or ISO datetime (UTC)")
+    parser.add_argument('--end', help="End bound, 'YYYY-MM-DD' (whole day) or ISO datetime (UTC)")
+    parser.add_argument('--underlying', help='NIFTY or BANKNIFTY (option_chain_data, futures_oi_data)')
+    parser.add_argument('--output', help='Output file (default: ./exports/<generated name>, - for stdout)')
+
+    args = parser.parse_args()
+
+    # Data may go to stdout; the app's own print() logging goes to stderr
+    stdout = sys.stdout.buffer
+    with contextlib.redirect_stdout(sys.stderr):
+        return export(args, stdout)
+
+
+def export(args, stdout):
+    from app import create_app
+    from app.controllers.market_controller import scheduler
+
+    app = create_app()
+    # A long export must not run the ingestion jobs a second time alongside the server
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+
+    with app.app_context():
+        export_service = ExportService()
+        try:
+            start = export_service.parse_bound(args.start)
+            end = export_service.parse_bound(args.end, end_of_day=True)
+            chunks = export_service.stream(args.dataset, args.format, start=start, end=end, underlying=args.underlying)
+        except ValueError as e:
+            print(f'❌ {e}', file=sys.stderr)
+            return 1
+
+        if args.output == '-':
+            for chunk in chunks:
+                stdout.write(chunk)
+            stdout.flush()
+            return 0
+
+        output = args.output or os.path.join(
+            'exports', export_service.filename(args.dataset, args.format, start, end, args.underlying)
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+
+        written = 0
+        with open(output, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+
+        print(f'✅ Exported {args.dataset} to {output} ({written / 1024 / 1024:.1f} MB)', file=sys.stderr)
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Dashboard load test
+Simulated users with several dashboard tabs open (the requests each page's
+script makes on load and on every live update, plus the page's open event
+stream) against a running server, or against gunicorn started here on a scratch
+database seeded with synthetic sessions. Reports p50/p95/p99 per endpoint and
+the database connections the workers used, to size gunicorn workers/threads
+and DB_POOL_SIZE. The report is written to storage/loadtest/<time>/report.json.
+
+Usage:
+    python load_test.py --serve --users 50 --duration 300
+    python load_test.py --serve --workers 4 --threads 8 --pool-size 5 --users 200 --time-scale 4
+    python load_test.py --serve --database-url postgresql://localhost/kite_loadtest --users 100
+    python load_test.py --url http://127.0.0.1:5000 --users 20 --refresh events
+"""
+
+import sys
+import os
+import argparse
+import contextlib
+import json
+import signal
+import socket
+import subprocess
+import time
+import urllib.request
+from datetime import date, datetime
+
+# Add the app directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def seed_database(trade_date, history_days, seed):
+    """Schema plus the trade date's full session and history_days sessions before it (for MACD)"""
+    with contextlib.redirect_stdout(sys.stderr):
+        from app import create_app, db
+        from app.services.market_simulator import MarketSimulator, SimulatedDataLoader
+        app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+    simulator = MarketSimulator(seed=seed)
+    loader = SimulatedDataLoader(simulator)
+    days = [trade_date]
+    while len(days) <= history_days:
+        days.insert(0, simulator.previous_trading_day(days[0]))
+    with app.app_context():
+        # Scratch database: create_app leaves the schema to migrations
+        db.create_all()
+        for day in days:
+            loader.load_day(day, ['NIFTY', 'BANKNIFTY'])
+            db.session.commit()
+            print(f"   📅 {day} loaded")
+        db.session.remove()
+        db.engine.dispose()
+
+
+def dotenv_overrides(names):
+    """Names the project's .env sets (config.config loads it with override=True)"""
+    from dotenv import dotenv_values
+    values = dotenv_values(os.path.join(ROOT, '.env'))
+    return [name for name in names if values.get(name)]
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(args, port, run_dir):
+    command = [
+        sys.executable, '-m', 'gunicorn', '--preload',
+        '-k', 'gthread', '--workers', str(args.workers), '--threads', str(args.threads),
+        '--bind', f'127.0.0.1:{port}', '--timeout', '120', 'run:app'
+    ]
+    log = open(os.path.join(run_dir, 'gunicorn.log'), 'w')
+    server = subprocess.Popen(command, cwd=ROOT, env=os.environ.copy(), stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with {server.returncode} (see {log.name})')
+        try:
+            with urllib.request.urlopen(f'{base_url}/health', timeout=2):
+                return server, base_url
+        except OSError:
+            time.sleep(0.5)
+    stop_server(server)
+    raise RuntimeError(f'gunicorn did not answer /health within 60s (see {log.name})')
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def print_report(report):
+    print(f"\n{'Endpoint':<48} {'Count':>7} {'Errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Max ms':>8}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<48} {stats['count']:>7} {stats['errors']:>7} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}")
+        for kind, count in stats['error_kinds'].items():
+            print(f"   ⚠️ {kind}: {count}")
+
+    print(f"\n📊 {report['requests']} requests in {report['seconds']}s ({report['requests_per_second']}/s), "
+          f"{report['errors']} errors, peak {report['peak_in_flight']} in flight")
+    if report['requests']:
+        print(f"⏱️ All endpoints: p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms")
+    streams = report['streams']
+    print(f"📡 Streams: {streams['opened']} opened (at most {streams['open_peak']} at once), "
+          f"{streams['failed']} failed, {streams['refused']} refused, {streams['events']} events")
+    server = report['options']
+    if server['serve'] and streams['open_peak'] >= server['workers'] * server['threads']:
+        # Each open stream holds one gthread worker thread for up to 2 minutes (MAX_STREAM_SECONDS)
+        print(f"⚠️ Streams took every worker thread ({server['workers']} x {server['threads']}): "
+              f"requests queued behind them")
+
+    db_connections = report['db_connections']
+    if db_connections:
+        print(f"🗄️ DB connections: in use max {db_connections['in_use_max']:.0f} "
+              f"(mean {db_connections['in_use_mean']}), open max {db_connections['open_max']:.0f}, "
+              f"one worker's peak checkout {db_connections['worker_checkout_peak']:.0f}")
+        if server['serve']:
+            pool_limit = (server['pool_size'] if server['pool_size'] is not None else 5) + \
+                (server['max_overflow'] if server['max_overflow'] is not None else 10)
+            if db_connections['worker_checkout_peak'] >= pool_limit:
+                print(f"⚠️ A worker used its whole pool ({pool_limit} connections): requests waited for a connection")
+    else:
+        print("🗄️ DB connections: no pool samples from /metrics")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the dashboards with simulated concurrent users')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='Base URL of a running server')
+    target.add_argument('--serve', action='store_true', help='Start gunicorn on a seeded scratch database')
+    parser.add_argument('--users', type=int, default=20, help='Concurrent users (default: 20)')
+    parser.add_argument('--tabs', type=int, default=3, help='Dashboard tabs each user has open (default: 3)')
+    parser.add_argument('--duration', type=float, default=120, help='Seconds of load (default: 120)')
+    parser.add_argument('--ramp', type=float, default=10, help='Seconds over which users arrive (default: 10)')
+    parser.add_argument('--refresh', choices=['timer', 'events'], default='timer',
+                        help='Refetch on the publish schedule or on streamed events (default: timer)')
+    parser.add_argument('--time-scale', type=float, default=1, help='Publish schedule speed-up, timer mode (default: 1)')
+    parser.add_argument('--no-stream', action='store_true', help='Do not hold live-update streams open')
+    parser.add_argument('--date', help='Trade date the pages ask for (default: last trading day before today)')
+    parser.add_argument('--seed', type=int, default=42, help='Page mix and synthetic market seed (default: 42)')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed (default: 30)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers, --serve (default: 2)')
+    parser.add_argument('--threads', type=int, default=8, help='Threads per worker, --serve (default: 8)')
+    parser.add_argument('--pool-size', type=int, help='DB_POOL_SIZE per worker, --serve (default: SQLAlchemy\'s 5)')
+    parser.add_argument('--max-overflow', type=int, help='DB_MAX_OVERFLOW per worker, --serve (default: SQLAlchemy\'s 10)')
+    parser.add_argument('--history-days', type=int, default=3, help='Sessions seeded before the trade date, --serve (default: 3)')
+    parser.add_argument('--database-url', help='Scratch database to seed, --serve (default: SQLite in the run directory)')
+    parser.add_argument('--output', help='Report file (default: storage/loadtest/<time>/report.json)')
+
+    args = parser.parse_args()
+    if not args.no_stream and args.tabs >= 6:
+        parser.error('a browser has 6 connections per host: with streams open, --tabs must be 5 or less')
+
+    run_dir = os.path.join(ROOT, 'storage', 'loadtest', datetime.now().strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(run_dir, exist_ok=True)
+
+    if args.serve:
+        # Read by config.config when the app is imported, here and in the gunicorn workers
+        # (scratch database, metrics, caches and live events, so a running server is left alone)
+        server_env = {
+            'DATABASE_URL': args.database_url or f"sqlite:///{os.path.join(run_dir, 'loadtest.db')}",
+            'FLASK_ENV': 'production',
+            'KITE_SIMULATION': 'true',
+            'KITE_SIM_SEED': str(args.seed),
+            'SCHEDULER_ENABLED': 'false',
+            'SQL_PROFILE_SAMPLE_RATE': '0',
+            'METRICS_DIR': os.path.join(run_dir, 'metrics'),
+            'SHARED_CACHE_DIR': os.path.join(run_dir, 'shared_cache'),
+            'EVENTS_DIR': os.path.join(run_dir, 'events'),
+        }
+        for name, value in (('DB_POOL_SIZE', args.pool_size), ('DB_MAX_OVERFLOW', args.max_overflow)):
+            if value is not None:
+                server_env[name] = str(value)
+        overridden = dotenv_overrides(list(server_env) + ['KITE_SIM_CLOCK'])
+        if overridden:
+            print(f"❌ .env sets {', '.join(overridden)}, which the app loads over the load test's settings")
+            return 1
+        os.environ.update(server_env)
+
+    from app.services.market_simulator import MarketSimulator
+    simulator = MarketSimulator(seed=args.seed)
+    trade_date = date.fromisoformat(args.date) if args.date else simulator.previous_trading_day(date.today())
+
+    server = None
+    base_url = args.url
+    try:
+        if args.serve:
+            print(f"🌱 Seeding {args.history_days + 1} sessions up to {trade_date}...")
+            seed_database(trade_date, args.history_days, args.seed)
+            # Pages read "today" as the seeded session, near its close
+            os.environ['KITE_SIM_CLOCK'] = f'{trade_date.isoformat()}T15:25'
+            print(f"🚀 Starting gunicorn: {args.workers} workers x {args.threads} threads")
+            server, base_url = start_server(args, free_port(), run_dir)
+
+        from app.services.load_test_service import LoadTest
+        load_test = LoadTest(
+            base_url, trade_date, users=args.users, tabs=args.tabs, duration=args.duration, ramp=args.ramp,
+            refresh=args.refresh, time_scale=args.time_scale, streams=not args.no_stream, seed=args.seed,
+            timeout=args.timeout
+        )
+        mix = {}
+        for pages in load_test.page_mix():
+            for page in pages:
+                mix[page] = mix.get(page, 0) + 1
+        print(f"👥 {args.users} users x {args.tabs} tabs against {base_url} for {args.duration:.0f}s "
+              f"({', '.join(f'{page} {count}' for page, count in sorted(mix.items()))})")
+        report = load_test.run()
+    except (RuntimeError, OSError) as e:
+        print(f"❌ Load test failed: {e}")
+        return 1
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    report['options'] = {key: value for key, value in vars(args).items() if key != 'database_url'}
+    report['trade_date'] = trade_date.isoformat()
+    print_report(report)
+
+    output = args.output or os.path.join(run_dir, 'report.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report saved to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
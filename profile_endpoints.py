@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+SQL profile of API endpoints
+Requests each endpoint through the app's test client with the SQL profiler on
+for every request and prints the per-endpoint report: statements, SQL time and
+repeated statement shapes (N+1 suspects)
+
+Usage:
+    python profile_endpoints.py
+    python profile_endpoints.py /api/top-oi-strikes "/api/oi-changes-timeline?underlying=BANKNIFTY" --repeat 3
+    python profile_endpoints.py --json > sql_profile.json
+"""
+
+import sys
+import os
+import json
+import argparse
+import contextlib
+
+# Add the app directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATHS = [
+    '/api/dashboard-comprehensive',
+    '/api/market-signal',
+    '/api/sector-performance',
+    '/api/top-oi-strikes',
+    '/api/oi-changes-timeline?underlying=NIFTY',
+    '/api/oi-changes-timeline?underlying=BANKNIFTY',
+    '/api/prices/history?limit=500',
+    '/api/macd-recent-signals',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the SQL issued by API endpoints')
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS, help='Request paths (default: dashboard APIs)')
+    parser.add_argument('--repeat', type=int, default=1, help='Requests per path (default: 1)')
+    parser.add_argument('--threshold', type=int, default=5,
+                        help='Executions of one statement shape per request reported as N+1 (default: 5)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    args = parser.parse_args()
+
+    # The report may go to stdout; the app's own print() logging goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        report = profile(args)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+def profile(args):
+    from app import create_app
+    from app.controllers.market_controller import scheduler
+    from app.middlewares.query_profiler import query_report
+
+    app = create_app()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    app.config['SQL_PROFILE_SAMPLE_RATE'] = 1.0
+    app.config['SQL_PROFILE_REPEAT_THRESHOLD'] = args.threshold
+
+    client = app.test_client()
+    query_report.clear()
+    for path in args.paths:
+        for _ in range(args.repeat):
+            response = client.get(path)
+            print(f"{response.status_code} {path}  {response.headers.get('Server-Timing', '')}")
+    return query_report.get_report()
+
+
+def print_report(report):
+    print(f"\n{'Endpoint':<45} {'Req':>4} {'Avg SQL':>8} {'Max SQL':>8} {'SQL ms':>8} {'Total ms':>9}")
+    print('-' * 87)
+    for endpoint, entry in report.items():
+        print(f"{endpoint:<45} {entry['requests']:>4} {entry['avg_statements']:>8} "
+              f"{entry['max_statements']:>8} {entry['avg_sql_ms']:>8} {entry['avg_ms']:>9}")
+
+    suspects = [(endpoint, shape) for endpoint, entry in report.items() for shape in entry['repeated']]
+    if not suspects:
+        print('\n✅ No repeated statement shapes')
+        return
+
+    print(f'\n⚠️ {len(suspects)} possible N+1 pattern(s):')
+    for endpoint, shape in suspects:
+        print(f"\n  {endpoint}: up to {shape['max_per_request']}x per request, {shape['seconds'] * 1000:.1f} ms total")
+        print(f"    {shape['sql'][:200]}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
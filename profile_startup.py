@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Startup profile
+Boots the app in fresh interpreters, the way a gunicorn worker without
+--preload does, and reports the process boot time, create_app's phases, the
+slowest imports and any library meant for the warm-up that boot loaded anyway.
+Exit status is 1 when the median boot exceeds --budget-ms.
+
+Usage:
+    python profile_startup.py
+    python profile_startup.py --runs 5 --top 20
+    python profile_startup.py --budget-ms 800
+"""
+
+import sys
+import os
+import argparse
+import contextlib
+import json
+import statistics
+import subprocess
+import time
+
+# Add the app directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def boot_child():
+    """Create the app in this interpreter and print its startup profile as JSON"""
+    with contextlib.redirect_stdout(sys.stderr):
+        from app import create_app
+        app = create_app()
+        from app.controllers.market_controller import scheduler
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+    print(json.dumps(app.extensions['startup_profile'].report()))
+    return 0
+
+
+def run_child(import_time=False):
+    command = [sys.executable] + (['-X', 'importtime'] if import_time else []) + [os.path.abspath(__file__), '--child']
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'boot failed')
+    return wall_ms, json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(stderr, top):
+    """Top-level imports by cumulative microseconds, from -X importtime output"""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that triggered them
+        if name.startswith('  '):
+            continue
+        totals[name.strip()] = int(cumulative)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure worker boot time and where it goes')
+    parser.add_argument('--runs', type=int, default=3, help='Timed boots (default: 3)')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports listed (default: 15)')
+    parser.add_argument('--budget-ms', type=float, default=1000, help='Median boot budget (default: 1000)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.child:
+        return boot_child()
+
+    print(f"⏱️ Booting the app {args.runs} times...")
+    walls, profiles = [], []
+    try:
+        for _ in range(args.runs):
+            wall_ms, profile, _ = run_child()
+            walls.append(wall_ms)
+            profiles.append(profile)
+        # Separate run: -X importtime slows the imports it measures
+        _, _, import_log = run_child(import_time=True)
+    except RuntimeError as e:
+        print(f"❌ Boot failed: {e}")
+        return 1
+
+    median_wall = statistics.median(walls)
+    median_app = statistics.median(profile['total_ms'] for profile in profiles)
+    print(f"\n🚀 Process boot (interpreter start to app ready): median {median_wall:.0f} ms "
+          f"({', '.join(f'{wall:.0f}' for wall in walls)})")
+    print(f"🏗️ create_app: median {median_app:.0f} ms")
+
+    print('\n📋 create_app phases (median ms)')
+    for i, phase in enumerate(profiles[0]['phases']):
+        ms = statistics.median(profile['phases'][i]['ms'] for profile in profiles)
+        print(f"   {phase['name']:<24} {ms:>8.1f}")
+
+    print("\n📦 Slowest top-level imports (cumulative ms, one -X importtime run)")
+    for name, microseconds in slowest_imports(import_log, args.top):
+        print(f"   {name:<40} {microseconds / 1000:>8.1f}")
+
+    deferred = profiles[0]['deferred_loaded_at_boot']
+    if deferred:
+        print(f"\n⚠️ Loaded at boot, meant for the warm-up: {', '.join(deferred)}")
+    print(f"\n📚 Modules loaded at boot: {profiles[0]['modules_at_boot']}")
+
+    if median_wall > args.budget_ms:
+        print(f"\n❌ Median boot {median_wall:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        return 1
+    print(f"\n✅ Median boot {median_wall:.0f} ms is within the {args.budget_ms:.0f} ms budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
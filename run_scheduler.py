@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Scheduler process
+Runs the background jobs (prices, option chains, MACD cache, Strategy 1, data
+gap monitor) in a process of their own, so web workers can boot with
+SCHEDULER_ENABLED=false and none of them runs a second copy of the jobs.
+
+Usage:
+    python run_scheduler.py
+    SCHEDULER_ENABLED=false gunicorn --workers 4 run:app    # web workers, started separately
+"""
+
+import sys
+import os
+import signal
+import threading
+
+# Add the app directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    # This process is the one that runs the jobs, whatever the shared environment says
+    # (set before config.config reads it)
+    os.environ['SCHEDULER_ENABLED'] = 'true'
+
+    from app import create_app
+    from app.controllers.market_controller import scheduler
+
+    create_app(os.getenv('FLASK_ENV', 'development'))
+    print(f"🕒 Scheduler running jobs: {', '.join(job.id for job in scheduler.get_jobs())}")
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+    stopped.wait()
+
+    print("🛑 Stopping scheduler...")
+    scheduler.shutdown(wait=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
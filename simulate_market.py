@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Synthetic market data
+Fills nifty_prices, banknifty_prices, option_chain_data and futures_oi_data
+with MarketSimulator sessions (same cadence as the live jobs: prices every
+minute, option chains every 2 minutes, futures every 5), for load tests and
+offline development. Run the server with KITE_SIMULATION=true to keep
+ingesting from the same simulated market.
+
+Usage:
+    python simulate_market.py --start 2025-12-01 --end 2025-12-05
+    python simulate_market.py --start 2025-12-15 --strikes 20 --seed 7 --clear
+    python simulate_market.py --start 2025-12-01 --end 2025-12-31 --underlyings NIFTY
+"""
+
+import sys
+import os
+import argparse
+import contextlib
+import time
+from datetime import date
+
+# Add the app directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic market data into the database')
+    parser.add_argument('--start', required=True, help='First trade date (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Last trade date (default: --start)')
+    parser.add_argument('--underlyings', default='NIFTY,BANKNIFTY', help='Comma separated (default: NIFTY,BANKNIFTY)')
+    parser.add_argument('--strikes', type=int, default=10, help='Strikes each side of ATM (default: 10)')
+    parser.add_argument('--chain-step', type=int, default=2, help='Minutes between option chain snapshots (default: 2)')
+    parser.add_argument('--futures-step', type=int, default=5, help='Minutes between futures rows (default: 5)')
+    parser.add_argument('--seed', type=int, default=42, help='Simulator seed (default: 42)')
+    parser.add_argument('--clear', action='store_true', help='Delete existing rows in the date range first')
+
+    args = parser.parse_args()
+    start = date.fromisoformat(args.start)
+    end = date.fromisoformat(args.end) if args.end else start
+    underlyings = [u.strip().upper() for u in args.underlyings.split(',') if u.strip()]
+
+    # Keep the app's own print() logging off stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        from app import create_app
+        from app.controllers.market_controller import scheduler
+
+        app = create_app()
+        # The generator must not race the ingestion jobs for the same tables
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+
+    from app.services.market_simulator import MarketSimulator, SimulatedDataLoader
+
+    simulator = MarketSimulator(seed=args.seed)
+    unknown = [u for u in underlyings if u not in simulator.UNDERLYINGS]
+    if unknown:
+        print(f"❌ Unknown underlying(s): {', '.join(unknown)}")
+        return 1
+
+    loader = SimulatedDataLoader(simulator, args.strikes, args.chain_step, args.futures_step)
+    with app.app_context():
+        if args.clear:
+            for table, deleted in loader.clear(start, end, underlyings).items():
+                print(f'🗑️ {table}: {deleted} rows deleted')
+
+        for day in loader.trading_days(start, end):
+            started = time.perf_counter()
+            counts = loader.load_day(day, underlyings)
+            rows = ', '.join(f'{table} {count}' for table, count in counts.items())
+            print(f'✅ {day}: {rows} ({time.perf_counter() - started:.1f}s)')
+
+    print('🎉 Synthetic market data loaded')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Strategy 1 replay benchmark
+
+Seeds a scratch SQLite database with a full trading session (one NIFTY price per
+minute from 9:15 to 15:30 and a 41-strike option chain every 2 minutes), then
+times the vectorised theoretical history against the per-row legacy path.
+
+Usage: python speed_test_strategy_replay.py [runs]
+"""
+import os
+import sys
+import time
+import tempfile
+
+# Scratch database must be configured before the app is imported
+db_path = os.path.join(tempfile.mkdtemp(), 'strategy_replay_bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from datetime import date, datetime, timedelta
+from app import create_app, db
+from app.models.nifty_price import NiftyPrice
+from app.models.banknifty_price import OptionChainData
+from app.services.strategy_service import StrategyService
+
+TARGET_MS = 100
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+
+def seed_session():
+    """One full session for today (timestamps stored as naive UTC, 9:15 IST = 3:45 UTC)"""
+    rng = np.random.default_rng(42)
+    session_start = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=3, minutes=45)
+    minutes = 376
+    prices = 25000 + np.cumsum(rng.normal(0, 8, minutes))
+    strikes = np.arange(24000, 26001, 50)
+
+    db.session.bulk_insert_mappings(NiftyPrice, [
+        {'timestamp': session_start + timedelta(minutes=m), 'price': float(prices[m]),
+         'high': float(prices[m] + 2), 'low': float(prices[m] - 2)}
+        for m in range(minutes)
+    ])
+
+    option_rows = []
+    for m in range(0, minutes, 2):
+        for strike in strikes:
+            moneyness = prices[m] - strike
+            option_rows.append({
+                'underlying': 'NIFTY',
+                'strike_price': float(strike),
+                'expiry_date': date.today(),
+                'ce_ltp': float(max(moneyness, 0) + 40 + rng.random()),
+                'pe_ltp': float(max(-moneyness, 0) + 40 + rng.random()),
+                'ce_oi': 1000, 'pe_oi': 1000,
+                'timestamp': session_start + timedelta(minutes=m, seconds=5)
+            })
+    db.session.bulk_insert_mappings(OptionChainData, option_rows)
+    db.session.commit()
+    return minutes, len(option_rows)
+
+
+def legacy_history(service):
+    """Pre-vectorisation path: per-row position calculation with LTP lookups"""
+    range_data = service.get_nifty_high_low_range()
+    rows = db.session.query(NiftyPrice).filter(
+        db.func.date(NiftyPrice.timestamp) == date.today()
+    ).order_by(NiftyPrice.timestamp.asc()).all()
+    return [service.calculate_strategy_1_positions(range_data['high'], range_data['low'], float(r.price)) for r in rows]
+
+
+app = create_app()
+with app.app_context():
+    db.create_all()
+    price_count, option_count = seed_session()
+    print(f'Seeded {price_count} price rows and {option_count} option chain rows')
+
+    service = StrategyService()
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = service.get_detailed_theoretical_history()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    legacy_start = time.perf_counter()
+    legacy_history(service)
+    legacy_ms = (time.perf_counter() - legacy_start) * 1000
+
+    best, median = min(timings), float(np.median(timings))
+    print(f'Vectorised history: {len(result["history"])} rows, best {best:.1f}ms, median {median:.1f}ms over {RUNS} runs')
+    print(f'Legacy per-row path: {legacy_ms:.1f}ms ({legacy_ms / median:.0f}x slower)')
+
+    if median > TARGET_MS:
+        print(f'FAIL: median {median:.1f}ms exceeds {TARGET_MS}ms target')
+        sys.exit(1)
+    print(f'PASS: full session under {TARGET_MS}ms')